@@ -22,6 +22,7 @@ console = Console(theme=custom_theme, force_terminal=True)
 
 FORMAT = "%(message)s"
 LOG_FILE_PATH = APP_HOME / "logging/app.log"
+LOG_FILE_PATH.parent.mkdir(exist_ok=True, parents=True)
 
 
 logging.basicConfig(
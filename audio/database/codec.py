@@ -0,0 +1,150 @@
+from __future__ import annotations
+
+import enum
+import struct
+import zlib
+
+import numpy as np
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Binary layout of `audio.sweepVoltage.voltages`:
+#   magic (3 bytes), version, format, compression, 2 reserved bytes
+#   scale (float64), only for `VoltageFormat.INT16`
+#   samples, little endian, optionally compressed
+# The magic starts with a non ASCII byte so it never matches the legacy
+# newline joined text of the samples.
+CODEC_MAGIC: bytes = b"\x93AV"
+CODEC_VERSION: int = 1
+
+_HEADER = struct.Struct("<3sBBBxx")
+_SCALE = struct.Struct("<d")
+
+INT16_MAX: int = 32767
+
+
+class VoltageFormat(enum.Enum):
+    FLOAT32 = 1
+    FLOAT64 = 2
+    INT16 = 3
+
+
+class Compression(enum.Enum):
+    NONE = 0
+    ZLIB = 1
+    ZSTD = 2
+
+
+_DTYPES: dict[VoltageFormat, np.dtype] = {
+    VoltageFormat.FLOAT32: np.dtype("<f4"),
+    VoltageFormat.FLOAT64: np.dtype("<f8"),
+    VoltageFormat.INT16: np.dtype("<i2"),
+}
+
+
+def is_legacy(data: bytes) -> bool:
+    """Check if `data` is the legacy newline joined text encoding."""
+    return bytes(data[: len(CODEC_MAGIC)]) != CODEC_MAGIC
+
+
+def _compress(payload: bytes, compression: Compression) -> bytes:
+    if compression == Compression.ZLIB:
+        return zlib.compress(payload)
+
+    if compression == Compression.ZSTD:
+        if zstandard is None:
+            _msg = "zstd compression needs the `zstandard` package."
+            raise ValueError(_msg)
+        return zstandard.ZstdCompressor().compress(payload)
+
+    return payload
+
+
+def _decompress(payload: memoryview, compression: Compression) -> bytes | memoryview:
+    if compression == Compression.ZLIB:
+        return zlib.decompress(payload)
+
+    if compression == Compression.ZSTD:
+        if zstandard is None:
+            _msg = "zstd compressed voltages need the `zstandard` package."
+            raise ValueError(_msg)
+        return zstandard.ZstdDecompressor().decompress(payload)
+
+    return payload
+
+
+def encode_voltages(
+    voltages: np.ndarray | list[float],
+    voltage_format: VoltageFormat = VoltageFormat.FLOAT64,
+    compression: Compression = Compression.NONE,
+    scale: float | None = None,
+) -> bytes:
+    """Encode the samples of a channel for `audio.sweepVoltage`.
+
+    Args:
+        voltages (np.ndarray | list[float]): The samples.
+        voltage_format (VoltageFormat, optional): Sample type. Defaults to
+            VoltageFormat.FLOAT64, lossless.
+        compression (Compression, optional): Payload compression. Defaults to
+            Compression.NONE.
+        scale (float | None, optional): Volts per `INT16` code, e.g. the ADC
+            resolution. Defaults to None, full scale on the largest sample.
+
+    Returns:
+        bytes: Header and payload.
+    """
+    voltages = np.asarray(voltages, dtype=np.float64)
+
+    extra = b""
+    if voltage_format == VoltageFormat.INT16:
+        if scale is None:
+            peak = float(np.max(np.abs(voltages), initial=0))
+            scale = peak / INT16_MAX if peak > 0 else 1.0
+        extra = _SCALE.pack(scale)
+        samples = np.clip(np.rint(voltages / scale), -INT16_MAX - 1, INT16_MAX)
+    else:
+        samples = voltages
+
+    payload = samples.astype(_DTYPES[voltage_format]).tobytes()
+
+    header = _HEADER.pack(
+        CODEC_MAGIC,
+        CODEC_VERSION,
+        voltage_format.value,
+        compression.value,
+    )
+    return header + extra + _compress(payload, compression)
+
+
+def decode_voltages(data: bytes) -> np.ndarray:
+    """Decode `audio.sweepVoltage.voltages`, binary or legacy text.
+
+    Uncompressed float payloads are returned as read only views of `data`.
+    """
+    if is_legacy(data):
+        return np.array(bytes(data).split(), dtype=np.float64)
+
+    view = memoryview(data)
+    _, version, voltage_format, compression = _HEADER.unpack_from(view)
+    if version > CODEC_VERSION:
+        _msg = f"Voltages codec version {version} is not supported."
+        raise ValueError(_msg)
+
+    voltage_format = VoltageFormat(voltage_format)
+    offset = _HEADER.size
+
+    scale = None
+    if voltage_format == VoltageFormat.INT16:
+        (scale,) = _SCALE.unpack_from(view, offset)
+        offset += _SCALE.size
+
+    payload = _decompress(view[offset:], Compression(compression))
+    samples = np.frombuffer(payload, dtype=_DTYPES[voltage_format])
+
+    if scale is not None:
+        return samples * scale
+
+    return samples
@@ -67,6 +67,30 @@ CREATE TABLE IF NOT EXISTS audio.testConfig(
   FOREIGN KEY (test_id) REFERENCES audio.test (id)
 );
 
+-- Analysis results of a sweep, keyed by the estimator and the hash of its
+-- parameters. `channel_idx` is the channel of the analysed tensor, gain and
+-- phase are relative to channel 0.
+CREATE TABLE IF NOT EXISTS audio.derivedResult(
+  id INT NOT NULL AUTO_INCREMENT,
+  sweep_id INT NOT NULL,
+  frequency_id INT NOT NULL,
+  channel_idx INT NOT NULL,
+  estimator VARCHAR(32) NOT NULL,
+  parameters_hash CHAR(64) NOT NULL,
+  rms DOUBLE NOT NULL,
+  phasor_real DOUBLE NOT NULL,
+  phasor_imag DOUBLE NOT NULL,
+  gain_dB DOUBLE NOT NULL,
+  phase DOUBLE NOT NULL,
+  rms_std DOUBLE,
+  phase_std DOUBLE,
+  date DATETIME NOT NULL,
+  PRIMARY KEY (id),
+  UNIQUE KEY (sweep_id, estimator, parameters_hash, frequency_id, channel_idx),
+  FOREIGN KEY (sweep_id) REFERENCES audio.sweep (id),
+  FOREIGN KEY (frequency_id) REFERENCES audio.frequency (id)
+);
+
 -- CREATE TABLE IF NOT EXISTS audio.media(
 --   id INT NOT NULL AUTO_INCREMENT,
 --   test_id INT NOT NULL,
@@ -0,0 +1,90 @@
+-- SQLite version of create_database.sql, the file is attached as `audio`.
+CREATE TABLE IF NOT EXISTS audio.test(
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  name VARCHAR(255) NOT NULL,
+  date DATETIME NOT NULL,
+  comment VARCHAR(500)
+);
+
+CREATE TABLE IF NOT EXISTS audio.sweep(
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  test_id INTEGER NOT NULL,
+  name VARCHAR(255) NOT NULL,
+  date DATETIME NOT NULL,
+  comment VARCHAR(500),
+  FOREIGN KEY (test_id) REFERENCES test (id)
+);
+
+CREATE TABLE IF NOT EXISTS audio.frequency(
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  sweep_id INTEGER NOT NULL,
+  idx INTEGER NOT NULL,
+  frequency DOUBLE NOT NULL,
+  Fs DOUBLE NOT NULL,
+  FOREIGN KEY (sweep_id) REFERENCES sweep (id)
+);
+
+CREATE TABLE IF NOT EXISTS audio.channel(
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  sweep_id INTEGER NOT NULL,
+  idx INTEGER NOT NULL,
+  name VARCHAR(255) NOT NULL,
+  comment VARCHAR(500),
+  FOREIGN KEY (sweep_id) REFERENCES sweep (id)
+);
+
+CREATE TABLE IF NOT EXISTS audio.sweepVoltage(
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  frequency_id INTEGER NOT NULL,
+  channel_id INTEGER NOT NULL,
+  voltages BLOB NOT NULL,
+  FOREIGN KEY (frequency_id) REFERENCES frequency (id),
+  FOREIGN KEY (channel_id) REFERENCES channel (id)
+);
+
+CREATE TABLE IF NOT EXISTS audio.sweepConfig(
+  sweep_id INTEGER NOT NULL,
+  amplitude DOUBLE,
+  frequency_min DOUBLE,
+  frequency_max DOUBLE,
+  points_per_decade DOUBLE,
+  number_of_samples INTEGER,
+  Fs_multiplier DOUBLE,
+  delay_measurements DOUBLE,
+  FOREIGN KEY (sweep_id) REFERENCES sweep (id)
+);
+
+CREATE TABLE IF NOT EXISTS audio.testConfig(
+  test_id INTEGER NOT NULL,
+  config BLOB NOT NULL,
+  FOREIGN KEY (test_id) REFERENCES test (id)
+);
+
+CREATE TABLE IF NOT EXISTS audio.derivedResult(
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  sweep_id INTEGER NOT NULL,
+  frequency_id INTEGER NOT NULL,
+  channel_idx INTEGER NOT NULL,
+  estimator VARCHAR(32) NOT NULL,
+  parameters_hash CHAR(64) NOT NULL,
+  rms DOUBLE NOT NULL,
+  phasor_real DOUBLE NOT NULL,
+  phasor_imag DOUBLE NOT NULL,
+  gain_dB DOUBLE NOT NULL,
+  phase DOUBLE NOT NULL,
+  rms_std DOUBLE,
+  phase_std DOUBLE,
+  date DATETIME NOT NULL,
+  UNIQUE (sweep_id, estimator, parameters_hash, frequency_id, channel_idx),
+  FOREIGN KEY (sweep_id) REFERENCES sweep (id),
+  FOREIGN KEY (frequency_id) REFERENCES frequency (id)
+);
+
+-- InnoDB indexes every foreign key, SQLite needs them explicitly
+CREATE INDEX IF NOT EXISTS audio.sweep_test_id ON sweep (test_id);
+CREATE INDEX IF NOT EXISTS audio.frequency_sweep_id ON frequency (sweep_id, idx);
+CREATE INDEX IF NOT EXISTS audio.channel_sweep_id ON channel (sweep_id, idx);
+CREATE INDEX IF NOT EXISTS audio.sweepVoltage_channel_id ON sweepVoltage (channel_id);
+CREATE INDEX IF NOT EXISTS audio.sweepConfig_sweep_id ON sweepConfig (sweep_id);
+CREATE INDEX IF NOT EXISTS audio.testConfig_test_id ON testConfig (test_id);
+CREATE INDEX IF NOT EXISTS audio.derivedResult_frequency_id ON derivedResult (frequency_id);
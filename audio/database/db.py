@@ -1,16 +1,39 @@
 from __future__ import annotations
 
 import configparser
+import enum
+import os
+import sqlite3
+import threading
+import time
+from collections.abc import Iterable, Iterator, Sequence
+from contextlib import contextmanager
 from dataclasses import dataclass
 from datetime import datetime
 from pathlib import Path
 from typing import TYPE_CHECKING, Self
 
 import mysql.connector
+import numpy as np
 from mysql.connector.connection import MySQLConnection
+from mysql.connector.pooling import (
+    CNX_POOL_MAXSIZE,
+    MySQLConnectionPool,
+    PooledMySQLConnection,
+)
 
 from audio.console import console
-from audio.constant import APP_DB_AUTH_PATH
+from audio.constant import APP_DB_AUTH_PATH, APP_HOME
+from audio.database import migration
+from audio.database.codec import (
+    Compression,
+    VoltageFormat,
+    decode_voltages,
+    encode_voltages,
+    is_legacy,
+)
+from audio.database.sqlite import SqliteConnection
+from audio.math.batch import SweepAnalysis, SweepTensor
 
 if TYPE_CHECKING:
     from mysql.connector.cursor import MySQLCursor
@@ -68,13 +91,23 @@ class DbSweepVoltage:
     id_: int
     frequency_id: int
     channel_id: int
-    voltages: list[float]
+    voltages: np.ndarray
+
+
+class StorageBackend(enum.Enum):
+    MYSQL = "mysql"
+    SQLITE = "sqlite"
+
 
 class DatabaseConfig:
+    backend: StorageBackend
+    sqlite_path: Path
     host: str
     port: str
     user: str
     password: str
+    pool_size: int
+    pool_timeout: float
 
     def __init__(self, config_path: Path) -> None:
         if not config_path.exists():
@@ -84,6 +117,7 @@ class DatabaseConfig:
             with open(config_path, "w") as f:
                 default_config = """
 [Database]
+backend = mysql
 host = localhost
 port = 3306
 user = root
@@ -96,33 +130,175 @@ password = password
         config.read(config_path)
 
         # Read configuration values
+        self.backend = StorageBackend(
+            config.get("Database", "backend", fallback=StorageBackend.MYSQL.value),
+        )
+        self.sqlite_path = Path(
+            config.get(
+                "Database",
+                "sqlite_path",
+                fallback=str(APP_HOME / "data/audio.sqlite"),
+            ),
+        ).expanduser()
         self.host = config.get("Database", "host")
         self.port = config.get("Database", "port")
         self.user = config.get("Database", "user")
         self.password = config.get("Database", "password")
+        self.pool_size = min(
+            config.getint("Database", "pool_size", fallback=5),
+            CNX_POOL_MAXSIZE,
+        )
+        self.pool_timeout = config.getfloat("Database", "pool_timeout", fallback=30)
 
 
+# One pool per process, the connections of a forked parent are never reused
+_POOLS: dict[int, tuple[MySQLConnectionPool, DatabaseConfig]] = {}
+_POOLS_LOCK = threading.Lock()
 
-class Database:
-    connection: MySQLConnection
-    _DATE_TIME_FORMAT: str = r"%Y-%m-%d %H:%M:%S.%f"
 
-    def __init__(self: Self) -> None:
-        try:
+def get_pool() -> tuple[MySQLConnectionPool, DatabaseConfig]:
+    """The connection pool of the current process, created on first use."""
+    pid = os.getpid()
+
+    with _POOLS_LOCK:
+        if pid not in _POOLS:
             db_config = DatabaseConfig(APP_DB_AUTH_PATH)
-            console.print(db_config)
-            self.connection = MySQLConnection(
+            pool = MySQLConnectionPool(
+                pool_name=f"audio-{pid}",
+                pool_size=db_config.pool_size,
                 host=db_config.host,
                 port=db_config.port,
                 user=db_config.user,
                 password=db_config.password,
             )
-            if self.connection.is_connected():
-                console.print("Connected to MySQL database")
-        except mysql.connector.Error as err:
+            console.print(
+                f"Connected to MySQL database {db_config.host}:{db_config.port}, pool size: {db_config.pool_size}",
+            )
+            _POOLS[pid] = (pool, db_config)
+
+        return _POOLS[pid]
+
+
+def get_connection(
+    backend: StorageBackend | None = None,
+    sqlite_path: Path | None = None,
+) -> PooledMySQLConnection | SqliteConnection:
+    """Connection to the configured storage backend.
+
+    MySQL connections are checked out of the process pool, waiting up to
+    `pool_timeout` for a free one, and pinged to reconnect if the server
+    dropped them. SQLite connections are opened on the local file, creating
+    the schema if missing and migrating it.
+
+    Args:
+        backend (StorageBackend | None, optional): Defaults to None, the
+            `backend` of the config file.
+        sqlite_path (Path | None, optional): Defaults to None, the
+            `sqlite_path` of the config file.
+    """
+    if backend is None or (backend == StorageBackend.SQLITE and sqlite_path is None):
+        db_config = DatabaseConfig(APP_DB_AUTH_PATH)
+        backend = backend or db_config.backend
+        sqlite_path = sqlite_path or db_config.sqlite_path
+
+    if backend == StorageBackend.SQLITE:
+        connection = SqliteConnection(sqlite_path)
+        connection.create_database()
+        migration.migrate(connection)
+        return connection
+
+    pool, db_config = get_pool()
+    deadline = time.monotonic() + db_config.pool_timeout
+
+    while True:
+        try:
+            connection = pool.get_connection()
+            break
+        except mysql.connector.errors.PoolError:
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.05)
+
+    connection.ping(reconnect=True, attempts=3, delay=1)
+    return connection
+
+
+
+class Database:
+    """Queries on a connection of the configured storage backend, MySQL
+    connections are checked out of the process pool.
+
+    The connection goes back to the pool with `close`, prefer `session` for a
+    scoped use. A `Database` must not be shared between threads.
+    """
+
+    connection: MySQLConnection | PooledMySQLConnection | SqliteConnection | None
+    _owned: bool
+    _DATE_TIME_FORMAT: str = r"%Y-%m-%d %H:%M:%S.%f"
+    _COPY_BATCH_ROWS: int = 256
+
+    # Encoding of the new `audio.sweepVoltage` rows
+    voltages_format: VoltageFormat = VoltageFormat.FLOAT64
+    voltages_compression: Compression = Compression.NONE
+
+    def __init__(
+        self: Self,
+        connection: MySQLConnection | PooledMySQLConnection | SqliteConnection | None = None,
+        backend: StorageBackend | None = None,
+        sqlite_path: Path | None = None,
+    ) -> None:
+        self.connection = connection
+        self._owned = connection is None
+        if connection is not None:
+            return
+
+        try:
+            self.connection = get_connection(backend, sqlite_path)
+        except (mysql.connector.Error, sqlite3.Error) as err:
+            console.log(err)
+
+    def __del__(self: Self) -> None:
+        if getattr(self, "_owned", False):
+            self.close()
+
+    @classmethod
+    @contextmanager
+    def session(
+        cls: type[Self],
+        backend: StorageBackend | None = None,
+        sqlite_path: Path | None = None,
+    ) -> Iterator[Self]:
+        """A `Database` on a new connection, rolled back on error and returned
+        to the pool on exit.
+        """
+        db = cls(backend=backend, sqlite_path=sqlite_path)
+        try:
+            yield db
+        except BaseException:
+            if db.connection is not None:
+                db.connection.rollback()
+            raise
+        finally:
+            db.close()
+
+    def close(self: Self) -> None:
+        """Return the connection to the pool."""
+        connection = getattr(self, "connection", None)
+        if connection is None:
+            return
+
+        self.connection = None
+        try:
+            connection.close()
+        except (mysql.connector.Error, sqlite3.Error) as err:
             console.log(err)
 
     def create_database(self: Self) -> None:
+        if isinstance(self.connection, SqliteConnection):
+            self.connection.create_database()
+            self.migrate()
+            return
+
         file_create_database = Path(__file__).parent / "create_database.sql"
 
         cur = self.connection.cursor()
@@ -132,12 +308,38 @@ class Database:
             console.log(err)
         self.connection.commit()
 
+        self.migrate()
+
+    def get_schema_version(self: Self) -> int:
+        """Last migration applied, 0 for the `create_database` schema."""
+        return max(migration.applied_migrations(self.connection), default=0)
+
+    def migrate(self: Self, target: int | None = None) -> list[migration.Migration]:
+        """Apply the pending schema migrations, up to `target`."""
+        try:
+            return migration.migrate(self.connection, target)
+        except (mysql.connector.Error, sqlite3.Error) as err:
+            self.connection.rollback()
+            console.log(f"[MIGRATION ERROR]: {err}")
+            return []
+
     def drop_database(self: Self) -> None:
+        if isinstance(self.connection, SqliteConnection):
+            self.connection.drop_database()
+            return
+
         cur = self.connection.cursor()
         cur.execute("DROP DATABASE IF EXISTS audio")
         cur.execute("CREATE DATABASE audio")
         self.connection.commit()
 
+    @classmethod
+    def _parse_date(cls: type[Self], date: datetime | str) -> datetime:
+        # MySQL returns `datetime`, SQLite the text of `_DATE_TIME_FORMAT`
+        if isinstance(date, str):
+            date = datetime.strptime(date, cls._DATE_TIME_FORMAT)
+        return date.astimezone()
+
     def insert_test(
         self: Self,
         name: str,
@@ -166,7 +368,7 @@ class Database:
         return DbTest(
             id_=_id,
             name=name,
-            date=datetime.strptime(date, self._DATE_TIME_FORMAT).astimezone(),
+            date=self._parse_date(date),
             comment=comment,
         )
 
@@ -217,7 +419,7 @@ class Database:
                 id_=_id,
                 test_id=test_id,
                 name=name,
-                date=datetime.strptime(date, self._DATE_TIME_FORMAT).astimezone(),
+                date=self._parse_date(date),
                 comment=comment,
             )
             for _id, test_id, name, date, comment in data
@@ -233,14 +435,14 @@ class Database:
 
     def get_sweep(self: Self, sweep_id: int) -> DbSweep:
         cur: MySQLCursor = self.connection.cursor()
-        cur.execute("SELECT * FROM audio.sweep WHERE sweep_id = %s", (sweep_id))
+        cur.execute("SELECT * FROM audio.sweep WHERE id = %s", (sweep_id,))
         data: tuple[int, int, str, str, str | None] = cur.fetchone()
         _id, test_id, name, date, comment = data
         return DbSweep(
             id_=_id,
             test_id=test_id,
             name=name,
-            date=datetime.strptime(date, self._DATE_TIME_FORMAT).astimezone(),
+            date=self._parse_date(date),
             comment=comment,
         )
 
@@ -250,6 +452,7 @@ class Database:
         idx: int,
         frequency: float,
         sampling_frequency: float,
+        commit: bool = True,
     ) -> int | None:
         cur: MySQLCursor = self.connection.cursor()
         data: tuple[int, int, float, float] = (
@@ -270,9 +473,31 @@ class Database:
             """,
             data,
         )
-        self.connection.commit()
+        if commit:
+            self.connection.commit()
         return cur.lastrowid
 
+    def reindex_frequencies(self: Self, sweep_id: int) -> None:
+        """Renumber the frequencies of a sweep in increasing frequency order,
+        for the sweeps not acquired in order.
+        """
+        cur: MySQLCursor = self.connection.cursor()
+        cur.execute(
+            """
+            SELECT id
+            FROM audio.frequency
+            WHERE sweep_id = %s ORDER BY frequency ASC, id ASC
+            """,
+            (sweep_id,),
+        )
+        ids: list[int] = [_id for (_id,) in cur.fetchall()]
+
+        cur.executemany(
+            "UPDATE audio.frequency SET idx = %s WHERE id = %s",
+            list(enumerate(ids)),
+        )
+        self.connection.commit()
+
     def get_frequencies_from_sweep_id(self: Self, sweep_id: int) -> list[DbFrequency]:
         cur: MySQLCursor = self.connection.cursor()
         cur.execute(
@@ -480,14 +705,17 @@ class Database:
         self: Self,
         frequency_id: int,
         channel_id: int,
-        voltages: list[float],
+        voltages: np.ndarray | list[float],
     ) -> int | None:
         cur: MySQLCursor = self.connection.cursor()
-        voltages_string: str = "\n".join([str(v) for v in voltages])
         data: tuple[int, int, bytes] = (
             frequency_id,
             channel_id,
-            voltages_string.encode(),
+            encode_voltages(
+                voltages,
+                voltage_format=self.voltages_format,
+                compression=self.voltages_compression,
+            ),
         )
 
         cur.execute(
@@ -504,6 +732,40 @@ class Database:
         self.connection.commit()
         return cur.lastrowid
 
+    def insert_many_sweep_voltages(
+        self: Self,
+        rows: list[tuple[int, int, np.ndarray | list[float]]],
+        commit: bool = True,
+    ) -> None:
+        """Insert `(frequency_id, channel_id, voltages)` rows with a single
+        `executemany`.
+        """
+        cur: MySQLCursor = self.connection.cursor()
+        cur.executemany(
+            """
+            INSERT INTO audio.sweepVoltage(
+                frequency_id,
+                channel_id,
+                voltages
+            )
+            VALUES (%s, %s, %s)
+            """,
+            [
+                (
+                    frequency_id,
+                    channel_id,
+                    encode_voltages(
+                        voltages,
+                        voltage_format=self.voltages_format,
+                        compression=self.voltages_compression,
+                    ),
+                )
+                for frequency_id, channel_id, voltages in rows
+            ],
+        )
+        if commit:
+            self.connection.commit()
+
     def get_sweep_voltages_from_id(
         self: Self,
         sweep_voltages_id: int,
@@ -516,13 +778,11 @@ class Database:
             WHERE id = %s
             ORDER BY id ASC
             """,
-            (sweep_voltages_id),
+            (sweep_voltages_id,),
         )
         data: tuple[int, int, int, bytes] = cur.fetchone()
         _id, _frequency_id, _channel_id, _voltages = data
-        voltages: list[float] = [
-            float(line) for line in _voltages.decode().splitlines()
-        ]
+        voltages: np.ndarray = decode_voltages(_voltages)
         sweep_voltages_data: DbSweepVoltage = DbSweepVoltage(
             id_=_id,
             frequency_id=_frequency_id,
@@ -548,12 +808,552 @@ class Database:
         data: tuple[int, int, int, bytes] = cur.fetchone()
 
         _id, _frequency_id, _channel_id, _voltages = data
-        voltages: list[float] = [
-            float(volt) for volt in _voltages.decode().splitlines()
-        ]
+        voltages: np.ndarray = decode_voltages(_voltages)
         return DbSweepVoltage(
             id_=_id,
             frequency_id=_frequency_id,
             channel_id=_channel_id,
             voltages=voltages,
         )
+
+    def get_sweep_tensor(
+        self: Self,
+        sweep_id: int,
+        channels: Sequence[int] | None = None,
+    ) -> SweepTensor:
+        """Load all the voltages of a sweep with a single streamed query.
+
+        Args:
+            sweep_id (int): The sweep.
+            channels (Sequence[int] | None, optional): Channel `idx` to load, in
+                the tensor order. Defaults to None, every channel by `idx`.
+
+        Returns:
+            SweepTensor: `(frequency, channel, sample)` voltages ordered by
+                frequency `idx`, with the frequency and channel ids.
+        """
+        return self._sweep_tensor(self._iter_sweep_rows(sweep_id, channels), channels)
+
+    def iter_sweep_blocks(
+        self: Self,
+        sweep_id: int,
+        channels: Sequence[int] | None = None,
+        block_size: int = 32,
+        fetch_size: int = 64,
+    ) -> Iterator[SweepTensor]:
+        """Stream the voltages of a sweep in blocks of frequencies, only a
+        block is in memory at once.
+
+        The connection is busy with the query until the iteration ends, run
+        other queries after the loop or on another `Database`.
+
+        Args:
+            sweep_id (int): The sweep.
+            channels (Sequence[int] | None, optional): Channel `idx` to load, in
+                the tensor order. Defaults to None, every channel by `idx`.
+            block_size (int, optional): Frequencies per block. Defaults to 32.
+            fetch_size (int, optional): Rows fetched from the server at once.
+                Defaults to 64.
+
+        Yields:
+            SweepTensor: The `(frequency, channel, sample)` voltages of
+                `block_size` consecutive frequencies, by frequency `idx`.
+        """
+        if channels is None:
+            channels = [channel.idx for channel in self.get_channels_from_sweep_id(sweep_id)]
+            channels.sort()
+
+        block: list[tuple] = []
+        n_frequencies = 0
+
+        for row in self._iter_sweep_rows(sweep_id, channels, fetch_size):
+            if len(block) == 0 or block[-1][0] != row[0]:
+                if n_frequencies == block_size:
+                    yield self._sweep_tensor(block, channels)
+                    block = []
+                    n_frequencies = 0
+                n_frequencies += 1
+            block.append(row)
+
+        if len(block) > 0:
+            yield self._sweep_tensor(block, channels)
+
+    def _iter_sweep_rows(
+        self: Self,
+        sweep_id: int,
+        channels: Sequence[int] | None,
+        fetch_size: int = 64,
+    ) -> Iterator[tuple[int, float, float, int, int, bytes]]:
+        query = """
+            SELECT
+                f.id,
+                f.frequency,
+                f.Fs,
+                c.id,
+                c.idx,
+                sv.voltages
+            FROM audio.sweepVoltage AS sv
+            JOIN audio.frequency AS f ON f.id = sv.frequency_id
+            JOIN audio.channel AS c ON c.id = sv.channel_id
+            WHERE f.sweep_id = %s
+            """
+        params: list[int] = [sweep_id]
+        if channels is not None:
+            query += f"AND c.idx IN ({', '.join(['%s'] * len(channels))})\n"
+            params.extend(channels)
+        query += "ORDER BY f.idx ASC, c.idx ASC\n"
+
+        # MySQL cursors are unbuffered, the rows are read from the server as
+        # they are fetched
+        cur: MySQLCursor = self.connection.cursor()
+        cur.execute(query, params)
+
+        exhausted = False
+        try:
+            while len(rows := cur.fetchmany(fetch_size)) > 0:
+                yield from rows
+            exhausted = True
+        finally:
+            # Stopped early, the unread rows would block the connection
+            if not exhausted:
+                while len(cur.fetchmany(fetch_size)) > 0:
+                    pass
+            cur.close()
+
+    @staticmethod
+    def _sweep_tensor(
+        rows: Iterable[tuple[int, float, float, int, int, bytes]],
+        channels: Sequence[int] | None,
+    ) -> SweepTensor:
+        frequency_ids: list[int] = []
+        frequency: list[float] = []
+        sampling_frequency: list[float] = []
+        voltages: list[dict[int, np.ndarray]] = []
+        channel_ids: dict[int, int] = {}
+
+        for _frequency_id, _frequency, _Fs, _channel_id, _channel_idx, _voltages in rows:
+            if len(frequency_ids) == 0 or frequency_ids[-1] != _frequency_id:
+                frequency_ids.append(_frequency_id)
+                frequency.append(_frequency)
+                sampling_frequency.append(_Fs)
+                voltages.append({})
+
+            channel_ids[_channel_idx] = _channel_id
+            voltages[-1][_channel_idx] = decode_voltages(_voltages)
+
+        channel_order = list(channels) if channels is not None else sorted(channel_ids)
+        empty = np.zeros(0)
+
+        tensor = SweepTensor.from_voltages(
+            frequency=frequency,
+            sampling_frequency=sampling_frequency,
+            voltages=[
+                [captures.get(idx, empty) for idx in channel_order]
+                for captures in voltages
+            ],
+        )
+        tensor.frequency_id = np.array(frequency_ids, dtype=np.int64)
+        tensor.channel_id = np.array(
+            [channel_ids.get(idx, -1) for idx in channel_order],
+            dtype=np.int64,
+        )
+
+        return tensor
+
+    def get_derived_results(
+        self: Self,
+        sweep_id: int,
+        estimator: str,
+        parameters_hash: str,
+    ) -> SweepAnalysis | None:
+        """Cached analysis of a sweep.
+
+        Returns:
+            SweepAnalysis | None: The analysis, None if not cached or cached
+                for some frequencies only.
+        """
+        cur: MySQLCursor = self.connection.cursor()
+        cur.execute(
+            "SELECT COUNT(*) FROM audio.frequency WHERE sweep_id = %s",
+            (sweep_id,),
+        )
+        (n_frequencies,) = cur.fetchone()
+
+        try:
+            cur.execute(
+                """
+                SELECT
+                    f.frequency,
+                    dr.channel_idx,
+                    dr.rms,
+                    dr.phasor_real,
+                    dr.phasor_imag,
+                    dr.rms_std,
+                    dr.phase_std
+                FROM audio.derivedResult AS dr
+                JOIN audio.frequency AS f ON f.id = dr.frequency_id
+                WHERE dr.sweep_id = %s AND dr.estimator = %s AND dr.parameters_hash = %s
+                ORDER BY f.idx ASC, dr.channel_idx ASC
+                """,
+                (sweep_id, estimator, parameters_hash),
+            )
+            rows: list[tuple] = cur.fetchall()
+        except (mysql.connector.Error, sqlite3.Error) as err:
+            # The databases created before the cache need the migration
+            console.log(f"[CACHE ERROR]: {err}, `audio db migrate` creates the table.")
+            return None
+
+        if n_frequencies == 0 or len(rows) == 0 or len(rows) % n_frequencies != 0:
+            return None
+
+        n_channels = len(rows) // n_frequencies
+        if any(row[1] != idx % n_channels for idx, row in enumerate(rows)):
+            return None
+
+        (
+            frequency,
+            _,
+            rms,
+            phasor_real,
+            phasor_imag,
+            rms_std,
+            phase_std,
+        ) = (np.array(column) for column in zip(*rows, strict=True))
+
+        def to_matrix(values: np.ndarray) -> np.ndarray | None:
+            if any(value is None for value in values):
+                return None
+            return values.astype(np.float64).reshape(n_frequencies, n_channels)
+
+        return SweepAnalysis(
+            frequency=frequency.astype(np.float64)[::n_channels],
+            rms=to_matrix(rms),
+            phasor=to_matrix(phasor_real) + 1j * to_matrix(phasor_imag),
+            rms_std=to_matrix(rms_std),
+            phase_std=to_matrix(phase_std),
+        )
+
+    def insert_derived_results(
+        self: Self,
+        sweep_id: int,
+        estimator: str,
+        parameters_hash: str,
+        frequency_ids: Sequence[int],
+        analysis: SweepAnalysis,
+        replace: bool = True,
+        commit: bool = True,
+    ) -> None:
+        """Cache the analysis of a sweep, replacing a partial one, nothing is
+        cached without the `derivedResult` table.
+
+        Args:
+            replace (bool, optional): Delete the results cached with the same
+                parameters first, False appends the results of some points of
+                the sweep. Defaults to True.
+            commit (bool, optional): Commit the results, an error does not
+                roll back the open transaction when False. Defaults to True.
+        """
+        n_frequencies, n_channels = analysis.rms.shape
+        gain_dB = np.stack(  # noqa: N806
+            [analysis.gain_dB(ref=0, dut=idx) for idx in range(n_channels)],
+            axis=1,
+        )
+        phase = np.stack(
+            [analysis.phase(ref=0, dut=idx) for idx in range(n_channels)],
+            axis=1,
+        )
+        date = datetime.now()
+
+        def optional(values: np.ndarray | None, idx: int, idx_channel: int) -> float | None:
+            return float(values[idx, idx_channel]) if values is not None else None
+
+        try:
+            cur: MySQLCursor = self.connection.cursor()
+            if replace:
+                cur.execute(
+                    """
+                    DELETE FROM audio.derivedResult
+                    WHERE sweep_id = %s AND estimator = %s AND parameters_hash = %s
+                    """,
+                    (sweep_id, estimator, parameters_hash),
+                )
+            cur.executemany(
+                """
+                INSERT INTO audio.derivedResult(
+                    sweep_id,
+                    frequency_id,
+                    channel_idx,
+                    estimator,
+                    parameters_hash,
+                    rms,
+                    phasor_real,
+                    phasor_imag,
+                    gain_dB,
+                    phase,
+                    rms_std,
+                    phase_std,
+                    date
+                )
+                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+                """,
+                [
+                    (
+                        sweep_id,
+                        int(frequency_ids[idx]),
+                        idx_channel,
+                        estimator,
+                        parameters_hash,
+                        float(analysis.rms[idx, idx_channel]),
+                        float(analysis.phasor[idx, idx_channel].real),
+                        float(analysis.phasor[idx, idx_channel].imag),
+                        float(gain_dB[idx, idx_channel]),
+                        float(phase[idx, idx_channel]),
+                        optional(analysis.rms_std, idx, idx_channel),
+                        optional(analysis.phase_std, idx, idx_channel),
+                        date,
+                    )
+                    for idx in range(n_frequencies)
+                    for idx_channel in range(n_channels)
+                ],
+            )
+            if commit:
+                self.connection.commit()
+        except (mysql.connector.Error, sqlite3.Error) as err:
+            console.log(f"[CACHE ERROR]: {err}")
+            if commit:
+                self.connection.rollback()
+
+    def invalidate_derived_results(
+        self: Self,
+        sweep_id: int | None = None,
+        estimator: str | None = None,
+    ) -> int:
+        """Delete the cached analysis results.
+
+        Args:
+            sweep_id (int | None, optional): Only of this sweep. Defaults to None.
+            estimator (str | None, optional): Only of this estimator, e.g.
+                `"FFT"`. Defaults to None.
+
+        Returns:
+            int: Deleted rows.
+        """
+        query = "DELETE FROM audio.derivedResult WHERE 1 = 1\n"
+        params: list[int | str] = []
+        if sweep_id is not None:
+            query += "AND sweep_id = %s\n"
+            params.append(sweep_id)
+        if estimator is not None:
+            query += "AND estimator = %s\n"
+            params.append(estimator)
+
+        cur: MySQLCursor = self.connection.cursor()
+        cur.execute(query, params)
+        self.connection.commit()
+
+        return cur.rowcount
+
+    def reencode_sweep_voltages(
+        self: Self,
+        sweep_id: int | None = None,
+        voltage_format: VoltageFormat | None = None,
+        compression: Compression | None = None,
+        legacy_only: bool = False,
+    ) -> int:
+        """Re-encode the stored voltages with the given codec.
+
+        Args:
+            sweep_id (int | None, optional): Only this sweep. Defaults to None,
+                every sweep.
+            voltage_format (VoltageFormat | None, optional): Defaults to None,
+                `voltages_format`.
+            compression (Compression | None, optional): Defaults to None,
+                `voltages_compression`.
+            legacy_only (bool, optional): Skip the rows already binary.
+                Defaults to False.
+
+        Returns:
+            int: Number of re-encoded rows.
+        """
+        if voltage_format is None:
+            voltage_format = self.voltages_format
+        if compression is None:
+            compression = self.voltages_compression
+
+        cur: MySQLCursor = self.connection.cursor()
+        if sweep_id is None:
+            cur.execute("SELECT id FROM audio.sweepVoltage ORDER BY id ASC")
+        else:
+            cur.execute(
+                """
+                SELECT sv.id
+                FROM audio.sweepVoltage AS sv
+                JOIN audio.frequency AS f ON f.id = sv.frequency_id
+                WHERE f.sweep_id = %s
+                ORDER BY sv.id ASC
+                """,
+                (sweep_id,),
+            )
+        ids: list[int] = [_id for (_id,) in cur.fetchall()]
+
+        # One row at a time, the whole table doesn't fit in memory
+        n_rows = 0
+        for _id in ids:
+            cur.execute(
+                "SELECT voltages FROM audio.sweepVoltage WHERE id = %s",
+                (_id,),
+            )
+            (_voltages,) = cur.fetchone()
+            if legacy_only and not is_legacy(_voltages):
+                continue
+
+            cur.execute(
+                "UPDATE audio.sweepVoltage SET voltages = %s WHERE id = %s",
+                (
+                    encode_voltages(
+                        decode_voltages(_voltages),
+                        voltage_format=voltage_format,
+                        compression=compression,
+                    ),
+                    _id,
+                ),
+            )
+            self.connection.commit()
+            n_rows += 1
+
+        return n_rows
+
+    def copy_sweep(self: Self, sweep_id: int, target: Database) -> int | None:
+        """Copy a sweep, with its test and test config, sweep config, channels,
+        frequencies and voltages, to another database in a single transaction.
+
+        The voltage blobs are copied as they are, without decoding.
+
+        Returns:
+            int | None: Id of the sweep in `target`.
+        """
+        sweep = self.get_sweep(sweep_id)
+        test = self.get_test(sweep.test_id)
+
+        source: MySQLCursor = self.connection.cursor()
+        cur: MySQLCursor = target.connection.cursor()
+
+        try:
+            cur.execute(
+                "INSERT INTO audio.test(name, date, comment) VALUES (%s, %s, %s)",
+                (test.name, test.date, test.comment),
+            )
+            test_id = cur.lastrowid
+
+            source.execute(
+                "SELECT config FROM audio.testConfig WHERE test_id = %s",
+                (sweep.test_id,),
+            )
+            cur.executemany(
+                "INSERT INTO audio.testConfig(test_id, config) VALUES (%s, %s)",
+                [(test_id, config) for (config,) in source.fetchall()],
+            )
+
+            cur.execute(
+                "INSERT INTO audio.sweep(test_id, name, date, comment) VALUES (%s, %s, %s, %s)",
+                (test_id, sweep.name, sweep.date, sweep.comment),
+            )
+            target_sweep_id = cur.lastrowid
+
+            source.execute(
+                """
+                SELECT
+                    amplitude,
+                    frequency_min,
+                    frequency_max,
+                    points_per_decade,
+                    number_of_samples,
+                    Fs_multiplier,
+                    delay_measurements
+                FROM audio.sweepConfig
+                WHERE sweep_id = %s
+                """,
+                (sweep_id,),
+            )
+            cur.executemany(
+                """
+                INSERT INTO audio.sweepConfig(
+                    sweep_id,
+                    amplitude,
+                    frequency_min,
+                    frequency_max,
+                    points_per_decade,
+                    number_of_samples,
+                    Fs_multiplier,
+                    delay_measurements
+                ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+                """,
+                [(target_sweep_id, *row) for row in source.fetchall()],
+            )
+
+            channel_ids: dict[int, int] = {}
+            for channel in self.get_channels_from_sweep_id(sweep_id):
+                cur.execute(
+                    "INSERT INTO audio.channel(sweep_id, idx, name, comment) VALUES (%s, %s, %s, %s)",
+                    (target_sweep_id, channel.idx, channel.name, channel.comment),
+                )
+                channel_ids[channel.id_] = cur.lastrowid
+
+            frequency_ids: dict[int, int] = {}
+            for frequency in self.get_frequencies_from_sweep_id(sweep_id):
+                frequency_ids[frequency.id_] = target.insert_frequency(
+                    target_sweep_id,
+                    frequency.idx,
+                    frequency.frequency,
+                    frequency.sampling_frequency,
+                    commit=False,
+                )
+
+            source.execute(
+                """
+                SELECT sv.frequency_id, sv.channel_id, sv.voltages
+                FROM audio.sweepVoltage AS sv
+                JOIN audio.frequency AS f ON f.id = sv.frequency_id
+                WHERE f.sweep_id = %s
+                ORDER BY sv.id ASC
+                """,
+                (sweep_id,),
+            )
+
+            rows: list[tuple[int, int, bytes]] = []
+            for frequency_id, channel_id, voltages in source:
+                rows.append(
+                    (frequency_ids[frequency_id], channel_ids[channel_id], voltages),
+                )
+                if len(rows) >= self._COPY_BATCH_ROWS:
+                    self._insert_raw_sweep_voltages(cur, rows)
+                    rows = []
+            self._insert_raw_sweep_voltages(cur, rows)
+
+            target.connection.commit()
+        except (mysql.connector.Error, sqlite3.Error) as err:
+            console.log(err)
+            target.connection.rollback()
+            return None
+
+        return target_sweep_id
+
+    @staticmethod
+    def _insert_raw_sweep_voltages(
+        cur: MySQLCursor,
+        rows: list[tuple[int, int, bytes]],
+    ) -> None:
+        if len(rows) == 0:
+            return
+
+        cur.executemany(
+            """
+            INSERT INTO audio.sweepVoltage(
+                frequency_id,
+                channel_id,
+                voltages
+            )
+            VALUES (%s, %s, %s)
+            """,
+            rows,
+        )
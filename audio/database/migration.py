@@ -0,0 +1,111 @@
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import TYPE_CHECKING, Self
+
+import rich.repr
+
+from audio.database.sqlite import SqliteConnection
+
+if TYPE_CHECKING:
+    from mysql.connector.connection import MySQLConnection
+    from mysql.connector.pooling import PooledMySQLConnection
+
+# `NNNN_<name>.sql` for MySQL and `NNNN_<name>.sqlite.sql` for SQLite, applied
+# in `NNNN` order on top of the `create_database` schema, version 0
+MIGRATIONS_PATH: Path = Path(__file__).parent / "migrations"
+
+_MIGRATION_FILE = re.compile(r"^(?P<version>\d{4})_(?P<name>\w+?)(?P<sqlite>\.sqlite)?\.sql$")
+
+_CREATE_SCHEMA_VERSION = """
+    CREATE TABLE IF NOT EXISTS audio.schemaVersion(
+      version INT NOT NULL,
+      name VARCHAR(255) NOT NULL,
+      date DATETIME NOT NULL,
+      PRIMARY KEY (version)
+    )
+    """
+
+
+@rich.repr.auto
+@dataclass
+class Migration:
+    version: int
+    name: str
+    path: Path
+
+    def statements(self: Self) -> list[str]:
+        """The `;` terminated statements of the file, without comments."""
+        lines = [
+            line
+            for line in self.path.read_text().splitlines()
+            if not line.lstrip().startswith("--")
+        ]
+        return [
+            statement.strip()
+            for statement in "\n".join(lines).split(";")
+            if statement.strip() != ""
+        ]
+
+
+def load_migrations(sqlite: bool = False) -> list[Migration]:
+    """Migrations of a backend, by version."""
+    migrations: dict[int, Migration] = {}
+
+    for path in sorted(MIGRATIONS_PATH.glob("*.sql")):
+        match = _MIGRATION_FILE.match(path.name)
+        if match is None or (match.group("sqlite") is not None) != sqlite:
+            continue
+
+        version = int(match.group("version"))
+        if version in migrations:
+            _msg = f"Migration {version} defined twice: {migrations[version].path.name}, {path.name}"
+            raise ValueError(_msg)
+        migrations[version] = Migration(version, match.group("name"), path)
+
+    return [migrations[version] for version in sorted(migrations)]
+
+
+def applied_migrations(
+    connection: MySQLConnection | PooledMySQLConnection | SqliteConnection,
+) -> set[int]:
+    cur = connection.cursor()
+    cur.execute(_CREATE_SCHEMA_VERSION)
+    cur.execute("SELECT version FROM audio.schemaVersion")
+    return {version for (version,) in cur.fetchall()}
+
+
+def migrate(
+    connection: MySQLConnection | PooledMySQLConnection | SqliteConnection,
+    target: int | None = None,
+) -> list[Migration]:
+    """Apply the migrations not applied yet, up to `target`.
+
+    Every migration is recorded in `audio.schemaVersion` once all its
+    statements succeeded. MySQL commits the DDL statements implicitly, a
+    failed migration can be partially applied and has to be fixed by hand.
+
+    Returns:
+        list[Migration]: The migrations applied.
+    """
+    applied = applied_migrations(connection)
+    pending = [
+        migration
+        for migration in load_migrations(isinstance(connection, SqliteConnection))
+        if migration.version not in applied and (target is None or migration.version <= target)
+    ]
+
+    cur = connection.cursor()
+    for migration in pending:
+        for statement in migration.statements():
+            cur.execute(statement)
+        cur.execute(
+            "INSERT INTO audio.schemaVersion(version, name, date) VALUES (%s, %s, %s)",
+            (migration.version, migration.name, datetime.now()),
+        )
+        connection.commit()
+
+    return pending
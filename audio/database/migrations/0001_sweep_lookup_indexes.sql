@@ -0,0 +1,3 @@
+-- Frequencies and channels of a sweep are looked up by sweep and read by idx
+CREATE INDEX frequency_sweep_id_idx ON audio.frequency (sweep_id, idx);
+CREATE INDEX channel_sweep_id_idx ON audio.channel (sweep_id, idx);
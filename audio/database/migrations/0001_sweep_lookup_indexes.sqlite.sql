@@ -0,0 +1,3 @@
+-- Frequencies and channels of a sweep are looked up by sweep and read by idx
+CREATE INDEX IF NOT EXISTS audio.frequency_sweep_id ON frequency (sweep_id, idx);
+CREATE INDEX IF NOT EXISTS audio.channel_sweep_id ON channel (sweep_id, idx);
@@ -0,0 +1,5 @@
+-- One capture per frequency and channel, the key serves the
+-- `get_sweep_voltages(frequency_id, channel_id)` lookup and the frequency_id
+-- foreign key
+ALTER TABLE audio.sweepVoltage
+  ADD UNIQUE KEY sweepVoltage_frequency_channel (frequency_id, channel_id);
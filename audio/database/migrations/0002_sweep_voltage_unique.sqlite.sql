@@ -0,0 +1,4 @@
+-- One capture per frequency and channel, replaces the plain index of the
+-- schema
+DROP INDEX IF EXISTS audio.sweepVoltage_frequency_id;
+CREATE UNIQUE INDEX IF NOT EXISTS audio.sweepVoltage_frequency_channel ON sweepVoltage (frequency_id, channel_id);
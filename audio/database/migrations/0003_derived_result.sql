@@ -0,0 +1,22 @@
+-- Analysis results cache of `analyse_sweep_cached`, the databases created
+-- before it was added to the schema miss the table
+CREATE TABLE IF NOT EXISTS audio.derivedResult(
+  id INT NOT NULL AUTO_INCREMENT,
+  sweep_id INT NOT NULL,
+  frequency_id INT NOT NULL,
+  channel_idx INT NOT NULL,
+  estimator VARCHAR(32) NOT NULL,
+  parameters_hash CHAR(64) NOT NULL,
+  rms DOUBLE NOT NULL,
+  phasor_real DOUBLE NOT NULL,
+  phasor_imag DOUBLE NOT NULL,
+  gain_dB DOUBLE NOT NULL,
+  phase DOUBLE NOT NULL,
+  rms_std DOUBLE,
+  phase_std DOUBLE,
+  date DATETIME NOT NULL,
+  PRIMARY KEY (id),
+  UNIQUE KEY (sweep_id, estimator, parameters_hash, frequency_id, channel_idx),
+  FOREIGN KEY (sweep_id) REFERENCES audio.sweep (id),
+  FOREIGN KEY (frequency_id) REFERENCES audio.frequency (id)
+);
@@ -0,0 +1,510 @@
+from __future__ import annotations
+
+import atexit
+import json
+import queue
+import threading
+import time
+import uuid
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Self
+
+import requests
+import rich.repr
+from requests.adapters import HTTPAdapter
+
+from audio.console import console
+from audio.constant import APP_HOME
+from audio.logging import log
+
+POCKETBASE_URL: str = "http://127.0.0.1:8090"
+POCKETBASE_SPOOL_PATH: Path = APP_HOME / "data/pocketbase-spool"
+
+
+@rich.repr.auto
+@dataclass(frozen=True)
+class RecordRef:
+    """Local handle of a record queued for upload, usable as a field value of
+    the records created after it and resolved to the PocketBase id on upload.
+    """
+
+    key: str
+
+
+def _is_ref(value: Any) -> bool:  # noqa: ANN401
+    """`{"$ref": key}` tag of a `RecordRef`, other dict values are JSON fields."""
+    return isinstance(value, dict) and set(value) == {"$ref"}
+
+
+@rich.repr.auto
+@dataclass
+class UploadJob:
+    collection: str
+    data: dict[str, Any]
+    files: dict[str, Path] = field(default_factory=dict)
+    key: str = field(default_factory=lambda: uuid.uuid4().hex)
+
+    def to_json(self: Self) -> str:
+        return json.dumps(
+            {
+                "key": self.key,
+                "collection": self.collection,
+                "data": {
+                    name: {"$ref": value.key} if isinstance(value, RecordRef) else value
+                    for name, value in self.data.items()
+                },
+                "files": {name: str(path) for name, path in self.files.items()},
+            },
+        )
+
+    @classmethod
+    def from_json(cls: type[Self], text: str) -> Self:
+        job = json.loads(text)
+        return cls(
+            collection=job["collection"],
+            data={
+                name: RecordRef(value["$ref"]) if _is_ref(value) else value
+                for name, value in job["data"].items()
+            },
+            files={name: Path(path) for name, path in job["files"].items()},
+            key=job["key"],
+        )
+
+
+class _RetryLaterError(Exception):
+    """PocketBase is unreachable or failing, the job goes to the spool."""
+
+
+_STOP = object()
+
+
+class PocketBaseUploader:
+    """Create PocketBase records from a background thread.
+
+    `create` never blocks: the record is queued, or spooled to disk when the
+    queue is full. The worker posts the records in order on a single keep-alive
+    `requests.Session`, retrying with exponential backoff. Consecutive queued
+    records without files, whose references are already uploaded, are created
+    together with the batch API (`/api/batch`, up to `batch_size` records in a
+    transaction); when it's disabled on the server they are posted one by one.
+    When PocketBase stays down the records are spooled, one JSON file each, and
+    uploaded again once it is back, in the next runs too.
+
+    Records can reference records created before them through the `RecordRef`
+    returned by `create`. A record rejected by PocketBase (4xx), and the
+    records referencing it, are moved to the `rejected` directory of the spool.
+    """
+
+    url: str
+    spool_path: Path
+    max_attempts: int
+    backoff: float
+    timeout: float
+    offline_interval: float
+    batch_size: int
+
+    _queue: queue.Queue
+    _thread: threading.Thread | None
+    _ids: dict[str, str]
+    _created: set[str]
+    _rejected: set[str]
+    _offline_until: float
+    _batch_api: bool
+    _spool_lock: threading.Lock
+
+    def __init__(
+        self: Self,
+        url: str = POCKETBASE_URL,
+        spool_path: Path = POCKETBASE_SPOOL_PATH,
+        queue_size: int = 1024,
+        max_attempts: int = 3,
+        backoff: float = 0.5,
+        timeout: float = 5,
+        offline_interval: float = 30,
+        batch_size: int = 50,
+    ) -> None:
+        self.url = url
+        self.spool_path = spool_path
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.timeout = timeout
+        self.offline_interval = offline_interval
+        self.batch_size = batch_size
+
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._thread = None
+        self._ids = {}
+        self._created = set()
+        self._rejected = set()
+        self._offline_until = 0
+        self._batch_api = True
+        self._spool_lock = threading.Lock()
+
+    def __enter__(self: Self) -> Self:
+        self.start()
+        return self
+
+    def __exit__(self: Self, exc_type, exc_value, traceback) -> None:  # noqa: ANN001
+        self.close()
+
+    def start(self: Self) -> None:
+        self.spool_path.mkdir(parents=True, exist_ok=True)
+        self._ids.update(self._load_spool_ids())
+
+        self._thread = threading.Thread(
+            target=self._run,
+            name="pocketbase-uploader",
+            daemon=True,
+        )
+        self._thread.start()
+
+    def create(
+        self: Self,
+        collection: str,
+        data: dict[str, Any],
+        files: dict[str, Path] | None = None,
+    ) -> RecordRef:
+        """Queue the creation of a record.
+
+        Args:
+            collection (str): PocketBase collection, e.g. `"sweeps"`.
+            data (dict[str, Any]): Record fields, `RecordRef` values are
+                replaced by the id of the referenced record.
+            files (dict[str, Path] | None, optional): File fields, the files
+                must stay on disk until uploaded. Defaults to None.
+
+        Returns:
+            RecordRef: Handle of the record.
+        """
+        job = UploadJob(collection, data, files or {})
+        self._created.add(job.key)
+
+        try:
+            self._queue.put_nowait(job)
+        except queue.Full:
+            self._spool(job)
+
+        return RecordRef(job.key)
+
+    def resolve(self: Self, ref: RecordRef | None) -> str | None:
+        """PocketBase id of an uploaded record, None if not uploaded yet."""
+        if ref is None:
+            return None
+        return self._ids.get(ref.key)
+
+    def close(self: Self, timeout: float = 10) -> None:
+        """Upload the queued records for up to `timeout` seconds, spool the
+        rest and stop the worker.
+        """
+        if self._thread is None:
+            return
+
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+        if self._thread.is_alive():
+            # The worker spools the remaining jobs without posting
+            self._offline_until = float("inf")
+            self._thread.join()
+        self._thread = None
+
+    def _run(self: Self) -> None:
+        session = requests.Session()
+        session.mount("http://", HTTPAdapter(pool_maxsize=1))
+
+        self._replay_spool(session)
+
+        while True:
+            try:
+                job = self._queue.get(timeout=self.offline_interval)
+            except queue.Empty:
+                self._replay_spool(session)
+                continue
+
+            if job is _STOP:
+                break
+
+            # Take the records already waiting, they can be created together
+            jobs = [job]
+            while len(jobs) < self.batch_size:
+                try:
+                    job = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if job is _STOP:
+                    break
+                jobs.append(job)
+
+            self._upload_jobs(session, jobs)
+
+            if job is _STOP:
+                break
+
+        session.close()
+
+    def _upload_jobs(
+        self: Self,
+        session: requests.Session,
+        jobs: list[UploadJob],
+    ) -> None:
+        batch: list[UploadJob] = []
+
+        for job in jobs:
+            if not self._batchable(job):
+                # The job may reference a record of the batch
+                self._upload_batch_or_spool(session, batch)
+                batch = []
+
+            if self._batchable(job):
+                batch.append(job)
+            else:
+                self._upload_or_spool(session, job)
+
+        self._upload_batch_or_spool(session, batch)
+
+    def _batchable(self: Self, job: UploadJob) -> bool:
+        return (
+            self._batch_api
+            and len(job.files) == 0
+            and all(
+                value.key in self._ids
+                for value in job.data.values()
+                if isinstance(value, RecordRef)
+            )
+        )
+
+    def _upload_batch_or_spool(
+        self: Self,
+        session: requests.Session,
+        jobs: list[UploadJob],
+    ) -> None:
+        if len(jobs) > 1 and time.monotonic() >= self._offline_until:
+            try:
+                if self._upload_batch(session, jobs):
+                    return
+            except _RetryLaterError as e:
+                console.log(f"[POCKETBASE OFFLINE]: {e}")
+                self._offline_until = time.monotonic() + self.offline_interval
+
+        # One by one, the failed batch transaction created no record
+        for job in jobs:
+            self._upload_or_spool(session, job)
+
+    def _upload_or_spool(self: Self, session: requests.Session, job: UploadJob) -> None:
+        refs = [value for value in job.data.values() if isinstance(value, RecordRef)]
+        if any(ref.key in self._rejected for ref in refs):
+            self._reject(job, "references a rejected record")
+            return
+
+        if time.monotonic() < self._offline_until or any(
+            ref.key not in self._ids for ref in refs
+        ):
+            self._spool(job)
+            return
+
+        try:
+            self._upload(session, job)
+        except _RetryLaterError as e:
+            console.log(f"[POCKETBASE OFFLINE]: {e}")
+            self._offline_until = time.monotonic() + self.offline_interval
+            self._spool(job)
+
+    def _post(
+        self: Self,
+        url: str,
+        post: Callable[[], requests.Response],
+    ) -> requests.Response:
+        """Retry `post` with exponential backoff while PocketBase is
+        unreachable or failing (5xx).
+
+        Raises:
+            _RetryLaterError: After `max_attempts` failures.
+        """
+        for attempt in range(self.max_attempts):
+            if attempt > 0:
+                time.sleep(self.backoff * 2 ** (attempt - 1))
+
+            try:
+                response = post()
+            except requests.RequestException as e:
+                error = e
+                continue
+
+            if response.status_code >= 500:  # noqa: PLR2004
+                error = f"{response.status_code}"
+                continue
+
+            return response
+
+        _msg = f"{url}: {error}"
+        raise _RetryLaterError(_msg)
+
+    def _data(self: Self, job: UploadJob) -> dict[str, Any]:
+        return {
+            name: self._ids[value.key] if isinstance(value, RecordRef) else value
+            for name, value in job.data.items()
+        }
+
+    def _upload(self: Self, session: requests.Session, job: UploadJob) -> None:
+        url = f"{self.url}/api/collections/{job.collection}/records"
+        data = self._data(job)
+
+        def post() -> requests.Response:
+            if len(job.files) == 0:
+                return session.post(url, json=data, timeout=self.timeout)
+
+            files = {name: path.open("rb") for name, path in job.files.items()}
+            try:
+                return session.post(url, data=data, files=files, timeout=self.timeout)
+            finally:
+                for file in files.values():
+                    file.close()
+
+        response = self._post(url, post)
+
+        if response.status_code != 200:  # noqa: PLR2004
+            # The record is rejected, posting it again would not help
+            console.log(f"[RESPONSE ERROR {response.status_code}]: {url}")
+            log.error(f"[POCKETBASE]: {url}: {response.content.decode()}")
+            self._reject(job, f"{response.status_code}")
+            return
+
+        self._ids[job.key] = response.json()["id"]
+
+    def _upload_batch(
+        self: Self,
+        session: requests.Session,
+        jobs: list[UploadJob],
+    ) -> bool:
+        """Create the records in one batch transaction.
+
+        Returns:
+            bool: False when the batch failed and nothing was created, e.g. a
+                record was rejected or the batch API is disabled.
+        """
+        url = f"{self.url}/api/batch"
+        body = {
+            "requests": [
+                {
+                    "method": "POST",
+                    "url": f"/api/collections/{job.collection}/records",
+                    "body": self._data(job),
+                }
+                for job in jobs
+            ],
+        }
+
+        response = self._post(
+            url,
+            lambda: session.post(url, json=body, timeout=self.timeout),
+        )
+
+        if response.status_code != 200:  # noqa: PLR2004
+            if response.status_code in (403, 404):
+                console.log(f"[POCKETBASE]: no batch API ({response.status_code}).")
+                self._batch_api = False
+            return False
+
+        for job, result in zip(jobs, response.json(), strict=True):
+            self._ids[job.key] = result["body"]["id"]
+        return True
+
+    # Spool
+
+    def _spool(self: Self, job: UploadJob) -> None:
+        # Inline the ids already known, the spool survives the process
+        job.data = {
+            name: self._ids.get(value.key, value)
+            if isinstance(value, RecordRef)
+            else value
+            for name, value in job.data.items()
+        }
+
+        with self._spool_lock:
+            file = self.spool_path / f"{time.time_ns():020d}-{job.key}.json"
+            file.write_text(job.to_json())
+
+    def _reject(self: Self, job: UploadJob, reason: str) -> None:
+        """Quarantine a job that will never be uploaded, and so its children."""
+        self._rejected.add(job.key)
+        log.error(f"[POCKETBASE]: {job.collection} {job.key} rejected: {reason}")
+
+        rejected_path = self.spool_path / "rejected"
+        with self._spool_lock:
+            rejected_path.mkdir(parents=True, exist_ok=True)
+            file = rejected_path / f"{time.time_ns():020d}-{job.key}.json"
+            file.write_text(job.to_json())
+
+    def _replay_spool(self: Self, session: requests.Session) -> None:
+        if time.monotonic() < self._offline_until:
+            return
+
+        with self._spool_lock:
+            files = sorted(self.spool_path.glob("*.json"))
+
+        # `<time>-<key>.json`, the records still waiting in the spool
+        pending = {file.stem.split("-", 1)[1] for file in files}
+
+        for file in files:
+            job = UploadJob.from_json(file.read_text())
+            pending.discard(job.key)
+
+            refs = [value for value in job.data.values() if isinstance(value, RecordRef)]
+            unresolved = [ref.key for ref in refs if ref.key not in self._ids]
+            if any(
+                key in self._rejected or (key not in pending and key not in self._created)
+                for key in unresolved
+            ):
+                # Rejected, or lost with no job left to upload it
+                self._reject(job, "references a record that will never be uploaded")
+                file.unlink()
+                continue
+            if len(unresolved) > 0:
+                continue
+
+            try:
+                self._upload(session, job)
+            except _RetryLaterError as e:
+                console.log(f"[POCKETBASE OFFLINE]: {e}")
+                self._offline_until = time.monotonic() + self.offline_interval
+                return
+
+            file.unlink()
+            if job.key in self._ids:
+                self._save_spool_id(job.key)
+
+        with self._spool_lock:
+            if not any(self.spool_path.glob("*.json")):
+                (self.spool_path / "ids.jsonl").unlink(missing_ok=True)
+
+    def _load_spool_ids(self: Self) -> dict[str, str]:
+        file = self.spool_path / "ids.jsonl"
+        if not file.exists():
+            return {}
+
+        return dict(
+            json.loads(line) for line in file.read_text().splitlines() if line != ""
+        )
+
+    def _save_spool_id(self: Self, key: str) -> None:
+        # Spooled records can still be referenced by other spooled records
+        with (self.spool_path / "ids.jsonl").open("a") as f:
+            f.write(json.dumps([key, self._ids[key]]) + "\n")
+
+
+_UPLOADER: PocketBaseUploader | None = None
+_UPLOADER_LOCK = threading.Lock()
+
+
+def get_uploader() -> PocketBaseUploader:
+    """The uploader of the process, started on first use and closed at exit."""
+    global _UPLOADER  # noqa: PLW0603
+
+    with _UPLOADER_LOCK:
+        if _UPLOADER is None:
+            _UPLOADER = PocketBaseUploader()
+            _UPLOADER.start()
+            atexit.register(_UPLOADER.close)
+
+        return _UPLOADER
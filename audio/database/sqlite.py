@@ -0,0 +1,110 @@
+from __future__ import annotations
+
+import sqlite3
+from collections.abc import Iterator, Sequence
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Self
+
+# Same text format of `Database._DATE_TIME_FORMAT`
+sqlite3.register_adapter(datetime, lambda date: date.strftime(r"%Y-%m-%d %H:%M:%S.%f"))
+
+SQLITE_SCHEMA: Path = Path(__file__).parent / "create_database.sqlite.sql"
+
+
+def _to_qmark(query: str) -> str:
+    """Turn the MySQL `%s` placeholders into the SQLite `?` ones."""
+    return query.replace("%s", "?")
+
+
+class SqliteCursor:
+    """`MySQLCursor` subset used by `Database`, on top of `sqlite3.Cursor`."""
+
+    _cursor: sqlite3.Cursor
+
+    def __init__(self: Self, cursor: sqlite3.Cursor) -> None:
+        self._cursor = cursor
+
+    def __iter__(self: Self) -> Iterator[tuple]:
+        return iter(self._cursor)
+
+    @property
+    def lastrowid(self: Self) -> int | None:
+        return self._cursor.lastrowid
+
+    @property
+    def rowcount(self: Self) -> int:
+        return self._cursor.rowcount
+
+    def execute(self: Self, query: str, params: Sequence[Any] = ()) -> None:
+        self._cursor.execute(_to_qmark(query), params)
+
+    def executemany(self: Self, query: str, params: Sequence[Sequence[Any]]) -> None:
+        self._cursor.executemany(_to_qmark(query), params)
+
+    def fetchone(self: Self) -> tuple | None:
+        return self._cursor.fetchone()
+
+    def fetchmany(self: Self, size: int) -> list[tuple]:
+        return self._cursor.fetchmany(size)
+
+    def fetchall(self: Self) -> list[tuple]:
+        return self._cursor.fetchall()
+
+    def close(self: Self) -> None:
+        self._cursor.close()
+
+
+class SqliteConnection:
+    """`MySQLConnection` subset used by `Database`, on an SQLite file.
+
+    The file is attached as the `audio` schema so the queries written for
+    MySQL (`audio.sweep`, ...) run unchanged. The journal is in WAL mode, the
+    readers don't block the writer.
+    """
+
+    path: Path
+    _connection: sqlite3.Connection
+
+    def __init__(self: Self, path: Path) -> None:
+        self.path = path
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        self._connection = sqlite3.connect(":memory:", timeout=30)
+        self._connection.execute("ATTACH DATABASE ? AS audio", (str(path),))
+        self._connection.execute("PRAGMA audio.journal_mode=WAL")
+        self._connection.execute("PRAGMA audio.synchronous=NORMAL")
+        self._connection.execute("PRAGMA foreign_keys=ON")
+
+    def cursor(self: Self) -> SqliteCursor:
+        return SqliteCursor(self._connection.cursor())
+
+    def commit(self: Self) -> None:
+        self._connection.commit()
+
+    def rollback(self: Self) -> None:
+        self._connection.rollback()
+
+    def close(self: Self) -> None:
+        self._connection.close()
+
+    def is_connected(self: Self) -> bool:
+        return True
+
+    def ping(self: Self, **_: Any) -> None:  # noqa: ANN401
+        """Nothing to check on a local file."""
+
+    def create_database(self: Self) -> None:
+        self._connection.executescript(SQLITE_SCHEMA.read_text())
+        self._connection.commit()
+
+    def drop_database(self: Self) -> None:
+        tables = self._connection.execute(
+            "SELECT name FROM audio.sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%'",
+        ).fetchall()
+
+        self._connection.execute("PRAGMA foreign_keys=OFF")
+        for (table,) in tables:
+            self._connection.execute(f'DROP TABLE IF EXISTS audio."{table}"')
+        self._connection.execute("PRAGMA foreign_keys=ON")
+        self._connection.commit()
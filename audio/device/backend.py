@@ -0,0 +1,49 @@
+from __future__ import annotations
+
+import functools
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+from typing import Self
+
+from audio.device.cdaq import Ni9223
+from audio.device.simulation import (
+    SimulatedBench,
+    SimulatedNi9223,
+    SimulatedResourceManager,
+)
+from audio.usb.usbtmc import ResourceManager
+
+
+@dataclass
+class InstrumentBackend:
+    """Factories for the instruments used by the sweeps.
+
+    `resource_manager` builds the generator `ResourceManager`, `nidaq` has the
+    `Ni9223` constructor signature and `sleep` is the sleep used for the
+    settling delays, so a simulated backend can also accelerate them. `now` is
+    the clock of `sleep`, in seconds.
+    """
+
+    name: str
+    resource_manager: Callable[[], ResourceManager]
+    nidaq: Callable[..., Ni9223]
+    sleep: Callable[[float], None]
+    now: Callable[[], float] = time.perf_counter
+
+    @classmethod
+    def hardware(cls: type[Self]) -> Self:
+        return cls("hardware", ResourceManager, Ni9223, time.sleep, time.perf_counter)
+
+    @classmethod
+    def simulated(cls: type[Self], bench: SimulatedBench | None = None) -> Self:
+        if bench is None:
+            bench = SimulatedBench()
+
+        return cls(
+            "simulated",
+            functools.partial(SimulatedResourceManager, bench),
+            functools.partial(SimulatedNi9223, bench=bench),
+            bench.clock.sleep,
+            bench.clock.now,
+        )
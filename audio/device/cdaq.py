@@ -1,5 +1,7 @@
 from __future__ import annotations
 
+import math
+import time
 from dataclasses import dataclass, field
 from typing import Self
 
@@ -15,6 +17,7 @@ from nidaqmx.utils import flatten_channel_string
 
 from audio.config.type import Range
 from audio.console import console
+from audio.utility.ring_buffer import RingBuffer, RingBufferOverrunError
 
 
 class CDAQAIDevice:
@@ -93,6 +96,15 @@ class Ni9223(CDAQAIDevice):
     input_channel: list[str] = field(default=list)
     task: nidaqmx.Task = None
     device: Device | None = None
+    _stream_buffer: RingBuffer | None = field(default=None, repr=False)
+    _stream_block: np.ndarray | None = field(default=None, repr=False)
+    _stream_block_size: int = field(default=0, repr=False)
+    _stream_reader: nidaqmx.stream_readers.AnalogMultiChannelReader | None = field(
+        default=None,
+        repr=False,
+    )
+    _stream_start_time: float | None = field(default=None, repr=False)
+    _stream_rate: float = field(default=0.0, repr=False)
 
     def init_device(self: Self) -> None:
         self.device = Device(self.input_channel)
@@ -121,9 +133,19 @@ class Ni9223(CDAQAIDevice):
             self.task_close()
 
     def set_sampling_clock_timing(self: Self, sampling_frequency: float) -> None:
-        self.task.timing.cfg_samp_clk_timing(sampling_frequency)
+        self.task.timing.cfg_samp_clk_timing(
+            sampling_frequency,
+            samps_per_chan=self.number_of_samples,
+        )
         self.sampling_frequency = sampling_frequency
 
+    @property
+    def sampling_clock_rate(self: Self) -> float | None:
+        """Sampling frequency of the task after DAQmx coerced it to the clock divider."""
+        if self.task is None:
+            return None
+        return self.task.timing.samp_clk_rate
+
     def add_ai_channel(self: Self, input_channel: list[str]) -> None:
         # 2. Add the AI Voltage Channel
         self.task.ai_channels.add_ai_voltage_chan(
@@ -166,7 +188,8 @@ class Ni9223(CDAQAIDevice):
 
         return voltages
 
-    def read_multi_voltages(self: Self) -> list[float] | None:
+    def read_multi_voltages(self: Self) -> np.ndarray | None:
+        """`(n_channels, number_of_samples)` array, the reader buffer itself."""
         reader: nidaqmx.stream_readers.AnalogMultiChannelReader = (
             nidaqmx.stream_readers.AnalogMultiChannelReader(self.task.in_stream)
         )
@@ -183,4 +206,171 @@ class Ni9223(CDAQAIDevice):
         except DaqError as e:
             console.log(f"[EXCEPTION]: {e}")
             return None
-        return list(values_read.tolist())
+        return values_read
+
+    @property
+    def streaming(self: Self) -> bool:
+        return self._stream_buffer is not None
+
+    def start_streaming(
+        self: Self,
+        sampling_frequency: float,
+        buffer_duration: float = 5.0,
+        block_size: int | None = None,
+    ) -> None:
+        """Start a continuous hardware-timed acquisition into a ring buffer.
+
+        The task keeps running until `stop_streaming` is called, samples are
+        copied into the ring buffer every `block_size` samples by the DAQmx
+        callback, so reading a capture does not pay the task start/stop latency.
+
+        Args:
+            sampling_frequency (float): Sampling frequency of the stream.
+            buffer_duration (float, optional): Seconds of history kept in the
+                ring buffer. Defaults to 5.0.
+            block_size (int | None, optional): Samples per callback, defaults to
+                about 20 callbacks per second.
+        """
+        if self.streaming:
+            self.stop_streaming()
+
+        n_channels = len(self.input_channel)
+
+        if block_size is None:
+            block_size = max(int(sampling_frequency / 20), 1)
+
+        capacity: int = max(
+            int(sampling_frequency * buffer_duration),
+            4 * block_size,
+            2 * self.number_of_samples,
+        )
+
+        self._stream_buffer = RingBuffer(n_channels, capacity)
+        self._stream_block = np.zeros((n_channels, block_size), dtype=np.float64)
+        self._stream_block_size = block_size
+        self._stream_reader = nidaqmx.stream_readers.AnalogMultiChannelReader(
+            self.task.in_stream,
+        )
+
+        self.task.timing.cfg_samp_clk_timing(
+            sampling_frequency,
+            sample_mode=nidaqmx.constants.AcquisitionType.CONTINUOUS,
+            samps_per_chan=capacity,
+        )
+        self.sampling_frequency = sampling_frequency
+        # The sample clock runs at a divider of the timebase
+        self._stream_rate = self.task.timing.samp_clk_rate
+
+        self.task.register_every_n_samples_acquired_into_buffer_event(
+            block_size,
+            self._stream_callback,
+        )
+
+        # The first sample cannot be acquired before the task is started, the
+        # sample times estimated from here are never earlier than the real ones
+        self._stream_start_time = time.perf_counter()
+        self.task.start()
+
+    def stop_streaming(self: Self) -> None:
+        if not self.streaming:
+            return
+
+        self.task.stop()
+        self.task.register_every_n_samples_acquired_into_buffer_event(
+            self._stream_block_size,
+            None,
+        )
+
+        self._stream_buffer = None
+        self._stream_block = None
+        self._stream_reader = None
+        self._stream_start_time = None
+
+    def _stream_callback(
+        self: Self,
+        task_handle: int,  # noqa: ARG002
+        every_n_samples_event_type: int,  # noqa: ARG002
+        number_of_samples: int,
+        callback_data: object,  # noqa: ARG002
+    ) -> int:
+        if self._stream_buffer is None:
+            return 0
+
+        try:
+            self._stream_reader.read_many_sample(
+                self._stream_block,
+                number_of_samples_per_channel=number_of_samples,
+                timeout=0,
+            )
+        except DaqError as e:
+            console.log(f"[EXCEPTION]: {e}")
+            return 0
+
+        self._stream_buffer.write(self._stream_block[:, :number_of_samples])
+
+        return 0
+
+    def stream_index_at(self: Self, timestamp: float) -> int:
+        """Absolute stream index of the first sample captured after `timestamp`.
+
+        `timestamp` is on the `time.perf_counter()` clock. The sample `n` is
+        acquired `n / rate` after the stream start: the callbacks run after
+        their samples were acquired, their time is not a sample time.
+        """
+        return math.ceil((timestamp - self._stream_start_time) * self._stream_rate)
+
+    def read_multi_voltages_after(
+        self: Self,
+        timestamp: float | None = None,
+        number_of_samples: int | None = None,
+        timeout: float | None = None,
+        decimation: int = 1,
+    ) -> np.ndarray | None:
+        """Return the next samples captured after `timestamp` from the stream.
+
+        Args:
+            timestamp (float | None, optional): `time.perf_counter()` instant,
+                defaults to now.
+            number_of_samples (int | None, optional): Samples per channel,
+                defaults to `number_of_samples`.
+            timeout (float | None, optional): Seconds to wait for the samples,
+                defaults to twice the capture time plus one second.
+            decimation (int, optional): Keep one sample every `decimation`,
+                the capture is sampled at `sampling_frequency / decimation`.
+                Defaults to 1.
+
+        Returns:
+            np.ndarray | None: `(n_channels, number_of_samples)` array or None
+                if the samples could not be retrieved.
+        """
+        if self._stream_buffer is None:
+            console.log("[ERROR]: Streaming is not started.")
+            return None
+
+        if timestamp is None:
+            timestamp = time.perf_counter()
+
+        if number_of_samples is None:
+            number_of_samples = self.number_of_samples
+        number_of_samples *= decimation
+
+        if number_of_samples > self._stream_buffer.capacity:
+            console.log(
+                f"[ERROR]: {number_of_samples} samples do not fit the stream buffer of {self._stream_buffer.capacity}.",
+            )
+            return None
+
+        if timeout is None:
+            timeout = 1 + 2 * number_of_samples / self.sampling_frequency
+
+        start = max(self.stream_index_at(timestamp), self._stream_buffer.oldest)
+
+        if not self._stream_buffer.wait_for(start + number_of_samples, timeout):
+            console.log("[ERROR]: Timeout waiting for the streamed samples.")
+            return None
+
+        try:
+            return self._stream_buffer.read(start, number_of_samples)[:, ::decimation]
+        except RingBufferOverrunError as e:
+            console.log(f"[EXCEPTION]: {e}")
+            return None
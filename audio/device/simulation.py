@@ -0,0 +1,527 @@
+from __future__ import annotations
+
+import math
+import re
+import threading
+import time
+from dataclasses import dataclass, field, replace
+from typing import Self
+
+import numpy as np
+import rich.repr
+from rich.panel import Panel
+from scipy import signal
+
+from audio.config.type import Range
+from audio.console import console
+from audio.device.cdaq import Ni9223
+from audio.math.coherent import coerce_sampling_frequency
+from audio.usb.usbtmc import UsbTmcInstrument
+
+
+class SimulationClock:
+    """Time source shared by the simulated instruments.
+
+    With `speed` 1 the simulation runs at wall-clock time, with a higher value
+    every sleep is shortened by that factor. With `math.inf` nothing sleeps and
+    the simulated time only advances through `sleep`.
+    """
+
+    speed: float
+
+    _real_start: float
+    _virtual_time: float
+    _lock: threading.Lock
+
+    def __init__(self: Self, speed: float = 1.0) -> None:
+        if speed <= 0:
+            _msg = "The simulation speed must be positive."
+            raise ValueError(_msg)
+
+        self.speed = speed
+        self._real_start = time.perf_counter()
+        self._virtual_time = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def virtual(self: Self) -> bool:
+        return math.isinf(self.speed)
+
+    def now(self: Self) -> float:
+        if self.virtual:
+            with self._lock:
+                return self._virtual_time
+
+        return (time.perf_counter() - self._real_start) * self.speed
+
+    def sleep(self: Self, seconds: float) -> None:
+        if seconds <= 0:
+            return
+
+        if self.virtual:
+            with self._lock:
+                self._virtual_time += seconds
+            return
+
+        time.sleep(seconds / self.speed)
+
+    def sleep_until(self: Self, instant: float) -> None:
+        self.sleep(instant - self.now())
+
+
+@rich.repr.auto
+@dataclass
+class DutModel:
+    """Linear model of the device under test.
+
+    Args:
+        gain_dB (float): Flat gain.
+        phase (float): Extra phase shift in degrees.
+        system (signal.lti | None): Analog filter applied on top of the flat
+            gain, defaults to a 2nd order 10 Hz - 100 kHz band-pass.
+    """
+
+    gain_dB: float = 0.0
+    phase: float = 0.0
+    system: signal.lti | None = field(
+        default_factory=lambda: signal.lti(
+            *signal.butter(
+                2,
+                [2 * np.pi * 10, 2 * np.pi * 100_000],
+                btype="bandpass",
+                analog=True,
+            ),
+        ),
+    )
+
+    def response(self: Self, frequency: float) -> complex:
+        return complex(self.responses(np.array([frequency]))[0])
+
+    def responses(self: Self, frequency: np.ndarray) -> np.ndarray:
+        h = np.full(
+            len(frequency),
+            10 ** (self.gain_dB / 20) * np.exp(1j * np.deg2rad(self.phase)),
+        )
+
+        if self.system is not None:
+            # The DC bin of a waveform spectrum
+            w = np.maximum(2 * np.pi * np.asarray(frequency, dtype=np.float64), 1e-9)
+            _, filter_response = signal.freqresp(self.system, w=w)
+            h *= filter_response
+
+        return h
+
+
+@dataclass
+class _GeneratorState:
+    amplitude_peak_to_peak: float = 0.0
+    frequency: float = 1000.0
+    output: bool = False
+    phase: float = 0.0
+    time: float = 0.0
+    # One period of the arbitrary waveform, a sine if None
+    waveform: np.ndarray | None = None
+    # Logarithmic sweep, played once from `sweep_trigger`, silent before it
+    sweep: bool = False
+    frequency_start: float = 100.0
+    frequency_stop: float = 1000.0
+    sweep_time: float = 1.0
+    sweep_trigger: float | None = None
+
+    @property
+    def settle_frequency(self: Self) -> float:
+        """Lowest frequency of the output, it sets the DUT settle time."""
+        if self.waveform is None:
+            return self.frequency
+
+        spectrum = np.abs(np.fft.rfft(self.waveform))[1:]
+        return self.frequency * (int(np.argmax(spectrum > 1e-3 * spectrum.max())) + 1)
+
+
+class SimulatedBench:
+    """Simulated Rigol generator wired to a DUT and to the cDAQ channels.
+
+    Channel layout by number of channels: 1 is the DUT output, 2 are
+    (ref, dut), 4 are the balanced (ref+, ref-, dut+, dut-).
+    """
+
+    clock: SimulationClock
+    dut: DutModel
+    noise_rms: float
+    settle_periods: float
+    settle_time_min: float
+    scpi_latency: float
+
+    _state: _GeneratorState
+    _previous: _GeneratorState
+    _lock: threading.Lock
+    _rng: np.random.Generator
+
+    def __init__(
+        self: Self,
+        clock: SimulationClock | None = None,
+        dut: DutModel | None = None,
+        noise_rms: float = 20e-6,
+        settle_periods: float = 3.0,
+        settle_time_min: float = 0.005,
+        scpi_latency: float = 0.004,
+        seed: int | None = None,
+    ) -> None:
+        self.clock = clock if clock is not None else SimulationClock()
+        self.dut = dut if dut is not None else DutModel()
+        self.noise_rms = noise_rms
+        self.settle_periods = settle_periods
+        self.settle_time_min = settle_time_min
+        self.scpi_latency = scpi_latency
+
+        self._state = _GeneratorState()
+        self._previous = _GeneratorState()
+        self._lock = threading.Lock()
+        self._rng = np.random.default_rng(seed)
+
+    def _change(self: Self, **changes: float | bool | np.ndarray | None) -> None:
+        with self._lock:
+            now = self.clock.now()
+            state = self._state
+
+            # Keeps the generator phase continuous across the change
+            phase = state.phase + 2 * np.pi * state.frequency * (now - state.time)
+
+            self._previous = replace(state, phase=phase, time=now)
+            self._state = replace(state, **changes, phase=phase, time=now)
+
+    def set_amplitude(self: Self, amplitude_peak_to_peak: float) -> None:
+        self._change(amplitude_peak_to_peak=amplitude_peak_to_peak)
+
+    def set_frequency(self: Self, frequency: float) -> None:
+        self._change(frequency=frequency)
+
+    def set_output(self: Self, output: bool) -> None:
+        self._change(output=output)
+
+    def set_arbitrary(self: Self, waveform: np.ndarray) -> None:
+        self._change(waveform=np.asarray(waveform, dtype=np.float64))
+
+    def set_sweep(self: Self, sweep: bool) -> None:
+        self._change(sweep=sweep, sweep_trigger=None)
+
+    def set_frequency_start(self: Self, frequency: float) -> None:
+        self._change(frequency_start=frequency)
+
+    def set_frequency_stop(self: Self, frequency: float) -> None:
+        self._change(frequency_stop=frequency)
+
+    def set_sweep_time(self: Self, seconds: float) -> None:
+        self._change(sweep_time=seconds)
+
+    def trigger_sweep(self: Self) -> None:
+        self._change(sweep_trigger=self.clock.now())
+
+    def reset(self: Self) -> None:
+        self._change(
+            amplitude_peak_to_peak=0.0,
+            frequency=1000.0,
+            output=False,
+            waveform=None,
+            sweep=False,
+            sweep_trigger=None,
+        )
+
+    def _sweep(
+        self: Self,
+        state: _GeneratorState,
+        times: np.ndarray,
+        dut: bool,
+    ) -> np.ndarray:
+        if state.sweep_trigger is None or len(times) == 0:
+            return np.zeros_like(times)
+
+        rate = state.sweep_time / math.log(state.frequency_stop / state.frequency_start)
+
+        def chirp(t: np.ndarray) -> np.ndarray:
+            elapsed = t - state.sweep_trigger
+            return np.where(
+                (elapsed >= 0) & (elapsed < state.sweep_time),
+                np.sin(2 * np.pi * state.frequency_start * rate * np.expm1(elapsed / rate)),
+                0.0,
+            )
+
+        if not dut:
+            return state.amplitude_peak_to_peak / 2 * chirp(times)
+
+        # Filtered on a uniform grid from the trigger, the DUT keeps its memory
+        # across the reads
+        dt = (times[-1] - times[0]) / max(len(times) - 1, 1) or 1e-6
+        start = min(state.sweep_trigger, times[0])
+        grid = start + np.arange(math.ceil((times[-1] - start) / dt) + 1) * dt
+        n_fft = 1 << (2 * len(grid) - 1).bit_length()
+        spectrum = np.fft.rfft(chirp(grid), n_fft)
+        spectrum *= self.dut.responses(np.fft.rfftfreq(n_fft, dt))
+        response = np.fft.irfft(spectrum, n_fft)[: len(grid)]
+
+        return state.amplitude_peak_to_peak / 2 * np.interp(times, grid, response)
+
+    def _tone(
+        self: Self,
+        state: _GeneratorState,
+        times: np.ndarray,
+        dut: bool,
+    ) -> np.ndarray:
+        if not state.output:
+            return np.zeros_like(times)
+
+        if state.sweep:
+            return self._sweep(state, times, dut)
+
+        phase = state.phase + 2 * np.pi * state.frequency * (times - state.time)
+
+        if state.waveform is None:
+            response = self.dut.response(state.frequency) if dut else 1
+            return (
+                abs(response)
+                * state.amplitude_peak_to_peak
+                / 2
+                * np.sin(phase + np.angle(response))
+            )
+
+        # Periodic waveform, every harmonic through the DUT
+        waveform = state.waveform
+        n_points = len(waveform)
+        if dut:
+            spectrum = np.fft.rfft(waveform)
+            spectrum *= self.dut.responses(np.arange(len(spectrum)) * state.frequency)
+            waveform = np.fft.irfft(spectrum, n_points)
+
+        position = np.mod(phase / (2 * np.pi), 1) * n_points
+        return (
+            state.amplitude_peak_to_peak
+            / 2
+            * np.interp(position, np.arange(n_points + 1), np.append(waveform, waveform[0]))
+        )
+
+    @staticmethod
+    def channel_weights(n_channels: int) -> np.ndarray:
+        """`(n_channels, 2)` weights of the (ref, dut) signals per channel."""
+        if n_channels == 1:
+            return np.array([[0.0, 1.0]])
+        if n_channels == 4:
+            return np.array([[0.5, 0.0], [-0.5, 0.0], [0.0, 0.5], [0.0, -0.5]])
+
+        weights = np.zeros((n_channels, 2))
+        weights[0::2, 0] = 1.0
+        weights[1::2, 1] = 1.0
+        return weights
+
+    def synthesize(self: Self, times: np.ndarray, n_channels: int) -> np.ndarray:
+        """Sample every channel at the simulated instants `times`."""
+        with self._lock:
+            state = self._state
+            previous = self._previous
+
+        ref = self._tone(state, times, dut=False)
+
+        dut = self._tone(state, times, dut=True)
+        if previous.output and not state.sweep:
+            # The DUT moves from the previous steady state to the new one
+            tau = max(self.settle_periods / state.settle_frequency, self.settle_time_min)
+            decay = np.exp(-np.clip(times - state.time, 0, None) / tau)
+            dut_previous = self._tone(previous, times, dut=True)
+            dut = dut * (1 - decay) + dut_previous * decay
+
+        voltages = self.channel_weights(n_channels) @ np.vstack((ref, dut))
+        voltages += self._rng.normal(0, self.noise_rms, voltages.shape)
+
+        return voltages
+
+
+class SimulatedUsbTmc:
+    """Stand-in for `usbtmc.Instrument` that drives a `SimulatedBench`."""
+
+    IDENTIFICATION: str = "Rigol Technologies,DG812,SIMULATED,00.01.00"
+
+    _AMPLITUDE = re.compile(r":SOUR\w*\d?:VOLT\w*:AMPL\w*\s+(\S+)", re.IGNORECASE)
+    _FREQUENCY = re.compile(r":SOUR\w*\d?:FREQ\w*\s+(\S+)", re.IGNORECASE)
+    _OUTPUT = re.compile(r":OUTP\w*?\d?\s+(ON|OFF)", re.IGNORECASE)
+    _ARBITRARY = re.compile(r":SOUR\w*\d?:TRAC\w*:DATA\w*\s+VOLATILE,(.+)", re.IGNORECASE)
+    _FREQUENCY_START = re.compile(r":SOUR\w*\d?:FREQ\w*:STAR\w*\s+(\S+)", re.IGNORECASE)
+    _FREQUENCY_STOP = re.compile(r":SOUR\w*\d?:FREQ\w*:STOP\s+(\S+)", re.IGNORECASE)
+    _SWEEP = re.compile(r":SOUR\w*\d?:SWE\w*:STAT\w*\s+(ON|OFF)", re.IGNORECASE)
+    _SWEEP_TIME = re.compile(r":SOUR\w*\d?:SWE\w*:TIME\s+(\S+)", re.IGNORECASE)
+    _SWEEP_TRIGGER = re.compile(r":SOUR\w*\d?:SWE\w*:TRIG\w*(:IMM\w*)?\s*$", re.IGNORECASE)
+
+    bench: SimulatedBench
+    connected: bool
+
+    def __init__(self: Self, bench: SimulatedBench) -> None:
+        self.bench = bench
+        self.connected = False
+
+    def open(self: Self) -> None:
+        self.connected = True
+
+    def close(self: Self) -> None:
+        self.connected = False
+
+    def write(self: Self, command: str) -> None:
+        self.bench.clock.sleep(self.bench.scpi_latency)
+
+        if command.strip().upper() == "*RST":
+            self.bench.reset()
+        elif match := self._AMPLITUDE.match(command):
+            self.bench.set_amplitude(float(match.group(1)))
+        elif match := self._FREQUENCY.match(command):
+            self.bench.set_frequency(float(match.group(1)))
+        elif match := self._OUTPUT.match(command):
+            self.bench.set_output(match.group(1).upper() == "ON")
+        elif match := self._ARBITRARY.match(command):
+            self.bench.set_arbitrary(np.array(match.group(1).split(","), dtype=np.float64))
+        elif match := self._FREQUENCY_START.match(command):
+            self.bench.set_frequency_start(float(match.group(1)))
+        elif match := self._FREQUENCY_STOP.match(command):
+            self.bench.set_frequency_stop(float(match.group(1)))
+        elif match := self._SWEEP.match(command):
+            self.bench.set_sweep(match.group(1).upper() == "ON")
+        elif match := self._SWEEP_TIME.match(command):
+            self.bench.set_sweep_time(float(match.group(1)))
+        elif self._SWEEP_TRIGGER.match(command):
+            self.bench.trigger_sweep()
+
+    def ask(self: Self, command: str) -> str:
+        self.bench.clock.sleep(self.bench.scpi_latency)
+
+        if command.strip().upper() == "*IDN?":
+            return self.IDENTIFICATION
+
+        return ""
+
+
+class SimulatedResourceManager:
+    bench: SimulatedBench
+
+    def __init__(self: Self, bench: SimulatedBench) -> None:
+        self.bench = bench
+
+    def search_resources(self: Self) -> list[str]:
+        return ["SIMULATED::RIGOL::DG812"]
+
+    def open_resource(
+        self: Self,
+        device: str | None = None,  # noqa: ARG002
+    ) -> UsbTmcInstrument | None:
+        return UsbTmcInstrument(SimulatedUsbTmc(self.bench))
+
+    def print_devices(self: Self) -> None:
+        for idx, resource in enumerate(self.search_resources()):
+            console.print(Panel(resource, title=f"Resource index: {idx}"))
+
+
+@dataclass
+class SimulatedNi9223(Ni9223):
+    """`Ni9223` that samples a `SimulatedBench` instead of the cDAQ."""
+
+    bench: SimulatedBench = field(default_factory=SimulatedBench, repr=False)
+    max_sampling_frequency: float = 1_000_000
+
+    _task_start_time: float | None = field(default=None, repr=False)
+
+    def init_device(self: Self) -> None:
+        pass
+
+    @property
+    def device_voltage_ranges(self: Self) -> Range[float] | None:
+        return Range[float](-10.0, 10.0)
+
+    @property
+    def device_sampling_frequency_max(self: Self) -> float | None:
+        return self.max_sampling_frequency
+
+    def create_task(self: Self, name: str = "") -> None:  # noqa: ARG002
+        self.task = None
+
+    def set_sampling_clock_timing(self: Self, sampling_frequency: float) -> None:
+        self.sampling_frequency = sampling_frequency
+
+    @property
+    def sampling_clock_rate(self: Self) -> float | None:
+        # Like the cDAQ the clock is a divider of the timebase
+        if self.sampling_frequency is None:
+            return None
+        return coerce_sampling_frequency(self.sampling_frequency)
+
+    def add_ai_channel(self: Self, input_channel: list[str]) -> None:
+        self.input_channel = input_channel
+
+    def add_rms_channel(self: Self) -> None:
+        pass
+
+    def task_start(self: Self) -> None:
+        self._task_start_time = self.bench.clock.now()
+
+    def task_stop(self: Self) -> None:
+        self._task_start_time = None
+
+    def task_close(self: Self) -> None:
+        self.stop_streaming()
+        self._task_start_time = None
+
+    def _acquire(self: Self, start_time: float, number_of_samples: int) -> np.ndarray:
+        times = start_time + np.arange(number_of_samples) / self.sampling_clock_rate
+        self.bench.clock.sleep_until(start_time + number_of_samples / self.sampling_clock_rate)
+        return self.bench.synthesize(times, len(self.input_channel))
+
+    def read_single_voltages(self: Self) -> np.ndarray:
+        start_time = self._task_start_time
+        if start_time is None:
+            start_time = self.bench.clock.now()
+
+        return self._acquire(start_time, self.number_of_samples)[0]
+
+    def read_multi_voltages(self: Self) -> np.ndarray | None:
+        start_time = self._task_start_time
+        if start_time is None:
+            start_time = self.bench.clock.now()
+
+        return self._acquire(start_time, self.number_of_samples)
+
+    @property
+    def streaming(self: Self) -> bool:
+        return self._stream_start_time is not None
+
+    def start_streaming(
+        self: Self,
+        sampling_frequency: float,
+        buffer_duration: float = 5.0,  # noqa: ARG002
+        block_size: int | None = None,  # noqa: ARG002
+    ) -> None:
+        self.sampling_frequency = sampling_frequency
+        self._stream_start_time = self.bench.clock.now()
+
+    def stop_streaming(self: Self) -> None:
+        self._stream_start_time = None
+
+    def stream_index_at(self: Self, timestamp: float) -> int:
+        return math.ceil((timestamp - self._stream_start_time) * self.sampling_clock_rate)
+
+    def read_multi_voltages_after(
+        self: Self,
+        timestamp: float | None = None,
+        number_of_samples: int | None = None,
+        timeout: float | None = None,  # noqa: ARG002
+        decimation: int = 1,
+    ) -> np.ndarray | None:
+        if self._stream_start_time is None:
+            console.log("[ERROR]: Streaming is not started.")
+            return None
+
+        if timestamp is None:
+            timestamp = self.bench.clock.now()
+
+        if number_of_samples is None:
+            number_of_samples = self.number_of_samples
+
+        start_time = (
+            self._stream_start_time
+            + max(self.stream_index_at(timestamp), 0) / self.sampling_clock_rate
+        )
+
+        return self._acquire(start_time, number_of_samples * decimation)[:, ::decimation]
@@ -21,7 +21,7 @@ from audio.math.interpolation import InterpolationKind
 from audio.math.phase import phase_offset_v4
 from audio.math.rms import RMS, RMS_MODE
 from audio.math.voltage import VoltageMode, Vrms_to_VdBu, Vrms_to_Vpp, voltage_converter
-from audio.model.sampling import VoltageSamplingV2
+from audio.model.sampling import VoltageSamplingV3
 from audio.usb.usbtmc import ResourceManager, UsbTmc
 from audio.utility import trim_value
 from audio.utility.scpi import SCPI, Bandwidth, Switch
@@ -623,21 +623,18 @@ def update_rms_value(  # noqa: C901, PLR0912, PLR0915
             voltages = data.device.value.read_multi_voltages()
             data.device.value.task_stop()
 
-        voltages_sampling_n: list[VoltageSamplingV2] = []
-
         with data.frequency.lock:
             frequency = data.frequency.value
-        for voltage_sampling in voltages:
-            voltages_sampling_n.append(
-                VoltageSamplingV2.from_list(
-                    voltage_sampling,
-                    frequency,
-                    sampling_frequency,
-                ).augment_interpolation(
-                    interpolation_rate=50,
-                    interpolation_mode=InterpolationKind.CUBIC,
-                ),
-            )
+
+        # All the channels interpolated at once, one view per channel
+        voltages_sampling_n: list[VoltageSamplingV3] = VoltageSamplingV3(
+            voltages,
+            frequency,
+            sampling_frequency,
+        ).augment_interpolation(
+            interpolation_rate=50,
+            interpolation_mode=InterpolationKind.CUBIC,
+        ).channels()
 
         rms_result_n: list[float | None] = []
 
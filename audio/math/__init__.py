@@ -2,6 +2,8 @@ import math
 
 import numpy as np
 
+from audio.math.zero_crossing import zero_crossings
+
 
 def unit_normalization(value: float) -> int:
     return int(value / abs(value))
@@ -20,100 +22,45 @@ def decimal_decompose(x: float) -> tuple[float, int]:
 def trim_sin_zero_offset(
     sample: list[float],
 ) -> tuple[list[float], int, int] | None:
-    min_intersections = 3
+    """Trim the sample to an integer number of half periods, between the
+    samples closest to the first and the last zero crossings.
 
-    zero_index_intersections: list[tuple[float, float]] = []
-
-    index_start: int = 0
-    index_end: int = len(sample)
+    Returns:
+        tuple[list[float], int, int] | None: The trimmed sample, start and end
+            index. None if there are less than 3 zero crossings.
+    """
+    min_intersections = 3
 
-    # From start to end
-    for n in range(1, len(sample)):
-        samp_curr_index: int = n
-        samp_prev_index: int = n - 1
-        samp_curr: float = sample[samp_curr_index]
-        samp_prev: float = sample[samp_prev_index]
+    crossings = zero_crossings(sample)
 
-        slope_normalized: float = (samp_prev * samp_curr) / np.abs(
-            samp_prev * samp_curr,
-        )
+    if len(crossings) < min_intersections:
+        return None
 
-        if slope_normalized < 0:
-            zero_index_intersections.append((samp_prev_index, samp_curr_index))
+    # Keep an even number of half periods
+    last: int = -2 if len(crossings) % 2 == 0 else -1
 
-    if len(zero_index_intersections) >= min_intersections:
-        (
-            zero_intersection_start_first,
-            zero_intersection_start_second,
-        ) = zero_index_intersections[0]
+    index_start = int(crossings.nearest[0])
+    index_end = int(crossings.nearest[last])
 
-        if (len(zero_index_intersections) % 2) == 0:
-            (
-                zero_intersection_end_first,
-                zero_intersection_end_second,
-            ) = zero_index_intersections[-2]
-
-        else:
-            (
-                zero_intersection_end_first,
-                zero_intersection_end_second,
-            ) = zero_index_intersections[-1]
-
-        index_start = (
-            zero_intersection_start_first
-            if np.abs(
-                sample[zero_intersection_start_first]
-                < sample[zero_intersection_start_second],
-            )
-            else zero_intersection_start_second
-        )
-
-        index_end = (
-            zero_intersection_end_first
-            if np.abs(
-                sample[zero_intersection_end_first]
-                < sample[zero_intersection_end_second],
-            )
-            else zero_intersection_end_second
-        )
-
-        return sample[index_start:index_end], index_start, index_end
-
-    return None
+    return sample[index_start:index_end], index_start, index_end
 
 
 def rms_full_cycle(sample: list[float]) -> list[float]:
-    from audio.math.rms import RMS
-
-    rms_fft_cycle_list: list[float] = []
-
-    start_slope: float = sample[1] - sample[0]
-    last_slope = 0
-
-    # From start to end
-    for n in range(2, len(sample)):
-        samp_curr_index: int = n
-        samp_prev_index: int = n - 1
-        samp_curr: float = sample[samp_curr_index]
-        samp_prev: float = sample[samp_prev_index]
-
-        slope: float = samp_curr - samp_prev
+    """RMS of the sample from its start to every zero crossing with the same
+    slope sign of the start.
+    """
+    samples = np.asarray(sample, dtype=np.float64)
 
-        norm: float = (samp_prev * samp_curr) / np.abs(samp_prev * samp_curr)
+    start_slope: float = samples[1] - samples[0]
 
-        if norm < 0 and start_slope * slope > 0:
-            last_slope: float = slope
-            index: int = (
-                samp_curr_index
-                if np.abs(samp_curr) < np.abs(samp_prev)
-                else samp_prev_index
-            )
-            rms_fft_cycle_list.append(RMS.fft(sample[0:index]))
+    crossings = zero_crossings(samples)
+    same_slope = (crossings.index >= 1) & (crossings.slope * start_slope > 0)
+    indexes = crossings.nearest[same_slope]
 
-    if start_slope * last_slope < -1:
-        rms_fft_cycle_list.append(RMS.fft(sample))
+    # Mean square of every prefix, equal to the Parseval sum of RMS.fft
+    squares_sum = np.concatenate(([0.0], np.cumsum(np.square(samples))))
 
-    return rms_fft_cycle_list
+    return list(np.sqrt(squares_sum[indexes] / indexes))
 
 
 def percentage_error(exact: float, approx: float) -> float:
@@ -0,0 +1,204 @@
+from __future__ import annotations
+
+from collections.abc import Callable
+from dataclasses import dataclass
+from typing import Self
+
+import numpy as np
+import rich.repr
+
+# Measures a frequency and returns the DUT transfer function, None if failed
+TransferMeasure = Callable[[float], complex | None]
+
+
+@rich.repr.auto
+@dataclass
+class AdaptiveConfig:
+    """Refinement criteria of an adaptive sweep.
+
+    Attributes:
+        tolerance_dB: Max deviation of the gain from the interpolation between
+            the neighbouring points, in log frequency.
+        tolerance_phase: Max deviation of the phase, in degrees.
+        cutoff_dB: Level of the crossing to locate, relative to the max gain.
+        tolerance_cutoff_dB: Max distance in dB from the crossing level of the
+            points around it.
+        max_points: Max points of the sweep, coarse grid included.
+        max_passes: Max refinement passes.
+        min_ratio: Min ratio between two neighbouring frequencies.
+    """
+
+    tolerance_dB: float = 0.1
+    tolerance_phase: float = 1.0
+    cutoff_dB: float = -3.0
+    tolerance_cutoff_dB: float = 0.1
+    max_points: int = 200
+    max_passes: int = 8
+    min_ratio: float = 1.005
+
+
+@rich.repr.auto
+@dataclass
+class AdaptiveResult:
+    """Points of an adaptive sweep in frequency order, `passes` counts the
+    refinement passes that added points.
+    """
+
+    frequency: np.ndarray
+    transfer: np.ndarray
+    passes: int
+
+    @property
+    def gain_dB(self: Self) -> np.ndarray:
+        return 20 * np.log10(np.abs(self.transfer))
+
+    @property
+    def phase(self: Self) -> np.ndarray:
+        return np.degrees(np.unwrap(np.angle(self.transfer)))
+
+
+def _chord_deviation(x: np.ndarray, y: np.ndarray) -> np.ndarray:
+    # Distance of every interior point from the line through its neighbours
+    t = (x[1:-1] - x[:-2]) / (x[2:] - x[:-2])
+    return np.abs(y[1:-1] - (y[:-2] + t * (y[2:] - y[:-2])))
+
+
+def refine_frequencies(
+    frequency: np.ndarray,
+    gain_dB: np.ndarray,
+    phase: np.ndarray | None = None,
+    config: AdaptiveConfig | None = None,
+) -> tuple[np.ndarray, np.ndarray]:
+    """Frequencies to add to a sweep, the geometric midpoints of the intervals
+    the linear interpolation in log frequency does not describe.
+
+    An interval is refined when a point at one of its ends deviates from the
+    chord of its neighbours by more than the tolerance, in gain or in phase,
+    or when it brackets the cutoff crossing and one of its ends is farther
+    than `tolerance_cutoff_dB` from the cutoff level.
+
+    Args:
+        frequency (np.ndarray): Frequencies, increasing.
+        gain_dB (np.ndarray): Gain at every frequency.
+        phase (np.ndarray | None, optional): Unwrapped phase at every frequency,
+            in degrees. Defaults to None.
+        config (AdaptiveConfig | None, optional): Criteria. Defaults to None.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: The new frequencies and their error, in
+            units of the tolerance that triggered them.
+    """
+    if config is None:
+        config = AdaptiveConfig()
+
+    frequency = np.asarray(frequency, dtype=np.float64)
+    gain_dB = np.asarray(gain_dB, dtype=np.float64)
+    if len(frequency) < 2:  # noqa: PLR2004
+        return np.empty(0), np.empty(0)
+
+    x = np.log10(frequency)
+    error = np.zeros(len(frequency) - 1)
+
+    curves = [(gain_dB, config.tolerance_dB)]
+    if phase is not None:
+        curves.append((np.asarray(phase, dtype=np.float64), config.tolerance_phase))
+
+    if len(frequency) > 2:  # noqa: PLR2004
+        for y, tolerance in curves:
+            deviation = _chord_deviation(x, y) / tolerance
+            error[:-1] = np.maximum(error[:-1], deviation)
+            error[1:] = np.maximum(error[1:], deviation)
+
+    level = gain_dB - (np.max(gain_dB) + config.cutoff_dB)
+    crossing = np.sign(level[:-1]) != np.sign(level[1:])
+    distance = np.maximum(np.abs(level[:-1]), np.abs(level[1:])) / config.tolerance_cutoff_dB
+    error = np.where(crossing, np.maximum(error, distance), error)
+
+    refine = (error > 1) & (frequency[1:] / frequency[:-1] > config.min_ratio)
+
+    return np.sqrt(frequency[:-1] * frequency[1:])[refine], error[refine]
+
+
+def adaptive_sweep(
+    measure: TransferMeasure,
+    frequency: list[float],
+    config: AdaptiveConfig | None = None,
+) -> AdaptiveResult:
+    """Measure a coarse grid and refine it until every interval is within the
+    tolerances or the point budget is spent.
+
+    Every pass measures the frequencies of `refine_frequencies`, the worst ones
+    first when they do not fit the budget. The points are measured in the
+    order they are added, not in frequency order.
+
+    Args:
+        measure (TransferMeasure): Measures one frequency, one hardware
+            acquisition.
+        frequency (list[float]): Coarse grid.
+        config (AdaptiveConfig | None, optional): Criteria. Defaults to None.
+
+    Returns:
+        AdaptiveResult: The measured points, the failed ones left out.
+    """
+    if config is None:
+        config = AdaptiveConfig()
+
+    frequencies: list[float] = []
+    transfers: list[complex] = []
+
+    def measure_all(new_frequencies: list[float]) -> None:
+        for new_frequency in new_frequencies:
+            frequencies.append(float(new_frequency))
+            transfers.append(measure(float(new_frequency)))
+
+    def result(passes: int) -> AdaptiveResult:
+        valid = [
+            (f, h) for f, h in zip(frequencies, transfers, strict=True) if h is not None and h != 0
+        ]
+        valid.sort(key=lambda point: point[0])
+        return AdaptiveResult(
+            np.array([f for f, _ in valid], dtype=np.float64),
+            np.array([h for _, h in valid], dtype=np.complex128),
+            passes,
+        )
+
+    measure_all(frequency[: config.max_points])
+
+    passes = 0
+    while passes < config.max_passes:
+        budget = config.max_points - len(frequencies)
+        current = result(passes)
+        new_frequencies, error = refine_frequencies(
+            current.frequency,
+            current.gain_dB,
+            current.phase,
+            config,
+        )
+        if budget <= 0 or len(new_frequencies) == 0:
+            break
+
+        worst = np.sort(np.argsort(error)[::-1][:budget])
+        measure_all(list(new_frequencies[worst]))
+        passes += 1
+
+    return result(passes)
+
+
+def transfer_estimate(
+    phasor: np.ndarray,
+    balanced: bool = False,
+) -> complex | None:
+    """DUT over reference transfer function of the channel phasors of a point:
+    channel 1 over 0, or (2 - 3) over (0 - 1) for the balanced channels.
+    """
+    if balanced:
+        reference = phasor[0] - phasor[1]
+        dut = phasor[2] - phasor[3]
+    else:
+        reference = phasor[0]
+        dut = phasor[1]
+
+    if reference == 0:
+        return None
+
+    return complex(dut / reference)
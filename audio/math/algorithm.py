@@ -1,3 +1,4 @@
+import math
 from typing import Self
 
 import numpy as np
@@ -40,3 +41,46 @@ class LogarithmicScale:
         self.f_list = [np.float_power(10, f) for f in self.f_log_list]
 
         self.f_list = [np.float_power(10, f) for f in self.f_log_list]
+
+
+
+# Ratio between the upper and lower bound of a decade
+DECADE: int = 10
+
+
+def decade_sampling(
+    frequency: float,
+    Fs_multiplier: float,
+    max_frequency_sampling: float,
+) -> tuple[float, int]:
+    """Sampling frequency shared by the decade of `frequency`, so a stream keeps
+    its clock across it, and the decimation of the captures back to about
+    `Fs_multiplier` times `frequency`.
+
+    Args:
+        frequency (float): Frequency in the decade.
+        Fs_multiplier (float): Sampling frequency over the signal frequency.
+        max_frequency_sampling (float): Max sampling frequency of the DAQ.
+
+    Returns:
+        tuple[float, int]: Sampling frequency of the decade and decimation.
+    """
+    decade_max = DECADE ** (math.floor(math.log10(frequency)) + 1)
+    sampling_frequency = min(decade_max * Fs_multiplier, max_frequency_sampling)
+    decimation = max(int(sampling_frequency // (frequency * Fs_multiplier)), 1)
+
+    return sampling_frequency, decimation
+
+
+def decade_stream_duration(number_of_samples: int, sampling_frequency: float) -> float:
+    """Seconds of stream history holding two of the longest captures of a
+    decade, the ones decimated `DECADE` times at its lower bound.
+
+    Args:
+        number_of_samples (int): Samples of a capture after the decimation.
+        sampling_frequency (float): Sampling frequency of the decade.
+
+    Returns:
+        float: Seconds of the stream buffer, at least 5.
+    """
+    return max(5.0, 2 * DECADE * number_of_samples / sampling_frequency)
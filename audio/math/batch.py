@@ -0,0 +1,421 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+from collections.abc import Sequence
+from dataclasses import dataclass
+from multiprocessing import Pool
+from multiprocessing.managers import SharedMemoryManager
+from multiprocessing.shared_memory import SharedMemory
+from typing import Any, Self
+
+import numpy as np
+import rich.repr
+
+from audio.math.coherent import COHERENCE_TOLERANCE
+from audio.math.rms import RMS_MODE
+from audio.math.sine_fit import sine_fit
+
+# Below this number of samples a single process is faster than the pool.
+SHARD_MIN_SAMPLES: int = 8_000_000
+
+# Ref = Ref+ - Ref-, DUT = DUT+ - DUT- of the balanced channels
+BALANCED_COMBINATION: list[list[float]] = [[1, -1, 0, 0], [0, 0, 1, -1]]
+
+
+@rich.repr.auto
+@dataclass
+class SweepTensor:
+    """A whole sweep as a `(frequency, channel, sample)` tensor.
+
+    Captures shorter than `n_samples` are zero padded, `lengths` holds the
+    number of valid samples of every frequency. `frequency_id` and `channel_id`
+    map the first two axes back to the database rows, when loaded from it.
+    """
+
+    voltages: np.ndarray
+    lengths: np.ndarray
+    frequency: np.ndarray
+    sampling_frequency: np.ndarray
+    frequency_id: np.ndarray | None = None
+    channel_id: np.ndarray | None = None
+
+    @classmethod
+    def from_voltages(
+        cls: type[Self],
+        frequency: Sequence[float],
+        sampling_frequency: Sequence[float],
+        voltages: Sequence[Sequence[Sequence[float]]],
+    ) -> Self:
+        """Build the tensor from one list of channel captures per frequency."""
+        n_channels = max((len(channels) for channels in voltages), default=0)
+        lengths = np.array(
+            [min((len(v) for v in channels), default=0) for channels in voltages],
+            dtype=np.int64,
+        )
+        n_samples = int(lengths.max()) if len(lengths) > 0 else 0
+
+        tensor = np.zeros((len(voltages), n_channels, n_samples), dtype=np.float64)
+        for idx, channels in enumerate(voltages):
+            for idx_channel, channel in enumerate(channels):
+                tensor[idx, idx_channel, : lengths[idx]] = np.asarray(
+                    channel,
+                    dtype=np.float64,
+                )[: lengths[idx]]
+
+        return cls(
+            voltages=tensor,
+            lengths=lengths,
+            frequency=np.asarray(frequency, dtype=np.float64),
+            sampling_frequency=np.asarray(sampling_frequency, dtype=np.float64),
+        )
+
+    @property
+    def n_frequencies(self: Self) -> int:
+        return self.voltages.shape[0]
+
+    @property
+    def n_channels(self: Self) -> int:
+        return self.voltages.shape[1]
+
+    @property
+    def n_samples(self: Self) -> int:
+        return self.voltages.shape[2]
+
+    def combine(self: Self, weights: Sequence[Sequence[float]]) -> Self:
+        """Linear combination of the channels, e.g. `[[1, -1, 0, 0], [0, 0, 1, -1]]`
+        turns the 4 balanced channels into the differential Ref and DUT.
+
+        The combined channels are not database channels, `channel_id` is
+        dropped and `frequency_id` kept.
+        """
+        return type(self)(
+            voltages=np.einsum(
+                "oc,fcs->fos",
+                np.asarray(weights, dtype=np.float64),
+                self.voltages,
+            ),
+            lengths=self.lengths,
+            frequency=self.frequency,
+            sampling_frequency=self.sampling_frequency,
+            frequency_id=self.frequency_id,
+        )
+
+
+# Bump when the estimators change, the cached analysis results become stale
+ANALYSIS_VERSION: int = 1
+
+
+def analysis_parameters_hash(**parameters: Any) -> str:  # noqa: ANN401
+    """Key of the analysis results in the derived results cache, the
+    parameters must be JSON serializable.
+    """
+    data = json.dumps({"version": ANALYSIS_VERSION, **parameters}, sort_keys=True)
+    return hashlib.sha256(data.encode()).hexdigest()
+
+
+@rich.repr.auto
+@dataclass
+class SweepAnalysis:
+    """Per frequency and channel results of `analyse_sweep`.
+
+    With `RMS_MODE.FFT` `rms` is the RMS over whole periods (DC included, like
+    `RMS.fft`), with `RMS_MODE.SINE_FIT` the RMS of the fitted tone. `phasor` is
+    the complex peak amplitude at the input frequency. The standard deviations
+    are only estimated by the sine fit.
+    """
+
+    frequency: np.ndarray
+    rms: np.ndarray
+    phasor: np.ndarray
+    rms_std: np.ndarray | None = None
+    phase_std: np.ndarray | None = None
+
+    @classmethod
+    def concatenate(cls: type[Self], results: Sequence[SweepAnalysis]) -> Self:
+        """Join the analyses of consecutive blocks of a sweep."""
+        if len(results) == 0:
+            _msg = "No sweep analysis to concatenate."
+            raise ValueError(_msg)
+
+        def join(name: str) -> np.ndarray | None:
+            values = [getattr(result, name) for result in results]
+            if any(value is None for value in values):
+                return None
+            return np.concatenate(values)
+
+        return cls(
+            frequency=join("frequency"),
+            rms=join("rms"),
+            phasor=join("phasor"),
+            rms_std=join("rms_std"),
+            phase_std=join("phase_std"),
+        )
+
+    def gain_dB(self: Self, ref: int = 0, dut: int = 1) -> np.ndarray:  # noqa: N802
+        return 20 * np.log10(self.rms[:, dut] / self.rms[:, ref])
+
+    def gain_dB_std(self: Self, ref: int = 0, dut: int = 1) -> np.ndarray | None:  # noqa: N802
+        if self.rms_std is None:
+            return None
+
+        relative = np.hypot(
+            self.rms_std[:, ref] / self.rms[:, ref],
+            self.rms_std[:, dut] / self.rms[:, dut],
+        )
+        return 20 / np.log(10) * relative
+
+    def phase(self: Self, ref: int = 0, dut: int = 1) -> np.ndarray:
+        """Phase of `dut` with respect to `ref` in degrees, in (-180, 180].
+
+        A DUT lagging the reference has a negative phase.
+        """
+        phase = np.degrees(np.angle(self.phasor[:, dut] * np.conj(self.phasor[:, ref])))
+        return np.where(phase <= -180, phase + 360, phase)
+
+
+def whole_period_weights(
+    lengths: np.ndarray,
+    frequency: np.ndarray,
+    sampling_frequency: np.ndarray,
+    n_samples: int,
+    tolerance: float = COHERENCE_TOLERANCE,
+) -> tuple[np.ndarray, np.ndarray]:
+    """Integration weights over the longest whole number of periods.
+
+    Coherent captures use every sample with the same weight. The others are
+    integrated with the trapezoidal rule up to the last whole period, the
+    fractional last interval is weighted with the linear interpolation of the
+    samples around it.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: `(rows, n_samples)` weights and the
+            window length in samples (the sum of the weights) of every row.
+    """
+    lengths = lengths[:, np.newaxis].astype(np.float64)
+    samples_per_period = (sampling_frequency / frequency)[:, np.newaxis]
+    n = np.arange(n_samples)[np.newaxis, :]
+
+    periods = lengths / samples_per_period
+    coherent = (np.abs(periods - np.rint(periods)) <= tolerance) & (periods >= 1)
+
+    # Trapezoidal rule over the samples span, (lengths - 1) intervals
+    window = np.floor((lengths - 1) / samples_per_period) * samples_per_period
+    window = np.where(window > 0, window, lengths - 1)
+    last = np.floor(window)
+    fraction = window - last
+
+    trapezoid = np.where(n < last, 1.0, 0.0)
+    trapezoid -= np.where(n == 0, 0.5, 0.0)
+    trapezoid += np.where(n == last, 0.5 + fraction - fraction**2 / 2, 0.0)
+    trapezoid += np.where(n == last + 1, fraction**2 / 2, 0.0)
+
+    weights = np.where(coherent, np.where(n < lengths, 1.0, 0.0), trapezoid)
+    window = np.where(coherent, lengths, window)
+
+    return weights, window[:, 0]
+
+
+def project(
+    voltages: np.ndarray,
+    lengths: np.ndarray,
+    frequency: np.ndarray,
+    sampling_frequency: np.ndarray,
+) -> tuple[np.ndarray, np.ndarray]:
+    """Mean square and phasor at the input frequency of every capture.
+
+    Args:
+        voltages (np.ndarray): `(rows, channels, samples)` tensor.
+        lengths (np.ndarray): Valid samples of every row.
+        frequency (np.ndarray): Input frequency of every row.
+        sampling_frequency (np.ndarray): Sampling frequency of every row.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: `(rows, channels)` mean square and
+            complex peak amplitude.
+    """
+    n_samples = voltages.shape[2]
+
+    weights, window = whole_period_weights(
+        lengths,
+        frequency,
+        sampling_frequency,
+        n_samples,
+    )
+
+    omega = 2 * np.pi * frequency / sampling_frequency
+    kernel = weights * np.exp(-1j * omega[:, np.newaxis] * np.arange(n_samples))
+
+    mean_square = np.einsum("rcs,rs->rc", np.square(voltages), weights)
+    mean_square /= window[:, np.newaxis]
+
+    phasor = np.einsum("rcs,rs->rc", voltages, kernel)
+    phasor *= 2 / window[:, np.newaxis]
+
+    return mean_square, phasor
+
+
+def estimate(
+    voltages: np.ndarray,
+    lengths: np.ndarray,
+    frequency: np.ndarray,
+    sampling_frequency: np.ndarray,
+    rms_mode: RMS_MODE = RMS_MODE.FFT,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """RMS, phasor and their standard deviations (phase in degrees) of every
+    capture, the deviations are NaN when the estimator has none.
+    """
+    if rms_mode == RMS_MODE.FFT:
+        mean_square, phasor = project(voltages, lengths, frequency, sampling_frequency)
+        unknown = np.full(mean_square.shape, np.nan)
+        return np.sqrt(mean_square), phasor, unknown, unknown
+
+    if rms_mode == RMS_MODE.SINE_FIT:
+        fit = sine_fit(
+            voltages,
+            frequency[:, np.newaxis],
+            sampling_frequency[:, np.newaxis],
+            lengths=lengths[:, np.newaxis],
+        )
+        return fit.rms, fit.phasor, fit.rms_std, np.degrees(fit.phase_std)
+
+    _msg = f"{rms_mode} is not supported by the sweep analysis."
+    raise ValueError(_msg)
+
+
+def analyse_sweep(
+    tensor: SweepTensor,
+    processes: int | None = None,
+    rms_mode: RMS_MODE = RMS_MODE.FFT,
+) -> SweepAnalysis:
+    """Analyse every frequency and channel of the sweep in batched calls.
+
+    Args:
+        tensor (SweepTensor): The sweep.
+        processes (int | None, optional): Worker processes, large sweeps are
+            sharded by frequency through shared memory. Defaults to None, one
+            process per CPU above `SHARD_MIN_SAMPLES` samples.
+        rms_mode (RMS_MODE, optional): `RMS_MODE.FFT` for the whole periods
+            projection or `RMS_MODE.SINE_FIT`. Defaults to RMS_MODE.FFT.
+
+    Returns:
+        SweepAnalysis: RMS and phasor of every frequency and channel.
+    """
+    if processes is None:
+        processes = os.cpu_count() if tensor.voltages.size >= SHARD_MIN_SAMPLES else 1
+
+    processes = max(min(processes, tensor.n_frequencies), 1)
+
+    if processes == 1:
+        rms, phasor, rms_std, phase_std = estimate(
+            tensor.voltages,
+            tensor.lengths,
+            tensor.frequency,
+            tensor.sampling_frequency,
+            rms_mode,
+        )
+    else:
+        rms, phasor, rms_std, phase_std = _estimate_sharded(tensor, processes, rms_mode)
+
+    has_std = rms_mode == RMS_MODE.SINE_FIT
+
+    return SweepAnalysis(
+        frequency=tensor.frequency,
+        rms=rms,
+        phasor=phasor,
+        rms_std=rms_std if has_std else None,
+        phase_std=phase_std if has_std else None,
+    )
+
+
+# Shared memory sharding
+# Only the block names, shapes and row ranges are sent to the workers.
+
+_SharedArray = tuple[str, tuple[int, ...], str]
+
+
+def _share(
+    manager: SharedMemoryManager,
+    array: np.ndarray,
+) -> tuple[SharedMemory, _SharedArray]:
+    shared_memory = manager.SharedMemory(size=max(array.nbytes, 1))
+    np.ndarray(array.shape, dtype=array.dtype, buffer=shared_memory.buf)[...] = array
+    return shared_memory, (shared_memory.name, array.shape, array.dtype.str)
+
+
+def _estimate_shard(
+    task: tuple[list[_SharedArray], list[_SharedArray], int, int, RMS_MODE],
+) -> None:
+    inputs, outputs, start, stop, rms_mode = task
+
+    blocks = [SharedMemory(name=name) for name, _, _ in inputs + outputs]
+    try:
+        arrays = [
+            np.ndarray(shape, dtype=dtype, buffer=block.buf)
+            for (_, shape, dtype), block in zip(inputs + outputs, blocks, strict=True)
+        ]
+        voltages, lengths, frequency, sampling_frequency = arrays[:4]
+
+        results = estimate(
+            voltages[start:stop],
+            lengths[start:stop],
+            frequency[start:stop],
+            sampling_frequency[start:stop],
+            rms_mode,
+        )
+        for output, result in zip(arrays[4:], results, strict=True):
+            output[start:stop] = result
+
+        # The views must be released before closing the blocks
+        del arrays, voltages, lengths, frequency, sampling_frequency, output
+    finally:
+        for block in blocks:
+            block.close()
+
+
+def _estimate_sharded(
+    tensor: SweepTensor,
+    processes: int,
+    rms_mode: RMS_MODE,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    n_rows, n_channels, _ = tensor.voltages.shape
+
+    with SharedMemoryManager() as manager:
+        inputs = [
+            _share(manager, np.ascontiguousarray(array))
+            for array in (
+                tensor.voltages,
+                tensor.lengths,
+                tensor.frequency,
+                tensor.sampling_frequency,
+            )
+        ]
+        outputs = [
+            _share(manager, np.zeros((n_rows, n_channels), dtype=dtype))
+            for dtype in (np.float64, np.complex128, np.float64, np.float64)
+        ]
+
+        bounds = np.linspace(0, n_rows, num=min(4 * processes, n_rows) + 1, dtype=int)
+        tasks = [
+            (
+                [shared for _, shared in inputs],
+                [shared for _, shared in outputs],
+                int(start),
+                int(stop),
+                rms_mode,
+            )
+            for start, stop in zip(bounds[:-1], bounds[1:], strict=True)
+            if stop > start
+        ]
+
+        with Pool(processes) as pool:
+            pool.map(_estimate_shard, tasks)
+
+        results = [
+            np.ndarray(shape, dtype=dtype, buffer=block.buf).copy()
+            for block, (_, shape, dtype) in outputs
+        ]
+
+    rms, phasor, rms_std, phase_std = results
+    return rms, phasor, rms_std, phase_std
@@ -0,0 +1,252 @@
+from __future__ import annotations
+
+import math
+from dataclasses import dataclass
+from typing import Self
+
+import numpy as np
+import rich.repr
+from rich.table import Column, Table
+
+from audio.config.sampling import SamplingConfig
+from audio.console import console
+from audio.math.algorithm import LogarithmicScale
+
+# Default sample clock timebase of the cDAQ chassis, every sampling frequency
+# is obtained as `timebase / divider` with an integer divider.
+DAQ_TIMEBASE: float = 80_000_000
+
+# Fractional periods left in a capture that are still considered coherent.
+COHERENCE_TOLERANCE: float = 1e-3
+
+# Clock dividers, closest to the requested one, tried by the coherent planner.
+COHERENT_SEARCH_DIVIDERS: int = 1024
+
+# Max (divider, number of samples) candidates evaluated at once by the planner.
+COHERENT_SEARCH_BLOCK: int = 1 << 20
+
+
+@rich.repr.auto
+@dataclass
+class CoherentPoint:
+    frequency: float
+    sampling_frequency: float
+    number_of_samples: int
+    n_periods: int
+    error: float
+    tolerance: float = COHERENCE_TOLERANCE
+
+    @property
+    def coherent(self: Self) -> bool:
+        return self.error <= self.tolerance
+
+
+def periods_error(
+    frequency: float,
+    sampling_frequency: float,
+    number_of_samples: int,
+) -> float:
+    """Distance in periods of the capture from an integer number of periods."""
+    periods = number_of_samples * frequency / sampling_frequency
+    return abs(periods - round(periods))
+
+
+def is_coherent(
+    frequency: float,
+    sampling_frequency: float,
+    number_of_samples: int,
+    tolerance: float = COHERENCE_TOLERANCE,
+) -> bool:
+    """Check if a capture holds an integer number of periods of `frequency`."""
+    if number_of_samples * frequency / sampling_frequency < 1:
+        return False
+
+    return (
+        periods_error(frequency, sampling_frequency, number_of_samples) <= tolerance
+    )
+
+
+def coerce_sampling_frequency(
+    sampling_frequency: float,
+    timebase: float = DAQ_TIMEBASE,
+) -> float:
+    """Sampling frequency the DAQ actually sets for `sampling_frequency`, the
+    closest one not above it with an integer divider of the timebase.
+    """
+    divider = max(math.ceil(round(timebase / sampling_frequency, 6)), 1)
+    return timebase / divider
+
+
+def plan_coherent_point(
+    frequency: float,
+    sampling_frequency: float,
+    number_of_samples: int,
+    number_of_samples_max: int,
+    max_frequency_sampling: float,
+    timebase: float = DAQ_TIMEBASE,
+    tolerance: float = COHERENCE_TOLERANCE,
+) -> CoherentPoint:
+    """Find the clock divider and capture length closest to the requested ones
+    that hold an integer number of periods.
+
+    The sampling frequency is searched between half and twice
+    `sampling_frequency` (never above `max_frequency_sampling`), only on the
+    `COHERENT_SEARCH_DIVIDERS` dividers closest to the requested one, and the
+    number of samples between `number_of_samples` and `number_of_samples_max`.
+    The candidates are evaluated in blocks of at most `COHERENT_SEARCH_BLOCK`.
+
+    Args:
+        frequency (float): Input frequency.
+        sampling_frequency (float): Requested sampling frequency.
+        number_of_samples (int): Minimum number of samples.
+        number_of_samples_max (int): Maximum number of samples.
+        max_frequency_sampling (float): Max sampling frequency of the DAQ.
+        timebase (float, optional): Sample clock timebase. Defaults to DAQ_TIMEBASE.
+        tolerance (float, optional): Max fractional period. Defaults to COHERENCE_TOLERANCE.
+
+    Returns:
+        CoherentPoint: The best plan, `coherent` is False when no divider hits
+            the tolerance.
+    """
+    sampling_frequency = min(sampling_frequency, max_frequency_sampling)
+    number_of_samples_max = max(number_of_samples_max, number_of_samples)
+
+    sampling_frequency_max = min(2 * sampling_frequency, max_frequency_sampling)
+    divider_min = max(math.ceil(timebase / sampling_frequency_max), 1)
+    divider_max = max(math.floor(timebase / (sampling_frequency / 2)), divider_min)
+
+    # Dividers sorted by the distance of their clock from the requested one
+    divider_requested = round(timebase / sampling_frequency)
+    dividers = np.arange(
+        max(divider_requested - COHERENT_SEARCH_DIVIDERS, divider_min),
+        min(divider_requested + COHERENT_SEARCH_DIVIDERS, divider_max) + 1,
+    )
+    distance = np.abs(np.log(timebase / dividers / sampling_frequency))
+    order = np.argsort(distance, kind="stable")[:COHERENT_SEARCH_DIVIDERS]
+    dividers, distance = dividers[order], distance[order]
+
+    n_samples = np.arange(number_of_samples, number_of_samples_max + 1)
+    block_size = max(COHERENT_SEARCH_BLOCK // n_samples.size, 1)
+
+    best: tuple[float, int, float] | None = None
+    for idx in range(0, dividers.size, block_size):
+        block = dividers[idx : idx + block_size, np.newaxis]
+        periods = n_samples[np.newaxis, :] * frequency * block / timebase
+        error = np.where(periods >= 0.5, np.abs(periods - np.rint(periods)), np.inf)
+
+        # The blocks come by increasing distance, so the first coherent
+        # candidate of a block is the closest clock with the shortest capture
+        coherent = error <= tolerance
+        if coherent.any():
+            idx_divider, idx_samples = np.unravel_index(np.argmax(coherent), error.shape)
+            best = (
+                float(block[idx_divider, 0]),
+                int(n_samples[idx_samples]),
+                float(error[idx_divider, idx_samples]),
+            )
+            break
+
+        idx_divider, idx_samples = np.unravel_index(np.argmin(error), error.shape)
+        if best is None or error[idx_divider, idx_samples] < best[2]:
+            best = (
+                float(block[idx_divider, 0]),
+                int(n_samples[idx_samples]),
+                float(error[idx_divider, idx_samples]),
+            )
+
+    divider, best_number_of_samples, error = best
+    return CoherentPoint(
+        frequency=frequency,
+        sampling_frequency=timebase / divider,
+        number_of_samples=best_number_of_samples,
+        n_periods=round(best_number_of_samples * frequency * divider / timebase),
+        error=error,
+        tolerance=tolerance,
+    )
+
+
+def plan_coherent_sweep(
+    sampling: SamplingConfig,
+    max_frequency_sampling: float,
+    timebase: float = DAQ_TIMEBASE,
+    tolerance: float = COHERENCE_TOLERANCE,
+) -> list[CoherentPoint]:
+    """Plan a coherent capture for every frequency of the sweep log scale.
+
+    Args:
+        sampling (SamplingConfig): Sweep sampling configuration.
+        max_frequency_sampling (float): Max sampling frequency of the DAQ.
+        timebase (float, optional): Sample clock timebase. Defaults to DAQ_TIMEBASE.
+        tolerance (float, optional): Max fractional period. Defaults to COHERENCE_TOLERANCE.
+
+    Returns:
+        list[CoherentPoint]: One point for every frequency of `LogarithmicScale`.
+    """
+    log_scale: LogarithmicScale = LogarithmicScale(
+        sampling.frequency_min,
+        sampling.frequency_max,
+        sampling.points_per_decade,
+    )
+
+    return [
+        plan_coherent_frequency(
+            frequency,
+            sampling,
+            max_frequency_sampling,
+            timebase,
+            tolerance,
+        )
+        for frequency in log_scale.f_list
+    ]
+
+
+def coherent_number_of_samples_max(sampling: SamplingConfig) -> int:
+    """Longest capture of a coherent plan, twice `number_of_samples` when
+    `number_of_samples_max` is not set.
+    """
+    if sampling.number_of_samples_max is not None:
+        return max(sampling.number_of_samples_max, sampling.number_of_samples)
+    return 2 * sampling.number_of_samples
+
+
+def plan_coherent_frequency(
+    frequency: float,
+    sampling: SamplingConfig,
+    max_frequency_sampling: float,
+    timebase: float = DAQ_TIMEBASE,
+    tolerance: float = COHERENCE_TOLERANCE,
+) -> CoherentPoint:
+    """Plan a coherent capture of one frequency with the sweep sampling
+    configuration, for the frequencies out of the log scale.
+    """
+    return plan_coherent_point(
+        frequency=frequency,
+        sampling_frequency=frequency * sampling.Fs_multiplier,
+        number_of_samples=sampling.number_of_samples,
+        number_of_samples_max=coherent_number_of_samples_max(sampling),
+        max_frequency_sampling=max_frequency_sampling,
+        timebase=timebase,
+        tolerance=tolerance,
+    )
+
+
+def print_coherent_plan(plan: list[CoherentPoint]) -> None:
+    table = Table(
+        Column(r"Frequency [Hz]", justify="right"),
+        Column(r"Fs [Hz]", justify="right"),
+        Column(r"Number of samples", justify="right"),
+        Column(r"Periods", justify="right"),
+        Column(r"Error", justify="right"),
+        title="[blue]Coherent Sampling Plan.",
+    )
+
+    for point in plan:
+        table.add_row(
+            f"{point.frequency:.5f}",
+            f"{point.sampling_frequency:.5f}",
+            f"{point.number_of_samples}",
+            f"{point.n_periods}",
+            f"{point.error:.2e}" if point.coherent else f"[red]{point.error:.2e}[/]",
+        )
+
+    console.print(table)
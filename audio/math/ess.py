@@ -0,0 +1,340 @@
+from __future__ import annotations
+
+import math
+from dataclasses import dataclass
+from typing import Self
+
+import numpy as np
+import rich.repr
+from scipy import signal
+
+# Min samples of `x` transformed at once by `fft_convolve_chunked`
+CONVOLUTION_BLOCK_SIZE: int = 2**16
+
+# Band-pass of the deconvolved sweep, see `ExponentialSweep.inverse_filter`
+INVERSE_BAND_PASS_ORDER: int = 2
+INVERSE_REGULARIZATION: float = 1e-4
+# Samples of the inverse filter after the sweep length, as a fraction of it
+INVERSE_TAIL: float = 0.05
+
+# Edges of the impulse response windows tapered by `ess_deconvolve`, as a
+# fraction of the samples before the peak
+IR_TAPER: float = 0.5
+
+
+def _next_power_of_2(n: int) -> int:
+    return 1 << max(n - 1, 0).bit_length()
+
+
+def _edge_taper(length: int, edge: int) -> np.ndarray:
+    # Flat window with half Hann edges of `edge` samples
+    edge = min(edge, length // 2)
+    taper = np.ones(length)
+    if edge > 0:
+        rise = 0.5 - 0.5 * np.cos(np.pi * (np.arange(edge) + 0.5) / edge)
+        taper[:edge] = rise
+        taper[length - edge :] = rise[::-1]
+    return taper
+
+
+@rich.repr.auto
+@dataclass
+class ExponentialSweep:
+    """Exponential sine sweep (Farina), the frequency grows exponentially from
+    `frequency_start` to `frequency_stop` in `duration` seconds.
+    """
+
+    frequency_start: float
+    frequency_stop: float
+    duration: float
+    sampling_frequency: float
+
+    @property
+    def rate(self: Self) -> float:
+        """Seconds for the frequency to grow by a factor e."""
+        return self.duration / math.log(self.frequency_stop / self.frequency_start)
+
+    @property
+    def number_of_samples(self: Self) -> int:
+        return round(self.duration * self.sampling_frequency)
+
+    def signal(self: Self) -> np.ndarray:
+        t = np.arange(self.number_of_samples) / self.sampling_frequency
+        return np.sin(
+            2 * np.pi * self.frequency_start * self.rate * np.expm1(t / self.rate),
+        )
+
+    def inverse_filter(self: Self) -> np.ndarray:
+        """Filter that turns the sweep in the causal impulse response of a
+        band-pass, placed at the last sample of the sweep.
+
+        The time reversed sweep with a -6 dB/octave envelope (Farina) whitens
+        the pink spectrum of the sweep, its zero phase product with the sweep
+        is then replaced by a minimum phase band-pass half an octave inside the
+        sweep band, by a regularized division. The band edges ring after the
+        impulse, within the window of the linear response, instead of before
+        it where the harmonics are.
+        """
+        n_samples = self.number_of_samples
+        t = np.arange(n_samples) / self.sampling_frequency
+        sweep = self.signal()
+        farina = sweep[::-1] * np.exp(-t / self.rate)
+
+        n_fft = _next_power_of_2(2 * n_samples)
+        frequency = np.fft.rfftfreq(n_fft, 1 / self.sampling_frequency)
+        farina_spectrum = np.fft.rfft(farina, n_fft)
+        whitened = np.fft.rfft(sweep, n_fft) * farina_spectrum
+
+        band = (frequency > 2 * self.frequency_start) & (frequency < self.frequency_stop / 2)
+        gain = np.median(np.abs(whitened[band]))
+        farina_spectrum /= gain
+        whitened /= gain
+
+        _, band_pass = signal.freqs(
+            *signal.butter(
+                INVERSE_BAND_PASS_ORDER,
+                [
+                    2 * np.pi * self.frequency_start * np.sqrt(2),
+                    2 * np.pi * self.frequency_stop / np.sqrt(2),
+                ],
+                btype="bandpass",
+                analog=True,
+            ),
+            worN=2 * np.pi * frequency,
+        )
+
+        inverse = np.fft.irfft(
+            band_pass
+            * farina_spectrum
+            * np.conj(whitened)
+            / (np.square(np.abs(whitened)) + INVERSE_REGULARIZATION),
+            n_fft,
+        )
+        return np.roll(inverse, n_samples - 1)[: n_samples + round(INVERSE_TAIL * n_samples)]
+
+    def harmonic_delay(self: Self, order: int) -> float:
+        """Advance of the impulse response of the `order` harmonic on the
+        linear one, in seconds.
+        """
+        return self.rate * math.log(order)
+
+
+def fft_convolve_chunked(
+    x: np.ndarray,
+    h: np.ndarray,
+    window: tuple[int, int] | None = None,
+    block_size: int = CONVOLUTION_BLOCK_SIZE,
+) -> np.ndarray:
+    """Linear convolution of `x` with `h` along the last axis, by FFT
+    overlap-add of blocks of `x`, at least as long as `h`.
+
+    Only the output samples in `window`, `[start, stop)`, are computed and
+    kept: the memory is bounded by the window and by the FFT of one block plus
+    `h`, not by the length of `x`.
+
+    Args:
+        x (np.ndarray): `(..., n)` signals.
+        h (np.ndarray): Filter.
+        window (tuple[int, int] | None, optional): Output samples to compute,
+            the whole `n + len(h) - 1` samples if None. Defaults to None.
+        block_size (int, optional): Min samples of `x` per FFT. Defaults to
+            CONVOLUTION_BLOCK_SIZE.
+
+    Returns:
+        np.ndarray: `(..., stop - start)` convolution, zero out of the full one.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    h = np.asarray(h, dtype=np.float64)
+    n_x = x.shape[-1]
+    n_full = n_x + len(h) - 1
+
+    start, stop = window if window is not None else (0, n_full)
+    output = np.zeros((*x.shape[:-1], stop - start))
+
+    # Shorter blocks than `h` would spend most of every FFT on `h`
+    n_fft = _next_power_of_2(max(block_size, len(h)) + len(h) - 1)
+    block_size = n_fft - len(h) + 1
+    h_spectrum = np.fft.rfft(h, n_fft)
+
+    for block_start in range(0, n_x, block_size):
+        block = x[..., block_start : block_start + block_size]
+        block_stop = block_start + block.shape[-1] + len(h) - 1
+
+        # Only the blocks that reach the window are transformed
+        if block_stop <= start or block_start >= stop:
+            continue
+
+        y = np.fft.irfft(np.fft.rfft(block, n_fft) * h_spectrum, n_fft)
+        first = max(start, block_start)
+        last = min(stop, block_stop)
+        output[..., first - start : last - start] += y[
+            ...,
+            first - block_start : last - block_start,
+        ]
+
+    return output
+
+
+@rich.repr.auto
+@dataclass
+class EssResult:
+    """Deconvolved exponential sweep of a reference and a DUT channel.
+
+    `impulse_response` is the `(ref, dut)` linear impulse response, from
+    `pre_samples` before its peak. `harmonics[k]` is the DUT impulse response of
+    the `k + 2` harmonic, zero padded to the same length.
+    """
+
+    sampling_frequency: float
+    impulse_response: np.ndarray
+    harmonics: np.ndarray
+    pre_samples: int
+
+    def _spectrum(self: Self, impulse_response: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        n_fft = _next_power_of_2(impulse_response.shape[-1])
+        return (
+            np.fft.rfftfreq(n_fft, 1 / self.sampling_frequency),
+            np.fft.rfft(impulse_response, n_fft),
+        )
+
+    def transfer(self: Self, frequency: np.ndarray) -> np.ndarray:
+        """DUT over reference linear transfer function at `frequency`."""
+        bins, spectrum = self._spectrum(self.impulse_response)
+        transfer = spectrum[1] / spectrum[0]
+        magnitude = np.interp(frequency, bins, np.abs(transfer))
+        phase = np.interp(frequency, bins, np.unwrap(np.angle(transfer)))
+        return magnitude * np.exp(1j * phase)
+
+    def gain_dB(self: Self, frequency: np.ndarray) -> np.ndarray:
+        return 20 * np.log10(np.abs(self.transfer(frequency)))
+
+    def phase(self: Self, frequency: np.ndarray) -> np.ndarray:
+        """Phase of the DUT on the reference in degrees, in (-180, 180]."""
+        phase = np.degrees(np.angle(self.transfer(frequency)))
+        return np.where(phase <= -180, phase + 360, phase)
+
+    def harmonic_distortion(self: Self, frequency: np.ndarray) -> np.ndarray:
+        """`(orders, frequencies)` amplitude of every harmonic on the
+        fundamental, for a fundamental at `frequency`.
+        """
+        bins, linear = self._spectrum(self.impulse_response[1])
+        _, harmonics = self._spectrum(self.harmonics)
+        fundamental = np.interp(frequency, bins, np.abs(linear))
+
+        return np.stack(
+            [
+                np.interp(frequency * (idx + 2), bins, np.abs(harmonic), right=np.nan)
+                for idx, harmonic in enumerate(harmonics)
+            ],
+        ) / fundamental
+
+    def thd(self: Self, frequency: np.ndarray) -> np.ndarray:
+        """Total harmonic distortion of the measured orders, the orders above
+        the Nyquist frequency left out.
+        """
+        return np.sqrt(np.nansum(np.square(self.harmonic_distortion(frequency)), axis=0))
+
+
+def ess_deconvolve(
+    recording: np.ndarray,
+    sweep: ExponentialSweep,
+    ir_length: float,
+    n_harmonics: int = 5,
+    block_size: int = CONVOLUTION_BLOCK_SIZE,
+) -> EssResult:
+    """Impulse responses of a recorded exponential sweep.
+
+    The linear impulse response is located on the peak of the reference. The
+    harmonic ones precede it by `ExponentialSweep.harmonic_delay`. Every
+    response is cut halfway to its neighbours with tapered edges. The results
+    are accurate an octave or two inside the sweep band, the linear response
+    needs `ir_length` of a few periods of the lowest frequency. The capture can
+    start anywhere before the sweep.
+
+    Args:
+        recording (np.ndarray): `(ref, dut)` capture of the sweep.
+        sweep (ExponentialSweep): The sweep played.
+        ir_length (float): Seconds of the linear impulse response after its peak.
+        n_harmonics (int, optional): Highest harmonic order. Defaults to 5.
+        block_size (int, optional): Min samples per FFT of the convolution.
+            Defaults to CONVOLUTION_BLOCK_SIZE.
+
+    Returns:
+        EssResult: The impulse responses.
+    """
+    recording = np.asarray(recording, dtype=np.float64)
+    inverse = sweep.inverse_filter()
+    sampling_frequency = sweep.sampling_frequency
+
+    # The sweep starts in the recording, the peak is not before its length
+    search_start = sweep.number_of_samples - 1
+    reference = fft_convolve_chunked(
+        recording[0],
+        inverse,
+        window=(search_start, max(recording.shape[-1], search_start + 1)),
+        block_size=block_size,
+    )
+    peak = search_start + int(np.argmax(np.abs(reference)))
+    del reference
+
+    def half_spacing(order: int) -> int:
+        # Samples halfway between the `order` and the `order - 1` responses
+        spacing = sweep.harmonic_delay(order) - sweep.harmonic_delay(order - 1)
+        return round(spacing / 2 * sampling_frequency)
+
+    pre_samples = half_spacing(2)
+    n_samples = pre_samples + round(ir_length * sampling_frequency)
+
+    # `(start, length, samples before the peak)` of the linear and the harmonic
+    # responses
+    windows_linear = (peak - pre_samples, n_samples, pre_samples)
+    windows_harmonic = [
+        (
+            peak
+            - round(sweep.harmonic_delay(order) * sampling_frequency)
+            - half_spacing(order + 1),
+            min(half_spacing(order + 1) + half_spacing(order), n_samples),
+            half_spacing(order + 1),
+        )
+        for order in range(2, n_harmonics + 1)
+    ]
+
+    # The windows are contiguous, one convolution covers them all
+    span_start = max(min(window[0] for window in [windows_linear, *windows_harmonic]), 0)
+    span_stop = windows_linear[0] + n_samples
+    span = fft_convolve_chunked(
+        recording,
+        inverse,
+        window=(span_start, span_stop),
+        block_size=block_size,
+    )
+
+    def impulse_response(
+        channels: np.ndarray,
+        start: int,
+        length: int,
+        pre: int,
+    ) -> np.ndarray:
+        first = max(start, span_start)
+        stop = max(start + length, first)
+        response = np.zeros((*channels.shape[:-1], n_samples))
+        response[..., first - start : stop - start] = channels[
+            ...,
+            first - span_start : stop - span_start,
+        ]
+        # Tapered edges, the truncated ringing of the band edges leaks less
+        response[..., :length] *= _edge_taper(length, round(IR_TAPER * pre))
+        return response
+
+    linear = impulse_response(span, *windows_linear)
+
+    harmonics = np.zeros((len(windows_harmonic), n_samples))
+    for idx, window in enumerate(windows_harmonic):
+        harmonics[idx] = impulse_response(span[1], *window)
+
+    return EssResult(
+        sampling_frequency=sampling_frequency,
+        impulse_response=linear,
+        harmonics=harmonics,
+        pre_samples=pre_samples,
+    )
@@ -0,0 +1,246 @@
+from __future__ import annotations
+
+import math
+from dataclasses import dataclass
+from typing import Self
+
+import numpy as np
+import rich.repr
+from rich.table import Column, Table
+
+from audio.config.sampling import SamplingConfig
+from audio.console import console
+from audio.math.algorithm import LogarithmicScale
+from audio.math.batch import SweepAnalysis
+from audio.math.coherent import DAQ_TIMEBASE
+
+# Points of the arbitrary waveform uploaded to the generator, one period
+WAVEFORM_POINTS: int = 16384
+
+# Tones stay below `WAVEFORM_POINTS / WAVEFORM_OVERSAMPLING` bins, far from the
+# images of the generator DAC
+WAVEFORM_OVERSAMPLING: int = 4
+
+# Min relative spacing in bins of the log scale frequencies, a tone lands at
+# most `1 / (2 * MIN_BIN_SPACING)` of a step away from its target
+MIN_BIN_SPACING: float = 2.0
+
+
+@rich.repr.auto
+@dataclass
+class ToneSet:
+    """Tones measured by one acquisition.
+
+    The tones are on the bins of the capture, `sampling_frequency /
+    number_of_samples` is the generator waveform frequency and the capture
+    holds exactly one of its periods.
+    """
+
+    bins: np.ndarray
+    phases: np.ndarray
+    sampling_frequency: float
+    number_of_samples: int
+
+    @property
+    def frequency_resolution(self: Self) -> float:
+        return self.sampling_frequency / self.number_of_samples
+
+    @property
+    def frequency(self: Self) -> np.ndarray:
+        return self.bins * self.frequency_resolution
+
+    def waveform(self: Self, n_points: int = WAVEFORM_POINTS) -> np.ndarray:
+        """One period of the tones, normalized to a peak of 1."""
+        return multitone_waveform(self.bins, self.phases, n_points)
+
+    def with_sampling_frequency(self: Self, sampling_frequency: float) -> Self:
+        """The same tones captured at a coerced sample clock."""
+        return type(self)(
+            self.bins,
+            self.phases,
+            sampling_frequency,
+            self.number_of_samples,
+        )
+
+
+def multitone_waveform(
+    bins: np.ndarray,
+    phases: np.ndarray,
+    n_points: int,
+) -> np.ndarray:
+    """Equal amplitude cosines on `bins` of a `n_points` period, peak of 1."""
+    spectrum = np.zeros(n_points // 2 + 1, dtype=np.complex128)
+    spectrum[bins] = np.exp(1j * phases)
+    waveform = np.fft.irfft(spectrum, n_points)
+    return waveform / np.max(np.abs(waveform))
+
+
+def crest_factor(waveform: np.ndarray) -> float:
+    return float(np.max(np.abs(waveform)) / np.sqrt(np.mean(np.square(waveform))))
+
+
+def schroeder_phases(n_tones: int) -> np.ndarray:
+    """Schroeder phases of `n_tones` tones of equal amplitude."""
+    k = np.arange(1, n_tones + 1)
+    return -np.pi * k * (k - 1) / n_tones
+
+
+def optimize_phases(
+    bins: np.ndarray,
+    n_points: int,
+    iterations: int = 100,
+    clip: float = 0.8,
+) -> np.ndarray:
+    """Tone phases of low crest factor.
+
+    Starts from the Schroeder phases and clips the waveform peaks, keeping the
+    phases of the clipped waveform at the tone bins, the phases of the lowest
+    crest factor are returned.
+    """
+    phases = schroeder_phases(len(bins))
+    phases_best = phases
+    crest_factor_best = math.inf
+
+    for _ in range(iterations):
+        waveform = multitone_waveform(bins, phases, n_points)
+        crest_factor_current = crest_factor(waveform)
+        if crest_factor_current < crest_factor_best:
+            crest_factor_best = crest_factor_current
+            phases_best = phases
+
+        phases = np.angle(np.fft.rfft(np.clip(waveform, -clip, clip))[bins])
+
+    return phases_best
+
+
+def plan_multitone(
+    sampling: SamplingConfig,
+    max_frequency_sampling: float,
+    n_points: int = WAVEFORM_POINTS,
+    timebase: float = DAQ_TIMEBASE,
+) -> list[ToneSet]:
+    """Group the sweep log scale in tone sets, measured one acquisition each.
+
+    A set starts at its lowest frequency, placed on a bin that resolves the log
+    scale steps, and holds the following frequencies up to
+    `n_points / WAVEFORM_OVERSAMPLING` bins. Every frequency is moved to the
+    closest bin, the frequencies falling on the same bin are measured once.
+
+    Args:
+        sampling (SamplingConfig): Sweep sampling configuration, frequency
+            range, points per decade and `Fs_multiplier`.
+        max_frequency_sampling (float): Max sampling frequency of the DAQ.
+        n_points (int, optional): Points of the generator waveform. Defaults
+            to WAVEFORM_POINTS.
+        timebase (float, optional): Sample clock timebase. Defaults to DAQ_TIMEBASE.
+
+    Returns:
+        list[ToneSet]: The sets, by frequency.
+    """
+    log_scale: LogarithmicScale = LogarithmicScale(
+        sampling.frequency_min,
+        sampling.frequency_max,
+        sampling.points_per_decade,
+    )
+    frequencies = np.asarray(log_scale.f_list, dtype=np.float64)
+
+    step = 10 ** (1 / sampling.points_per_decade) - 1
+    bin_min = max(math.ceil(MIN_BIN_SPACING / step), 1)
+    bin_max = max(n_points // WAVEFORM_OVERSAMPLING, bin_min)
+
+    tone_sets: list[ToneSet] = []
+    idx = 0
+    while idx < len(frequencies):
+        frequency_low = frequencies[idx]
+        in_set = frequencies[idx:] < frequency_low * bin_max / bin_min * (1 + 1e-9)
+        set_frequencies = frequencies[idx:][in_set]
+        idx += len(set_frequencies)
+
+        # The sample clock is a divider of the timebase, the capture length
+        # sets the bin spacing
+        sampling_frequency = min(
+            set_frequencies[-1] * sampling.Fs_multiplier,
+            max_frequency_sampling,
+        )
+        sampling_frequency = timebase / math.ceil(timebase / sampling_frequency)
+        number_of_samples = round(sampling_frequency * bin_min / frequency_low)
+        resolution = sampling_frequency / number_of_samples
+
+        bins = np.unique(np.maximum(np.rint(set_frequencies / resolution), 1).astype(np.int64))
+        bins = bins[bins < number_of_samples // 2]
+
+        tone_sets.append(
+            ToneSet(
+                bins=bins,
+                phases=optimize_phases(bins, n_points),
+                sampling_frequency=sampling_frequency,
+                number_of_samples=number_of_samples,
+            ),
+        )
+
+    return tone_sets
+
+
+def multitone_analysis(
+    voltages: np.ndarray,
+    tone_set: ToneSet,
+    combination: list[list[float]] | None = None,
+) -> SweepAnalysis:
+    """Gain and phase of every tone from one FFT of every channel.
+
+    Args:
+        voltages (np.ndarray): `(channels, periods * number_of_samples)`
+            capture, the periods are averaged.
+        tone_set (ToneSet): Tones of the capture.
+        combination (list[list[float]] | None, optional): Channels combination,
+            `(combined, channels)`. Defaults to None.
+
+    Returns:
+        SweepAnalysis: Per tone and channel results.
+    """
+    voltages = np.atleast_2d(np.asarray(voltages, dtype=np.float64))
+    n_channels, n_samples = voltages.shape
+    periods = n_samples // tone_set.number_of_samples
+    if periods < 1:
+        _msg = f"{n_samples} samples for a {tone_set.number_of_samples} samples period."
+        raise ValueError(_msg)
+
+    average = (
+        voltages[:, : periods * tone_set.number_of_samples]
+        .reshape(n_channels, periods, tone_set.number_of_samples)
+        .mean(axis=1)
+    )
+    spectrum = np.fft.rfft(average, axis=-1)[:, tone_set.bins]
+    phasor = (2 * spectrum / tone_set.number_of_samples).T
+
+    if combination is not None:
+        phasor = phasor @ np.asarray(combination, dtype=np.float64).T
+
+    return SweepAnalysis(
+        frequency=tone_set.frequency,
+        rms=np.abs(phasor) / np.sqrt(2),
+        phasor=phasor,
+    )
+
+
+def print_multitone_plan(tone_sets: list[ToneSet]) -> None:
+    table = Table(
+        Column(r"Frequency [Hz]", justify="right"),
+        Column(r"Tones", justify="right"),
+        Column(r"Fs [Hz]", justify="right"),
+        Column(r"Number of samples", justify="right"),
+        Column(r"Crest factor", justify="right"),
+        title="[blue]Multitone Plan.",
+    )
+
+    for tone_set in tone_sets:
+        frequency = tone_set.frequency
+        table.add_row(
+            f"{frequency[0]:.5f} - {frequency[-1]:.5f}",
+            f"{len(tone_set.bins)}",
+            f"{tone_set.sampling_frequency:.5f}",
+            f"{tone_set.number_of_samples}",
+            f"{crest_factor(tone_set.waveform()):.3f}",
+        )
+
+    console.print(table)
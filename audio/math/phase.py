@@ -1,8 +1,12 @@
 import math
 from typing import Literal
 
+import numpy as np
+
 from audio.console import console
-from audio.model.sampling import VoltageSampling, VoltageSamplingV2
+from audio.math.sine_fit import sine_fit
+from audio.math.zero_crossing import zero_crossings
+from audio.model.sampling import VoltageSampling, VoltageSamplingV2, VoltageSamplingV3
 
 
 def point_to_angle_radiants(voltage: float, amplitude_peak: float) -> float:
@@ -25,30 +29,21 @@ def delta_points(
     )
 
 
-def phase_offset_v2(
-    voltage_sampling_0: VoltageSampling,
-    voltage_sampling_1: VoltageSampling,
+def _remove_dc_offset(
+    voltage_sampling_0: VoltageSampling | VoltageSamplingV2 | VoltageSamplingV3,
+    voltage_sampling_1: VoltageSampling | VoltageSamplingV2 | VoltageSamplingV3,
     *,
     debug: bool = False,
-) -> float | None:
-    zero_index_0: int | None = None
-    zero_index_slope_0: float | None = None
-    zero_index_1: int | None = None
-    zero_index_slope_1: float | None = None
-    begin_index_1: int
-    alpha: float | None = None
-
-    sign_phase: float = 1
+) -> tuple[np.ndarray, np.ndarray]:
+    volts_0 = np.asarray(voltage_sampling_0.voltages, dtype=np.float64)
+    volts_1 = np.asarray(voltage_sampling_1.voltages, dtype=np.float64)
 
-    volts_0 = voltage_sampling_0.voltages
-    volts_1 = voltage_sampling_1.voltages
-
-    max0: float = max(volts_0)
-    min0: float = min(volts_0)
+    max0: float = volts_0.max()
+    min0: float = volts_0.min()
     dcoffset0: float = (max0 + min0) / 2.0
 
-    max1: float = max(volts_1)
-    min1: float = min(volts_1)
+    max1: float = volts_1.max()
+    min1: float = volts_1.min()
     dcoffset1: float = (max1 + min1) / 2.0
 
     diffoffset = dcoffset1 - dcoffset0
@@ -58,182 +53,78 @@ def phase_offset_v2(
             f"F: {voltage_sampling_0.input_frequency:+06.05f}, max0: {max0:+.05f}, max1: {max1:+.05f}, min0: {min0:+.05f}, min1: {min1:+.05f}, dcoffset0: {dcoffset0:+.05f}, dcoffset1: {dcoffset1:+.05f}, diffoffset: {diffoffset:+.07f}",
         )
 
-    volts_0.sub(dcoffset0)
-    volts_1.sub(dcoffset1)
-
-    for idx in range(1, len(volts_0)):
-        samp_curr_index: int = idx
-        samp_prev_index: int = idx - 1
-
-        samp_curr: float = float(volts_0[samp_curr_index])
-        samp_prev: float = float(volts_0[samp_prev_index])
-
-        cross: float = samp_prev * samp_curr
-
-        is_cross: bool = cross < 0
+    return volts_0 - dcoffset0, volts_1 - dcoffset1
 
-        if is_cross:
-            zero_index_slope_0 = samp_curr - samp_prev
 
-            if abs(samp_curr) < abs(samp_prev):
-                zero_index_0 = samp_curr_index
-            else:
-                zero_index_0 = samp_prev_index
-            begin_index_1 = samp_prev_index
-
-            tx0_0: float = samp_prev_index * (1 / voltage_sampling_0.sampling_frequency)
-            tx1_0: float = samp_curr_index * (1 / voltage_sampling_0.sampling_frequency)
-            m0: float = (samp_curr - samp_prev) / (tx1_0 - tx0_0)
-            q0: float = samp_prev - m0 * tx0_0
-            tx_0: float = -q0 / m0
-
-            break
+def phase_offset_v2(
+    voltage_sampling_0: VoltageSampling,
+    voltage_sampling_1: VoltageSampling,
+    *,
+    debug: bool = False,
+) -> float | None:
+    volts_0, volts_1 = _remove_dc_offset(
+        voltage_sampling_0,
+        voltage_sampling_1,
+        debug=debug,
+    )
 
-    if zero_index_0 is None or zero_index_slope_0 is None or tx_0 is None:
+    crossings_0 = zero_crossings(
+        volts_0,
+        sampling_frequency=voltage_sampling_0.sampling_frequency,
+    )
+    if len(crossings_0) == 0:
         return None
 
-    for idx in range(max(begin_index_1, 1), len(volts_1)):
-        samp_curr_index = idx
-        samp_prev_index = idx - 1
+    # The second signal is searched from the first crossing of the first one
+    begin_index_1: int = int(crossings_0.index[0])
 
-        samp_curr: float = float(volts_1[samp_curr_index])
-        samp_prev: float = float(volts_1[samp_prev_index])
-
-        cross: float = samp_prev * samp_curr
-        is_cross = cross < 0
-
-        if is_cross:
-            slope: float = samp_curr - samp_prev
-            zero_index_slope_1 = slope
-            if zero_index_slope_0 * zero_index_slope_1 < 0:
-                sign_phase = -1
-
-            #     samp_curr_index if samp_curr - samp_prev < 0 else samp_prev_index
-            if abs(samp_curr) < abs(samp_prev):
-                zero_index_1 = samp_curr_index
-            else:
-                zero_index_1 = samp_prev_index
-
-            tx0_1: float = samp_prev_index * (1 / voltage_sampling_1.sampling_frequency)
-            tx1_1: float = samp_curr_index * (1 / voltage_sampling_1.sampling_frequency)
-            m1: float = (samp_curr - samp_prev) / (tx1_1 - tx0_1)
-            q1: float = samp_prev - m1 * tx0_1
-            tx_1: float = -q1 / m1
-
-            break
-
-    if zero_index_1 is None or tx_1 is None:
+    crossings_1 = zero_crossings(
+        volts_1,
+        sampling_frequency=voltage_sampling_1.sampling_frequency,
+    )
+    position_1 = crossings_1.first(start=max(begin_index_1, 1) - 1)
+    if position_1 is None:
         return None
 
-    time = tx_1 - tx_0
+    time: float = crossings_1.time[position_1] - crossings_0.time[0]
     period_time: float = 1 / voltage_sampling_0.input_frequency
 
     alpha = (time / period_time) * 360
-    if sign_phase < 0:
+    if crossings_0.slope[0] * crossings_1.slope[position_1] < 0:
         alpha -= 180
 
     return alpha
 
 
 def phase_offset_v3(
-    voltage_sampling_0: VoltageSamplingV2,
-    voltage_sampling_1: VoltageSamplingV2,
+    voltage_sampling_0: VoltageSamplingV2 | VoltageSamplingV3,
+    voltage_sampling_1: VoltageSamplingV2 | VoltageSamplingV3,
     *,
     debug: bool = False,
 ) -> tuple[float, Literal[-1, 1]] | None:
-    zero_index_0: int | None = None
-    zero_index_slope_0: float | None = None
-    zero_index_1: int | None = None
-    zero_index_slope_1: float | None = None
-    begin_index_1: int
-    alpha: float | None = None
-
-    sign_phase: float = 1
-
-    max0: float = max(voltage_sampling_0.voltages)
-    min0: float = min(voltage_sampling_0.voltages)
-    dcoffset0: float = (max0 + min0) / 2.0
-
-    max1: float = max(voltage_sampling_1.voltages)
-    min1: float = min(voltage_sampling_1.voltages)
-    dcoffset1: float = (max1 + min1) / 2.0
-
-    diffoffset = dcoffset1 - dcoffset0
-
-    if debug:
-        console.log(
-            f"F: {voltage_sampling_0.input_frequency:+06.05f}, max0: {max0:+.05f}, max1: {max1:+.05f}, min0: {min0:+.05f}, min1: {min1:+.05f}, dcoffset0: {dcoffset0:+.05f}, dcoffset1: {dcoffset1:+.05f}, diffoffset: {diffoffset:+.07f}",
-        )
-
-    voltage_sampling_0.voltages.sub(dcoffset0)
-    voltage_sampling_1.voltages.sub(dcoffset1)
-
-    for idx in range(1, len(voltage_sampling_0.voltages)):
-        samp_curr_index: int = idx
-        samp_prev_index: int = idx - 1
-
-        samp_curr: float = float(voltage_sampling_0.voltages[samp_curr_index])
-        samp_prev: float = float(voltage_sampling_0.voltages[samp_prev_index])
-
-        cross: float = samp_prev * samp_curr
-
-        is_cross: bool = cross < 0
-
-        if is_cross:
-            zero_index_slope_0 = samp_curr - samp_prev
-
-            if abs(samp_curr) < abs(samp_prev):
-                zero_index_0 = samp_curr_index
-            else:
-                zero_index_0 = samp_prev_index
-            begin_index_1 = samp_prev_index
-
-            tx0_0: float = float(voltage_sampling_0.times[samp_prev_index])
-            tx1_0: float = float(voltage_sampling_0.times[samp_curr_index])
-
-            m0: float = (samp_curr - samp_prev) / (tx1_0 - tx0_0)
-            q0: float = samp_prev - m0 * tx0_0
-            tx_0: float = -q0 / m0
-
-            break
+    volts_0, volts_1 = _remove_dc_offset(
+        voltage_sampling_0,
+        voltage_sampling_1,
+        debug=debug,
+    )
 
-    if zero_index_0 is None or zero_index_slope_0 is None or tx_0 is None:
+    crossings_0 = zero_crossings(volts_0, times=voltage_sampling_0.times)
+    if len(crossings_0) == 0:
         return None
 
-    for idx in range(max(begin_index_1, 1), len(voltage_sampling_1.voltages)):
-        samp_curr_index = idx
-        samp_prev_index = idx - 1
-
-        samp_curr = voltage_sampling_1.voltages[samp_curr_index]
-        samp_prev = voltage_sampling_1.voltages[samp_prev_index]
+    # The second signal is searched from the first crossing of the first one
+    begin_index_1: int = int(crossings_0.index[0])
 
-        cross: float = samp_prev * samp_curr
-        is_cross = cross < 0
-
-        if is_cross:
-            slope: float = samp_curr - samp_prev
-            zero_index_slope_1 = slope
-            if zero_index_slope_0 * zero_index_slope_1 < 0:
-                sign_phase = -1
-
-            if abs(samp_curr) < abs(samp_prev):
-                zero_index_1 = samp_curr_index
-            else:
-                zero_index_1 = samp_prev_index
-
-            tx0_1: float = float(voltage_sampling_1.times[samp_prev_index])
-            tx1_1: float = float(voltage_sampling_1.times[samp_curr_index])
-
-            m1: float = (samp_curr - samp_prev) / (tx1_1 - tx0_1)
-            q1: float = samp_prev - m1 * tx0_1
-            tx_1: float = -q1 / m1
-
-            break
-
-    if zero_index_1 is None or tx_1:
+    crossings_1 = zero_crossings(volts_1, times=voltage_sampling_1.times)
+    position_1 = crossings_1.first(start=max(begin_index_1, 1) - 1)
+    if position_1 is None:
         return None
 
-    time: float = tx_1 - tx_0
+    sign_phase: Literal[-1, 1] = 1
+    if crossings_0.slope[0] * crossings_1.slope[position_1] < 0:
+        sign_phase = -1
+
+    time: float = crossings_1.time[position_1] - crossings_0.time[0]
     period_time: float = 1 / voltage_sampling_0.input_frequency
 
     alpha = (time / period_time) * 360
@@ -244,90 +135,92 @@ def phase_offset_v3(
 
 
 def phase_offset_v4(
-    voltage_sampling_0: VoltageSamplingV2,
-    voltage_sampling_1: VoltageSamplingV2,
+    voltage_sampling_0: VoltageSamplingV2 | VoltageSamplingV3,
+    voltage_sampling_1: VoltageSamplingV2 | VoltageSamplingV3,
     *,
     debug: bool = False,
 ) -> float | None:
-    global_index: int | None = None
-
-    max0: float = max(voltage_sampling_0.voltages)
-    min0: float = min(voltage_sampling_0.voltages)
-    dcoffset0: float = (max0 + min0) / 2.0
-
-    max1: float = max(voltage_sampling_1.voltages)
-    min1: float = min(voltage_sampling_1.voltages)
-    dcoffset1: float = (max1 + min1) / 2.0
-
-    diffoffset: float = dcoffset1 - dcoffset0
-    voltage_sampling_0.voltages.subtract(dcoffset0)
-    voltage_sampling_1.voltages.subtract(dcoffset1)
-
-    if debug:
-        console.log(
-            f"F: {voltage_sampling_0.input_frequency:+06.05f}, max0: {max0:+.05f}, max1: {max1:+.05f}, min0: {min0:+.05f}, min1: {min1:+.05f}, dcoffset0: {dcoffset0:+.05f}, dcoffset1: {dcoffset1:+.05f}, diffoffset: {diffoffset:+.07f}",
-        )
+    volts_0, volts_1 = _remove_dc_offset(
+        voltage_sampling_0,
+        voltage_sampling_1,
+        debug=debug,
+    )
 
-    tx_0: float | None = None
-    tx_1: float | None = None
+    # Skips the first samples, where the interpolation is less accurate
+    crossings_0 = zero_crossings(volts_0)
+    position_0 = crossings_0.first(start=74, rising=True)
+    if position_0 is None:
+        return None
 
-    for idx in range(75, len(voltage_sampling_0.voltages)):
-        samp_curr_index = idx
-        samp_prev_index = idx - 1
+    global_index: int = int(crossings_0.index[position_0]) + 1
 
-        samp_curr = voltage_sampling_0.voltages[samp_curr_index]
-        samp_prev = voltage_sampling_0.voltages[samp_prev_index]
+    crossings_1 = zero_crossings(volts_1)
+    position_1 = crossings_1.first(start=global_index - 1, rising=True)
+    if position_1 is None:
+        return None
 
-        cross: float = samp_curr * samp_prev
-        slope: float = samp_curr - samp_prev
+    # The crossing time is the time of the first sample after the sign change
+    tx_0: float = float(voltage_sampling_0.times[global_index])
+    tx_1: float = float(voltage_sampling_1.times[int(crossings_1.index[position_1]) + 1])
 
-        is_cross = cross < 0
-        is_positive_slope = slope > 0
+    delta_time: float = tx_1 - tx_0
 
-        if is_cross and is_positive_slope:
-            global_index = samp_curr_index
+    return (delta_time * voltage_sampling_0.input_frequency) * 360
 
-            tx0_0: float = float(voltage_sampling_0.times[samp_prev_index])
-            tx1_0: float = float(voltage_sampling_0.times[samp_curr_index])
 
-            m0: float = (samp_curr - samp_prev) / (tx1_0 - tx0_0)
-            q0: float = (tx0_0 * samp_curr - tx1_0 * samp_prev) / (tx0_0 - tx1_0)
-            tx_0 = -q0 / m0
-            tx_0 = tx1_0
+def phase_offset_coherent(
+    voltage_sampling_0: VoltageSamplingV2 | VoltageSamplingV3,
+    voltage_sampling_1: VoltageSamplingV2 | VoltageSamplingV3,
+) -> float | None:
+    """Phase offset of two captures holding an integer number of periods.
 
-            break
+    It projects both captures on the input frequency (single DFT bin), so no
+    interpolation or zero crossing search is needed. It follows the
+    `phase_offset_v4` convention: the delay of `voltage_sampling_1` with respect
+    to `voltage_sampling_0`, in degrees between 0 and 360.
+    """
+    volts_0 = np.asarray(voltage_sampling_0.voltages, dtype=np.float64)
+    volts_1 = np.asarray(voltage_sampling_1.voltages, dtype=np.float64)
 
-    if tx_0 is None:
+    if len(volts_0) == 0 or len(volts_1) == 0:
         return None
 
-    for idx in range(global_index, len(voltage_sampling_1.voltages)):
-        samp_curr_index: int = idx
-        samp_prev_index: int = idx - 1
-
-        samp_curr: float = voltage_sampling_1.voltages[samp_curr_index]
-        samp_prev: float = voltage_sampling_1.voltages[samp_prev_index]
+    def _phasor(volts: np.ndarray, sampling_frequency: float) -> complex:
+        omega = 2 * np.pi * voltage_sampling_0.input_frequency / sampling_frequency
+        return complex(np.dot(volts, np.exp(-1j * omega * np.arange(len(volts)))))
 
-        cross: float = samp_curr * samp_prev
-        slope: float = samp_curr - samp_prev
+    phasor_0 = _phasor(volts_0, voltage_sampling_0.sampling_frequency)
+    phasor_1 = _phasor(volts_1, voltage_sampling_1.sampling_frequency)
 
-        is_cross: bool = cross < 0
-        is_positive_slope: bool = slope > 0
-
-        if is_cross and is_positive_slope:
-            tx0_1: float = float(voltage_sampling_1.times[samp_prev_index])
-            tx1_1: float = float(voltage_sampling_1.times[samp_curr_index])
+    if phasor_0 == 0 or phasor_1 == 0:
+        return None
 
-            m1: float = (samp_curr - samp_prev) / (tx1_1 - tx0_1)
-            q1: float = samp_prev + m1 * tx0_1
-            q1: float = (tx0_1 * samp_curr - tx1_1 * samp_prev) / (tx0_1 - tx1_1)
-            tx_1 = -q1 / m1
-            tx_1 = tx1_1
+    return math.degrees(np.angle(phasor_0 * np.conj(phasor_1))) % 360
 
-            break
 
-    if tx_1 is None or tx_1 is None:
+def phase_offset_sine_fit(
+    voltage_sampling_0: VoltageSamplingV2 | VoltageSamplingV3,
+    voltage_sampling_1: VoltageSamplingV2 | VoltageSamplingV3,
+) -> float | None:
+    """Phase offset from a 3 parameter sine fit of both captures at the input
+    frequency, it works on any number of periods.
+
+    It follows the `phase_offset_v4` convention: the delay of
+    `voltage_sampling_1` with respect to `voltage_sampling_0`, in degrees
+    between 0 and 360.
+    """
+    if len(voltage_sampling_0.voltages) < 3 or len(voltage_sampling_1.voltages) < 3:
         return None
 
-    delta_time: float = tx_1 - tx_0
+    fit_0 = sine_fit(
+        voltage_sampling_0.voltages,
+        voltage_sampling_0.input_frequency,
+        voltage_sampling_0.sampling_frequency,
+    )
+    fit_1 = sine_fit(
+        voltage_sampling_1.voltages,
+        voltage_sampling_0.input_frequency,
+        voltage_sampling_1.sampling_frequency,
+    )
 
-    return (delta_time * voltage_sampling_0.input_frequency) * 360
+    return math.degrees(float(fit_0.phase - fit_1.phase)) % 360
@@ -1,3 +1,4 @@
+from collections import deque
 from typing import Self
 
 import numpy as np
@@ -13,25 +14,27 @@ class TimedValue:
 
 
 class PidTERM:
-    _proportional: list[float]
-    _integral: list[float]
-    _derivative: list[float]
+    """History of the PID terms, the last `history` values of each if given."""
 
-    def __init__(self: Self) -> None:
-        self._proportional = [0]
-        self._integral = [0]
-        self._derivative = [0]
+    _proportional: deque[float]
+    _integral: deque[float]
+    _derivative: deque[float]
+
+    def __init__(self: Self, history: int | None = None) -> None:
+        self._proportional = deque([0], maxlen=history)
+        self._integral = deque([0], maxlen=history)
+        self._derivative = deque([0], maxlen=history)
 
     @property
-    def proportional(self: Self) -> list[float]:
+    def proportional(self: Self) -> deque[float]:
         return self._proportional
 
     @property
-    def integral(self: Self) -> list[float]:
+    def integral(self: Self) -> deque[float]:
         return self._integral
 
     @property
-    def derivative(self: Self) -> list[float]:
+    def derivative(self: Self) -> deque[float]:
         return self._derivative
 
     def add_proportional(self: Self, value: float) -> None:
@@ -45,6 +48,13 @@ class PidTERM:
 
 
 class PidController:
+    """PID controller updated in constant time per sample.
+
+    The error integral is a running trapezoid sum and the derivative is the
+    difference of the last two process variables, the lists kept for the plots
+    are ring buffers of `history` values when given.
+    """
+
     term: PidTERM
 
     set_point: float
@@ -53,15 +63,18 @@ class PidController:
     tau_derivative: float
     controller_output_zero: float
 
-    _error_list: list[TimedValue]
+    integral_limit: float | None
+    output_limits: tuple[float, float] | None
+
+    _error_list: deque[TimedValue]
     _error_integral: float
-    _error_integral_cache_index: int
+    _last_error: float | None
 
-    _process_output_list: list[float]
-    _process_variable_list: list[float]
+    _process_output_list: deque[float]
+    _process_variable_list: deque[float]
 
-    _derivative_process_variable_list: list[int]
-    _derivative_process_variable: int
+    _derivative_process_variable: float
+    _last_process_variable: float | None
 
     def __init__(
         self: Self,
@@ -70,8 +83,27 @@ class PidController:
         tau_integral: float,
         tau_derivative: float,
         controller_output_zero: float,
+        integral_limit: float | None = None,
+        output_limits: tuple[float, float] | None = None,
+        history: int | None = None,
     ) -> None:
-        self.term = PidTERM()
+        """PID controller.
+
+        Args:
+            set_point (float): Set point.
+            controller_gain (float): Proportional gain `Kc`.
+            tau_integral (float): Integral time constant, reset time.
+            tau_derivative (float): Derivative time constant.
+            controller_output_zero (float): Controller output bias.
+            integral_limit (float | None, optional): Max absolute value of the
+                integral term, the error integral stops growing past it
+                (anti-windup). Defaults to None.
+            output_limits (tuple[float, float] | None, optional): Min and max
+                controller output. Defaults to None.
+            history (int | None, optional): Values kept for the plots, all of
+                them if None. Defaults to None.
+        """
+        self.term = PidTERM(history)
 
         self.set_point = set_point
         self.controller_gain = controller_gain
@@ -84,27 +116,28 @@ class PidController:
 
         self.controller_output_zero = controller_output_zero
 
-        self._error_integral_cache_index = 0
+        self.integral_limit = integral_limit
+        self.output_limits = output_limits
 
-        self._error_list = []
-        self._error_integral_list: list[int] = [0]
+        self._error_list = deque(maxlen=history)
         self._error_integral = 0
+        self._last_error = None
 
-        self._process_variable_list = []
-        self._derivative_process_variable_list = [0]
+        self._process_variable_list = deque(maxlen=history)
         self._derivative_process_variable = 0
+        self._last_process_variable = None
 
-        self._process_output_list = [controller_output_zero]
+        self._process_output_list = deque([controller_output_zero], maxlen=history)
 
     @property
-    def process_output_list(self: Self) -> list[float]:
+    def process_output_list(self: Self) -> deque[float]:
         return self._process_output_list
 
     def add_process_output(self: Self, value: float) -> None:
         self._process_output_list.append(value)
 
     @property
-    def error_list(self: Self) -> list[TimedValue]:
+    def error_list(self: Self) -> deque[TimedValue]:
         return self._error_list
 
     @property
@@ -112,61 +145,79 @@ class PidController:
         return self._error_integral
 
     @property
-    def process_variable_list(self: Self) -> list[float]:
+    def process_variable_list(self: Self) -> deque[float]:
         return self._process_variable_list
 
     @property
-    def derivative_process_variable(self: Self) -> int:
+    def derivative_process_variable(self: Self) -> float:
         return self._derivative_process_variable
 
     def add_error(self: Self, error: TimedValue) -> None:
         self._error_list.append(error)
 
+        # Trapezoid rule with unit spacing, as `np.trapz` of the whole list
+        if self._last_error is not None:
+            self._error_integral += (self._last_error + error.value) / 2
+        self._last_error = error.value
+
+        if self.integral_limit is not None and self.controller_gain != 0:
+            max_integral = abs(self.integral_limit * self.tau_integral / self.controller_gain)
+            self._error_integral = min(max(self._error_integral, -max_integral), max_integral)
+
     def add_process_variable(self: Self, process_variable: float) -> None:
         self._process_variable_list.append(process_variable)
 
+        # Backward difference, as the last value of `np.gradient` of the list
+        if self._last_process_variable is not None:
+            self._derivative_process_variable = (
+                process_variable - self._last_process_variable
+            )
+        self._last_process_variable = process_variable
+
     @staticmethod
     def check_limit_diff(error: float, lim: float) -> bool:
         return abs(error) < lim
 
     @property
     def proportional_term(self: Self) -> float:
-        if len(self.error_list) < 0:
+        if self._last_error is None:
             return 0
 
-        return self.controller_gain * self.error_list[-1].value
+        return self.controller_gain * self._last_error
 
     @property
     def integral_term(self: Self) -> float:
-        # if index_error_list > self._error_integral_cache_index:
-        #     self._error_integral += calculate_area(
-
-        return (
-            self.controller_gain
-            * calculate_area([error.value for error in self.error_list])
-            / self.tau_integral
-        )
+        return self.controller_gain * self._error_integral / self.tau_integral
 
     @property
     def derivative_term(self: Self) -> float:
-        gradient: float = calculate_gradient(self.process_variable_list)
-        return -self.controller_gain * self.tau_derivative * gradient
+        return (
+            -self.controller_gain
+            * self.tau_derivative
+            * self._derivative_process_variable
+        )
 
     @property
     def output_process(self: Self) -> float:
         """This is the Output Process Variable that controls the
-        PID algorithm
+        PID algorithm, clamped to `output_limits`
 
         Returns:
             float: Output Process Variable
         """
-        return (
+        output = (
             self.controller_output_zero
             + self.term.proportional[-1]
             + self.term.integral[-1]
             + self.term.derivative[-1]
         )
 
+        if self.output_limits is not None:
+            output_min, output_max = self.output_limits
+            output = min(max(output, output_min), output_max)
+
+        return output
+
 
 def calculate_area(function: list[float]) -> float:
     if len(function) < 1:
@@ -11,7 +11,8 @@ from scipy.fft import fft
 from audio.console import console
 from audio.math import integrate, trim_sin_zero_offset
 from audio.math.interpolation import InterpolationKind, interpolation_model
-from audio.model.sampling import VoltageSampling, VoltageSamplingV2
+from audio.math.sine_fit import sine_fit
+from audio.model.sampling import VoltageSampling, VoltageSamplingV2, VoltageSamplingV3
 from audio.utility import read_voltages
 from audio.utility.timer import Timer
 
@@ -20,6 +21,7 @@ class RMS_MODE(enum.Enum):
     FFT = 1
     AVERAGE = 2
     INTEGRATE = 3
+    SINE_FIT = 4
 
 
 class RMS:
@@ -157,15 +159,52 @@ class RMS:
             n_samp = len(voltages)
             voltages_fft = fft(voltages, n_samp, workers=-1)
 
-            summation = np.sum(
-                [np.float_power(np.absolute(v), 2) for v in voltages_fft],
-            )
+            summation = np.sum(np.square(np.absolute(voltages_fft)))
             rms: float = np.sqrt(summation) / n_samp
         except Exception:
             return None
 
         return rms
 
+    @staticmethod
+    def coherent(voltages) -> float | None:
+        """Calculate the RMS Voltage value of a capture that holds an integer
+        number of periods, no interpolation or trimming is needed.
+
+        Args:
+            voltages (List[float]): The sampling voltages list
+
+        Returns:
+            float: The RMS Voltage
+        """
+        voltages = np.asarray(voltages, dtype=np.float64)
+        if len(voltages) == 0:
+            return None
+
+        return float(np.sqrt(np.mean(np.square(voltages))))
+
+    @staticmethod
+    def sine_fit(
+        voltages,
+        frequency: float,
+        sampling_frequency: float,
+    ) -> float | None:
+        """Calculate the RMS Voltage value of the tone at `frequency` with a
+        3 parameter sine fit, it needs no trimming or interpolation.
+
+        Args:
+            voltages (List[float]): The sampling voltages list
+            frequency (float): The input frequency
+            sampling_frequency (float): The sampling frequency
+
+        Returns:
+            float: The RMS Voltage, DC offset and harmonics excluded
+        """
+        if len(voltages) < 3:
+            return None
+
+        return float(sine_fit(voltages, frequency, sampling_frequency).rms)
+
     @staticmethod
     def integration(voltages: list[float], Fs: float) -> float:
         """Calculate the RMS Voltage value with the Integration Technic
@@ -181,7 +220,7 @@ class RMS:
 
     @staticmethod
     def rms_v2(
-        voltages_sampling: VoltageSampling,
+        voltages_sampling: VoltageSampling | VoltageSamplingV3,
         rms_mode: RMS_MODE = RMS_MODE.FFT,
         time_report: bool = False,
         trim: bool = False,
@@ -191,7 +230,7 @@ class RMS:
         result = RMSResult()
         timer = Timer()
 
-        voltages = list(voltages_sampling.voltages)
+        voltages = np.asarray(voltages_sampling.voltages, dtype=np.float64)
         voltages_len = len(voltages)
         if voltages_len < 2:
             return None
@@ -243,11 +282,11 @@ class RMS:
 
     @staticmethod
     def rms_v3(
-        voltages_sampling: VoltageSamplingV2,
+        voltages_sampling: VoltageSamplingV2 | VoltageSamplingV3,
         trim: bool,
         rms_mode: RMS_MODE,
     ) -> float | None:
-        voltages = list(voltages_sampling.voltages)
+        voltages = np.asarray(voltages_sampling.voltages, dtype=np.float64)
         voltages_len = len(voltages)
         if voltages_len < 2:
             return None
@@ -273,6 +312,12 @@ class RMS:
             rms = RMS.average(voltages)
         elif rms_mode == RMS_MODE.INTEGRATE:
             rms = RMS.integration(voltages, voltages_sampling.sampling_frequency)
+        elif rms_mode == RMS_MODE.SINE_FIT:
+            rms = RMS.sine_fit(
+                voltages,
+                voltages_sampling.input_frequency,
+                voltages_sampling.sampling_frequency,
+            )
         else:
             return None
 
@@ -0,0 +1,130 @@
+from __future__ import annotations
+
+from collections.abc import Callable
+from dataclasses import dataclass
+from typing import Self
+
+import rich.repr
+
+# Generator amplitude to DUT output RMS, None if the measure failed
+SetLevelMeasure = Callable[[float], float | None]
+
+
+@rich.repr.auto
+@dataclass
+class SetLevelStep:
+    amplitude: float
+    rms: float
+
+
+@rich.repr.auto
+@dataclass
+class SetLevelResult:
+    """Steps of a set level search, `index` is the step closest to the target."""
+
+    steps: list[SetLevelStep]
+    index: int
+    converged: bool
+
+    @property
+    def amplitude(self: Self) -> float:
+        return self.steps[self.index].amplitude
+
+    @property
+    def rms(self: Self) -> float:
+        return self.steps[self.index].rms
+
+    @property
+    def iterations(self: Self) -> int:
+        """Hardware acquisitions used."""
+        return len(self.steps)
+
+
+def _next_amplitude(
+    steps: list[SetLevelStep],
+    target_rms: float,
+    low: SetLevelStep | None,
+    high: SetLevelStep | None,
+    amplitude_max: float,
+) -> float:
+    last = steps[-1]
+
+    if len(steps) > 1 and steps[-2].rms != last.rms:
+        # Secant on the last two measures
+        previous = steps[-2]
+        slope = (last.rms - previous.rms) / (last.amplitude - previous.amplitude)
+        amplitude = last.amplitude + (target_rms - last.rms) / slope
+    elif last.rms > 0:
+        # Gain through the origin, exact for a linear DUT
+        amplitude = last.amplitude * target_rms / last.rms
+    else:
+        amplitude = last.amplitude * 10
+
+    if high is None and amplitude > amplitude_max:
+        return amplitude_max
+
+    # Bisection when the step leaves the bracket
+    lower = low.amplitude if low is not None else 0.0
+    upper = high.amplitude if high is not None else amplitude_max
+    if not lower < amplitude <= upper:
+        amplitude = (lower + upper) / 2
+
+    return amplitude
+
+
+def solve_set_level(
+    measure: SetLevelMeasure,
+    target_rms: float,
+    amplitude_start: float,
+    tolerance: float,
+    amplitude_max: float = 11,
+    max_iterations: int = 8,
+) -> SetLevelResult | None:
+    """Generator amplitude that gives `target_rms` out of the DUT.
+
+    The DUT gain is nearly linear in the amplitude: the first step scales the
+    start amplitude by the measured gain, the next ones are secant steps on the
+    last two measures, falling back to the bisection of the bracket found so
+    far when a step leaves it.
+
+    Args:
+        measure (SetLevelMeasure): Applies the amplitude and returns the DUT
+            RMS, one hardware acquisition.
+        target_rms (float): Target RMS.
+        amplitude_start (float): First amplitude.
+        tolerance (float): Max absolute RMS error.
+        amplitude_max (float, optional): Max generator amplitude. Defaults to 11.
+        max_iterations (int, optional): Max acquisitions. Defaults to 8.
+
+    Returns:
+        SetLevelResult | None: The best step, not converged if the tolerance was
+            not reached in `max_iterations`. None if a measure failed.
+    """
+    steps: list[SetLevelStep] = []
+    low: SetLevelStep | None = None
+    high: SetLevelStep | None = None
+
+    amplitude = min(amplitude_start, amplitude_max)
+    while len(steps) < max_iterations:
+        rms = measure(amplitude)
+        if rms is None:
+            return None
+
+        step = SetLevelStep(amplitude, rms)
+        steps.append(step)
+
+        if abs(target_rms - rms) < tolerance:
+            return SetLevelResult(steps, len(steps) - 1, converged=True)
+
+        if rms < target_rms:
+            if low is None or amplitude > low.amplitude:
+                low = step
+        elif high is None or amplitude < high.amplitude:
+            high = step
+
+        amplitude = _next_amplitude(steps, target_rms, low, high, amplitude_max)
+        if amplitude == step.amplitude:
+            break
+
+    index = min(range(len(steps)), key=lambda idx: abs(target_rms - steps[idx].rms))
+    return SetLevelResult(steps, index, converged=False)
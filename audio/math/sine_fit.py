@@ -0,0 +1,228 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Self
+
+import numpy as np
+import rich.repr
+
+
+@rich.repr.auto
+@dataclass
+class SineFitResult:
+    """Least squares fit of `amplitude * cos(2 pi frequency t + phase) + offset`.
+
+    Every field has the leading shape of the fitted voltages, the `*_std` fields
+    are the standard deviations estimated from the fit residual.
+    """
+
+    amplitude: np.ndarray
+    phase: np.ndarray
+    offset: np.ndarray
+    frequency: np.ndarray
+    residual_rms: np.ndarray
+    amplitude_std: np.ndarray
+    phase_std: np.ndarray
+    offset_std: np.ndarray
+
+    @property
+    def rms(self: Self) -> np.ndarray:
+        """RMS of the fitted tone, DC offset and harmonics excluded."""
+        return self.amplitude / np.sqrt(2)
+
+    @property
+    def rms_std(self: Self) -> np.ndarray:
+        return self.amplitude_std / np.sqrt(2)
+
+    @property
+    def phasor(self: Self) -> np.ndarray:
+        return self.amplitude * np.exp(1j * self.phase)
+
+
+def _valid_mask(n_samples: int, lengths: np.ndarray | None) -> np.ndarray:
+    """Valid samples mask, broadcast against the captures like `lengths`."""
+    if lengths is None:
+        return np.ones(n_samples, dtype=bool)
+
+    return np.arange(n_samples) < np.asarray(lengths)[..., np.newaxis]
+
+
+def _solve(
+    design: np.ndarray,
+    voltages: np.ndarray,
+    mask: np.ndarray,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Batched linear least squares through the normal equations.
+
+    Returns:
+        tuple: Parameters, their covariance, the residual RMS and the residual.
+    """
+    design = design * mask[..., np.newaxis]
+    normal = np.einsum("...sk,...sl->...kl", design, design)
+    projection = np.einsum("...sk,...s->...k", design, voltages * mask)
+
+    normal_inverse = np.linalg.inv(normal)
+    parameters = np.einsum("...kl,...l->...k", normal_inverse, projection)
+
+    residual = (voltages - np.einsum("...sk,...k->...s", design, parameters)) * mask
+    n_valid = mask.sum(axis=-1)
+    dof = np.maximum(n_valid - design.shape[-1], 1)
+    variance = np.sum(np.square(residual), axis=-1) / dof
+
+    covariance = normal_inverse * variance[..., np.newaxis, np.newaxis]
+    residual_rms = np.sqrt(
+        np.sum(np.square(residual), axis=-1) / np.maximum(n_valid, 1),
+    )
+
+    return parameters, covariance, residual_rms, residual
+
+
+def _solve_3(
+    omega: np.ndarray,
+    voltages: np.ndarray,
+    mask: np.ndarray,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """3 parameter least squares without the `(..., samples, 3)` design tensor.
+
+    The cosine and sine basis keep the shape of `omega` and `mask`, e.g. one
+    row per frequency shared by all the channels, and the normal equations
+    are accumulated from them.
+
+    Returns:
+        tuple: Parameters, their covariance and the residual RMS.
+    """
+    phase = omega[..., np.newaxis] * np.arange(voltages.shape[-1], dtype=np.float64)
+    basis = (np.cos(phase) * mask, np.sin(phase) * mask, np.broadcast_to(mask, phase.shape))
+    basis = tuple(np.asarray(b, dtype=np.float64) for b in basis)
+
+    normal = np.stack(
+        [np.stack([np.sum(b_k * b_l, axis=-1) for b_l in basis], axis=-1) for b_k in basis],
+        axis=-2,
+    )
+    masked = voltages * mask
+    projection = np.stack(
+        [np.einsum("...s,...s->...", masked, b_k) for b_k in basis],
+        axis=-1,
+    )
+
+    normal_inverse = np.linalg.inv(normal)
+    parameters = np.einsum("...kl,...l->...k", normal_inverse, projection)
+
+    residual = masked
+    for k, b_k in enumerate(basis):
+        residual = residual - parameters[..., k, np.newaxis] * b_k
+    residual_sum = np.sum(np.square(residual), axis=-1)
+
+    n_valid = mask.sum(axis=-1)
+    variance = residual_sum / np.maximum(n_valid - len(basis), 1)
+    covariance = normal_inverse * variance[..., np.newaxis, np.newaxis]
+    residual_rms = np.sqrt(residual_sum / np.maximum(n_valid, 1))
+
+    return parameters, covariance, residual_rms
+
+
+def _polar(
+    parameters: np.ndarray,
+    covariance: np.ndarray,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Amplitude and phase of `a cos + b sin` with first order uncertainties."""
+    a, b = parameters[..., 0], parameters[..., 1]
+    var_a, var_b = covariance[..., 0, 0], covariance[..., 1, 1]
+    cov_ab = covariance[..., 0, 1]
+
+    amplitude = np.hypot(a, b)
+    phase = np.arctan2(-b, a)
+
+    amplitude_safe = np.where(amplitude > 0, amplitude, np.inf)
+    amplitude_var = a**2 * var_a + b**2 * var_b + 2 * a * b * cov_ab
+    amplitude_var /= amplitude_safe**2
+    phase_var = b**2 * var_a + a**2 * var_b - 2 * a * b * cov_ab
+    phase_var /= amplitude_safe**4
+
+    return amplitude, phase, np.sqrt(np.abs(amplitude_var)), np.sqrt(np.abs(phase_var))
+
+
+def sine_fit(
+    voltages: np.ndarray,
+    frequency: float | np.ndarray,
+    sampling_frequency: float | np.ndarray,
+    lengths: np.ndarray | None = None,
+    fit_frequency: bool = False,
+    max_iterations: int = 10,
+    tolerance: float = 1e-10,
+) -> SineFitResult:
+    """IEEE-1057 sine fit of every capture at the known generator frequency.
+
+    The 3 parameter fit is a single linear least squares solve for the cosine,
+    sine and DC components. With `fit_frequency` the 4 parameter fit refines
+    the frequency with Gauss-Newton iterations starting from it. Captures don't
+    need an integer number of periods.
+
+    Args:
+        voltages (np.ndarray): `(..., samples)` captures, e.g. `(rows, channels,
+            samples)`.
+        frequency (float | np.ndarray): Input frequency, broadcast against the
+            leading dimensions of `voltages` (one value per row needs a
+            trailing axis, `frequency[:, np.newaxis]`).
+        sampling_frequency (float | np.ndarray): Sampling frequency, broadcast
+            like `frequency`.
+        lengths (np.ndarray | None, optional): Valid samples of every capture,
+            the rest is padding, broadcast like `frequency`. Defaults to None,
+            all samples.
+        fit_frequency (bool, optional): Use the 4 parameter fit. Defaults to False.
+        max_iterations (int, optional): Max 4 parameter iterations. Defaults to 10.
+        tolerance (float, optional): Relative frequency step that stops the
+            iterations. Defaults to 1e-10.
+
+    Returns:
+        SineFitResult: Amplitude, phase, DC offset, frequency and uncertainties.
+    """
+    voltages = np.asarray(voltages, dtype=np.float64)
+    shape = voltages.shape[:-1]
+    n_samples = voltages.shape[-1]
+
+    # `omega` and `mask` keep their own shape, only broadcast by the solve
+    omega = 2 * np.pi * np.asarray(frequency, dtype=np.float64) / sampling_frequency
+    mask = _valid_mask(n_samples, lengths)
+
+    parameters, covariance, residual_rms = _solve_3(omega, voltages, mask)
+
+    if fit_frequency:
+        omega = np.broadcast_to(omega, shape)
+        n = np.arange(n_samples, dtype=np.float64)
+
+        for _ in range(max_iterations):
+            a, b = parameters[..., 0:1], parameters[..., 1:2]
+            phase = omega[..., np.newaxis] * n
+            design = np.stack(
+                (
+                    np.cos(phase),
+                    np.sin(phase),
+                    np.ones_like(phase),
+                    n * (b * np.cos(phase) - a * np.sin(phase)),
+                ),
+                axis=-1,
+            )
+
+            parameters, covariance, residual_rms, _ = _solve(design, voltages, mask)
+
+            step = parameters[..., 3]
+            omega = omega + step
+            if np.all(np.abs(step) <= tolerance * np.abs(omega)):
+                break
+
+        # Final linear solve at the refined frequency
+        parameters, covariance, residual_rms = _solve_3(omega, voltages, mask)
+
+    amplitude, phase, amplitude_std, phase_std = _polar(parameters, covariance)
+
+    return SineFitResult(
+        amplitude=amplitude,
+        phase=phase,
+        offset=parameters[..., 2],
+        frequency=np.broadcast_to(omega * sampling_frequency / (2 * np.pi), shape),
+        residual_rms=residual_rms,
+        amplitude_std=amplitude_std,
+        phase_std=phase_std,
+        offset_std=np.sqrt(np.abs(covariance[..., 2, 2])),
+    )
@@ -0,0 +1,108 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Self
+
+import numpy as np
+import rich.repr
+
+
+@rich.repr.auto
+@dataclass
+class ZeroCrossings:
+    """Sign changes of a sampled signal.
+
+    Every crossing lies between the samples `index` and `index + 1`.
+    """
+
+    index: np.ndarray
+    slope: np.ndarray
+    time: np.ndarray
+    nearest: np.ndarray
+
+    def __len__(self: Self) -> int:
+        return len(self.index)
+
+    @property
+    def rising(self: Self) -> np.ndarray:
+        return self.slope > 0
+
+    @property
+    def falling(self: Self) -> np.ndarray:
+        return self.slope < 0
+
+    def first(
+        self: Self,
+        start: int = 0,
+        rising: bool | None = None,
+    ) -> int | None:
+        """Position of the first crossing with `index >= start`.
+
+        Args:
+            start (int, optional): First sample index. Defaults to 0.
+            rising (bool | None, optional): Only rising (True) or falling (False)
+                crossings. Defaults to None, both.
+
+        Returns:
+            int | None: Position in the crossing arrays, None if not found.
+        """
+        mask = self.index >= start
+        if rising is True:
+            mask &= self.rising
+        elif rising is False:
+            mask &= self.falling
+
+        positions = np.flatnonzero(mask)
+        if len(positions) == 0:
+            return None
+
+        return int(positions[0])
+
+
+def zero_crossings(
+    samples: np.ndarray | list[float],
+    sampling_frequency: float | None = None,
+    times: np.ndarray | list[float] | None = None,
+) -> ZeroCrossings:
+    """Find all the zero crossings of `samples` in a single vectorized pass.
+
+    A crossing is counted only on a strict sign change, samples equal to zero
+    are not crossings.
+
+    Args:
+        samples (np.ndarray | list[float]): The sampled signal.
+        sampling_frequency (float | None, optional): Used to express the
+            crossing times in seconds. Defaults to None, sample units.
+        times (np.ndarray | list[float] | None, optional): Time of every
+            sample, it takes precedence over `sampling_frequency`.
+
+    Returns:
+        ZeroCrossings: Index of the sample before the crossing, slope
+            (`samples[index + 1] - samples[index]`), linearly interpolated
+            crossing time and index of the sample closest to zero.
+    """
+    samples = np.asarray(samples, dtype=np.float64)
+
+    samples_prev = samples[:-1]
+    samples_curr = samples[1:]
+
+    index = np.flatnonzero(samples_prev * samples_curr < 0)
+
+    value_prev = samples_prev[index]
+    value_curr = samples_curr[index]
+    slope = value_curr - value_prev
+
+    fraction = -value_prev / slope
+
+    if times is not None:
+        times = np.asarray(times, dtype=np.float64)
+        time_prev = times[index]
+        time = time_prev + fraction * (times[index + 1] - time_prev)
+    elif sampling_frequency is not None:
+        time = (index + fraction) / sampling_frequency
+    else:
+        time = index + fraction
+
+    nearest = np.where(np.abs(value_curr) < np.abs(value_prev), index + 1, index)
+
+    return ZeroCrossings(index=index, slope=slope, time=time, nearest=nearest)
@@ -0,0 +1,209 @@
+from __future__ import annotations
+
+import json
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Self
+
+import numpy as np
+import rich.repr
+import yaml
+from pandas import DataFrame
+
+from audio.config.plot import PlotConfig
+from audio.config.type import Range
+from audio.math.batch import SweepTensor
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover
+    pa = None
+    pq = None
+
+# A sweep archive is a Parquet file, one row per sweep point: the summary
+# columns of `SweepData`, and the raw captures in `voltages` as a
+# `list<list<float32>>` (channels, samples). The metadata (amplitude, plot and
+# sweep config) is JSON in the schema metadata, read from the footer only.
+ARCHIVE_VERSION: int = 1
+ARCHIVE_SUFFIX: str = ".parquet"
+
+SUMMARY_COLUMNS: list[str] = [
+    "frequency",
+    "rms",
+    "dBV",
+    "Fs",
+    "oversampling_ratio",
+    "n_periods",
+    "n_samples",
+]
+VOLTAGES_COLUMN: str = "voltages"
+
+_METADATA_KEY: bytes = b"audio"
+
+
+def _require_pyarrow() -> None:
+    if pq is None:
+        _msg = "Sweep archives need the `pyarrow` package."
+        raise ImportError(_msg)
+
+
+def plot_config_from_dict(dictionary: dict[str, Any]) -> PlotConfig:
+    """`PlotConfig` of its YAML encoding, `PlotConfig.to_yaml_string`."""
+    x_limit = dictionary.get("x_limit")
+    y_limit = dictionary.get("y_limit")
+
+    return PlotConfig(
+        y_offset=dictionary.get("y_offset"),
+        x_limit=Range.from_list(x_limit) if x_limit is not None else None,
+        y_limit=Range.from_list(y_limit) if y_limit is not None else None,
+        interpolation_rate=dictionary.get("interpolation_rate"),
+        dpi=dictionary.get("dpi"),
+        color=dictionary.get("color"),
+        legend=dictionary.get("legend"),
+        title=dictionary.get("title"),
+    )
+
+
+def _voltages_array(tensor: SweepTensor) -> pa.Array:
+    # Built from flat buffers, no Python list per capture
+    _, n_channels, _ = tensor.voltages.shape
+    lengths = np.repeat(tensor.lengths, n_channels)
+    mask = np.arange(tensor.voltages.shape[2]) < lengths.reshape(
+        len(tensor.lengths),
+        n_channels,
+    )[..., np.newaxis]
+
+    values = pa.array(tensor.voltages[mask].astype(np.float32))
+    offsets = np.concatenate([[0], np.cumsum(lengths)]).astype(np.int32)
+    channels = pa.ListArray.from_arrays(pa.array(offsets), values)
+
+    point_offsets = (np.arange(len(tensor.lengths) + 1) * n_channels).astype(np.int32)
+    return pa.ListArray.from_arrays(pa.array(point_offsets), channels)
+
+
+def _voltages_tensor(
+    column: pa.ChunkedArray,
+    frequency: np.ndarray,
+    sampling_frequency: np.ndarray,
+) -> SweepTensor:
+    points = column.combine_chunks()
+    channels = points.flatten()
+
+    n_points = len(points)
+    n_channels = len(channels) // n_points if n_points > 0 else 0
+    lengths = np.diff(channels.offsets.to_numpy()).reshape(n_points, n_channels)
+    values = channels.flatten().to_numpy(zero_copy_only=False)
+
+    n_samples = int(lengths.max(initial=0))
+    mask = np.arange(n_samples) < lengths[..., np.newaxis]
+    voltages = np.zeros((n_points, n_channels, n_samples), dtype=np.float64)
+    voltages[mask] = values
+
+    return SweepTensor(
+        voltages=voltages,
+        lengths=lengths.max(axis=1, initial=0).astype(np.int64),
+        frequency=np.asarray(frequency, dtype=np.float64),
+        sampling_frequency=np.asarray(sampling_frequency, dtype=np.float64),
+    )
+
+
+@rich.repr.auto
+@dataclass
+class SweepArchive:
+    """Content of a sweep archive, the parts not read are left empty."""
+
+    data: DataFrame
+    amplitude: float | None = None
+    plot: PlotConfig | None = None
+    config: dict[str, Any] = field(default_factory=dict)
+    captures: SweepTensor | None = None
+
+    def save(self: Self, path: Path, compression: str = "zstd") -> None:
+        """Write the archive, with column statistics and `compression`."""
+        _require_pyarrow()
+
+        table = pa.Table.from_pandas(self.data, preserve_index=False)
+
+        if self.captures is not None:
+            if len(self.captures.lengths) != table.num_rows:
+                _msg = f"{len(self.captures.lengths)} captures for {table.num_rows} sweep points."
+                raise ValueError(_msg)
+            for name, values in [
+                ("frequency", self.captures.frequency),
+                ("Fs", self.captures.sampling_frequency),
+            ]:
+                if name not in table.column_names:
+                    table = table.append_column(name, pa.array(values))
+            table = table.append_column(VOLTAGES_COLUMN, _voltages_array(self.captures))
+
+        metadata = {
+            "version": ARCHIVE_VERSION,
+            "amplitude": self.amplitude,
+            "plot": self.plot.to_yaml_string() if self.plot is not None else None,
+            "config": self.config,
+        }
+        table = table.replace_schema_metadata(
+            {_METADATA_KEY: json.dumps(metadata, default=str)},
+        )
+
+        pq.write_table(
+            table,
+            path,
+            compression=compression,
+            write_statistics=True,
+        )
+
+    @classmethod
+    def read(
+        cls: type[Self],
+        path: Path,
+        columns: list[str] | None = None,
+        captures: bool = False,
+    ) -> Self:
+        """Read a sweep archive.
+
+        Args:
+            path (Path): Archive file.
+            columns (list[str] | None, optional): Summary columns to read, all
+                of them if None. Defaults to None.
+            captures (bool, optional): Read the raw captures too, the biggest
+                column by far. Defaults to False.
+        """
+        _require_pyarrow()
+
+        schema = pq.read_schema(path)
+        names = [name for name in schema.names if name != VOLTAGES_COLUMN]
+        if columns is not None:
+            names = [name for name in names if name in columns]
+
+        read_columns = list(names)
+        if captures:
+            read_columns += [
+                name
+                for name in ["frequency", "Fs", VOLTAGES_COLUMN]
+                if name in schema.names and name not in read_columns
+            ]
+
+        table = pq.read_table(path, columns=read_columns)
+
+        tensor: SweepTensor | None = None
+        if captures and VOLTAGES_COLUMN in schema.names:
+            tensor = _voltages_tensor(
+                table.column(VOLTAGES_COLUMN),
+                table.column("frequency").to_numpy(),
+                table.column("Fs").to_numpy(),
+            )
+
+        metadata = json.loads((schema.metadata or {}).get(_METADATA_KEY, b"{}"))
+        plot = metadata.get("plot")
+
+        return cls(
+            data=table.select(names).to_pandas(),
+            amplitude=metadata.get("amplitude"),
+            plot=plot_config_from_dict(yaml.safe_load(plot) or {})
+            if plot is not None
+            else None,
+            config=metadata.get("config") or {},
+            captures=tensor,
+        )
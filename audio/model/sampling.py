@@ -4,6 +4,7 @@ from dataclasses import dataclass
 from pathlib import Path
 from typing import Self
 
+import numpy as np
 import pandas as pd
 from pandas import DataFrame
 
@@ -37,8 +38,8 @@ class VoltageSampling:
 
         try:
             with Path.open(file, mode="w", encoding="utf-8") as f:
-                f.write(f"# frequency: {self.input_frequency:.5}")
-                f.write(f"# Fs: {self.sampling_frequency:.5}")
+                f.write(f"# frequency: {self.input_frequency}\n")
+                f.write(f"# Fs: {self.sampling_frequency}\n")
                 self.data.to_csv(f, header=["voltage"])
                 return True
         except Exception as e:
@@ -131,3 +132,105 @@ class VoltageSamplingV2:
     @property
     def times(self: Self):
         return self.data["time"]
+
+
+class VoltageSamplingV3:
+    """Voltages of a capture as a numpy view, `(samples,)` or
+    `(channels, samples)`, with an implicit time axis `n / sampling_frequency`.
+
+    The voltages are not copied when they are already a float64 array, as the
+    `read_multi_voltages` buffers are.
+    """
+
+    __slots__ = ("voltages", "input_frequency", "sampling_frequency", "_times")
+
+    voltages: np.ndarray
+    input_frequency: float
+    sampling_frequency: float
+    _times: np.ndarray | None
+
+    def __init__(
+        self: Self,
+        voltages: np.ndarray | list[float] | list[list[float]],
+        input_frequency: float,
+        sampling_frequency: float,
+    ) -> None:
+        self.voltages = np.asarray(voltages, dtype=np.float64)
+        self.input_frequency = input_frequency
+        self.sampling_frequency = sampling_frequency
+        self._times = None
+
+    @classmethod
+    def from_list(
+        cls: type[Self],
+        voltages: np.ndarray | list[float],
+        input_frequency: float,
+        sampling_frequency: float,
+    ) -> Self:
+        return cls(voltages, input_frequency, sampling_frequency)
+
+    def __repr__(self: Self) -> str:
+        return f"VoltageSamplingV3(shape={self.voltages.shape}, input_frequency={self.input_frequency}, sampling_frequency={self.sampling_frequency})"
+
+    def __len__(self: Self) -> int:
+        return self.voltages.shape[-1]
+
+    @property
+    def n_channels(self: Self) -> int:
+        return 1 if self.voltages.ndim == 1 else self.voltages.shape[0]
+
+    @property
+    def times(self: Self) -> np.ndarray:
+        """Sample instants, computed on first use."""
+        if self._times is None or len(self._times) != len(self):
+            self._times = np.arange(len(self)) / self.sampling_frequency
+        return self._times
+
+    def channel(self: Self, idx: int) -> Self:
+        """The single channel `idx`, a view of the voltages."""
+        if self.voltages.ndim == 1:
+            if idx != 0:
+                _msg = f"Channel {idx} of a single channel sampling."
+                raise IndexError(_msg)
+            return self
+        return type(self)(self.voltages[idx], self.input_frequency, self.sampling_frequency)
+
+    def channels(self: Self) -> list[Self]:
+        return [self.channel(idx) for idx in range(self.n_channels)]
+
+    def augment_interpolation(
+        self: Self,
+        interpolation_rate: int,
+        interpolation_mode: InterpolationKind,
+    ) -> Self:
+        _, y_interpolated = interpolation_model(
+            self.times,
+            self.voltages,
+            int(len(self) * interpolation_rate),
+            kind=interpolation_mode,
+        )
+
+        return type(self)(
+            y_interpolated,
+            self.input_frequency,
+            self.sampling_frequency * interpolation_rate,
+        )
+
+    def to_dataframe(self: Self) -> DataFrame:
+        columns = (
+            {"voltage": self.voltages}
+            if self.voltages.ndim == 1
+            else {f"voltage-{idx}": voltages for idx, voltages in enumerate(self.voltages)}
+        )
+        return DataFrame({"time": self.times, **columns})
+
+    def save(self: Self, file: Path) -> bool:
+        try:
+            with Path.open(file, mode="w", encoding="utf-8") as f:
+                f.write(f"# frequency: {self.input_frequency}\n")
+                f.write(f"# Fs: {self.sampling_frequency}\n")
+                self.to_dataframe().to_csv(f, index=False)
+                return True
+        except Exception as e:
+            console.log(f"{e}")
+            return False
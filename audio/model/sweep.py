@@ -1,7 +1,8 @@
 from __future__ import annotations
 
+import io
 import sys
-import typing
+from pathlib import Path
 from typing import Any, Self
 
 import pandas as pd
@@ -10,9 +11,8 @@ from pandas import DataFrame
 
 from audio.config.plot import PlotConfig
 from audio.console import console
-
-if typing.TYPE_CHECKING:
-    from pathlib import Path
+from audio.math.batch import SweepTensor
+from audio.model.archive import ARCHIVE_SUFFIX, SweepArchive
 
 
 class SingleSweepData:
@@ -105,13 +105,31 @@ class SweepData:
         self.amplitude = amplitude
         self.config = config
 
+    @classmethod
+    def from_file(cls: type[Self], path: Path, columns: list[str] | None = None) -> Self:
+        """Load a sweep `.csv` or a sweep archive, of which only `columns`."""
+        if path.suffix == ARCHIVE_SUFFIX:
+            return cls.from_archive(path, columns)
+        return cls.from_csv_file(path)
+
+    @classmethod
+    def from_archive(cls: type[Self], path: Path, columns: list[str] | None = None) -> Self:
+        archive = SweepArchive.read(path, columns)
+        return cls(
+            archive.data,
+            archive.amplitude,
+            archive.plot if archive.plot is not None else PlotConfig(),
+        )
+
     @classmethod
     def from_csv_file(cls: type[Self], path: Path) -> Self:
         if not path.exists() or not path.is_file():
             raise Exception
 
+        text = path.read_text()
+
         data: DataFrame = pd.read_csv(
-            path,
+            io.StringIO(text),
             header=0,
             comment="#",
             names=[
@@ -125,7 +143,7 @@ class SweepData:
             ],
         )
 
-        yaml_dict = SweepData._yaml_extract_from_comments(path.read_text())
+        yaml_dict = SweepData._yaml_extract_from_comments(text)
 
         amplitude: float | None = SweepData.get_amplitude_from_dictionary(yaml_dict)
         # TODO: Implement PlotConfig.from_dict() version to PlotConfigXML. from_dict()
@@ -153,6 +171,21 @@ class SweepData:
                 index=False,
             )
 
+    def save_archive(
+        self: Self,
+        path: Path,
+        captures: SweepTensor | None = None,
+        config: dict[str, Any] | None = None,
+    ) -> None:
+        """Save to a sweep archive, with the raw `captures` of the points."""
+        SweepArchive(
+            self.data,
+            self.amplitude,
+            self.config,
+            config or {},
+            captures,
+        ).save(path)
+
     @staticmethod
     def _yaml_extract_from_comments(data: str) -> dict:
         data_yaml: str = "\n".join(
@@ -29,7 +29,7 @@ class CacheCsvData:
         path_hash = self._create_hash(csv_path)
 
         if self._csvData.get(path_hash, None) is None:
-            sweep_data = SweepData.from_csv_file(csv_path)
+            sweep_data = SweepData.from_file(csv_path, columns=["frequency", "dBV"])
             self._csvData[path_hash] = sweep_data
 
     def get_csv_file_data(self, csv_path: Path) -> SweepData | None:
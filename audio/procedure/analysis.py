@@ -1,4 +1,3 @@
-import json
 import math
 from datetime import datetime, timedelta
 from pathlib import Path
@@ -6,7 +5,6 @@ from pathlib import Path
 import click
 import matplotlib.pyplot as plt
 import numpy as np
-import requests
 from matplotlib import ticker
 from matplotlib.axes import Axes
 from rich.panel import Panel
@@ -19,23 +17,36 @@ from audio.config.sampling import SamplingConfig
 from audio.config.sweep import SweepConfig
 from audio.console import console
 from audio.constant import APP_HOME
-from audio.database.db import Database, DbChannel, DbFrequency, DbSweepVoltage
+from audio.database.db import Database, DbFrequency, DbSweepVoltage
+from audio.database.pocketbase import RecordRef, get_uploader
 from audio.logging import log
+from audio.math.adaptive import AdaptiveConfig
+from audio.math.batch import (
+    BALANCED_COMBINATION,
+    SweepAnalysis,
+    SweepTensor,
+    analyse_sweep,
+    analysis_parameters_hash,
+)
 from audio.math.interpolation import (
     InterpolationKind,
     interpolation_model,
     logx_interpolation_model_smoothing_spline,
 )
-from audio.math.phase import phase_offset_v2, phase_offset_v4
+from audio.math.phase import phase_offset_v2
 from audio.math.rms import RMS, RMS_MODE, RMSResult
-from audio.math.voltage import calculate_gain_db
-from audio.model.sampling import VoltageSampling, VoltageSamplingV2
+from audio.model.sampling import VoltageSampling
 from audio.sampling import (
     DataSetLevel,
     config_balanced_set_level_v2,
     config_set_level_v2,
 )
 from audio.sweep import sweep, sweep_balanced, sweep_balanced_single, sweep_single
+from audio.sweep.multitone import (
+    MULTITONE_ESTIMATOR,
+    multitone_parameters_hash,
+    sweep_multitone,
+)
 from audio.utility.timer import Timer
 
 
@@ -45,7 +56,65 @@ def create_database_v2():
 
 
 @click.command()
-def analysis():
+@click.option(
+    "--coherent",
+    is_flag=True,
+    help="Plan coherent captures, the analysis skips the interpolation.",
+    default=False,
+)
+@click.option(
+    "--sine-fit",
+    is_flag=True,
+    help="Estimate gain and phase with the IEEE-1057 sine fit.",
+    default=False,
+)
+@click.option(
+    "--settle",
+    is_flag=True,
+    help="Wait for the steady state after every frequency change instead of a fixed delay.",
+    default=False,
+)
+@click.option(
+    "--adaptive",
+    is_flag=True,
+    help="Refine the frequency grid where the gain or phase curve bends, and around the -3 dB crossing.",
+    default=False,
+)
+@click.option(
+    "--multitone",
+    is_flag=True,
+    help="Measure many frequencies per acquisition with a multitone arbitrary waveform.",
+    default=False,
+)
+@click.option(
+    "--streaming",
+    is_flag=True,
+    help="Keep the acquisition running and read every capture from the stream.",
+    default=False,
+)
+@click.option(
+    "--dut",
+    type=str,
+    help="DUT identifier, the settle times are learned per DUT.",
+    default=None,
+)
+@click.option(
+    "--settle-reset",
+    "settle_reset",
+    is_flag=True,
+    help="Forget the settle times learned for the DUT.",
+    default=False,
+)
+def analysis(
+    coherent: bool,
+    sine_fit: bool,
+    settle: bool,
+    adaptive: bool,
+    multitone: bool,
+    streaming: bool,
+    dut: str | None,
+    settle_reset: bool,
+):
     db = Database()
     test_id = db.insert_test(
         "Test Machine 1",
@@ -53,22 +122,13 @@ def analysis():
         comment="Test Procedure with Database",
     )
 
-    PB_test_id: str | None = None
-    url = "http://127.0.0.1:8090/api/collections/tests/records"
-    response: requests.Response = requests.post(
-        url,
-        json={
+    PB_test_id: RecordRef = get_uploader().create(
+        "tests",
+        {
             "name": "Test v2 Procedure",
             "comment": "v2 Procedure Comment",
         },
-        timeout=5,
     )
-    response_data = json.loads(response.content.decode())
-    console.log(response_data)
-    if response.status_code != 200:
-        console.log(f"[RESPONSE ERROR]: {url}")
-    else:
-        PB_test_id = response_data["id"]
 
     channel_ref = Channel("cDAQ9189-1CDBE0AMod5/ai1", "Ref")
     channel_dut = Channel("cDAQ9189-1CDBE0AMod5/ai3", "DUT")
@@ -86,10 +146,14 @@ def analysis():
         PlotConfig(),
     )
     dBu: float = -6
-    data_set_level: DataSetLevel = config_set_level_v2(
+    data_set_level: DataSetLevel | None = config_set_level_v2(
         dBu=dBu,
         config=sampling_config,
+        streaming=streaming,
     )
+    if data_set_level is None:
+        console.log("[ERROR]: Set level failed.")
+        return
 
     console.log(data_set_level)
     log.info(f"[DATA] dB setlevel {data_set_level}")
@@ -119,39 +183,134 @@ def analysis():
         ),
         PlotConfig(),
     )
-    sweep_id = sweep(test_id=test_id, PB_test_id=PB_test_id, config=config)
+
+    if multitone:
+        sweep_id = sweep_multitone(test_id=test_id, config=config)
+        console.log(f"[DATA]: sweep_id: {sweep_id}")
+        log.info(f"[DATA] sweep_id: {sweep_id}")
+
+        make_multitone_calculation(sweep_id, channels=[0, 1], dB_offset=data_set_level.dB)
+        return
+
+    sweep_id = sweep(
+        test_id=test_id,
+        PB_test_id=PB_test_id,
+        config=config,
+        streaming=streaming,
+        coherent=coherent,
+        settle=settle,
+        adaptive=AdaptiveConfig() if adaptive else None,
+        dut=dut,
+        settle_reset=settle_reset,
+        rms_mode=RMS_MODE.SINE_FIT if sine_fit else RMS_MODE.FFT,
+    )
     console.log(f"[DATA]: sweep_id: {sweep_id}")
     log.info(f"[DATA] sweep_id: {sweep_id}")
 
-    make_calculation(sweep_id, data_set_level.dB)
-
+    make_calculation(
+        sweep_id,
+        data_set_level.dB,
+        rms_mode=RMS_MODE.SINE_FIT if sine_fit else RMS_MODE.FFT,
+    )
 
-def make_calculation(sweep_id: int, dB_offset: float = 0):
-    db = Database()
 
+def make_calculation(
+    sweep_id: int,
+    dB_offset: float = 0,
+    rms_mode: RMS_MODE = RMS_MODE.FFT,
+):
     console.print(Panel("[bold]RETRIEVING DATA FROM DB[/]"))
 
-    frequencies: list[DbFrequency] = db.get_frequencies_from_sweep_id(sweep_id=sweep_id)
+    # Ref, DUT
+    result = analyse_sweep_cached(sweep_id, channels=[0, 1], rms_mode=rms_mode)
+
+    make_graph_dB_phase(
+        sweep_id=sweep_id,
+        result=result,
+        dB_offset=dB_offset,
+    )
 
-    channels: list[DbChannel] = db.get_channels_from_sweep_id(sweep_id=sweep_id)
 
-    voltages_ref: list[DbSweepVoltage] = []
-    voltages_dut: list[DbSweepVoltage] = []
+def make_multitone_calculation(
+    sweep_id: int | None,
+    channels: list[int],
+    combination: list[list[float]] | None = None,
+    dB_offset: float = 0,
+):
+    """Plot the results stored by `sweep_multitone`."""
+    if sweep_id is None:
+        console.log("[ERROR]: Multitone sweep failed.")
+        return
+
+    with Database.session() as db:
+        result = db.get_derived_results(
+            sweep_id,
+            MULTITONE_ESTIMATOR,
+            multitone_parameters_hash(channels, combination),
+        )
 
-    for freq_ref in frequencies:
-        voltages_ref.append(db.get_sweep_voltages(freq_ref.id_, channels[0].id_))
+    if result is None:
+        console.log(f"[ERROR]: Sweep {sweep_id} has no multitone results.")
+        return
 
-    for freq_ref in frequencies:
-        voltages_dut.append(db.get_sweep_voltages(freq_ref.id_, channels[1].id_))
     make_graph_dB_phase(
         sweep_id=sweep_id,
-        frequencies=frequencies,
-        voltages_ref=voltages_ref,
-        voltages_dut=voltages_dut,
+        result=result,
         dB_offset=dB_offset,
     )
 
 
+def analyse_sweep_cached(
+    sweep_id: int,
+    channels: list[int],
+    rms_mode: RMS_MODE = RMS_MODE.FFT,
+    combination: list[list[float]] | None = None,
+) -> SweepAnalysis:
+    """`analyse_sweep` of the `channels` of a sweep, optionally combined, read
+    from the derived results cache when already analysed with the same
+    parameters and cached on a miss.
+    """
+    parameters_hash = analysis_parameters_hash(
+        channels=channels,
+        combination=combination,
+    )
+
+    timer = Timer()
+    timer.start()
+
+    with Database.session() as db:
+        result = db.get_derived_results(sweep_id, rms_mode.name, parameters_hash)
+        if result is not None:
+            log.info(f"TIME CACHED ANALYSIS LOAD: {timer.stop()}")
+            return result
+
+        # Only a block of frequencies is in memory at once
+        results: list[SweepAnalysis] = []
+        frequency_ids: list[np.ndarray] = []
+        for block in db.iter_sweep_blocks(sweep_id, channels=channels):
+            tensor = block.combine(combination) if combination is not None else block
+            results.append(analyse_sweep(tensor, rms_mode=rms_mode))
+            frequency_ids.append(block.frequency_id)
+
+        if len(results) == 0:
+            _msg = f"Sweep {sweep_id} has no voltages."
+            raise ValueError(_msg)
+
+        result = SweepAnalysis.concatenate(results)
+        log.info(f"TIME SWEEP LOAD AND CALCULATION RMS AND PHASE: {timer.lap()}")
+
+        db.insert_derived_results(
+            sweep_id,
+            rms_mode.name,
+            parameters_hash,
+            np.concatenate(frequency_ids),
+            result,
+        )
+        log.info(f"TIME ANALYSIS CACHE: {timer.stop()}")
+
+    return result
+
+
 def make_graph_ref_dut_dutrefsub_dB_phase(
     sweep_id: int,
     frequencies: list[DbFrequency],
@@ -324,13 +483,47 @@ def make_graph_ref_dut_dutrefsub_dB_phase(
 
 def make_graph_dB_phase(
     sweep_id: int,
-    frequencies: list[DbFrequency],
-    voltages_ref: list[DbSweepVoltage],
-    voltages_dut: list[DbSweepVoltage],
+    result: SweepAnalysis,
     dB_offset: float = 0,
 ):
     log.info("make_graph_dB_phase")
 
+    timer = Timer()
+
+    timer.start()
+
+    log_uncertainty(result)
+
+    plot_dB_phase(
+        sweep_id=sweep_id,
+        frequency=result.frequency,
+        gain_dB=result.gain_dB(ref=0, dut=1) - dB_offset,
+        phase=result.phase(ref=0, dut=1),
+        dB_offset=dB_offset,
+    )
+
+    elapsed_time = timer.stop()
+    log.info(f"TIME TOTAL: {elapsed_time}")
+
+
+def log_uncertainty(result: SweepAnalysis) -> None:
+    gain_dB_std = result.gain_dB_std(ref=0, dut=1)
+    if gain_dB_std is None or result.phase_std is None:
+        return
+
+    phase_std = np.hypot(result.phase_std[:, 0], result.phase_std[:, 1])
+    log.info(f"MAX GAIN STD: {np.max(gain_dB_std):.2e} dB")
+    log.info(f"MAX PHASE STD: {np.max(phase_std):.2e} deg")
+
+
+def plot_dB_phase(
+    sweep_id: int,
+    frequency: np.ndarray,
+    gain_dB: np.ndarray,
+    phase: np.ndarray,
+    dB_offset: float = 0,
+) -> None:
+    """Plot, save and upload the DUT - Ref gain and phase of a sweep."""
     directory = Path(APP_HOME / "data/imgs")
     directory.mkdir(parents=True, exist_ok=True)
 
@@ -352,87 +545,25 @@ def make_graph_dB_phase(
 
     console.print(Panel("[bold]CREATING PLOT[/]"))
 
-    interpolation_rate_rms = 50
-
-    voltage_sampling_ref_list: list[VoltageSamplingV2] = []
-    voltage_sampling_dut_list: list[VoltageSamplingV2] = []
-
-    # Ref
-    freq_volts_ref = zip(frequencies, voltages_ref, strict=False)
-    rms_ref: list[float] = []
-    for freq_ref, volt_ref in freq_volts_ref:
-        voltage_sampling = VoltageSamplingV2.from_list(
-            volt_ref.voltages,
-            input_frequency=freq_ref.frequency,
-            sampling_frequency=freq_ref.sampling_frequency,
-        )
-        voltage_sampling_ref_list.append(voltage_sampling)
-
-        rms = RMS.rms_v3(
-            voltage_sampling.augment_interpolation(
-                interpolation_rate=interpolation_rate_rms,
-                interpolation_mode=InterpolationKind.CUBIC,
-            ),
-            trim=True,
-            rms_mode=RMS_MODE.FFT,
-        )
-        rms_ref.append(rms)
-
-    timer_lap = timer.lap()
-    log.info(f"TIME CALCULATION REF RMS: {timer_lap}")
-
-    # DUT
-    freq_volts_dut = zip(frequencies, voltages_dut, strict=False)
-    rms_dut: list[RMSResult] = []
-    for freq_ref, volt_dut in freq_volts_dut:
-        voltage_sampling = VoltageSamplingV2.from_list(
-            volt_dut.voltages,
-            input_frequency=freq_ref.frequency,
-            sampling_frequency=freq_ref.sampling_frequency,
-        )
-        voltage_sampling_dut_list.append(voltage_sampling)
-
-        rms = RMS.rms_v3(
-            voltage_sampling.augment_interpolation(
-                interpolation_rate=interpolation_rate_rms,
-                interpolation_mode=InterpolationKind.CUBIC,
-            ),
-            trim=True,
-            rms_mode=RMS_MODE.FFT,
-        )
-        rms_dut.append(rms)
-
-    timer_lap = timer.lap()
-    log.info(f"TIME CALCULATION DUT RMS: {timer_lap}")
-
     axis_dut_sub_ref_dB: Axes = axis[0]
     axis_dut_sub_ref_dB.set_title("DUT - Ref [dB]")
     axis_dut_sub_ref_dB.set_xlabel("Frequency")
     axis_dut_sub_ref_dB.set_ylabel("dB")
     axis_dut_sub_ref_dB.tick_params(labelright=True)
 
-    rms_dut_sub_ref_dB: list[float] = [
-        calculate_gain_db(ref, dut) - dB_offset for ref, dut in zip(rms_ref, rms_dut, strict=False)
-    ]
-
     (
         axis_dut_sub_ref_dB_data_x,
         axis_dut_sub_ref_dB_data_y,
     ) = logx_interpolation_model_smoothing_spline(
-        [freq.frequency for freq in frequencies],
-        rms_dut_sub_ref_dB,
+        list(frequency),
+        list(gain_dB),
         1,
         lam=0.00001,
     )
 
-    #     axis_dut_sub_ref_dB_data_x,
-    #     axis_dut_sub_ref_dB_data_y,
-    # ) = logx_interpolation_model(
-    #     rms_dut_sub_ref_dB,
-
     axis_dut_sub_ref_dB.semilogx(
-        [freq.frequency for freq in frequencies],
-        rms_dut_sub_ref_dB,
+        frequency,
+        gain_dB,
         ".",
         color="blue",
         markersize=3,
@@ -464,101 +595,19 @@ def make_graph_dB_phase(
     axis_dut_sub_ref_phase_ax1.tick_params(labelright=True)
     axis_dut_sub_ref_phase_ax1.axhline(0, color="black", linewidth=1)
 
-    offset_phase_ref_dut: list[float] = []
-
-    interpolation_rate_phase = 50
-
-    for _freq, volts_ref, volts_dut in zip(
-        frequencies,
-        voltage_sampling_dut_list,
-        voltage_sampling_ref_list,
-        strict=True,
-    ):
-        voltage_sampling_ref = volts_ref.augment_interpolation(
-            interpolation_rate=interpolation_rate_phase,
-            interpolation_mode=InterpolationKind.CUBIC,
-        )
-
-        voltage_sampling_dut = volts_dut.augment_interpolation(
-            interpolation_rate=interpolation_rate_phase,
-            interpolation_mode=InterpolationKind.CUBIC,
-        )
-
-        try:
-            offset_phase = phase_offset_v4(
-                voltage_sampling_ref,
-                voltage_sampling_dut,
-            )
-        except Exception as e:
-            console.log(f"{e}")
-
-            plt.close()
-            plt.plot(voltage_sampling_ref.voltages, ".-", color="blue")
-            plt.plot(voltage_sampling_dut.voltages, ".-", color="red")
-            plt.show()
-            plt.close()
-
-        offset_phase_ref_dut.append(offset_phase)
-
-    # --------------------------------------
-    # for idx in range(1, len(sign_phase_list)):
-
-    #     if is_cross:
-    #         if (
-    #             curr_sign_phase - prev_sign_phase < 0
-    #             and abs(offset_phase_ref_dut[idx - 1] - offset_phase_ref_dut[idx]) > 100
-    #         ):
-
-    # for index_transform in index_to_transform:
-
-    #     for idx, phase_value in enumerate(offset_phase_ref_dut):
-    #         if idx <= index_transform:
-
-    # for idx in range(1, len(sign_phase_list)):
-
-    #     if is_cross:
-    #         if (
-    #             curr_sign_phase - prev_sign_phase > 0
-    #             and abs(offset_phase_ref_dut[idx - 1] - offset_phase_ref_dut[idx]) > 100
-    #         ):
-
-    # for index_transform in index_to_transform:
-
-    #     for idx, phase_value in enumerate(offset_phase_ref_dut):
-    #         if idx <= index_transform:
-    # --------------------------------------
-
-    # TODO: V2
-    # for idx in range(1, len(offset_phase_ref_dut)):
-
-    #     if curr_sign_phase - prev_sign_phase:
-    #         if (
-    #             curr_sign_phase - prev_sign_phase > 0
-    #             and abs(offset_phase_ref_dut[idx - 1] - offset_phase_ref_dut[idx]) > 100
-    #         ):
-
-    # TODO: V1
-    for idx, value in enumerate(offset_phase_ref_dut):
-        if value > 180:
-            offset_phase_ref_dut[idx] -= 360
-
     (
         axis_dut_sub_ref_dB_data_x,
         axis_dut_sub_ref_dB_data_y,
     ) = logx_interpolation_model_smoothing_spline(
-        [freq.frequency for freq in frequencies],
-        offset_phase_ref_dut,
+        list(frequency),
+        list(phase),
         1,
         lam=0.00001,
     )
 
-    #     axis_dut_sub_ref_dB_data_x,
-    #     axis_dut_sub_ref_dB_data_y,
-    # ) = logx_interpolation_model(
-    #     offset_phase_ref_dut,
     axis_dut_sub_ref_phase_ax1.semilogx(
-        [freq.frequency for freq in frequencies],
-        offset_phase_ref_dut,
+        frequency,
+        phase,
         ".",
         color="blue",
         markersize=3,
@@ -571,8 +620,8 @@ def make_graph_dB_phase(
         linewidth=1,
     )
 
-    data_phase_y_max = max(offset_phase_ref_dut)
-    data_phase_y_min = min(offset_phase_ref_dut)
+    data_phase_y_max: float = max(phase)
+    data_phase_y_min: float = min(phase)
 
     data_phase_y_range_max: int
     data_phase_y_range_min: int
@@ -628,71 +677,44 @@ def make_graph_dB_phase(
     axis_dut_sub_ref_phase_ax1.grid(which="major", color="grey", linestyle="-")
     axis_dut_sub_ref_phase_ax1.grid(which="minor", color="grey", linestyle="--")
 
-    timer_lap = timer.lap()
+    timer_lap: timedelta = timer.lap()
     log.info(f"TIME DUT - REF PHASE PLOT: {timer_lap}")
 
-    elapsed_time = timer.stop()
-    log.info(f"TIME TOTAL: {elapsed_time}")
-
-    file = directory / f"{datetime.now().strftime('%Y-%m-%dT%H-%M-%SZ')}.jpeg"
+    file: Path = directory / f"{datetime.now().strftime('%Y-%m-%dT%H-%M-%SZ')}.jpeg"
     plt.savefig(file)
 
-    with open(file, mode="rb") as f:
-        response = requests.post(
-            "http://127.0.0.1:8090/api/collections/graphs/records",
-            data={
-                "sweep_id": sweep_id,
-                "gain_dB": dB_offset,
-                "comment": comment,
-            },
-            files={"file": f},
-            timeout=5,
-        )
-        if response.status_code != 200:
-            data = json.loads(response.content)
-            console.log(data)
+    get_uploader().create(
+        "graphs",
+        {
+            "sweep_id": sweep_id,
+            "gain_dB": dB_offset,
+            "comment": comment,
+        },
+        files={"file": file},
+    )
+
+    elapsed_time: timedelta = timer.stop()
+    log.info(f"TIME PLOT TOTAL: {elapsed_time}")
 
     plt.show()
     plt.close()
 
 
-def parallel_calculate_rms(data: list[tuple[DbFrequency, DbSweepVoltage]]):
-    from multiprocessing.pool import Pool
-
-    data: list[tuple[int, tuple[DbFrequency, DbSweepVoltage]]] = [
-        (idx, d) for idx, d in enumerate(data)
-    ]
-
-    rms_list: list[tuple[int, RMSResult]] = []
-
-    with Pool() as pool:
-        results = pool.imap_unordered(parallel_calculate_rms_calulate, data)
-        for result in results:
-            rms_list.append(result)
-
-    rms_list.sort(key=lambda x: x[0])
-    rms_list = [rms for idx, rms in rms_list]
-    return rms_list
-
-
-def parallel_calculate_rms_calulate(
-    data: tuple[int, tuple[DbFrequency, DbSweepVoltage]],
-):
-    idx, data_db = data
-    freq, volt = data_db
-
-    voltage_sampling = VoltageSampling.from_list(
-        volt.voltages,
-        input_frequency=freq.frequency,
-        sampling_frequency=freq.sampling_frequency,
-    )
-    rms = RMS.rms_v2(
-        voltage_sampling,
-        interpolation_rate=50,
-        trim=True,
+def parallel_calculate_rms(
+    data: list[tuple[DbFrequency, DbSweepVoltage]],
+) -> list[RMSResult]:
+    """RMS of every capture, large sweeps are sharded across a process pool
+    through shared memory by `analyse_sweep`.
+    """
+    tensor = SweepTensor.from_voltages(
+        frequency=[freq.frequency for freq, _ in data],
+        sampling_frequency=[freq.sampling_frequency for freq, _ in data],
+        voltages=[[volt.voltages] for _, volt in data],
     )
 
-    return (idx, rms)
+    result = analyse_sweep(tensor)
+
+    return [RMSResult(rms=float(rms)) for rms in result.rms[:, 0]]
 
 
 def test_calculation():
@@ -703,7 +725,65 @@ def test_calculation():
 
 
 @click.command()
-def balanced_analysis() -> None:
+@click.option(
+    "--coherent",
+    is_flag=True,
+    help="Plan coherent captures, the analysis skips the interpolation.",
+    default=False,
+)
+@click.option(
+    "--sine-fit",
+    is_flag=True,
+    help="Estimate gain and phase with the IEEE-1057 sine fit.",
+    default=False,
+)
+@click.option(
+    "--settle",
+    is_flag=True,
+    help="Wait for the steady state after every frequency change instead of a fixed delay.",
+    default=False,
+)
+@click.option(
+    "--adaptive",
+    is_flag=True,
+    help="Refine the frequency grid where the gain or phase curve bends, and around the -3 dB crossing.",
+    default=False,
+)
+@click.option(
+    "--multitone",
+    is_flag=True,
+    help="Measure many frequencies per acquisition with a multitone arbitrary waveform.",
+    default=False,
+)
+@click.option(
+    "--streaming",
+    is_flag=True,
+    help="Keep the acquisition running and read every capture from the stream.",
+    default=False,
+)
+@click.option(
+    "--dut",
+    type=str,
+    help="DUT identifier, the settle times are learned per DUT.",
+    default=None,
+)
+@click.option(
+    "--settle-reset",
+    "settle_reset",
+    is_flag=True,
+    help="Forget the settle times learned for the DUT.",
+    default=False,
+)
+def balanced_analysis(
+    coherent: bool,
+    sine_fit: bool,
+    settle: bool,
+    adaptive: bool,
+    multitone: bool,
+    streaming: bool,
+    dut: str | None,
+    settle_reset: bool,
+) -> None:
     db = Database()
     test_id = db.insert_test(
         "Test Machine 1",
@@ -711,22 +791,13 @@ def balanced_analysis() -> None:
         comment="Test Procedure with Database",
     )
 
-    PB_test_id: str | None = None
-    url = "http://127.0.0.1:8090/api/collections/tests/records"
-    response = requests.post(
-        url,
-        json={
+    PB_test_id: RecordRef = get_uploader().create(
+        "tests",
+        {
             "name": "Test v2 Procedure",
             "comment": "v2 Procedure Comment",
         },
-        timeout=5,
     )
-    response_data = json.loads(response.content.decode())
-    console.log(response_data)
-    if response.status_code != 200:
-        console.log(f"[RESPONSE ERROR]: {url}")
-    else:
-        PB_test_id = response_data["id"]
 
     channel_ref_plus = Channel("cDAQ9189-1CDBE0AMod5/ai0", "Ref+")
     channel_ref_minus = Channel("cDAQ9189-1CDBE0AMod5/ai1", "Ref-")
@@ -751,10 +822,14 @@ def balanced_analysis() -> None:
         PlotConfig(),
     )
     dBu: float = 0
-    data_set_level: DataSetLevel = config_balanced_set_level_v2(
+    data_set_level: DataSetLevel | None = config_balanced_set_level_v2(
         dBu=dBu,
         config=sampling_config,
+        streaming=streaming,
     )
+    if data_set_level is None:
+        console.log("[ERROR]: Set level failed.")
+        return
 
     console.log(data_set_level)
     log.info(f"[DATA] dB setlevel {data_set_level}")
@@ -789,444 +864,67 @@ def balanced_analysis() -> None:
         ),
         PlotConfig(),
     )
-    sweep_id = sweep_balanced(test_id=test_id, PB_test_id=PB_test_id, config=config)
-    console.log(f"[DATA]: sweep_id: {sweep_id}")
-    log.info(f"[DATA] sweep_id: {sweep_id}")
-
-    make_balanced_calculation(sweep_id, data_set_level.dB)
-
 
-def make_balanced_calculation(sweep_id: int, dB_offset: float = 0):
-    db = Database()
-
-    console.print(Panel("[bold]RETRIEVING DATA FROM DB[/]"))
-
-    frequencies: list[DbFrequency] = db.get_frequencies_from_sweep_id(sweep_id=sweep_id)
-
-    channels: list[DbChannel] = db.get_channels_from_sweep_id(sweep_id=sweep_id)
-
-    voltages_ref_plus: list[VoltageSamplingV2] = []
-    voltages_ref_minus: list[VoltageSamplingV2] = []
-    voltages_dut_plus: list[VoltageSamplingV2] = []
-    voltages_dut_minus: list[VoltageSamplingV2] = []
-
-    voltages_ref: list[VoltageSamplingV2] = []
-    voltages_dut: list[VoltageSamplingV2] = []
-
-    for freq in frequencies:
-        voltages_ref_plus_raw_db = db.get_sweep_voltages(freq.id_, channels[0].id_)
-        voltages_ref_plus_raw = VoltageSamplingV2.from_list(
-            voltages_ref_plus_raw_db.voltages,
-            input_frequency=freq.frequency,
-            sampling_frequency=freq.sampling_frequency,
+    if multitone:
+        sweep_id = sweep_multitone(
+            test_id=test_id,
+            config=config,
+            combination=BALANCED_COMBINATION,
         )
-        voltages_ref_plus.append(voltages_ref_plus_raw)
-
-        voltages_ref_minus_raw_db = db.get_sweep_voltages(freq.id_, channels[1].id_)
-        voltages_ref_minus_raw = VoltageSamplingV2.from_list(
-            voltages_ref_minus_raw_db.voltages,
-            input_frequency=freq.frequency,
-            sampling_frequency=freq.sampling_frequency,
+        console.log(f"[DATA]: sweep_id: {sweep_id}")
+        log.info(f"[DATA] sweep_id: {sweep_id}")
+
+        make_multitone_calculation(
+            sweep_id,
+            channels=[0, 1, 2, 3],
+            combination=BALANCED_COMBINATION,
+            dB_offset=data_set_level.dB,
         )
-        voltages_ref_minus.append(voltages_ref_minus_raw)
-
-        voltages_ref_raw: list[float] = []
-        for plus, minus in zip(
-            voltages_ref_plus_raw.voltages,
-            voltages_ref_minus_raw.voltages,
-            strict=True,
-        ):
-            voltages_ref_raw.append(plus - minus)
-
-        voltages_ref_raw: VoltageSamplingV2 = VoltageSamplingV2.from_list(
-            voltages=voltages_ref_raw,
-            input_frequency=freq.frequency,
-            sampling_frequency=freq.sampling_frequency,
-        )
-        voltages_ref.append(voltages_ref_raw)
-
-        voltages_dut_plus_raw_db = db.get_sweep_voltages(freq.id_, channels[2].id_)
-        voltages_dut_plus_raw = VoltageSamplingV2.from_list(
-            voltages_dut_plus_raw_db.voltages,
-            input_frequency=freq.frequency,
-            sampling_frequency=freq.sampling_frequency,
-        )
-        voltages_dut_plus.append(voltages_dut_plus_raw)
+        return
+
+    sweep_id = sweep_balanced(
+        test_id=test_id,
+        PB_test_id=PB_test_id,
+        config=config,
+        streaming=streaming,
+        coherent=coherent,
+        settle=settle,
+        adaptive=AdaptiveConfig() if adaptive else None,
+        dut=dut,
+        settle_reset=settle_reset,
+        rms_mode=RMS_MODE.SINE_FIT if sine_fit else RMS_MODE.FFT,
+    )
+    console.log(f"[DATA]: sweep_id: {sweep_id}")
+    log.info(f"[DATA] sweep_id: {sweep_id}")
 
-        voltages_dut_minus_raw_db = db.get_sweep_voltages(freq.id_, channels[3].id_)
-        voltages_dut_minus_raw = VoltageSamplingV2.from_list(
-            voltages_dut_minus_raw_db.voltages,
-            input_frequency=freq.frequency,
-            sampling_frequency=freq.sampling_frequency,
-        )
-        voltages_dut_minus.append(voltages_dut_minus_raw)
-
-        voltages_dut_raw: list[float] = []
-        for plus, minus in zip(
-            voltages_dut_plus_raw.voltages,
-            voltages_dut_minus_raw.voltages,
-            strict=True,
-        ):
-            voltages_dut_raw.append(plus - minus)
-
-        voltages_dut_raw: VoltageSamplingV2 = VoltageSamplingV2.from_list(
-            voltages=voltages_dut_raw,
-            input_frequency=freq.frequency,
-            sampling_frequency=freq.sampling_frequency,
-        )
-        voltages_dut.append(voltages_dut_raw)
-
-        debug: bool = False
-
-        if debug:
-            import matplotlib.pyplot as plt
-
-            plt.plot(voltages_ref_raw.times, voltages_ref_raw.voltages, color="red")
-            plt.plot(
-                voltages_ref_plus_raw.times,
-                voltages_ref_plus_raw.voltages,
-                color="green",
-            )
-            plt.plot(
-                voltages_ref_minus_raw.times,
-                voltages_ref_minus_raw.voltages,
-                color="blue",
-            )
-            plt.show()
-            plt.close()
-
-    make_balanced_graph_dB_phase(
-        sweep_id=sweep_id,
-        frequencies=frequencies,
-        voltages_ref=voltages_ref,
-        voltages_dut=voltages_dut,
-        dB_offset=dB_offset,
+    make_balanced_calculation(
+        sweep_id,
+        data_set_level.dB,
+        rms_mode=RMS_MODE.SINE_FIT if sine_fit else RMS_MODE.FFT,
     )
 
 
-def make_balanced_graph_dB_phase(
+def make_balanced_calculation(
     sweep_id: int,
-    frequencies: list[DbFrequency],
-    voltages_ref: list[VoltageSamplingV2],
-    voltages_dut: list[VoltageSamplingV2],
     dB_offset: float = 0,
+    rms_mode: RMS_MODE = RMS_MODE.FFT,
 ):
-    log.info("make_graph_dB_phase")
-
-    directory = Path(APP_HOME / "data/imgs")
-    directory.mkdir(parents=True, exist_ok=True)
-
-    timer = Timer()
-
-    timer.start()
-
-    figure, axis = plt.subplots(2, 1)
-    figure.set_size_inches(15, 9)
-    figure.tight_layout(pad=5.0)
-
-    timer_lap = timer.lap()
-    log.info(f"TIME INIT PLOT: {timer_lap}")
-
-    comment = Prompt.ask("Test condition", default=None)
-    timer_lap = timer.lap()
-    plt.suptitle(f"ID: {sweep_id}, dB: {dB_offset:0.5f}, comment: {comment}")
-    plt.style.use("seaborn")
-
-    console.print(Panel("[bold]CREATING PLOT[/]"))
-
-    interpolation_rate_rms = 50
-
-    # Ref
-    rms_ref: list[float] = []
-
-    for volt_ref in voltages_ref:
-        rms = RMS.rms_v3(
-            volt_ref.augment_interpolation(
-                interpolation_rate=interpolation_rate_rms,
-                interpolation_mode=InterpolationKind.CUBIC,
-            ),
-            trim=True,
-            rms_mode=RMS_MODE.FFT,
-        )
-        rms_ref.append(rms)
-
-    timer_lap = timer.lap()
-    log.info(f"TIME CALCULATION REF RMS: {timer_lap}")
-
-    # DUT
-    rms_dut: list[RMSResult] = []
-    for volt_dut in voltages_dut:
-        rms = RMS.rms_v3(
-            volt_dut.augment_interpolation(
-                interpolation_rate=interpolation_rate_rms,
-                interpolation_mode=InterpolationKind.CUBIC,
-            ),
-            trim=True,
-            rms_mode=RMS_MODE.FFT,
-        )
-        rms_dut.append(rms)
-
-    timer_lap = timer.lap()
-    log.info(f"TIME CALCULATION DUT RMS: {timer_lap}")
-
-    axis_dut_sub_ref_dB: Axes = axis[0]
-    axis_dut_sub_ref_dB.set_title("DUT - Ref [dB]")
-    axis_dut_sub_ref_dB.set_xlabel("Frequency")
-    axis_dut_sub_ref_dB.set_ylabel("dB")
-    axis_dut_sub_ref_dB.tick_params(labelright=True)
-
-    rms_dut_sub_ref_dB: list[float] = [
-        calculate_gain_db(ref, dut) - dB_offset for ref, dut in zip(rms_ref, rms_dut, strict=False)
-    ]
-
-    (
-        axis_dut_sub_ref_dB_data_x,
-        axis_dut_sub_ref_dB_data_y,
-    ) = logx_interpolation_model_smoothing_spline(
-        [freq.frequency for freq in frequencies],
-        rms_dut_sub_ref_dB,
-        1,
-        lam=0.00001,
-    )
-
-    #     axis_dut_sub_ref_dB_data_x,
-    #     axis_dut_sub_ref_dB_data_y,
-    # ) = logx_interpolation_model(
-    #     rms_dut_sub_ref_dB,
-
-    axis_dut_sub_ref_dB.semilogx(
-        [freq.frequency for freq in frequencies],
-        rms_dut_sub_ref_dB,
-        ".",
-        color="blue",
-        markersize=3,
-    )
-    axis_dut_sub_ref_dB.semilogx(
-        axis_dut_sub_ref_dB_data_x,
-        axis_dut_sub_ref_dB_data_y,
-        "-",
-        color="red",
-        linewidth=1,
-    )
-    if min(axis_dut_sub_ref_dB_data_y) < -3:
-        axis_dut_sub_ref_dB.axhline(0, color="black", linewidth=1)
-        axis_dut_sub_ref_dB.axhline(-3, color="green", linewidth=1)
-
-    axis_dut_sub_ref_dB.axes.xaxis.set_minor_formatter(ticker.NullFormatter())
-    axis_dut_sub_ref_dB.axes.xaxis.set_major_formatter(ticker.ScalarFormatter())
-    axis_dut_sub_ref_dB.grid(which="major", color="grey", linestyle="-")
-    axis_dut_sub_ref_dB.grid(which="minor", color="grey", linestyle="--")
-
-    timer_lap = timer.lap()
-    log.info("TIME DUT - REF dB PLOT: %s", timer_lap)
-
-    # DUT - Red [Phase °]
-    axis_dut_sub_ref_phase_ax1: Axes = axis[1]
-    axis_dut_sub_ref_phase_ax1.set_title("DUT - REF Phase [°]")
-    axis_dut_sub_ref_phase_ax1.set_xlabel("Frequency")
-    axis_dut_sub_ref_phase_ax1.set_ylabel("Degrees [°]")
-    axis_dut_sub_ref_phase_ax1.tick_params(labelright=True)
-    axis_dut_sub_ref_phase_ax1.axhline(0, color="black", linewidth=1)
-
-    offset_phase_ref_dut: list[float] = []
-
-    interpolation_rate_phase = 50
-
-    for _freq, volts_ref, volts_dut in zip(
-        frequencies,
-        voltages_ref,
-        voltages_dut,
-        strict=True,
-    ):
-        voltage_sampling_ref = volts_ref.augment_interpolation(
-            interpolation_rate=interpolation_rate_phase,
-            interpolation_mode=InterpolationKind.CUBIC,
-        )
-
-        voltage_sampling_dut = volts_dut.augment_interpolation(
-            interpolation_rate=interpolation_rate_phase,
-            interpolation_mode=InterpolationKind.CUBIC,
-        )
-
-        try:
-            offset_phase = phase_offset_v4(
-                voltage_sampling_ref,
-                voltage_sampling_dut,
-            )
-        except Exception as e:
-            console.log(f"{e}")
-
-            plt.close()
-            plt.plot(voltage_sampling_ref.voltages, ".-", color="blue")
-            plt.plot(voltage_sampling_dut.voltages, ".-", color="red")
-            plt.show()
-            plt.close()
-
-        if offset_phase is None:
-            plt.close()
-            plt.title(f"freq: {_freq}")
-            plt.plot(voltage_sampling_ref.voltages, ".-", color="blue")
-            plt.plot(voltage_sampling_dut.voltages, ".-", color="red")
-            plt.show()
-            plt.close()
-
-        offset_phase_ref_dut.append(offset_phase)
-
-    # --------------------------------------
-    # for idx in range(1, len(sign_phase_list)):
-
-    #     if is_cross:
-    #         if (
-    #             curr_sign_phase - prev_sign_phase < 0
-    #             and abs(offset_phase_ref_dut[idx - 1] - offset_phase_ref_dut[idx]) > 100
-    #         ):
-
-    # for index_transform in index_to_transform:
-
-    #     for idx, phase_value in enumerate(offset_phase_ref_dut):
-    #         if idx <= index_transform:
-
-    # for idx in range(1, len(sign_phase_list)):
-
-    #     if is_cross:
-    #         if (
-    #             curr_sign_phase - prev_sign_phase > 0
-    #             and abs(offset_phase_ref_dut[idx - 1] - offset_phase_ref_dut[idx]) > 100
-    #         ):
-
-    # for index_transform in index_to_transform:
-
-    #     for idx, phase_value in enumerate(offset_phase_ref_dut):
-    #         if idx <= index_transform:
-    # --------------------------------------
-
-    # TODO: V2
-    # for idx in range(1, len(offset_phase_ref_dut)):
-
-    #     if curr_sign_phase - prev_sign_phase:
-    #         if (
-    #             curr_sign_phase - prev_sign_phase > 0
-    #             and abs(offset_phase_ref_dut[idx - 1] - offset_phase_ref_dut[idx]) > 100
-    #         ):
-
-    # TODO: V1
-    for idx, value in enumerate(offset_phase_ref_dut):
-        if value > 180:
-            offset_phase_ref_dut[idx] -= 360
-
-    (
-        axis_dut_sub_ref_dB_data_x,
-        axis_dut_sub_ref_dB_data_y,
-    ) = logx_interpolation_model_smoothing_spline(
-        [freq.frequency for freq in frequencies],
-        offset_phase_ref_dut,
-        1,
-        lam=0.00001,
-    )
+    console.print(Panel("[bold]RETRIEVING DATA FROM DB[/]"))
 
-    #     axis_dut_sub_ref_dB_data_x,
-    #     axis_dut_sub_ref_dB_data_y,
-    # ) = logx_interpolation_model(
-    #     offset_phase_ref_dut,
-    axis_dut_sub_ref_phase_ax1.semilogx(
-        [freq.frequency for freq in frequencies],
-        offset_phase_ref_dut,
-        ".",
-        color="blue",
-        markersize=3,
+    # Ref+, Ref-, DUT+, DUT-, combined to Ref = Ref+ - Ref-, DUT = DUT+ - DUT-
+    result = analyse_sweep_cached(
+        sweep_id,
+        channels=[0, 1, 2, 3],
+        rms_mode=rms_mode,
+        combination=BALANCED_COMBINATION,
     )
-    axis_dut_sub_ref_phase_ax1.semilogx(
-        axis_dut_sub_ref_dB_data_x,
-        axis_dut_sub_ref_dB_data_y,
-        "-",
-        color="red",
-        linewidth=1,
-    )
-
-    data_phase_y_max: float = max(offset_phase_ref_dut)
-    data_phase_y_min: float = min(offset_phase_ref_dut)
-
-    data_phase_y_range_max: int
-    data_phase_y_range_min: int
-
-    if data_phase_y_max < 30:
-        data_phase_y_range_max = 30
-    elif data_phase_y_max < 45:
-        data_phase_y_range_max = 45
-    elif data_phase_y_max <= 90:
-        data_phase_y_range_max = 90
-    elif data_phase_y_max <= 180:
-        data_phase_y_range_max = 180
-    else:
-        data_phase_y_range_max = data_phase_y_max
-
-    if data_phase_y_min > -30:
-        data_phase_y_range_min = -30
-    elif data_phase_y_min > -45:
-        data_phase_y_range_min = -45
-    elif data_phase_y_min >= -90:
-        data_phase_y_range_min = -90
-    elif data_phase_y_min >= -180:
-        data_phase_y_range_min = -180
-    else:
-        data_phase_y_range_min = data_phase_y_min
-
-    data_phase_y_total_range = int(data_phase_y_range_max - data_phase_y_range_min)
 
-    data_phase_y_total_range_step: int = 5
-
-    if data_phase_y_total_range <= 60:
-        data_phase_y_total_range_step = 3
-    elif data_phase_y_total_range <= 120:
-        data_phase_y_total_range_step = 5
-    elif data_phase_y_total_range <= 240:
-        data_phase_y_total_range_step = 10
-    elif data_phase_y_total_range <= 360:
-        data_phase_y_total_range_step = 15
-    else:
-        data_phase_y_total_range_step = int(data_phase_y_total_range % 120) * 5
-
-    axis_dut_sub_ref_phase_ax1.set_yticks(
-        np.arange(
-            data_phase_y_range_min,
-            data_phase_y_range_max + 1,
-            data_phase_y_total_range_step,
-            dtype=int,
-        ),
+    make_graph_dB_phase(
+        sweep_id=sweep_id,
+        result=result,
+        dB_offset=dB_offset,
     )
 
-    axis_dut_sub_ref_phase_ax1.axes.xaxis.set_minor_formatter(ticker.NullFormatter())
-    axis_dut_sub_ref_phase_ax1.axes.xaxis.set_major_formatter(ticker.ScalarFormatter())
-    axis_dut_sub_ref_phase_ax1.grid(which="major", color="grey", linestyle="-")
-    axis_dut_sub_ref_phase_ax1.grid(which="minor", color="grey", linestyle="--")
-
-    timer_lap: timedelta = timer.lap()
-    log.info(f"TIME DUT - REF PHASE PLOT: {timer_lap}")
-
-    elapsed_time: timedelta = timer.stop()
-    log.info(f"TIME TOTAL: {elapsed_time}")
-
-    file: Path = directory / f"{datetime.now().strftime('%Y-%m-%dT%H-%M-%SZ')}.jpeg"
-    plt.savefig(file)
-
-    with Path.open(file, mode="rb") as f:
-        response: requests.Response = requests.post(
-            "http://127.0.0.1:8090/api/collections/graphs/records",
-            data={
-                "sweep_id": sweep_id,
-                "gain_dB": dB_offset,
-                "comment": comment,
-            },
-            files={"file": f},
-            timeout=5,
-        )
-        if response.status_code != 200:
-            data = json.loads(response.content)
-            console.log(data)
-
-    plt.show()
-    plt.close()
-
 
 def test_balanced_calculation():
     make_balanced_calculation(
@@ -27,15 +27,23 @@ from usbtmc import Instrument
 from audio.config.plot import PlotConfig
 from audio.config.sweep import SweepConfig
 from audio.console import console
+from audio.device.backend import InstrumentBackend
 from audio.device.cdaq import Ni9223
 from audio.math import calculate_voltage_decibel, percentage_error, transfer_function
-from audio.math.algorithm import LogarithmicScale
+from audio.math.algorithm import (
+    LogarithmicScale,
+    decade_sampling,
+    decade_stream_duration,
+)
 from audio.math.interpolation import InterpolationKind, logx_interpolation_model
-from audio.math.pid import PidController, TimedValue
+from audio.math.pid import PidController
 from audio.math.rms import RMS, RMS_MODE, RMSResult
+from audio.math.set_level import SetLevelResult, solve_set_level
 from audio.math.voltage import VdBu_to_Vrms, Vpp_to_Vrms, calculate_gain_db
-from audio.model.sampling import VoltageSampling, VoltageSamplingV2
+from audio.model.sampling import VoltageSamplingV3
 from audio.model.sweep import SweepData
+from audio.sweep.settle import SettleDetector, nidaq_block_reader
+from audio.sweep.spool import CaptureSpool, CaptureSpoolWriter
 from audio.usb.usbtmc import ResourceManager, UsbTmc
 from audio.utility import trim_value
 from audio.utility.scpi import SCPI, Bandwidth, Switch
@@ -47,12 +55,19 @@ def sampling_curve(
     sweep_home_path: Path,
     sweep_file_path: Path,
     debug: bool = False,
+    backend: InstrumentBackend | None = None,
+    export_csv: bool = False,
+    settle: bool = False,
+    streaming: bool = False,
+    dut: str | None = None,
+    settle_reset: bool = False,
 ):
     """Sweep Function.
 
     Directory:
     `sweep_home_path`
-    |-`/sweep`
+    |-`/sweep.spool`: raw captures, see `CaptureSpool`
+    |-`/sweep`: only with `export_csv`
         |- `1000`
 
         |- `2000`
@@ -67,15 +82,32 @@ def sampling_curve(
         sweep_home_path (Path): Home for the sweep measurements
         sweep_file_path (Path): File path to the sweep `.csv` file
         debug (bool, optional): _description_. Defaults to False.
+        backend (InstrumentBackend | None, optional): Instruments to use.
+            Defaults to the hardware ones.
+        export_csv (bool, optional): Export the captures to a `sample.csv`
+            per frequency too. Defaults to False.
+        settle (bool, optional): Wait for the steady state after every
+            frequency change instead of the fixed `delay_measurements`, see
+            `SettleDetector`. Defaults to False.
+        streaming (bool, optional): Keep the acquisition running and read
+            every capture from the stream, see `Ni9223.start_streaming`.
+            Defaults to False.
+        dut (str | None, optional): DUT identifier, the settle times are
+            learned per DUT. Defaults to None.
+        settle_reset (bool, optional): Forget the settle times learned for
+            the DUT. Defaults to False.
     """
 
     DEFAULT = {"delay": 0.2}
 
+    if backend is None:
+        backend = InstrumentBackend.hardware()
+
     HOME: Path = sweep_home_path
     HOME.mkdir(parents=True, exist_ok=True)
 
     measurements_path: Path = HOME / "sweep"
-    measurements_path.mkdir(parents=True, exist_ok=True)
+    spool_path: Path = HOME / "sweep.spool"
 
     progress_list_task = Progress(
         SpinnerColumn(),
@@ -153,22 +185,23 @@ def sampling_curve(
 
     # Asks for the 2 instruments
     try:
-        list_devices: list[Instrument] = UsbTmc.search_devices()
+        rm = backend.resource_manager()
+        list_devices = rm.search_resources()
 
         if len(list_devices) < 1:
             raise Exception("UsbTmc devices not found.")
 
         if debug:
-            UsbTmc.print_devices_list(list_devices)
+            rm.print_devices()
 
-        generator: UsbTmc = UsbTmc(list_devices[0])
+        generator = rm.open_resource(list_devices[0])
 
     except Exception as e:
         console.print(f"{e}")
 
     progress_list_task.update(task_sampling, task="Setting Devices")
 
-    if not generator.instr.instrument.connected:
+    if not generator.instr.connected:
         generator.open()
 
     if config.rigol.amplitude_peak_to_peak > 12:
@@ -205,7 +238,17 @@ def sampling_curve(
         ],
     )
 
-    sleep(2)
+    # The output-on transient is waited for at the first frequency
+    settle_detector: SettleDetector | None = None
+    if settle:
+        settle_detector = SettleDetector.for_sweep(
+            config,
+            backend,
+            dut=dut,
+            reset=settle_reset,
+        )
+    else:
+        backend.sleep(2)
 
     log_scale: LogarithmicScale = LogarithmicScale(
         config.sampling.frequency_min,
@@ -241,30 +284,71 @@ def sampling_curve(
         max_value=config.nidaq.max_frequency_sampling,
     )
 
-    nidaq = Ni9223(
+    nidaq = backend.nidaq(
         config.sampling.number_of_samples,
-        input_channel=[config.nidaq.input_channel],
+        input_channel=[config.nidaq.channels[0].name],
     )
 
     nidaq.create_task("Sampling")
-    nidaq.add_ai_channel([config.nidaq.input_channel])
+    nidaq.add_ai_channel([config.nidaq.channels[0].name])
     nidaq.set_sampling_clock_timing(Fs)
 
-    for frequency in log_scale.f_list:
+    spool = CaptureSpoolWriter(
+        spool_path,
+        n_channels=1,
+        max_samples=max(
+            config.sampling.number_of_samples,
+            config.sampling.number_of_samples_max or 0,
+        ),
+        config={
+            "amplitude_peak_to_peak": config.rigol.amplitude_peak_to_peak,
+            "frequency_min": config.sampling.frequency_min,
+            "frequency_max": config.sampling.frequency_max,
+            "points_per_decade": config.sampling.points_per_decade,
+            "Fs_multiplier": config.sampling.Fs_multiplier,
+        },
+    )
+
+    for idx, frequency in enumerate(log_scale.f_list):
         # Sets the Frequency
         generator.write(SCPI.set_source_frequency(1, round(frequency, 5)))
 
-        sleep(
-            config.sampling.delay_measurements
-            if config.sampling.delay_measurements is not None
-            else DEFAULT.get("delay"),
-        )
+        decimation = 1
+        if streaming:
+            # One clock per decade, the stream restarts only between decades
+            Fs, decimation = decade_sampling(
+                frequency,
+                config.sampling.Fs_multiplier,
+                config.nidaq.max_frequency_sampling,
+            )
+            if not nidaq.streaming or nidaq.sampling_frequency != Fs:
+                nidaq.start_streaming(
+                    Fs,
+                    buffer_duration=decade_stream_duration(nidaq.number_of_samples, Fs),
+                )
+        else:
+            # Trim number_of_samples to MAX value
+            Fs = trim_value(
+                frequency * config.sampling.Fs_multiplier,
+                max_value=config.nidaq.max_frequency_sampling,
+            )
 
-        # Trim number_of_samples to MAX value
-        Fs = trim_value(
-            frequency * config.sampling.Fs_multiplier,
-            max_value=config.nidaq.max_frequency_sampling,
-        )
+        if settle_detector is not None:
+            settle_result = settle_detector.wait(
+                nidaq_block_reader(nidaq, Fs, streaming),
+                frequency,
+                Fs,
+            )
+            if not settle_result.settled:
+                console.log(
+                    f"[SETTLE]: freq: {frequency}, not settled after {settle_result.time:.3f} s",
+                )
+        else:
+            backend.sleep(
+                config.sampling.delay_measurements
+                if config.sampling.delay_measurements is not None
+                else DEFAULT.get("delay"),
+            )
 
         # Trim number_of_samples to MAX value
         if config.sampling.number_of_samples_max is not None and (
@@ -275,6 +359,28 @@ def sampling_curve(
                 config.sampling.number_of_samples_max,
             )
 
+        time = Timer()
+        time.start()
+
+        # GET MEASUREMENTS
+        if streaming:
+            voltages = nidaq.read_multi_voltages_after(decimation=decimation)
+            if voltages is not None:
+                voltages = voltages[0]
+        else:
+            nidaq.set_sampling_clock_timing(Fs)
+            nidaq.task_start()
+            voltages = nidaq.read_single_voltages()
+            nidaq.task_stop()
+
+        if voltages is None:
+            console.log(f"[ACQUISITION ERROR]: freq: {frequency}, point skipped.")
+            progress_sweep.update(task_sweep, advance=1)
+            continue
+
+        # The streamed captures are decimated back to the point frequency
+        Fs /= decimation
+
         oversampling_ratio = Fs / frequency
         n_periods = config.sampling.number_of_samples / oversampling_ratio
 
@@ -284,28 +390,20 @@ def sampling_curve(
         n_periods_list.append(n_periods)
         n_samples_list.append(config.sampling.number_of_samples)
 
-        time = Timer()
-        time.start()
-
-        sweep_frequency_path = measurements_path / f"{round(frequency, 5)}".replace(".", "_", 1)
-        sweep_frequency_path.mkdir(parents=True, exist_ok=True)
-
-        save_file_path = sweep_frequency_path / "sample.csv"
-
-        # GET MEASUREMENTS
-
-        nidaq.set_sampling_clock_timing(Fs)
-        nidaq.task_start()
-        voltages = nidaq.read_single_voltages()
-        nidaq.task_stop()
+        # The DAQ coerces Fs to a divider of its timebase
+        sampling_clock_rate = nidaq.sampling_clock_rate
+        if sampling_clock_rate is None:
+            sampling_clock_rate = Fs
+        else:
+            sampling_clock_rate /= decimation
 
-        voltages_sampling = VoltageSampling.from_list(
+        voltages_sampling = VoltageSamplingV3.from_list(
             voltages,
             frequency,
-            Fs,
+            sampling_clock_rate,
         )
         result: RMSResult = RMS.rms_v2(voltages_sampling)
-        voltages_sampling.save(save_file_path)
+        spool.append(idx, frequency, sampling_clock_rate, [voltages])
 
         elapsed_time: datetime.timedelta = time.stop()
 
@@ -358,6 +456,16 @@ def sampling_curve(
         else:
             console.print("[ERROR] - Error retrieving rms_value.", style="error")
 
+    if streaming:
+        nidaq.stop_streaming()
+
+    spool.close()
+
+    if settle_detector is not None:
+        settle_detector.save()
+    if export_csv:
+        CaptureSpool.read(spool_path).export_csv(measurements_path)
+
     sampling_data = pd.DataFrame(
         list(
             zip(
@@ -449,12 +557,12 @@ def plot_from_csv(
 
     progress_list_task.update(task_plotting, task="Read Measurements")
 
-    sweep_data = SweepData.from_csv_file(measurements_file_path)
+    sweep_data = SweepData.from_file(measurements_file_path)
 
     cfg = sweep_data.config
 
     if file_offset_sweep_path is not None:
-        balancer = SweepData.from_csv_file(file_offset_sweep_path)
+        balancer = SweepData.from_file(file_offset_sweep_path)
 
         sweep_data.data["dBV"] = sweep_data.data["dBV"] - balancer.data["dBV"]
 
@@ -586,12 +694,34 @@ def plot_from_csv(
     live.stop()
 
 
+def _print_set_level_result(set_level: SetLevelResult) -> None:
+    table_result = Table(
+        "Gain Apparato",
+        "Vpp [Vpp]",
+        "Rms Value [V]",
+        "steps",
+        "converged",
+    )
+
+    table_result.add_row(
+        f"{set_level.rms / set_level.amplitude:.8f}",
+        f"{set_level.amplitude:.8f}",
+        f"{set_level.rms:.8f}",
+        f"{set_level.iterations}",
+        "[green]yes[/]" if set_level.converged else "[red]no[/]",
+    )
+
+    console.print(Panel(table_result))
+
+
 def config_set_level(
     dBu: float,
     config: SweepConfig,
     plot_file_path: Path | None,
     set_level_file_path: Path | None = None,
     debug: bool = False,
+    tolerance: float = 0.001,
+    max_iterations: int = 8,
 ):
     voltage_amplitude_start: float = 0.1
     voltage_amplitude = voltage_amplitude_start
@@ -600,7 +730,6 @@ def config_set_level(
         frequency * config.sampling.Fs_multiplier,
         max_value=config.nidaq.max_frequency_sampling,
     )
-    diff_voltage = 0.001
     target_Vrms = VdBu_to_Vrms(dBu)
 
     table = Table(
@@ -610,9 +739,6 @@ def config_set_level(
         Column("Rms Value [V]", justify="right"),
         Column("Diff Vpp [V]", justify="right"),
         Column("Gain [dB]", justify="right"),
-        Column("Proportional Term [V]", justify="right"),
-        Column("Integral Term [V]", justify="right"),
-        Column("Differential Term [V]", justify="right"),
         Column("Error [%]", justify="right"),
         title="[blue]Configuration.",
     )
@@ -716,21 +842,8 @@ def config_set_level(
 
     progress_list_task.update(task_sampling, task="Searching for Voltage offset")
 
-    Vpp_found: bool = False
-    iteration: int = 0
-    pid = PidController(
-        set_point=target_Vrms,
-        controller_gain=1.5,
-        tau_integral=1,
-        tau_derivative=0.5,
-        controller_output_zero=voltage_amplitude_start,
-    )
-
     gain_dB_list: list[float] = []
 
-    k_tot = 0.2745
-    gain_apparato: float | None = None
-
     nidaq = Ni9223(
         config.sampling.number_of_samples,
         Fs,
@@ -741,110 +854,74 @@ def config_set_level(
     nidaq.add_ai_channel(["cDAQ9189-1CDBE0AMod5/ai1"])
     nidaq.set_sampling_clock_timing(Fs)
 
-    while not Vpp_found:
+    def measure(amplitude: float) -> float | None:
+        nonlocal voltage_amplitude
+
+        # Apply new Amplitude
+        if amplitude != voltage_amplitude:
+            voltage_amplitude = amplitude
+            SCPI.exec_commands(
+                generator,
+                [SCPI.set_source_voltage_amplitude(1, voltage_amplitude)],
+            )
+            sleep(0.4)
+
         # GET MEASUREMENTS
         nidaq.task_start()
         voltages = nidaq.read_single_voltages()
         nidaq.task_stop()
-        voltages_sampling = VoltageSampling.from_list(voltages, frequency, Fs)
-        result: RMSResult = RMS.rms_v2(
+        voltages_sampling = VoltageSamplingV3.from_list(voltages, frequency, Fs)
+        result: RMSResult | None = RMS.rms_v2(
             voltages_sampling,
         )
 
-        if result.rms is not None:
-            if not gain_apparato:
-                gain_apparato = result.rms / voltage_amplitude_start
-                pid.controller_gain = k_tot / gain_apparato
-
-            pid.add_process_variable(result.rms)
-
-            error: float = target_Vrms - result.rms
-
-            pid.add_error(TimedValue(error))
-
-            error_percentage: float = percentage_error(
-                exact=target_Vrms,
-                approx=result.rms,
-            )
-
-            gain_dB: float = calculate_gain_db(
-                result.rms,
-                Vpp_to_Vrms(voltage_amplitude),
-            )
-
-            gain_dB_list.append(gain_dB)
-
-            table.add_row(
-                f"{iteration}",
-                f"{target_Vrms:.8f}",
-                f"{voltage_amplitude:.8f}",
-                f"{result.rms:.8f}",
-                "[{}]{:+.8f}[/]".format(
-                    "red" if error > diff_voltage else "green",
-                    error,
-                ),
-                "[{}]{:+.8f}[/]".format(
-                    "red" if gain_dB < 0 else "green",
-                    gain_dB,
-                ),
-                f"{pid.term.proportional[-1]:+.8f}",
-                f"{pid.term.integral[-1]:+.8f}",
-                f"{pid.term.derivative[-1]:+.8f}",
-                "[{}]{:+.5%}[/]".format(
-                    "red" if error > diff_voltage else "green",
-                    error_percentage,
-                ),
-            )
-
-            if pid.check_limit_diff(error, diff_voltage):
-                Vpp_found = True
-
-                table_result = Table(
-                    "Gain Apparato",
-                    "Kc",
-                    "tauI",
-                    "tauD",
-                    "steps",
-                )
-
-                table_result.add_row(
-                    f"{result.rms / voltage_amplitude:.8f}",
-                    f"{pid.controller_gain}",
-                    f"{pid.tau_integral}",
-                    f"{pid.tau_derivative}",
-                    f"{iteration}",
-                )
-
-                console.print(Panel(table_result))
-
-            else:
-                pid.term.add_proportional(pid.proportional_term)
-                pid.term.add_integral(pid.integral_term)
-                pid.term.add_derivative(pid.derivative_term)
-
-                output_variable: float = pid.output_process
-
-                pid.add_process_output(output_variable)
+        if result is None or result.rms is None:
+            console.print("[SAMPLING] - Error retrieving rms_value.")
+            return None
 
-                voltage_amplitude = output_variable
+        error: float = target_Vrms - result.rms
 
-                # Apply new Amplitude
+        error_percentage: float = percentage_error(
+            exact=target_Vrms,
+            approx=result.rms,
+        )
 
-                if voltage_amplitude > 11:
-                    voltage_amplitude = 11
-                    console.print("[ERROR] - Voltage Input > 11.", style="error")
+        gain_dB: float = calculate_gain_db(
+            result.rms,
+            Vpp_to_Vrms(voltage_amplitude),
+        )
 
-                generator_configs: list = [
-                    SCPI.set_source_voltage_amplitude(1, voltage_amplitude),
-                ]
+        gain_dB_list.append(gain_dB)
 
-                SCPI.exec_commands(generator, generator_configs)
+        table.add_row(
+            f"{len(gain_dB_list) - 1}",
+            f"{target_Vrms:.8f}",
+            f"{voltage_amplitude:.8f}",
+            f"{result.rms:.8f}",
+            "[{}]{:+.8f}[/]".format(
+                "red" if abs(error) > tolerance else "green",
+                error,
+            ),
+            "[{}]{:+.8f}[/]".format(
+                "red" if gain_dB < 0 else "green",
+                gain_dB,
+            ),
+            "[{}]{:+.5%}[/]".format(
+                "red" if abs(error) > tolerance else "green",
+                error_percentage,
+            ),
+        )
 
-                sleep(0.4)
+        return result.rms
 
-                iteration += 1
-        else:
-            console.print("[SAMPLING] - Error retrieving rms_value.")
+    set_level = solve_set_level(
+        measure,
+        target_rms=target_Vrms,
+        amplitude_start=voltage_amplitude_start,
+        tolerance=tolerance,
+        amplitude_max=11,
+        max_iterations=max_iterations,
+    )
 
     nidaq.task_close()
 
@@ -857,71 +934,40 @@ def config_set_level(
 
     live.stop()
 
-    console.print(Panel(f"Generator Voltage to obtain +4dBu: {voltage_amplitude}"))
+    if set_level is None:
+        return
+
+    _print_set_level_result(set_level)
 
-    sp = np.full(iteration, target_Vrms)
+    console.print(Panel(f"Generator Voltage to obtain +4dBu: {set_level.amplitude}"))
 
     plt.figure(1, figsize=(16, 9))
 
-    plt.subplot(2, 2, 1)
+    plt.subplot(2, 1, 1)
     plt.plot(
-        sp,
+        np.full(set_level.iterations, target_Vrms),
         "k-",
         linewidth=0.5,
         label="Setpoint (SP)",
     )
     plt.plot(
-        pid.process_variable_list,
+        [step.rms for step in set_level.steps],
         "r:",
+        marker="o",
         linewidth=1,
         label="Process Variable (PV)",
     )
     plt.grid(True)
-    plt.legend(["Set Point (SP)", "Process Variable (PV)"], loc="best")
-
-    plt.subplot(2, 2, 2)
-    plt.plot(
-        pid.term.proportional,
-        color="g",
-        linestyle="-",
-        linewidth=2,
-        label=r"Proportional = $K_c \; e(t)$",
-    )
-    plt.plot(
-        pid.term.integral,
-        color="b",
-        linestyle="-",
-        linewidth=2,
-        label=r"Integral = $\frac{K_c}{\tau_I} \int_{i=0}^{n_t} e(t) \; dt $",
-    )
-    plt.plot(
-        pid.term.derivative,
-        color="r",
-        linestyle="--",
-        linewidth=2,
-        label=r"Derivative = $-K_c \tau_D \frac{d(PV)}{dt}$",
-    )
-    plt.grid(True)
     plt.legend(loc="best")
 
-    plt.subplot(2, 2, 3)
+    plt.subplot(2, 1, 2)
     plt.plot(
-        [error.value for error in pid.error_list],
-        color="m",
-        linestyle="--",
-        linewidth=2,
-        label="Error (e=SP-PV)",
-    )
-    plt.grid(True)
-    plt.legend(loc="best")
-
-    plt.subplot(2, 2, 4)
-    plt.plot(
-        pid.process_output_list,
+        [step.amplitude for step in set_level.steps],
         color="b",
         linestyle="--",
+        marker="o",
         linewidth=2,
-        label="Controller Output (OP)",
+        label="Generator Amplitude [Vpp]",
     )
     plt.grid(True)
     plt.legend(loc="best")
@@ -936,21 +982,24 @@ def config_set_level(
 class DataSetLevel:
     volts: float
     dB: float
+    iterations: int | None = None
 
     def __str__(self) -> str:
-        return f"[DataSetLevel]: volts: {self.volts}, dB: {self.dB}"
+        return f"[DataSetLevel]: volts: {self.volts}, dB: {self.dB}, iterations: {self.iterations}"
 
     def __rich_repr__(self):
         yield "volts", self.volts
         yield "dB", self.dB
+        yield "iterations", self.iterations
 
 
 def config_set_level_v2(
     dBu: float,
     config: SweepConfig,
+    streaming: bool = False,
+    tolerance: float = 0.0005,
+    max_iterations: int = 8,
 ):
-    data_set_level: DataSetLevel | None = None
-
     voltage_amplitude_start: float = 0.01
     voltage_amplitude = voltage_amplitude_start
     frequency = 1000
@@ -958,7 +1007,6 @@ def config_set_level_v2(
         frequency * config.sampling.Fs_multiplier,
         max_value=config.nidaq.max_frequency_sampling,
     )
-    diff_voltage = 0.0005
     target_Vrms = VdBu_to_Vrms(dBu)
     interpolation_rate_rms: float = 50
 
@@ -969,9 +1017,6 @@ def config_set_level_v2(
         Column("Rms Value [V]", justify="right"),
         Column("Diff Vpp [V]", justify="right"),
         Column("Gain [dB]", justify="right"),
-        Column("Proportional Term [V]", justify="right"),
-        Column("Integral Term [V]", justify="right"),
-        Column("Differential Term [V]", justify="right"),
         Column("Error [%]", justify="right"),
         title="[blue]Configuration.",
     )
@@ -1083,23 +1128,8 @@ def config_set_level_v2(
 
     progress_list_task.update(task_sampling, task="Searching for Voltage offset")
 
-    Vpp_found: bool = False
-    iteration: int = 0
-    pid = PidController(
-        set_point=target_Vrms,
-        controller_gain=1.5,
-        tau_integral=1,
-        tau_derivative=0.5,
-        controller_output_zero=voltage_amplitude_start,
-    )
-
     gain_dB_list: list[float] = []
 
-    k_tot = 0.2745
-    gain_apparato: float | None = None
-
-    level_offset: float | None = None
-
     nidaq = Ni9223(
         config.sampling.number_of_samples,
         Fs,
@@ -1110,22 +1140,43 @@ def config_set_level_v2(
     nidaq.add_ai_channel([ch.name for ch in config.nidaq.channels])
     nidaq.set_sampling_clock_timing(Fs)
 
-    while not Vpp_found:
+    if streaming:
+        nidaq.start_streaming(Fs)
+
+    def measure(amplitude: float) -> float | None:
+        nonlocal voltage_amplitude
+
+        # Apply new Amplitude
+        if amplitude != voltage_amplitude:
+            voltage_amplitude = amplitude
+            SCPI.exec_commands(
+                generator,
+                [SCPI.set_source_voltage_amplitude(1, voltage_amplitude)],
+            )
+            sleep(0.4)
+
         # GET MEASUREMENTS
-        nidaq.task_start()
+        if not streaming:
+            nidaq.task_start()
 
         isVoltagesRetrievingOk = False
         while isVoltagesRetrievingOk is not True:
-            voltages = nidaq.read_multi_voltages()
+            voltages = (
+                nidaq.read_multi_voltages_after()
+                if streaming
+                else nidaq.read_multi_voltages()
+            )
             if voltages is None:
                 console.log("[ERROR]: Error in retrieving Samples.")
             else:
                 isVoltagesRetrievingOk = True
 
-        nidaq.task_stop()
+        if not streaming:
+            nidaq.task_stop()
 
-        voltages_sampling_ref = VoltageSampling.from_list(voltages[0], frequency, Fs)
-        voltages_sampling_dut = VoltageSampling.from_list(voltages[1], frequency, Fs)
+        sampling = VoltageSamplingV3(voltages, frequency, Fs)
+        voltages_sampling_ref = sampling.channel(0)
+        voltages_sampling_dut = sampling.channel(1)
 
         rms_ref: RMSResult = RMS.rms_v2(
             voltages_sampling_ref,
@@ -1138,103 +1189,53 @@ def config_set_level_v2(
             trim=True,
         )
 
-        if rms_ref is None or rms_dut is None:
+        if rms_ref is None or rms_dut is None or rms_dut.rms is None:
             console.log("[ERROR]: rms_not calculated")
+            return None
 
-        if rms_dut.rms is not None:
-            if not gain_apparato:
-                gain_apparato = rms_dut.rms / voltage_amplitude_start
-                pid.controller_gain = k_tot / gain_apparato
-
-            pid.add_process_variable(rms_dut.rms)
-
-            error: float = target_Vrms - rms_dut.rms
-
-            pid.add_error(TimedValue(error))
-
-            error_percentage: float = percentage_error(
-                exact=target_Vrms,
-                approx=rms_dut.rms,
-            )
-
-            gain_dB: float = calculate_gain_db(rms_ref.rms, rms_dut.rms)
-
-            gain_dB_list.append(gain_dB)
+        error: float = target_Vrms - rms_dut.rms
 
-            table.add_row(
-                f"{iteration}",
-                f"{target_Vrms:.8f}",
-                f"{voltage_amplitude:.8f}",
-                f"{rms_dut.rms:.8f}",
-                "[{}]{:+.8f}[/]".format(
-                    "red" if error > diff_voltage else "green",
-                    error,
-                ),
-                "[{}]{:+.8f}[/]".format(
-                    "red" if gain_dB < 0 else "green",
-                    gain_dB,
-                ),
-                f"{pid.term.proportional[-1]:+.8f}",
-                f"{pid.term.integral[-1]:+.8f}",
-                f"{pid.term.derivative[-1]:+.8f}",
-                "[{}]{:+.5%}[/]".format(
-                    "red" if error > diff_voltage else "green",
-                    error_percentage,
-                ),
-            )
-
-            if pid.check_limit_diff(error, diff_voltage):
-                Vpp_found = True
-                level_offset = voltage_amplitude
-
-                table_result = Table(
-                    "Gain Apparato",
-                    "Kc",
-                    "tauI",
-                    "tauD",
-                    "steps",
-                )
-
-                table_result.add_row(
-                    f"{rms_dut.rms / voltage_amplitude:.8f}",
-                    f"{pid.controller_gain}",
-                    f"{pid.tau_integral}",
-                    f"{pid.tau_derivative}",
-                    f"{iteration}",
-                )
-
-                console.print(Panel(table_result))
-
-                data_set_level = DataSetLevel(volts=level_offset, dB=gain_dB)
-
-            else:
-                pid.term.add_proportional(pid.proportional_term)
-                pid.term.add_integral(pid.integral_term)
-                pid.term.add_derivative(pid.derivative_term)
-
-                output_variable: float = pid.output_process
-
-                pid.add_process_output(output_variable)
+        error_percentage: float = percentage_error(
+            exact=target_Vrms,
+            approx=rms_dut.rms,
+        )
 
-                voltage_amplitude = output_variable
+        gain_dB: float = calculate_gain_db(rms_ref.rms, rms_dut.rms)
 
-                # Apply new Amplitude
+        gain_dB_list.append(gain_dB)
 
-                if voltage_amplitude > 11:
-                    voltage_amplitude = 11
-                    console.print("[ERROR] - Voltage Input > 11.", style="error")
+        table.add_row(
+            f"{len(gain_dB_list) - 1}",
+            f"{target_Vrms:.8f}",
+            f"{voltage_amplitude:.8f}",
+            f"{rms_dut.rms:.8f}",
+            "[{}]{:+.8f}[/]".format(
+                "red" if abs(error) > tolerance else "green",
+                error,
+            ),
+            "[{}]{:+.8f}[/]".format(
+                "red" if gain_dB < 0 else "green",
+                gain_dB,
+            ),
+            "[{}]{:+.5%}[/]".format(
+                "red" if abs(error) > tolerance else "green",
+                error_percentage,
+            ),
+        )
 
-                generator_configs: list = [
-                    SCPI.set_source_voltage_amplitude(1, voltage_amplitude),
-                ]
+        return rms_dut.rms
 
-                SCPI.exec_commands(generator, generator_configs)
+    set_level = solve_set_level(
+        measure,
+        target_rms=target_Vrms,
+        amplitude_start=voltage_amplitude_start,
+        tolerance=tolerance,
+        amplitude_max=11,
+        max_iterations=max_iterations,
+    )
 
-                sleep(0.4)
-
-                iteration += 1
-        else:
-            console.print("[SAMPLING] - Error retrieving rms_value.")
+    if streaming:
+        nidaq.stop_streaming()
 
     nidaq.task_close()
     live.stop()
@@ -1246,9 +1247,16 @@ def config_set_level_v2(
     SCPI.exec_commands(generator, generator_ac_curves)
     generator.close()
 
-    np.full(iteration, target_Vrms)
+    if set_level is None:
+        return None
+
+    _print_set_level_result(set_level)
 
-    return data_set_level
+    return DataSetLevel(
+        volts=set_level.amplitude,
+        dB=gain_dB_list[set_level.index],
+        iterations=set_level.iterations,
+    )
 
 
 def plot_config_set_level_v2(
@@ -1327,9 +1335,10 @@ def plot_config_set_level_v2(
 def config_balanced_set_level_v2(
     dBu: float,
     config: SweepConfig,
+    streaming: bool = False,
+    tolerance: float = 0.0005,
+    max_iterations: int = 8,
 ) -> DataSetLevel | None:
-    data_set_level: DataSetLevel | None = None
-
     voltage_amplitude_start: float = 0.01
     voltage_amplitude: float = voltage_amplitude_start
     frequency = 1000
@@ -1337,7 +1346,6 @@ def config_balanced_set_level_v2(
         frequency * config.sampling.Fs_multiplier,
         max_value=config.nidaq.max_frequency_sampling,
     )
-    diff_voltage = 0.0005
     target_Vrms: float = VdBu_to_Vrms(dBu)
     interpolation_rate_rms: float = 50
 
@@ -1348,9 +1356,6 @@ def config_balanced_set_level_v2(
         Column("Rms Value [V]", justify="right"),
         Column("Diff Vpp [V]", justify="right"),
         Column("Gain [dB]", justify="right"),
-        Column("Proportional Term [V]", justify="right"),
-        Column("Integral Term [V]", justify="right"),
-        Column("Differential Term [V]", justify="right"),
         Column("Error [%]", justify="right"),
         title="[blue]Configuration.",
     )
@@ -1462,23 +1467,8 @@ def config_balanced_set_level_v2(
 
     progress_list_task.update(task_sampling, task="Searching for Voltage offset")
 
-    Vpp_found: bool = False
-    iteration: int = 0
-    pid = PidController(
-        set_point=target_Vrms,
-        controller_gain=1.5,
-        tau_integral=1,
-        tau_derivative=0.2,
-        controller_output_zero=voltage_amplitude_start,
-    )
-
     gain_dB_list: list[float] = []
 
-    k_tot = 0.2745
-    gain_apparato: float | None = None
-
-    level_offset: float | None = None
-
     nidaq = Ni9223(
         config.sampling.number_of_samples,
         Fs,
@@ -1489,70 +1479,55 @@ def config_balanced_set_level_v2(
     nidaq.add_ai_channel([ch.name for ch in config.nidaq.channels])
     nidaq.set_sampling_clock_timing(Fs)
 
-    while not Vpp_found:
+    if streaming:
+        nidaq.start_streaming(Fs)
+
+    def measure(amplitude: float) -> float | None:
+        nonlocal voltage_amplitude
+
+        # Apply new Amplitude
+        if amplitude != voltage_amplitude:
+            voltage_amplitude = amplitude
+            SCPI.exec_commands(
+                generator,
+                [SCPI.set_source_voltage_amplitude(1, voltage_amplitude)],
+            )
+            sleep(0.4)
+
         # GET MEASUREMENTS
-        nidaq.task_start()
+        if not streaming:
+            nidaq.task_start()
 
         isVoltagesRetrievingOk = False
         while isVoltagesRetrievingOk is not True:
-            voltages: list[float] | None = nidaq.read_multi_voltages()
+            voltages: np.ndarray | None = (
+                nidaq.read_multi_voltages_after()
+                if streaming
+                else nidaq.read_multi_voltages()
+            )
             if voltages is None:
                 console.log("[ERROR]: Error in retrieving Samples.")
             else:
                 isVoltagesRetrievingOk = True
 
-        nidaq.task_stop()
+        if not streaming:
+            nidaq.task_stop()
 
-        voltages_sampling_ref_plus = VoltageSamplingV2.from_list(
-            voltages[0],
-            frequency,
-            Fs,
-        )
-        voltages_sampling_ref_minus = VoltageSamplingV2.from_list(
-            voltages[1],
-            frequency,
-            Fs,
-        )
-        voltages_sampling_dut_plus = VoltageSamplingV2.from_list(
-            voltages[2],
-            frequency,
-            Fs,
-        )
-        voltages_sampling_dut_minus = VoltageSamplingV2.from_list(
-            voltages[3],
+        sampling = VoltageSamplingV3(voltages, frequency, Fs)
+
+        # Balanced channels: ref+, ref-, dut+, dut-
+        voltages_sampling_ref = VoltageSamplingV3(
+            sampling.voltages[0] - sampling.voltages[1],
             frequency,
             Fs,
-        )
-
-        voltages_sampling_ref_raw: list[float] = []
-        for plus, minus in zip(
-            voltages_sampling_ref_plus.voltages,
-            voltages_sampling_ref_minus.voltages,
-            strict=True,
-        ):
-            voltages_sampling_ref_raw.append(plus - minus)
-
-        voltages_sampling_ref: VoltageSamplingV2 = VoltageSamplingV2.from_list(
-            voltages=voltages_sampling_ref_raw,
-            input_frequency=frequency,
-            sampling_frequency=Fs,
         ).augment_interpolation(
             interpolation_rate_rms,
             interpolation_mode=InterpolationKind.CUBIC,
         )
-
-        voltages_sampling_dut_raw: list[float] = []
-        for plus, minus in zip(
-            voltages_sampling_dut_plus.voltages,
-            voltages_sampling_dut_minus.voltages,
-            strict=True,
-        ):
-            voltages_sampling_dut_raw.append(plus - minus)
-
-        voltages_sampling_dut: VoltageSamplingV2 = VoltageSamplingV2.from_list(
-            voltages=voltages_sampling_dut_raw,
-            input_frequency=frequency,
-            sampling_frequency=Fs,
+        voltages_sampling_dut = VoltageSamplingV3(
+            sampling.voltages[2] - sampling.voltages[3],
+            frequency,
+            Fs,
         ).augment_interpolation(
             interpolation_rate_rms,
             interpolation_mode=InterpolationKind.CUBIC,
@@ -1571,101 +1546,51 @@ def config_balanced_set_level_v2(
 
         if rms_ref is None or rms_dut is None:
             console.log("[ERROR]: rms_not calculated")
+            return None
 
-        if rms_dut is not None:
-            if not gain_apparato:
-                gain_apparato = rms_dut / voltage_amplitude_start
-                pid.controller_gain = k_tot / gain_apparato
-
-            pid.add_process_variable(rms_dut)
+        error: float = target_Vrms - rms_dut
 
-            error: float = target_Vrms - rms_dut
-
-            pid.add_error(TimedValue(error))
-
-            error_percentage: float = percentage_error(
-                exact=target_Vrms,
-                approx=rms_dut,
-            )
-
-            gain_dB: float = calculate_gain_db(rms_ref, rms_dut)
-
-            gain_dB_list.append(gain_dB)
-
-            table.add_row(
-                f"{iteration}",
-                f"{target_Vrms:.8f}",
-                f"{voltage_amplitude:.8f}",
-                f"{rms_dut:.8f}",
-                "[{}]{:+.8f}[/]".format(
-                    "red" if error > diff_voltage else "green",
-                    error,
-                ),
-                "[{}]{:+.8f}[/]".format(
-                    "red" if gain_dB < 0 else "green",
-                    gain_dB,
-                ),
-                f"{pid.term.proportional[-1]:+.8f}",
-                f"{pid.term.integral[-1]:+.8f}",
-                f"{pid.term.derivative[-1]:+.8f}",
-                "[{}]{:+.5%}[/]".format(
-                    "red" if error > diff_voltage else "green",
-                    error_percentage,
-                ),
-            )
-
-            if pid.check_limit_diff(error, diff_voltage):
-                Vpp_found = True
-                level_offset = voltage_amplitude
-
-                table_result = Table(
-                    "Gain Apparato",
-                    "Kc",
-                    "tauI",
-                    "tauD",
-                    "steps",
-                )
-
-                table_result.add_row(
-                    f"{rms_dut / voltage_amplitude:.8f}",
-                    f"{pid.controller_gain}",
-                    f"{pid.tau_integral}",
-                    f"{pid.tau_derivative}",
-                    f"{iteration}",
-                )
-
-                console.print(Panel(table_result))
-
-                data_set_level = DataSetLevel(volts=level_offset, dB=gain_dB)
-
-            else:
-                pid.term.add_proportional(pid.proportional_term)
-                pid.term.add_integral(pid.integral_term)
-                pid.term.add_derivative(pid.derivative_term)
-
-                output_variable: float = pid.output_process
-
-                pid.add_process_output(output_variable)
-
-                voltage_amplitude = output_variable
+        error_percentage: float = percentage_error(
+            exact=target_Vrms,
+            approx=rms_dut,
+        )
 
-                # Apply new Amplitude
+        gain_dB: float = calculate_gain_db(rms_ref, rms_dut)
 
-                if voltage_amplitude > 11:
-                    voltage_amplitude = 11
-                    console.print("[ERROR] - Voltage Input > 11.", style="error")
+        gain_dB_list.append(gain_dB)
 
-                generator_configs: list = [
-                    SCPI.set_source_voltage_amplitude(1, voltage_amplitude),
-                ]
+        table.add_row(
+            f"{len(gain_dB_list) - 1}",
+            f"{target_Vrms:.8f}",
+            f"{voltage_amplitude:.8f}",
+            f"{rms_dut:.8f}",
+            "[{}]{:+.8f}[/]".format(
+                "red" if abs(error) > tolerance else "green",
+                error,
+            ),
+            "[{}]{:+.8f}[/]".format(
+                "red" if gain_dB < 0 else "green",
+                gain_dB,
+            ),
+            "[{}]{:+.5%}[/]".format(
+                "red" if abs(error) > tolerance else "green",
+                error_percentage,
+            ),
+        )
 
-                SCPI.exec_commands(generator, generator_configs)
+        return rms_dut
 
-                sleep(0.4)
+    set_level = solve_set_level(
+        measure,
+        target_rms=target_Vrms,
+        amplitude_start=voltage_amplitude_start,
+        tolerance=tolerance,
+        amplitude_max=11,
+        max_iterations=max_iterations,
+    )
 
-                iteration += 1
-        else:
-            console.print("[SAMPLING] - Error retrieving rms_value.")
+    if streaming:
+        nidaq.stop_streaming()
 
     nidaq.task_close()
     live.stop()
@@ -1677,6 +1602,13 @@ def config_balanced_set_level_v2(
     SCPI.exec_commands(generator, generator_ac_curves)
     generator.close()
 
-    np.full(iteration, target_Vrms)
+    if set_level is None:
+        return None
+
+    _print_set_level_result(set_level)
 
-    return data_set_level
+    return DataSetLevel(
+        volts=set_level.amplitude,
+        dB=gain_dB_list[set_level.index],
+        iterations=set_level.iterations,
+    )
@@ -0,0 +1,175 @@
+from pathlib import Path
+
+import click
+from pandas import DataFrame
+
+from audio.console import console
+from audio.database.db import Database, StorageBackend
+from audio.model.archive import ARCHIVE_SUFFIX, SUMMARY_COLUMNS, SweepArchive
+from audio.model.sweep import SweepData
+from audio.sweep.spool import CaptureSpool, CaptureSpoolWriter
+
+
+@click.group()
+def archive() -> None:
+    """Sweep archives, the summary, raw captures and config of a sweep in one
+    Parquet file.
+    """
+
+
+@archive.command(
+    "export",
+    help="Export a sweep directory (sweep.csv, sweep.spool) or a database sweep to an archive.",
+)
+@click.option(
+    "--home",
+    type=Path,
+    help="Sweep directory, with the `sweep.csv` and optionally the `sweep.spool`.",
+    default=None,
+)
+@click.option(
+    "--sweep-id",
+    type=int,
+    help="Database sweep, instead of a sweep directory.",
+    default=None,
+)
+@click.option(
+    "--backend",
+    type=click.Choice([b.value for b in StorageBackend]),
+    help="Database backend, the configured one if not given.",
+    default=None,
+)
+@click.option(
+    "--output",
+    "-o",
+    type=Path,
+    help="Archive file, `sweep.parquet` in the sweep directory if not given.",
+    default=None,
+)
+@click.option(
+    "--no-captures",
+    "no_captures",
+    is_flag=True,
+    help="Only the summary, without the raw captures.",
+    default=False,
+)
+def export(
+    home: Path | None,
+    sweep_id: int | None,
+    backend: str | None,
+    output: Path | None,
+    no_captures: bool,
+) -> None:
+    if (home is None) == (sweep_id is None):
+        console.log("[ARCHIVE ERROR]: give one of --home and --sweep-id.")
+        return
+
+    if home is not None:
+        sweep_data = SweepData.from_csv_file(home / "sweep.csv")
+        spool_path = home / "sweep.spool"
+
+        captures = None
+        config = {}
+        if not no_captures and spool_path.exists():
+            spool = CaptureSpool.read(spool_path)
+            captures = spool.to_tensor()
+            config = spool.config
+
+            if len(captures.lengths) != len(sweep_data.data):
+                console.log(
+                    f"[ARCHIVE ERROR]: {len(captures.lengths)} captures for {len(sweep_data.data)} sweep points, captures not archived.",
+                )
+                captures = None
+
+        sweep_archive = SweepArchive(
+            sweep_data.data,
+            sweep_data.amplitude,
+            sweep_data.config,
+            config,
+            captures,
+        )
+        output = output if output is not None else home / f"sweep{ARCHIVE_SUFFIX}"
+    else:
+        with Database.session(
+            backend=StorageBackend(backend) if backend is not None else None,
+        ) as db:
+            tensor = db.get_sweep_tensor(sweep_id)
+            sweep = db.get_sweep(sweep_id)
+
+        sweep_archive = SweepArchive(
+            DataFrame(
+                {
+                    "frequency": tensor.frequency,
+                    "Fs": tensor.sampling_frequency,
+                    "n_samples": tensor.lengths,
+                },
+            ),
+            config={
+                "sweep_id": sweep_id,
+                "name": sweep.name,
+                "date": sweep.date,
+                "comment": sweep.comment,
+            },
+            captures=None if no_captures else tensor,
+        )
+        output = output if output is not None else Path(f"sweep-{sweep_id}{ARCHIVE_SUFFIX}")
+
+    sweep_archive.save(output)
+
+    console.log(f"[ARCHIVE]: {len(sweep_archive.data)} sweep points to '{output}'")
+
+
+@archive.command(
+    "import",
+    help="Import an archive to a sweep directory, sweep.csv and sweep.spool.",
+)
+@click.argument("archive_path", type=Path)
+@click.option(
+    "--home",
+    type=Path,
+    help="Sweep directory to create.",
+    required=True,
+)
+@click.option(
+    "--export-csv",
+    "export_csv",
+    is_flag=True,
+    help="Export the raw captures to a csv per frequency too.",
+    default=False,
+)
+def import_(archive_path: Path, home: Path, export_csv: bool) -> None:
+    sweep_archive = SweepArchive.read(archive_path, captures=True)
+
+    home.mkdir(parents=True, exist_ok=True)
+    if set(SUMMARY_COLUMNS).issubset(sweep_archive.data.columns):
+        SweepData(
+            sweep_archive.data[SUMMARY_COLUMNS],
+            sweep_archive.amplitude,
+            sweep_archive.plot,
+        ).save(home / "sweep.csv")
+    else:
+        console.log("[ARCHIVE]: no sweep summary in the archive, sweep.csv not created.")
+
+    captures = sweep_archive.captures
+    if captures is not None:
+        _, n_channels, n_samples = captures.voltages.shape
+        with CaptureSpoolWriter(
+            home / "sweep.spool",
+            n_channels,
+            n_samples,
+            config=sweep_archive.config,
+        ) as spool:
+            for idx, (voltages, length) in enumerate(
+                zip(captures.voltages, captures.lengths, strict=True),
+            ):
+                spool.append(
+                    idx,
+                    captures.frequency[idx],
+                    captures.sampling_frequency[idx],
+                    voltages[:, :length],
+                )
+
+        if export_csv:
+            CaptureSpool.read(home / "sweep.spool").export_csv(home / "sweep")
+
+    console.log(f"[ARCHIVE]: {len(sweep_archive.data)} sweep points to '{home}'")
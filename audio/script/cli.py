@@ -1,6 +1,9 @@
 import click
 
 from audio.procedure.analysis import analysis, balanced_analysis
+from audio.script.archive import archive
+from audio.script.db import db
+from audio.script.ess import ess
 from audio.script.generator import generator
 from audio.script.gui import gui
 from audio.script.ni import ni
@@ -27,6 +30,7 @@ def cli() -> None:
 
 
 cli.add_command(sweep)
+cli.add_command(ess)
 cli.add_command(sweep_debug)
 cli.add_command(plot)
 cli.add_command(set_level)
@@ -61,3 +65,5 @@ cli.add_command(audio)
 
 audio.add_command(analysis)
 audio.add_command(balanced_analysis)
+audio.add_command(db)
+audio.add_command(archive)
@@ -0,0 +1,207 @@
+from pathlib import Path
+
+import click
+from rich.table import Column, Table
+
+from audio.console import console
+from audio.database import migration
+from audio.database.codec import Compression, VoltageFormat
+from audio.database.db import Database, StorageBackend
+from audio.database.sqlite import SqliteConnection
+from audio.math.rms import RMS_MODE
+
+
+@click.group()
+def db() -> None:
+    """Database maintenance commands"""
+
+
+@db.command(help="Re-encode the stored sweep voltages with the binary codec.")
+@click.option(
+    "--sweep-id",
+    type=int,
+    help="Only the voltages of this sweep.",
+    default=None,
+)
+@click.option(
+    "--format",
+    "voltage_format",
+    type=click.Choice([f.name.lower() for f in VoltageFormat]),
+    help="Sample type.",
+    default=VoltageFormat.FLOAT64.name.lower(),
+    show_default=True,
+)
+@click.option(
+    "--compression",
+    type=click.Choice([c.name.lower() for c in Compression]),
+    help="Payload compression.",
+    default=Compression.NONE.name.lower(),
+    show_default=True,
+)
+@click.option(
+    "--legacy-only",
+    is_flag=True,
+    help="Only convert the rows still stored as text.",
+    default=False,
+)
+def reencode(
+    sweep_id: int | None,
+    voltage_format: str,
+    compression: str,
+    legacy_only: bool,
+) -> None:
+    with Database.session() as database:
+        n_rows = database.reencode_sweep_voltages(
+            sweep_id=sweep_id,
+            voltage_format=VoltageFormat[voltage_format.upper()],
+            compression=Compression[compression.upper()],
+            legacy_only=legacy_only,
+        )
+
+    console.log(f"[DATA]: re-encoded {n_rows} sweep voltages rows.")
+
+
+def _same_database(source: Database, target: Database) -> bool:
+    """Both on the MySQL server, or on the same SQLite file."""
+    source_sqlite = isinstance(source.connection, SqliteConnection)
+    target_sqlite = isinstance(target.connection, SqliteConnection)
+    if source_sqlite and target_sqlite:
+        return source.connection.path.resolve() == target.connection.path.resolve()
+    return not source_sqlite and not target_sqlite
+
+
+@db.command(help="Copy a sweep between storage backends, e.g. MySQL to SQLite.")
+@click.option(
+    "--sweep-id",
+    type=int,
+    help="Sweep to copy.",
+    required=True,
+)
+@click.option(
+    "--source",
+    type=click.Choice([b.value for b in StorageBackend]),
+    help="Source backend, the configured one if not given.",
+    default=None,
+)
+@click.option(
+    "--target",
+    type=click.Choice([b.value for b in StorageBackend]),
+    help="Target backend.",
+    required=True,
+)
+@click.option(
+    "--sqlite-path",
+    type=Path,
+    help="SQLite file, the configured one if not given.",
+    default=None,
+)
+@click.option(
+    "--target-sqlite-path",
+    type=Path,
+    help="SQLite file of the target, --sqlite-path if not given.",
+    default=None,
+)
+def copy(
+    sweep_id: int,
+    source: str | None,
+    target: str,
+    sqlite_path: Path | None,
+    target_sqlite_path: Path | None,
+) -> None:
+    with Database.session(
+        backend=StorageBackend(source) if source is not None else None,
+        sqlite_path=sqlite_path,
+    ) as source_db, Database.session(
+        backend=StorageBackend(target),
+        sqlite_path=target_sqlite_path or sqlite_path,
+    ) as target_db:
+        if _same_database(source_db, target_db):
+            console.log("[COPY ERROR]: the source and target are the same database.")
+            return
+
+        target_sweep_id = source_db.copy_sweep(sweep_id, target_db)
+
+    if target_sweep_id is None:
+        console.log(f"[COPY ERROR]: sweep {sweep_id} not copied.")
+        return
+
+    console.log(f"[DATA]: sweep {sweep_id} copied to {target}, sweep_id: {target_sweep_id}")
+
+
+@db.command(help="Delete the cached analysis results, they are computed again on use.")
+@click.option(
+    "--sweep-id",
+    type=int,
+    help="Only the results of this sweep.",
+    default=None,
+)
+@click.option(
+    "--estimator",
+    type=click.Choice([mode.name for mode in (RMS_MODE.FFT, RMS_MODE.SINE_FIT)]),
+    help="Only the results of this estimator.",
+    default=None,
+)
+def invalidate(sweep_id: int | None, estimator: str | None) -> None:
+    with Database.session() as database:
+        n_rows = database.invalidate_derived_results(sweep_id, estimator)
+
+    console.log(f"[DATA]: deleted {n_rows} cached analysis results.")
+
+
+@db.command(help="Apply the pending schema migrations.")
+@click.option(
+    "--target",
+    type=int,
+    help="Last migration to apply, all of them if not given.",
+    default=None,
+)
+@click.option(
+    "--backend",
+    type=click.Choice([b.value for b in StorageBackend]),
+    help="Backend, the configured one if not given.",
+    default=None,
+)
+@click.option(
+    "--sqlite-path",
+    type=Path,
+    help="SQLite file, the configured one if not given.",
+    default=None,
+)
+@click.option(
+    "--status",
+    is_flag=True,
+    help="Only show the migrations and whether they are applied.",
+    default=False,
+)
+def migrate(
+    target: int | None,
+    backend: str | None,
+    sqlite_path: Path | None,
+    status: bool,
+) -> None:
+    with Database.session(
+        backend=StorageBackend(backend) if backend is not None else None,
+        sqlite_path=sqlite_path,
+    ) as database:
+        if not status:
+            for applied in database.migrate(target):
+                console.log(f"[MIGRATION]: {applied.version:04d} {applied.name}")
+
+        applied_versions = migration.applied_migrations(database.connection)
+        migrations = migration.load_migrations(
+            isinstance(database.connection, SqliteConnection),
+        )
+
+    table = Table(
+        Column("Version", justify="right"),
+        Column("Name"),
+        Column("Applied", justify="center"),
+        title="[blue]Schema migrations.",
+    )
+    for item in migrations:
+        table.add_row(
+            f"{item.version:04d}",
+            item.name,
+            "[green]yes[/]" if item.version in applied_versions else "[red]no[/]",
+        )
+    console.print(table)
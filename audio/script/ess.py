@@ -0,0 +1,209 @@
+import pathlib
+from datetime import datetime
+
+import click
+
+from audio.config.plot import PlotConfig
+from audio.config.rigol import RigolConfig
+from audio.config.sampling import SamplingConfig
+from audio.config.sweep import SweepConfig
+from audio.config.type import Range
+from audio.console import console
+from audio.device.backend import InstrumentBackend
+from audio.device.simulation import SimulatedBench, SimulationClock
+from audio.procedure.analysis import BALANCED_COMBINATION
+from audio.sampling import plot_from_csv
+from audio.sweep.ess import sweep_ess
+from audio.utility.timer import Timer
+
+
+@click.command(help="Audio Sweep with an exponential sine sweep.")
+@click.option(
+    "--config",
+    "config_path",
+    type=pathlib.Path,
+    help="Configuration path of the config file in json5 format.",
+    required=True,
+)
+@click.option(
+    "--home",
+    type=pathlib.Path,
+    help="Home path, where the csv and plot image will be created.",
+    default=pathlib.Path.cwd(),
+    show_default=True,
+)
+# Config Overloads
+@click.option(
+    "--amplitude_pp",
+    type=float,
+    help="The Amplitude of generated wave.",
+    default=None,
+)
+@click.option(
+    "--spd",
+    type=float,
+    help="Samples per decade of the frequency response.",
+    default=None,
+)
+@click.option(
+    "--f_range",
+    nargs=2,
+    type=(float, float),
+    help="Samples Frequency Range.",
+    default=None,
+)
+@click.option(
+    "--y_lim",
+    nargs=2,
+    type=(float, float),
+    help="Range y Plot.",
+    default=None,
+)
+@click.option(
+    "--x_lim",
+    nargs=2,
+    type=(float, float),
+    help="Range x Plot.",
+    default=None,
+)
+@click.option(
+    "--duration",
+    type=float,
+    help="Seconds of the sweep.",
+    default=2.0,
+    show_default=True,
+)
+@click.option(
+    "--ir_length",
+    type=float,
+    help="Seconds of the impulse response, 5 periods of the min frequency if not set.",
+    default=None,
+)
+@click.option(
+    "--harmonics",
+    type=int,
+    help="Highest harmonic order of the distortion.",
+    default=5,
+    show_default=True,
+)
+# Flags
+@click.option(
+    "--balanced",
+    is_flag=True,
+    help="The channels are the balanced (ref+, ref-, dut+, dut-).",
+    default=False,
+)
+@click.option(
+    "--time/--no-time",
+    help="Show elapsed time.",
+    default=False,
+)
+@click.option(
+    "--debug/--no-debug",
+    "debug",
+    help="Will print verbose messages.",
+    default=False,
+)
+@click.option(
+    "--simulate",
+    is_flag=True,
+    help="Will Simulate the Sweep.",
+    default=False,
+)
+@click.option(
+    "--simulate_speed",
+    type=float,
+    help="Speed of the simulated time, 'inf' runs the simulation without sleeping.",
+    default=1.0,
+    show_default=True,
+)
+def ess(
+    config_path: pathlib.Path,
+    home: pathlib.Path,
+    amplitude_pp: float | None,
+    spd: float | None,
+    f_range: tuple[float, float] | None,
+    y_lim: tuple[float, float] | None,
+    x_lim: tuple[float, float] | None,
+    duration: float,
+    ir_length: float | None,
+    harmonics: int,
+    balanced: bool,
+    time: bool,
+    debug: bool,
+    simulate: bool,
+    simulate_speed: float,
+):
+    HOME_PATH = home.absolute().resolve()
+
+    datetime_now = datetime.now().strftime(r"%Y-%m-%d--%H-%M-%f")
+
+    cfg = SweepConfig.from_xml_file(config_path)
+
+    if cfg is None:
+        raise Exception("Configurations not loaded correctly.")
+
+    # Override Configurations
+    cfg.rigol.override(RigolConfig(amplitude_peak_to_peak=amplitude_pp))
+
+    cfg.sampling.override(
+        SamplingConfig(
+            points_per_decade=spd,
+            frequency_min=f_range[0] if f_range else None,
+            frequency_max=f_range[1] if f_range else None,
+        ),
+    )
+
+    cfg.plot.override(
+        PlotConfig(
+            x_limit=Range.from_list(x_lim),
+            y_limit=Range.from_list(y_lim),
+        ),
+    )
+
+    if debug:
+        cfg.print_object()
+
+    home_measurements_dir_path: pathlib.Path = pathlib.Path(
+        HOME_PATH / f"{datetime_now}",
+    )
+    measurements_file_path: pathlib.Path = home_measurements_dir_path / "sweep.csv"
+    image_file_path: pathlib.Path = home_measurements_dir_path / "sweep.png"
+
+    backend: InstrumentBackend | None = None
+
+    if simulate:
+        backend = InstrumentBackend.simulated(
+            SimulatedBench(clock=SimulationClock(speed=simulate_speed)),
+        )
+
+    timer = Timer()
+
+    if time:
+        timer.start()
+
+    result = sweep_ess(
+        config=cfg,
+        sweep_home_path=home_measurements_dir_path,
+        sweep_file_path=measurements_file_path,
+        backend=backend,
+        duration=duration,
+        ir_length=ir_length,
+        n_harmonics=harmonics,
+        combination=BALANCED_COMBINATION if balanced else None,
+    )
+
+    if time:
+        time_execution = timer.stop()
+
+        console.log(f"Sweep time: {time_execution}")
+
+    if result is None:
+        return
+
+    plot_from_csv(
+        plot_config=cfg.plot,
+        measurements_file_path=measurements_file_path,
+        plot_file_path=image_file_path,
+        debug=debug,
+    )
@@ -6,7 +6,7 @@ from usbtmc import Instrument
 
 from audio.console import console
 from audio.math.rms import RMS
-from audio.model.sampling import VoltageSampling
+from audio.model.sampling import VoltageSamplingV3
 from audio.usb.usbtmc import UsbTmc
 from audio.utility import trim_value
 from audio.utility.scpi import SCPI, Bandwidth, Switch
@@ -269,8 +269,9 @@ def read_rms_v2(
     generator.close()
     nidaq.task_close()
 
-    voltages_sampling_1 = VoltageSampling.from_list(voltages[0], frequency, Fs)
-    voltages_sampling_2 = VoltageSampling.from_list(voltages[1], frequency, Fs)
+    sampling = VoltageSamplingV3(voltages, frequency, Fs)
+    voltages_sampling_1 = sampling.channel(0)
+    voltages_sampling_2 = sampling.channel(1)
 
     result_1 = RMS.rms_v2(voltages_sampling_1, trim=False)
     result_2 = RMS.rms_v2(voltages_sampling_2, trim=False)
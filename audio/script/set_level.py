@@ -8,7 +8,7 @@ from audio.console import console
 from audio.sampling import config_set_level
 
 
-@click.command(help="Gets the config Offset Through PID Controller.")
+@click.command(help="Gets the generator amplitude for +4 dBu out of the DUT.")
 @click.option(
     "--config",
     "config_path",
@@ -29,10 +29,18 @@ from audio.sampling import config_set_level
     help="Will print verbose messages.",
     default=False,
 )
+@click.option(
+    "--tolerance",
+    type=float,
+    help="Max error of the DUT output [Vrms].",
+    default=0.001,
+    show_default=True,
+)
 def set_level(
     config_path: pathlib.Path,
     home: pathlib.Path,
     debug: bool,
+    tolerance: float,
 ):
     HOME_PATH = home.absolute().resolve()
 
@@ -49,4 +57,5 @@ def set_level(
         config=config,
         plot_file_path=HOME_PATH / f"{datetime_now}.config.png",
         debug=debug,
+        tolerance=tolerance,
     )
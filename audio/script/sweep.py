@@ -6,6 +6,8 @@ import click
 from audio.config.sweep import SweepConfig
 from audio.config.type import Range
 from audio.console import console
+from audio.device.backend import InstrumentBackend
+from audio.device.simulation import SimulatedBench, SimulationClock
 from audio.docker.latex import create_latex_file
 from audio.model.set_level import SetLevel
 from audio.sampling import plot_from_csv, sampling_curve
@@ -104,12 +106,51 @@ from audio.utility.timer import Timer
     help="Will Simulate the Sweep.",
     default=False,
 )
+@click.option(
+    "--simulate_speed",
+    type=float,
+    help="Speed of the simulated time, 'inf' runs the simulation without sleeping.",
+    default=1.0,
+    show_default=True,
+)
 @click.option(
     "--pdf/--no-pdf",
     "pdf",
     help="Will skip the pdf creation.",
     default=True,
 )
+@click.option(
+    "--export-csv",
+    "export_csv",
+    is_flag=True,
+    help="Export the raw captures to a csv per frequency too.",
+    default=False,
+)
+@click.option(
+    "--settle",
+    is_flag=True,
+    help="Wait for the steady state after every frequency change instead of a fixed delay.",
+    default=False,
+)
+@click.option(
+    "--streaming",
+    is_flag=True,
+    help="Keep the acquisition running and read every capture from the stream.",
+    default=False,
+)
+@click.option(
+    "--dut",
+    type=str,
+    help="DUT identifier, the settle times are learned per DUT.",
+    default=None,
+)
+@click.option(
+    "--settle-reset",
+    "settle_reset",
+    is_flag=True,
+    help="Forget the settle times learned for the DUT.",
+    default=False,
+)
 def sweep(
     config_path: pathlib.Path,
     home: pathlib.Path,
@@ -125,7 +166,13 @@ def sweep(
     time: bool,
     debug: bool,
     simulate: bool,
+    simulate_speed: float,
     pdf: bool,
+    export_csv: bool,
+    settle: bool,
+    streaming: bool,
+    dut: str | None,
+    settle_reset: bool,
 ):
     HOME_PATH = home.absolute().resolve()
 
@@ -184,36 +231,47 @@ def sweep(
     measurements_file_path: pathlib.Path = home_measurements_dir_path / "sweep.csv"
     image_file_path: pathlib.Path = home_measurements_dir_path / "sweep.png"
 
-    if not simulate:
-        timer = Timer()
-
-        if time:
-            timer.start()
+    backend: InstrumentBackend | None = None
 
-        sampling_curve(
-            config=cfg,
-            sweep_home_path=home_measurements_dir_path,
-            sweep_file_path=measurements_file_path,
-            debug=debug,
+    if simulate:
+        backend = InstrumentBackend.simulated(
+            SimulatedBench(clock=SimulationClock(speed=simulate_speed)),
         )
 
-        if time:
-            time_execution = timer.stop()
+    timer = Timer()
+
+    if time:
+        timer.start()
+
+    sampling_curve(
+        config=cfg,
+        sweep_home_path=home_measurements_dir_path,
+        sweep_file_path=measurements_file_path,
+        debug=debug,
+        backend=backend,
+        export_csv=export_csv,
+        settle=settle,
+        streaming=streaming,
+        dut=dut,
+        settle_reset=settle_reset,
+    )
+
+    if time:
+        time_execution = timer.stop()
+
+        console.log(f"Sweep time: {time_execution}")
 
-            console.log(f"Sweep time: {time_execution}")
+    plot_from_csv(
+        plot_config=cfg.plot,
+        measurements_file_path=measurements_file_path,
+        plot_file_path=image_file_path,
+        debug=debug,
+    )
 
-    if not simulate:
-        plot_from_csv(
-            plot_config=cfg.plot,
-            measurements_file_path=measurements_file_path,
-            plot_file_path=image_file_path,
+    if pdf:
+        create_latex_file(
+            image_file_path,
+            home=HOME_PATH,
+            latex_home=home_measurements_dir_path,
             debug=debug,
         )
-
-        if pdf:
-            create_latex_file(
-                image_file_path,
-                home=HOME_PATH,
-                latex_home=home_measurements_dir_path,
-                debug=debug,
-            )
@@ -12,6 +12,7 @@ from audio.math import rms_full_cycle, trim_sin_zero_offset
 from audio.math.interpolation import InterpolationKind, interpolation_model
 from audio.math.rms import RMS
 from audio.model.sweep import SingleSweepData
+from audio.sweep.spool import CaptureSpool
 from audio.utility import get_subfolder
 
 
@@ -41,19 +42,22 @@ def sweep_debug(
     sweep_dir: pathlib.Path | None,
     iteration_rms: bool,
 ):
-    measurement_dir: pathlib.Path = pathlib.Path()
-
-    if sweep_dir is not None:
-        measurement_dir = sweep_dir / "sweep"
-
-    else:
+    if sweep_dir is None:
         measurement_dirs: list[pathlib.Path] = get_subfolder(home)
 
         if len(measurement_dirs) > 0:
-            measurement_dir = measurement_dirs[-1] / "sweep"
+            sweep_dir = measurement_dirs[-1]
         else:
             raise Exception("Cannot create the debug info from sweep csvs.")
 
+    measurement_dir: pathlib.Path = sweep_dir / "sweep"
+    spool_path: pathlib.Path = sweep_dir / "sweep.spool"
+
+    # The sweeps keep the captures in the spool, the CSVs only with `--export-csv`
+    if not measurement_dir.exists() and spool_path.exists():
+        console.print(f"Exporting the captures of '{spool_path}'.")
+        CaptureSpool.read(spool_path).export_csv(measurement_dir)
+
     if not measurement_dir.exists() or not measurement_dir.is_dir():
         raise Exception("The measurement directory doesn't exists.")
 
@@ -1,12 +1,11 @@
-import json
 import sys
 import time
+from collections.abc import Callable
 from datetime import datetime, timedelta
 from pathlib import Path
-from time import sleep
 
+import numpy as np
 import pandas as pd
-import requests
 from rich.progress import track
 from rich.table import Column, Table
 
@@ -14,13 +13,32 @@ from audio.config.sweep import SweepConfig
 from audio.console import console
 from audio.constant import APP_HOME
 from audio.database.db import Database, DbSweepConfig
+from audio.database.pocketbase import RecordRef, get_uploader
+from audio.device.backend import InstrumentBackend
 from audio.device.cdaq import Ni9223
 from audio.logging import log
-from audio.math.algorithm import LogarithmicScale
-from audio.math.rms import RMS
+from audio.math.adaptive import AdaptiveConfig, adaptive_sweep, transfer_estimate
+from audio.math.algorithm import (
+    LogarithmicScale,
+    decade_sampling,
+    decade_stream_duration,
+)
+from audio.math.batch import BALANCED_COMBINATION
+from audio.math.coherent import (
+    CoherentPoint,
+    coherent_number_of_samples_max,
+    plan_coherent_frequency,
+    plan_coherent_sweep,
+    print_coherent_plan,
+)
+from audio.math.rms import RMS, RMS_MODE
+from audio.math.sine_fit import sine_fit
 from audio.math.voltage import calculate_gain_db
-from audio.model.sampling import VoltageSampling
-from audio.usb.usbtmc import ResourceManager
+from audio.model.sampling import VoltageSamplingV3
+from audio.sweep.pipeline import PointAnalyser, SweepPipeline, SweepPoint
+from audio.sweep.settle import SettleDetector, nidaq_block_reader
+from audio.sweep.spool import CaptureSpoolWriter
+from audio.sweep.writer import DatabaseWriter
 from audio.utility import trim_value
 from audio.utility.scpi import SCPI, Bandwidth, ScpiV2, Switch
 from audio.utility.timer import Timer
@@ -67,14 +85,19 @@ class SweepAmplitudePhaseTable:
 
 def sweep_amplitude_phase(
     config: SweepConfig,
+    streaming: bool = False,
+    backend: InstrumentBackend | None = None,
 ):
     DEFAULT = {"delay": 0.2}
 
+    if backend is None:
+        backend = InstrumentBackend.hardware()
+
     db = Database()
 
     # Asks for the 2 instruments
     try:
-        rm = ResourceManager()
+        rm = backend.resource_manager()
         list_devices = rm.search_resources()
         if len(list_devices) < 1:
             raise Exception("UsbTmc devices not found.")
@@ -121,18 +144,20 @@ def sweep_amplitude_phase(
 
     frequency: float = round(config.sampling.frequency_min, 5)
 
-    nidaq = Ni9223(
+    nidaq = backend.nidaq(
         config.sampling.number_of_samples,
-        input_channel=config.nidaq.channels,
+        input_channel=[ch.name for ch in config.nidaq.channels],
     )
-    config.nidaq.max_frequency_sampling = nidaq.device.ai_max_multi_chan_rate
+    max_frequency_sampling = nidaq.device_sampling_frequency_max
+    if max_frequency_sampling is not None:
+        config.nidaq.max_frequency_sampling = max_frequency_sampling
 
     Fs = trim_value(
         frequency * config.sampling.Fs_multiplier,
         max_value=config.nidaq.max_frequency_sampling,
     )
     nidaq.create_task("Sweep Amplitude-Phase")
-    nidaq.add_ai_channel(config.nidaq.channels)
+    nidaq.add_ai_channel([ch.name for ch in config.nidaq.channels])
     nidaq.set_sampling_clock_timing(Fs)
 
     timer = Timer()
@@ -149,13 +174,16 @@ def sweep_amplitude_phase(
         "Sweep Input/Output",
     )
     db.insert_sweep_config_data(
-        sweep_id,
-        config.sampling.frequency_min,
-        config.sampling.frequency_max,
-        config.sampling.points_per_decade,
-        config.sampling.number_of_samples,
-        config.sampling.Fs_multiplier,
-        config.sampling.delay_measurements,
+        DbSweepConfig(
+            sweep_id,
+            config.rigol.amplitude_peak_to_peak,
+            config.sampling.frequency_min,
+            config.sampling.frequency_max,
+            config.sampling.points_per_decade,
+            config.sampling.number_of_samples,
+            config.sampling.Fs_multiplier,
+            config.sampling.delay_measurements,
+        ),
     )
 
     channel_ids: list[int] = []
@@ -169,47 +197,99 @@ def sweep_amplitude_phase(
         )
         channel_ids.append(_id)
 
-    for idx, frequency in track(
-        enumerate(log_scale.f_list),
-        total=len(log_scale.f_list),
-        console=console,
-    ):
-        # Sets the Frequency
-        generator.write(
-            SCPI.set_source_frequency(1, round(frequency, 5)),
-        )
+    # Ref, DUT
+    analyser = PointAnalyser([0, 1])
 
-        sleep(
-            config.sampling.delay_measurements
-            if config.sampling.delay_measurements is not None
-            else DEFAULT.get("delay"),
-        )
+    writer = DatabaseWriter(
+        sweep_id,
+        channel_ids,
+        estimator=analyser.estimator,
+        parameters_hash=analyser.parameters_hash,
+    )
+    writer.start()
 
-        # Trim number_of_samples to MAX value
-        Fs = trim_value(
-            frequency * config.sampling.Fs_multiplier,
-            max_value=config.nidaq.max_frequency_sampling,
-        )
+    pipeline = SweepPipeline([("analysis", analyser), ("store", writer.put)])
+    pipeline.start()
 
-        # GET MEASUREMENTS
-        nidaq.set_sampling_clock_timing(Fs)
-        nidaq.task_start()
-        timer.start()
-        voltages = nidaq.read_multi_voltages()
-        timer.stop()
-        nidaq.task_stop()
+    # The stages are stopped and the captures committed even if the
+    # acquisition fails
+    try:
+        for idx, frequency in track(
+            enumerate(log_scale.f_list),
+            total=len(log_scale.f_list),
+            console=console,
+        ):
+            timer_acquisition = Timer()
+            timer_acquisition.start()
 
-        frequency_id = db.insert_frequency(sweep_id, idx, frequency, Fs)
+            # Sets the Frequency
+            generator.write(
+                SCPI.set_source_frequency(1, round(frequency, 5)),
+            )
 
-        sweep_voltages_ids: list[int] = []
+            backend.sleep(
+                config.sampling.delay_measurements
+                if config.sampling.delay_measurements is not None
+                else DEFAULT.get("delay"),
+            )
 
-        for channel, voltages_sweep in zip(channel_ids, voltages, strict=False):
-            _id = db.insert_sweep_voltages(
-                frequency_id,
-                channel,
-                voltages_sweep,
+            # GET MEASUREMENTS
+            decimation = 1
+            if streaming:
+                # One clock per decade, the stream restarts only between decades
+                Fs, decimation = decade_sampling(
+                    frequency,
+                    config.sampling.Fs_multiplier,
+                    config.nidaq.max_frequency_sampling,
+                )
+                if not nidaq.streaming or nidaq.sampling_frequency != Fs:
+                    nidaq.start_streaming(
+                        Fs,
+                        buffer_duration=decade_stream_duration(
+                            nidaq.number_of_samples,
+                            Fs,
+                        ),
+                    )
+                timer.start()
+                voltages = nidaq.read_multi_voltages_after(decimation=decimation)
+                timer.stop()
+            else:
+                # Trim number_of_samples to MAX value
+                Fs = trim_value(
+                    frequency * config.sampling.Fs_multiplier,
+                    max_value=config.nidaq.max_frequency_sampling,
+                )
+                nidaq.set_sampling_clock_timing(Fs)
+                nidaq.task_start()
+                timer.start()
+                voltages = nidaq.read_multi_voltages()
+                timer.stop()
+                nidaq.task_stop()
+
+            if voltages is None:
+                console.log(f"[ACQUISITION ERROR]: freq: {frequency}, point skipped.")
+                continue
+
+            sampling_clock_rate = nidaq.sampling_clock_rate
+            if sampling_clock_rate is None:
+                sampling_clock_rate = Fs
+            sampling_clock_rate /= decimation
+
+            pipeline.put(
+                SweepPoint(idx, frequency, sampling_clock_rate, voltages),
+                busy=timer_acquisition.stop(),
             )
-            sweep_voltages_ids.append(_id)
+
+        pipeline.close()
+        writer.close()
+    finally:
+        if streaming:
+            nidaq.stop_streaming()
+
+        pipeline.close(raise_error=False)
+        writer.close(raise_error=False)
+
+    pipeline.print_statistics()
 
     generator.execute(
         [
@@ -217,20 +297,134 @@ def sweep_amplitude_phase(
             SCPI.clear(),
         ],
     )
+    return sweep_id
+
+
+def _wait_settled(
+    settle_detector: SettleDetector,
+    nidaq: Ni9223,
+    frequency: float,
+    sampling_frequency: float,
+    streaming: bool,
+) -> None:
+    result = settle_detector.wait(
+        nidaq_block_reader(nidaq, sampling_frequency, streaming),
+        frequency,
+        sampling_frequency,
+    )
+
+    if not result.settled:
+        log.warning(
+            f"[SETTLE]: freq: {frequency}, not settled after {result.time:.3f} s, measured anyway",
+        )
+
+    log.debug(
+        f"[SETTLE]: freq: {frequency}, time: {result.time:.4f} s, blocks: {result.blocks}, cached: {result.cached}",
+    )
+
+
+def _sweep_adaptive(
+    acquire: Callable[[int, float, CoherentPoint | None], SweepPoint | None],
+    config: SweepConfig,
+    log_scale: LogarithmicScale,
+    adaptive: AdaptiveConfig,
+    coherent: bool,
+    balanced: bool = False,
+) -> None:
+    """Acquire the log scale as the coarse grid of an adaptive sweep, the idx
+    of the points is the acquisition order.
+    """
+    n_points = 0
+
+    def measure(frequency: float) -> complex | None:
+        nonlocal n_points
+        point = (
+            plan_coherent_frequency(
+                frequency,
+                config.sampling,
+                config.nidaq.max_frequency_sampling,
+            )
+            if coherent
+            else None
+        )
+        sweep_point = acquire(n_points, frequency, point)
+        n_points += 1
+
+        if sweep_point is None:
+            return None
+
+        return transfer_estimate(
+            sine_fit(
+                np.asarray(sweep_point.voltages, dtype=np.float64),
+                frequency,
+                sweep_point.sampling_frequency,
+            ).phasor,
+            balanced,
+        )
+
+    result = adaptive_sweep(measure, log_scale.f_list, adaptive)
+
+    console.log(
+        f"[ADAPTIVE]: {n_points} points, {len(log_scale.f_list)} coarse, {result.passes} refinement passes",
+    )
+
+
+def _capture_spool(
+    directory: Path,
+    sweep_id: int,
+    config: SweepConfig,
+    plan: list[CoherentPoint] | None,
+) -> CaptureSpoolWriter:
+    """Spool of the raw captures of a sweep, `sweep-<sweep_id>.spool`."""
+    max_samples = max(
+        config.sampling.number_of_samples,
+        config.sampling.number_of_samples_max or 0,
+    )
+    # The coherent points out of the plan, e.g. the adaptive ones, can take
+    # up to the same limit as the planned ones
+    if plan is not None:
+        max_samples = max(max_samples, coherent_number_of_samples_max(config.sampling))
+
+    return CaptureSpoolWriter(
+        directory / f"sweep-{sweep_id}.spool",
+        n_channels=len(config.nidaq.channels),
+        max_samples=max_samples,
+        config={
+            "sweep_id": sweep_id,
+            "amplitude_peak_to_peak": config.rigol.amplitude_peak_to_peak,
+            "frequency_min": config.sampling.frequency_min,
+            "frequency_max": config.sampling.frequency_max,
+            "points_per_decade": config.sampling.points_per_decade,
+            "Fs_multiplier": config.sampling.Fs_multiplier,
+            "channels": [channel.name for channel in config.nidaq.channels],
+        },
+    )
 
 
 def sweep(
     test_id: int,
-    PB_test_id: str,
+    PB_test_id: RecordRef | None,
     config: SweepConfig,
+    streaming: bool = False,
+    backend: InstrumentBackend | None = None,
+    coherent: bool = False,
+    export_csv: bool = True,
+    settle: bool = False,
+    adaptive: AdaptiveConfig | None = None,
+    dut: str | None = None,
+    settle_reset: bool = False,
+    rms_mode: RMS_MODE = RMS_MODE.FFT,
 ):
     DEFAULT = {"delay": 0.2}
 
+    if backend is None:
+        backend = InstrumentBackend.hardware()
+
     db = Database()
 
     # Asks for the 2 instruments
     try:
-        rm = ResourceManager()
+        rm = backend.resource_manager()
         list_devices = rm.search_resources()
         if len(list_devices) < 1:
             raise Exception("UsbTmc devices not found.")
@@ -269,7 +463,17 @@ def sweep(
         ],
     )
 
-    sleep(2)
+    # The output-on transient is waited for at the first frequency
+    settle_detector: SettleDetector | None = None
+    if settle:
+        settle_detector = SettleDetector.for_sweep(
+            config,
+            backend,
+            dut=dut,
+            reset=settle_reset,
+        )
+    else:
+        backend.sleep(2)
 
     log_scale: LogarithmicScale = LogarithmicScale(
         config.sampling.frequency_min,
@@ -279,7 +483,21 @@ def sweep(
 
     frequency: float = round(config.sampling.frequency_min, 5)
 
-    nidaq = Ni9223(
+    # Coherent captures hold whole periods, the analysis needs no interpolation
+    plan: list[CoherentPoint] | None = None
+    if coherent:
+        plan = plan_coherent_sweep(
+            config.sampling,
+            config.nidaq.max_frequency_sampling,
+        )
+        print_coherent_plan(plan)
+        for point in plan:
+            if not point.coherent:
+                log.warning(
+                    f"[COHERENT]: freq: {point.frequency}, the clock divider cannot hit coherence, error: {point.error:.2e} periods",
+                )
+
+    nidaq = backend.nidaq(
         config.sampling.number_of_samples,
         input_channel=[ch.name for ch in config.nidaq.channels],
     )
@@ -312,26 +530,19 @@ def sweep(
     )
     db.insert_sweep_config_data(sweep_config_data)
 
-    PB_sweeps_id: str | None = None
-    url = "http://127.0.0.1:8090/api/collections/sweeps/records"
-    response = requests.post(
-        url,
-        json={
+    uploader = get_uploader()
+
+    PB_sweeps_id: RecordRef = uploader.create(
+        "sweeps",
+        {
             "test_id": PB_test_id,
             "name": "Sweep v2 Procedure",
             "comment": "v2 Sweep Comment",
         },
-        timeout=5,
     )
-    response_data = json.loads(response.content.decode())
-    console.log(response_data)
-    if response.status_code != 200:
-        console.log(f"[RESPONSE ERROR]: {url}")
-    else:
-        PB_sweeps_id = response_data["id"]
 
     channel_ids: list[int] = []
-    PB_channels_ids: list[str] = []
+    PB_channels_ids: list[RecordRef] = []
 
     if config.nidaq.channels is None:
         return None
@@ -345,32 +556,86 @@ def sweep(
         )
         channel_ids.append(_id)
 
-        PB_channels_id: str | None = None
-        url = "http://127.0.0.1:8090/api/collections/channels/records"
-        response = requests.post(
-            url,
-            json={
-                "sweep_id": PB_sweeps_id,
-                "idx": idx_channel,
-                "name": channel.name,
-                "comment": channel.comment,
-            },
-            timeout=5,
+        PB_channels_ids.append(
+            uploader.create(
+                "channels",
+                {
+                    "sweep_id": PB_sweeps_id,
+                    "idx": idx_channel,
+                    "name": channel.name,
+                    "comment": channel.comment,
+                },
+            ),
         )
-        response_data = json.loads(response.content.decode())
-        console.log(response_data)
-        if response.status_code != 200:
-            console.log(f"[RESPONSE ERROR]: {url}")
+
+    directory = Path(APP_HOME / "data/measurements")
+    directory.mkdir(parents=True, exist_ok=True)
+
+    # Ref, DUT
+    analyser = PointAnalyser([0, 1], rms_mode)
+
+    writer = DatabaseWriter(
+        sweep_id,
+        channel_ids,
+        estimator=analyser.estimator,
+        parameters_hash=analyser.parameters_hash,
+    )
+    writer.start()
+
+    spool = _capture_spool(directory, sweep_id, config, plan)
+
+    def store(point: SweepPoint) -> None:
+        timer_store = Timer()
+        timer_store.start()
+
+        spool.append(point.idx, point.frequency, point.sampling_frequency, point.voltages)
+        writer.put(point)
+
+        if not export_csv:
+            for PK_channel_id in PB_channels_ids:
+                uploader.create(
+                    "measurements",
+                    {
+                        "sweep_id": PB_sweeps_id,
+                        "channel_id": PK_channel_id,
+                        "idx": point.idx,
+                        "frequency": point.frequency,
+                        "sampling_frequency": point.sampling_frequency,
+                    },
+                )
         else:
-            PB_channels_id = response_data["id"]
+            for idx_channel, (PK_channel_id, voltage_data) in enumerate(
+                zip(PB_channels_ids, point.voltages, strict=True),
+            ):
+                file = directory / f"sweep-{sweep_id}-{point.idx:04d}-{idx_channel}.csv"
+                pd.DataFrame(voltage_data, columns=["voltage"]).to_csv(file)
+
+                uploader.create(
+                    "measurements",
+                    {
+                        "sweep_id": PB_sweeps_id,
+                        "channel_id": PK_channel_id,
+                        "idx": point.idx,
+                        "frequency": point.frequency,
+                        "sampling_frequency": point.sampling_frequency,
+                    },
+                    files={"samples": file},
+                )
 
-        PB_channels_ids.append(PB_channels_id)
+        time_store = timer_store.stop()
 
-    for idx_frequency, frequency in track(
-        enumerate(log_scale.f_list),
-        total=len(log_scale.f_list),
-        console=console,
-    ):
+        log.debug(
+            f"[STORE]: freq: {point.frequency}, Fs: {point.sampling_frequency}, {time_store}",
+        )
+
+    pipeline = SweepPipeline([("analysis", analyser), ("store", store)])
+    pipeline.start()
+
+    def acquire(
+        idx_frequency: int,
+        frequency: float,
+        point: CoherentPoint | None,
+    ) -> SweepPoint | None:
         time_start = timer.start()
 
         # Sets the Frequency
@@ -380,94 +645,129 @@ def sweep(
 
         time_generator_write_frequency = timer.lap()
 
-        sleep(
-            config.sampling.delay_measurements
-            if config.sampling.delay_measurements is not None
-            else DEFAULT.get("delay"),
-        )
-
-        time_sleep = timer.lap()
-
         # Trim number_of_samples to MAX value
-        Fs = trim_value(
-            frequency * config.sampling.Fs_multiplier,
-            max_value=config.nidaq.max_frequency_sampling,
-        )
+        decimation = 1
+        if point is not None:
+            # A coherent capture needs its own clock divider
+            Fs = point.sampling_frequency
+            nidaq.number_of_samples = point.number_of_samples
+        elif streaming:
+            # One clock per decade, the stream restarts only between decades
+            Fs, decimation = decade_sampling(
+                frequency,
+                config.sampling.Fs_multiplier,
+                config.nidaq.max_frequency_sampling,
+            )
+        else:
+            Fs = trim_value(
+                frequency * config.sampling.Fs_multiplier,
+                max_value=config.nidaq.max_frequency_sampling,
+            )
 
         time_trim = timer.lap()
 
-        # GET MEASUREMENTS
-        nidaq.set_sampling_clock_timing(Fs)
-        time_acquisition_set_clock = timer.lap()
-        nidaq.task_start()
-        time_acquisition_task_start = timer.lap()
-        voltages = nidaq.read_multi_voltages()
-        log.debug(f"[DATA]: {len(voltages)}, {len(voltages[0])}, {len(voltages[1])}")
-        time_acquisition_read = timer.lap()
-        nidaq.task_stop()
-        time_acquisition_task_stop = timer.lap()
+        # The settle detector reads from the same stream
+        if streaming and (not nidaq.streaming or nidaq.sampling_frequency != Fs):
+            nidaq.start_streaming(
+                Fs,
+                buffer_duration=decade_stream_duration(nidaq.number_of_samples, Fs),
+            )
 
-        frequency_id = db.insert_frequency(sweep_id, idx_frequency, frequency, Fs)
+        if settle_detector is not None:
+            _wait_settled(settle_detector, nidaq, frequency, Fs, streaming)
+        else:
+            backend.sleep(
+                config.sampling.delay_measurements
+                if config.sampling.delay_measurements is not None
+                else DEFAULT.get("delay"),
+            )
 
-        time_db_insert_frequency = timer.lap()
+        time_sleep = timer.lap()
+
+        # GET MEASUREMENTS
+        if streaming:
+            time_acquisition_set_clock = timer.lap()
+            time_acquisition_task_start = timedelta()
+            voltages = nidaq.read_multi_voltages_after(decimation=decimation)
+            time_acquisition_read = timer.lap()
+            time_acquisition_task_stop = timedelta()
+        else:
+            nidaq.set_sampling_clock_timing(Fs)
+            time_acquisition_set_clock = timer.lap()
+            nidaq.task_start()
+            time_acquisition_task_start = timer.lap()
+            voltages = nidaq.read_multi_voltages()
+            time_acquisition_read = timer.lap()
+            nidaq.task_stop()
+            time_acquisition_task_stop = timer.lap()
 
-        sweep_voltages_ids: list[int] = []
+        time_acquisition: timedelta = timer.stop()
 
-        for channel, voltages_sweep in zip(channel_ids, voltages, strict=True):
-            _id = db.insert_sweep_voltages(
-                frequency_id,
-                channel,
-                voltages_sweep,
-            )
-            sweep_voltages_ids.append(_id)
+        if voltages is None:
+            console.log(f"[ACQUISITION ERROR]: freq: {frequency}, point skipped.")
+            return None
 
-        directory = Path(APP_HOME / "data/measurements")
-        directory.mkdir(parents=True, exist_ok=True)
+        log.debug(f"[DATA]: {len(voltages)}, {len(voltages[0])}, {len(voltages[1])}")
 
-        for PK_channel_id, voltage_data in zip(
-            PB_channels_ids,
-            voltages,
-            strict=True,
-        ):
-            file = directory / f"{datetime.now().strftime('%Y-%m-%dT%H-%M-%SZ')}.csv"
-            pd.DataFrame(voltage_data, columns=["voltage"]).to_csv(file)
-
-            url = "http://127.0.0.1:8090/api/collections/measurements/records"
-            json_data = {
-                "sweep_id": PB_sweeps_id,
-                "channel_id": PK_channel_id,
-                "idx": idx_frequency,
-                "frequency": frequency,
-                "sampling_frequency": Fs,
-            }
-            console.log(json_data)
-            response = requests.post(
-                url,
-                data=json_data,
-                files={
-                    "samples": Path.open(file, "rb"),
-                },
-                timeout=5,
+        if point is not None and nidaq.sampling_clock_rate != Fs:
+            log.warning(
+                f"[COHERENT]: freq: {frequency}, Fs: {Fs} coerced to {nidaq.sampling_clock_rate}",
             )
-            response_data = json.loads(response.content.decode())
-            console.log(response_data)
-            if response.status_code != 200:
-                console.log(f"[RESPONSE ERROR]: {url}")
-            else:
-                response_data["id"]
 
-        time_db_insert_sweep_voltage = timer.lap()
+        # The DAQ coerces Fs to a divider of its timebase, the analysis and
+        # the coherence check need the rate actually used
+        sampling_clock_rate = nidaq.sampling_clock_rate
+        if sampling_clock_rate is None:
+            sampling_clock_rate = Fs
+        sampling_clock_rate /= decimation
+
+        sweep_point = SweepPoint(idx_frequency, frequency, sampling_clock_rate, voltages)
+        pipeline.put(sweep_point, busy=time_acquisition)
 
-        timer.stop()
         time_stop = time.perf_counter()
         console.log(
             f"[ACQUISITION]: freq: {frequency}, Fs: {Fs} time: {timedelta(seconds=time_stop-time_start)}",
         )
 
         log.debug(
-            f"[ACQUISITION]: freq: {frequency}, Fs: {Fs}, {time_generator_write_frequency}, {time_trim}, {time_sleep}, {time_db_insert_frequency}, {time_db_insert_sweep_voltage}, {time_acquisition_set_clock}, {time_acquisition_task_start}, {time_acquisition_read}, {time_acquisition_task_stop}",
+            f"[ACQUISITION]: freq: {frequency}, Fs: {Fs}, {time_generator_write_frequency}, {time_trim}, {time_sleep}, {time_acquisition_set_clock}, {time_acquisition_task_start}, {time_acquisition_read}, {time_acquisition_task_stop}",
         )
 
+        return sweep_point
+
+    try:
+        if adaptive is None:
+            for idx_frequency, frequency in track(
+                enumerate(log_scale.f_list),
+                total=len(log_scale.f_list),
+                console=console,
+            ):
+                acquire(
+                    idx_frequency,
+                    frequency,
+                    plan[idx_frequency] if plan is not None else None,
+                )
+        else:
+            _sweep_adaptive(acquire, config, log_scale, adaptive, coherent)
+
+        pipeline.close()
+        writer.close()
+    finally:
+        if streaming:
+            nidaq.stop_streaming()
+
+        pipeline.close(raise_error=False)
+        writer.close(raise_error=False)
+        spool.close()
+
+    # The adaptive points are measured out of order, idx is the frequency order
+    if adaptive is not None:
+        db.reindex_frequencies(sweep_id)
+
+    if settle_detector is not None:
+        settle_detector.save()
+    pipeline.print_statistics()
+
     generator.execute(
         [
             SCPI.set_output(1, Switch.OFF),
@@ -483,12 +783,16 @@ def sweep_single(
     frequency: float,
     n_sweep: int,
     config: SweepConfig,
+    backend: InstrumentBackend | None = None,
 ):
     DEFAULT = {"delay": 0.2}
 
+    if backend is None:
+        backend = InstrumentBackend.hardware()
+
     # Asks for the 2 instruments
     try:
-        rm = ResourceManager()
+        rm = backend.resource_manager()
         list_devices = rm.search_resources()
         if len(list_devices) < 1:
             raise Exception("UsbTmc devices not found.")
@@ -521,9 +825,9 @@ def sweep_single(
         ],
     )
 
-    sleep(2)
+    backend.sleep(2)
 
-    nidaq = Ni9223(
+    nidaq = backend.nidaq(
         config.sampling.number_of_samples,
         input_channel=[ch.name for ch in config.nidaq.channels],
     )
@@ -552,7 +856,7 @@ def sweep_single(
     ):
         time_start = timer.start()
 
-        sleep(
+        backend.sleep(
             config.sampling.delay_measurements
             if config.sampling.delay_measurements is not None
             else DEFAULT.get("delay"),
@@ -571,16 +875,9 @@ def sweep_single(
         timer.stop()
         time_stop = time.perf_counter()
 
-        voltage_ref = VoltageSampling.from_list(
-            voltages=voltages[0],
-            input_frequency=frequency,
-            sampling_frequency=Fs,
-        )
-        voltage_dut = VoltageSampling.from_list(
-            voltages=voltages[1],
-            input_frequency=frequency,
-            sampling_frequency=Fs,
-        )
+        sampling = VoltageSamplingV3(voltages, frequency, Fs)
+        voltage_ref = sampling.channel(0)
+        voltage_dut = sampling.channel(1)
 
         rms_result_ref = RMS.rms_v2(voltage_ref, trim=True, interpolation_rate=50)
         rms_result_dut = RMS.rms_v2(voltage_dut, trim=True, interpolation_rate=50)
@@ -642,12 +939,16 @@ def sweep_balanced_single(
     frequency: float,
     n_sweep: int,
     config: SweepConfig,
+    backend: InstrumentBackend | None = None,
 ):
     DEFAULT = {"delay": 0.2}
 
+    if backend is None:
+        backend = InstrumentBackend.hardware()
+
     # Asks for the 2 instruments
     try:
-        rm = ResourceManager()
+        rm = backend.resource_manager()
         list_devices = rm.search_resources()
         if len(list_devices) < 1:
             raise Exception("UsbTmc devices not found.")
@@ -680,9 +981,9 @@ def sweep_balanced_single(
         ],
     )
 
-    sleep(2)
+    backend.sleep(2)
 
-    nidaq = Ni9223(
+    nidaq = backend.nidaq(
         config.sampling.number_of_samples,
         input_channel=[ch.name for ch in config.nidaq.channels],
     )
@@ -711,7 +1012,7 @@ def sweep_balanced_single(
     ):
         time_start = timer.start()
 
-        sleep(
+        backend.sleep(
             config.sampling.delay_measurements
             if config.sampling.delay_measurements is not None
             else DEFAULT.get("delay"),
@@ -730,53 +1031,17 @@ def sweep_balanced_single(
         timer.stop()
         time_stop = time.perf_counter()
 
-        voltage_ref_plus = VoltageSampling.from_list(
-            voltages=voltages[0],
-            input_frequency=frequency,
-            sampling_frequency=Fs,
-        )
-        voltage_ref_minus = VoltageSampling.from_list(
-            voltages=voltages[1],
-            input_frequency=frequency,
-            sampling_frequency=Fs,
-        )
-        voltage_dut_plus = VoltageSampling.from_list(
-            voltages=voltages[2],
-            input_frequency=frequency,
-            sampling_frequency=Fs,
-        )
-        voltage_dut_minus = VoltageSampling.from_list(
-            voltages=voltages[3],
-            input_frequency=frequency,
-            sampling_frequency=Fs,
+        # Balanced channels: ref+, ref-, dut+, dut-
+        sampling = VoltageSamplingV3(voltages, frequency, Fs)
+        voltage_ref = VoltageSamplingV3(
+            sampling.voltages[0] - sampling.voltages[1],
+            frequency,
+            Fs,
         )
-
-        voltage_ref_raw: list[float] = []
-        for plus, minus in zip(
-            voltage_ref_plus.voltages,
-            voltage_ref_minus.voltages,
-            strict=True,
-        ):
-            voltage_ref_raw.append(plus - minus)
-
-        voltage_ref = VoltageSampling.from_list(
-            voltages=voltage_ref_raw,
-            input_frequency=frequency,
-            sampling_frequency=Fs,
-        )
-
-        voltage_dut_raw: list[float] = []
-        for plus, minus in zip(
-            voltage_dut_plus.voltages,
-            voltage_dut_minus.voltages,
-            strict=True,
-        ):
-            voltage_dut_raw.append(plus - minus)
-
-        voltage_dut = VoltageSampling.from_list(
-            voltages=voltage_dut_raw,
-            input_frequency=frequency,
-            sampling_frequency=Fs,
+        voltage_dut = VoltageSamplingV3(
+            sampling.voltages[2] - sampling.voltages[3],
+            frequency,
+            Fs,
         )
 
         rms_result_ref = RMS.rms_v2(voltage_ref, trim=True, interpolation_rate=50)
@@ -834,16 +1099,28 @@ def sweep_balanced_single(
 
 def sweep_balanced(
     test_id: int,
-    PB_test_id: str,
+    PB_test_id: RecordRef | None,
     config: SweepConfig,
+    streaming: bool = False,
+    backend: InstrumentBackend | None = None,
+    coherent: bool = False,
+    export_csv: bool = True,
+    settle: bool = False,
+    adaptive: AdaptiveConfig | None = None,
+    dut: str | None = None,
+    settle_reset: bool = False,
+    rms_mode: RMS_MODE = RMS_MODE.FFT,
 ):
     DEFAULT = {"delay": 0.2}
 
+    if backend is None:
+        backend = InstrumentBackend.hardware()
+
     db = Database()
 
     # Asks for the 2 instruments
     try:
-        rm = ResourceManager()
+        rm = backend.resource_manager()
         list_devices = rm.search_resources()
         if len(list_devices) < 1:
             raise Exception("UsbTmc devices not found.")
@@ -882,7 +1159,17 @@ def sweep_balanced(
         ],
     )
 
-    sleep(2)
+    # The output-on transient is waited for at the first frequency
+    settle_detector: SettleDetector | None = None
+    if settle:
+        settle_detector = SettleDetector.for_sweep(
+            config,
+            backend,
+            dut=dut,
+            reset=settle_reset,
+        )
+    else:
+        backend.sleep(2)
 
     log_scale: LogarithmicScale = LogarithmicScale(
         config.sampling.frequency_min,
@@ -892,7 +1179,21 @@ def sweep_balanced(
 
     frequency: float = round(config.sampling.frequency_min, 5)
 
-    nidaq = Ni9223(
+    # Coherent captures hold whole periods, the analysis needs no interpolation
+    plan: list[CoherentPoint] | None = None
+    if coherent:
+        plan = plan_coherent_sweep(
+            config.sampling,
+            config.nidaq.max_frequency_sampling,
+        )
+        print_coherent_plan(plan)
+        for point in plan:
+            if not point.coherent:
+                log.warning(
+                    f"[COHERENT]: freq: {point.frequency}, the clock divider cannot hit coherence, error: {point.error:.2e} periods",
+                )
+
+    nidaq = backend.nidaq(
         config.sampling.number_of_samples,
         input_channel=[ch.name for ch in config.nidaq.channels],
     )
@@ -925,26 +1226,19 @@ def sweep_balanced(
     )
     db.insert_sweep_config_data(sweep_config_data)
 
-    PB_sweeps_id: str | None = None
-    url = "http://127.0.0.1:8090/api/collections/sweeps/records"
-    response = requests.post(
-        url,
-        json={
+    uploader = get_uploader()
+
+    PB_sweeps_id: RecordRef = uploader.create(
+        "sweeps",
+        {
             "test_id": PB_test_id,
             "name": "Sweep v2 Procedure",
             "comment": "v2 Sweep Comment",
         },
-        timeout=5,
     )
-    response_data = json.loads(response.content.decode())
-    console.log(response_data)
-    if response.status_code != 200:
-        console.log(f"[RESPONSE ERROR]: {url}")
-    else:
-        PB_sweeps_id = response_data["id"]
 
     channel_ids: list[int] = []
-    PB_channels_ids: list[str] = []
+    PB_channels_ids: list[RecordRef] = []
 
     if config.nidaq.channels is None:
         return None
@@ -958,25 +1252,17 @@ def sweep_balanced(
         )
         channel_ids.append(_id)
 
-        PB_channels_id: str | None = None
-        url = "http://127.0.0.1:8090/api/collections/channels/records"
-        response = requests.post(
-            url,
-            json={
-                "sweep_id": PB_sweeps_id,
-                "idx": idx_channel,
-                "name": channel.name,
-                "comment": channel.comment,
-            },
-            timeout=5,
+        PB_channels_ids.append(
+            uploader.create(
+                "channels",
+                {
+                    "sweep_id": PB_sweeps_id,
+                    "idx": idx_channel,
+                    "name": channel.name,
+                    "comment": channel.comment,
+                },
+            ),
         )
-        response_data = json.loads(response.content.decode())
-        if response.status_code != 200:
-            console.log(f"[RESPONSE ERROR]: {url}")
-        else:
-            PB_channels_id = response_data["id"]
-
-        PB_channels_ids.append(PB_channels_id)
 
     BANDS: list[tuple[float, float, float]] = [
         (0, 10, 200),
@@ -990,11 +1276,78 @@ def sweep_balanced(
         (100_000, 1_000_000, 1_000_000),
     ]
 
-    for idx_frequency, frequency in track(
-        enumerate(log_scale.f_list),
-        total=len(log_scale.f_list),
-        console=console,
-    ):
+    directory = Path(APP_HOME / "data/measurements")
+    directory.mkdir(parents=True, exist_ok=True)
+
+    # Ref+, Ref-, DUT+, DUT-, combined to Ref = Ref+ - Ref-, DUT = DUT+ - DUT-
+    analyser = PointAnalyser([0, 1, 2, 3], rms_mode, BALANCED_COMBINATION)
+
+    writer = DatabaseWriter(
+        sweep_id,
+        channel_ids,
+        estimator=analyser.estimator,
+        parameters_hash=analyser.parameters_hash,
+    )
+    writer.start()
+
+    spool = _capture_spool(directory, sweep_id, config, plan)
+
+    def store(point: SweepPoint) -> None:
+        timer_store = Timer()
+        timer_store.start()
+
+        spool.append(point.idx, point.frequency, point.sampling_frequency, point.voltages)
+        writer.put(point)
+
+        if not export_csv:
+            for PK_channel_id in PB_channels_ids:
+                uploader.create(
+                    "measurements",
+                    {
+                        "sweep_id": PB_sweeps_id,
+                        "channel_id": PK_channel_id,
+                        "idx": point.idx,
+                        "frequency": point.frequency,
+                        "sampling_frequency": point.sampling_frequency,
+                    },
+                )
+        else:
+            for idx_channel, (PK_channel_id, voltage_data) in enumerate(
+                zip(PB_channels_ids, point.voltages, strict=True),
+            ):
+                csv_file_path = (
+                    directory / f"sweep-{sweep_id}-{point.idx:04d}-{idx_channel}.csv"
+                )
+                pd.DataFrame(voltage_data).to_csv(csv_file_path)
+
+                uploader.create(
+                    "measurements",
+                    {
+                        "sweep_id": PB_sweeps_id,
+                        "channel_id": PK_channel_id,
+                        "idx": point.idx,
+                        "frequency": point.frequency,
+                        "sampling_frequency": point.sampling_frequency,
+                    },
+                    files={"samples": csv_file_path},
+                )
+
+        time_store = timer_store.stop()
+
+        log.debug(
+            f"[STORE]: freq: {point.frequency}, Fs: {point.sampling_frequency}, {time_store}",
+        )
+
+    pipeline = SweepPipeline([("analysis", analyser), ("store", store)])
+    pipeline.start()
+
+    def acquire(
+        idx_frequency: int,
+        frequency: float,
+        point: CoherentPoint | None,
+    ) -> SweepPoint | None:
+        nonlocal Fs
+
         time_start: float = timer.start()
 
         # Sets the Frequency
@@ -1004,14 +1357,6 @@ def sweep_balanced(
 
         time_generator_write_frequency: timedelta = timer.lap()
 
-        sleep(
-            config.sampling.delay_measurements
-            if config.sampling.delay_measurements is not None
-            else DEFAULT.get("delay"),
-        )
-
-        time_sleep: timedelta = timer.lap()
-
         # Trim number_of_samples to MAX value
         new_sampling_frequency: float = 0.0
 
@@ -1023,80 +1368,127 @@ def sweep_balanced(
                     max_value=config.nidaq.max_frequency_sampling,
                 )
 
+        if point is not None:
+            new_sampling_frequency = point.sampling_frequency
+            nidaq.number_of_samples = point.number_of_samples
+
         if new_sampling_frequency == 0.0:
             sys.exit()
 
-        # GET MEASUREMENTS
-        if Fs != new_sampling_frequency:
-            Fs = new_sampling_frequency
-            nidaq.set_sampling_clock_timing(Fs)
-        time_acquisition_set_clock = timer.lap()
-        nidaq.task_start()
-        time_acquisition_task_start = timer.lap()
-        voltages = nidaq.read_multi_voltages()
-        log.debug(f"[DATA]: {len(voltages)}, {len(voltages[0])}, {len(voltages[1])}")
-        time_acquisition_read = timer.lap()
-        nidaq.task_stop()
-        time_acquisition_task_stop = timer.lap()
+        if settle_detector is not None:
+            _wait_settled(
+                settle_detector,
+                nidaq,
+                frequency,
+                new_sampling_frequency,
+                streaming,
+            )
+        else:
+            backend.sleep(
+                config.sampling.delay_measurements
+                if config.sampling.delay_measurements is not None
+                else DEFAULT.get("delay"),
+            )
 
-        frequency_id = db.insert_frequency(sweep_id, idx_frequency, frequency, Fs)
+        time_sleep: timedelta = timer.lap()
 
-        time_db_insert_frequency = timer.lap()
+        # GET MEASUREMENTS
+        if streaming:
+            # The stream is restarted only on band changes
+            if not nidaq.streaming or Fs != new_sampling_frequency:
+                Fs = new_sampling_frequency
+                nidaq.start_streaming(Fs)
+            time_acquisition_set_clock = timer.lap()
+            time_acquisition_task_start = timedelta()
+            voltages = nidaq.read_multi_voltages_after()
+            time_acquisition_read = timer.lap()
+            time_acquisition_task_stop = timedelta()
+        else:
+            if Fs != new_sampling_frequency or point is not None:
+                Fs = new_sampling_frequency
+                nidaq.set_sampling_clock_timing(Fs)
+            time_acquisition_set_clock = timer.lap()
+            nidaq.task_start()
+            time_acquisition_task_start = timer.lap()
+            voltages = nidaq.read_multi_voltages()
+            time_acquisition_read = timer.lap()
+            nidaq.task_stop()
+            time_acquisition_task_stop = timer.lap()
+
+        time_acquisition: timedelta = timer.stop()
+
+        if voltages is None:
+            console.log(f"[ACQUISITION ERROR]: freq: {frequency}, point skipped.")
+            return None
 
-        sweep_voltages_ids: list[int] = []
+        log.debug(f"[DATA]: {len(voltages)}, {len(voltages[0])}, {len(voltages[1])}")
 
-        for channel, voltages_sweep in zip(channel_ids, voltages, strict=True):
-            _id = db.insert_sweep_voltages(
-                frequency_id,
-                channel,
-                voltages_sweep,
+        if point is not None and nidaq.sampling_clock_rate != Fs:
+            log.warning(
+                f"[COHERENT]: freq: {frequency}, Fs: {Fs} coerced to {nidaq.sampling_clock_rate}",
             )
-            sweep_voltages_ids.append(_id)
-
-        directory = Path(APP_HOME / "data/measurements")
-        directory.mkdir(parents=True, exist_ok=True)
-
-        for PK_channel_id, voltage_data in zip(PB_channels_ids, voltages, strict=True):
-            csv_file_path = directory / f"{datetime.now().strftime('%Y-%m-%dT%H-%M-%SZ')}.csv"
-            pd.DataFrame(voltage_data).to_csv(csv_file_path)
-
-            url = "http://127.0.0.1:8090/api/collections/measurements/records"
-            json_data = {
-                "sweep_id": PB_sweeps_id,
-                "channel_id": PK_channel_id,
-                "idx": idx_frequency,
-                "frequency": frequency,
-                "sampling_frequency": Fs,
-            }
-            csv_file= Path.open(csv_file_path, "rb")
-            response = requests.post(
-                url,
-                data=json_data,
-                files={
-                    "samples": csv_file,
-                },
-                timeout=5,
-            )
-            csv_file.close()
-            response_data = json.loads(response.content.decode())
-            if response.status_code != 200:
-                console.log(f"[RESPONSE ERROR {response.status_code}]: {url}")
-            else:
-                response_data["id"]
 
-        time_db_insert_sweep_voltage = timer.lap()
+        # The DAQ coerces Fs to a divider of its timebase, the analysis and
+        # the coherence check need the rate actually used
+        sampling_clock_rate = nidaq.sampling_clock_rate
+        if sampling_clock_rate is None:
+            sampling_clock_rate = Fs
+
+        sweep_point = SweepPoint(idx_frequency, frequency, sampling_clock_rate, voltages)
+        pipeline.put(sweep_point, busy=time_acquisition)
 
-        timer.stop()
         time_stop = time.perf_counter()
         console.log(
             f"[ACQUISITION]: freq: {frequency}, Fs: {Fs} time: {timedelta(seconds=time_stop-time_start)}",
         )
 
         log.debug(
-            f"[ACQUISITION]: freq: {frequency}, Fs: {Fs}, {time_generator_write_frequency}, {time_sleep}, {time_db_insert_frequency}, {time_db_insert_sweep_voltage}, {time_acquisition_set_clock}, {time_acquisition_task_start}, {time_acquisition_read}, {time_acquisition_task_stop}",
+            f"[ACQUISITION]: freq: {frequency}, Fs: {Fs}, {time_generator_write_frequency}, {time_sleep}, {time_acquisition_set_clock}, {time_acquisition_task_start}, {time_acquisition_read}, {time_acquisition_task_stop}",
         )
 
-    nidaq.task_close()
+        return sweep_point
+
+    try:
+        if adaptive is None:
+            for idx_frequency, frequency in track(
+                enumerate(log_scale.f_list),
+                total=len(log_scale.f_list),
+                console=console,
+            ):
+                acquire(
+                    idx_frequency,
+                    frequency,
+                    plan[idx_frequency] if plan is not None else None,
+                )
+        else:
+            _sweep_adaptive(
+                acquire,
+                config,
+                log_scale,
+                adaptive,
+                coherent,
+                balanced=True,
+            )
+
+        pipeline.close()
+        writer.close()
+    finally:
+        if streaming:
+            nidaq.stop_streaming()
+
+        nidaq.task_close()
+
+        pipeline.close(raise_error=False)
+        writer.close(raise_error=False)
+        spool.close()
+
+    # The adaptive points are measured out of order, idx is the frequency order
+    if adaptive is not None:
+        db.reindex_frequencies(sweep_id)
+
+    if settle_detector is not None:
+        settle_detector.save()
+    pipeline.print_statistics()
 
     generator.execute(
         [
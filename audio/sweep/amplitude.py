@@ -23,8 +23,9 @@ from audio.device.cdaq import Ni9223
 from audio.math.algorithm import LogarithmicScale
 from audio.math.rms import RMS, RMSResult
 from audio.math.voltage import Vpp_to_Vrms
-from audio.model.sampling import VoltageSampling
+from audio.model.sampling import VoltageSamplingV3
 from audio.model.sweep import SweepData
+from audio.sweep.spool import CaptureSpool, CaptureSpoolWriter
 from audio.usb.usbtmc import ResourceManager, UsbTmc
 from audio.utility import trim_value
 from audio.utility.scpi import SCPI, Bandwidth, Switch
@@ -78,14 +79,18 @@ def amplitude_sweep(
     sweep_home_path: Path,
     sweep_file_path: Path,
     debug: bool = False,
+    export_csv: bool = False,
 ):
+    """Amplitude sweep, the raw captures go to `sweep_home_path/sweep.spool`
+    and, with `export_csv`, to a `sweep/<frequency>/sample.csv` per frequency.
+    """
     DEFAULT = {"delay": 0.2}
 
     HOME: Path = sweep_home_path
     HOME.mkdir(parents=True, exist_ok=True)
 
     measurements_path: Path = HOME / "sweep"
-    measurements_path.mkdir(parents=True, exist_ok=True)
+    spool_path: Path = HOME / "sweep.spool"
 
     progress_list_task = Progress(
         SpinnerColumn(),
@@ -249,7 +254,23 @@ def amplitude_sweep(
     nidaq.add_ai_channel([config.nidaq.input_channel])
     nidaq.set_sampling_clock_timing(Fs)
 
-    for frequency in log_scale.f_list:
+    spool = CaptureSpoolWriter(
+        spool_path,
+        n_channels=1,
+        max_samples=max(
+            config.sampling.number_of_samples,
+            config.sampling.number_of_samples_max or 0,
+        ),
+        config={
+            "amplitude_peak_to_peak": config.rigol.amplitude_peak_to_peak,
+            "frequency_min": config.sampling.frequency_min,
+            "frequency_max": config.sampling.frequency_max,
+            "points_per_decade": config.sampling.points_per_decade,
+            "Fs_multiplier": config.sampling.Fs_multiplier,
+        },
+    )
+
+    for idx, frequency in enumerate(log_scale.f_list):
         # Sets the Frequency
         generator.write(SCPI.set_source_frequency(1, round(frequency, 5)))
 
@@ -288,11 +309,6 @@ def amplitude_sweep(
         time = Timer()
         time.start()
 
-        sweep_frequency_path = measurements_path / f"{round(frequency, 5)}".replace(".", "_", 1)
-        sweep_frequency_path.mkdir(parents=True, exist_ok=True)
-
-        save_file_path = sweep_frequency_path / "sample.csv"
-
         # GET MEASUREMENTS
 
         nidaq.set_sampling_clock_timing(Fs)
@@ -300,7 +316,7 @@ def amplitude_sweep(
         voltages = nidaq.read_single_voltages()
         nidaq.task_stop()
 
-        voltages_sampling = VoltageSampling.from_list(
+        voltages_sampling = VoltageSamplingV3.from_list(
             voltages,
             frequency,
             Fs,
@@ -310,7 +326,7 @@ def amplitude_sweep(
             trim=True,
             interpolation_rate=10,
         )
-        voltages_sampling.save(save_file_path)
+        spool.append(idx, frequency, Fs, [voltages])
 
         elapsed_time: timedelta = time.stop()
 
@@ -354,6 +370,10 @@ def amplitude_sweep(
         else:
             console.print("[ERROR] - Error retrieving rms_value.", style="error")
 
+    spool.close()
+    if export_csv:
+        CaptureSpool.read(spool_path).export_csv(measurements_path)
+
     sampling_data = pd.DataFrame(
         list(
             zip(
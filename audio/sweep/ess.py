@@ -0,0 +1,287 @@
+from __future__ import annotations
+
+import math
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from rich.panel import Panel
+from rich.table import Column, Table
+
+from audio.config.sweep import SweepConfig
+from audio.console import console
+from audio.device.backend import InstrumentBackend
+from audio.logging import log
+from audio.math.algorithm import LogarithmicScale
+from audio.math.coherent import DAQ_TIMEBASE
+from audio.math.ess import EssResult, ExponentialSweep, ess_deconvolve
+from audio.math.voltage import Vpp_to_Vrms
+from audio.model.sweep import SweepData
+from audio.sweep.spool import CaptureSpoolWriter
+from audio.utility.scpi import SCPI, Switch
+
+# The sweep starts two octaves below the min frequency and ends an octave above
+# the max one, the deconvolution is not accurate close to the band edges
+BAND_MARGIN_LOW: float = 4.0
+BAND_MARGIN_HIGH: float = 2.0
+
+# Sampling frequency over the sweep stop frequency
+SAMPLING_RATIO: float = 5.0
+
+# Seconds captured before the sweep trigger
+PRE_ROLL: float = 0.1
+
+# Default length of the impulse response, in periods of the min frequency
+IR_PERIODS: float = 5
+
+
+def plan_exponential_sweep(
+    config: SweepConfig,
+    duration: float,
+    timebase: float = DAQ_TIMEBASE,
+) -> ExponentialSweep:
+    """Exponential sweep covering the sweep range of `config` with margins,
+    sampled at a divider of the timebase.
+    """
+    sampling_frequency = min(
+        SAMPLING_RATIO * BAND_MARGIN_HIGH * config.sampling.frequency_max,
+        config.nidaq.max_frequency_sampling,
+    )
+    sampling_frequency = timebase / math.ceil(timebase / sampling_frequency)
+
+    return ExponentialSweep(
+        frequency_start=config.sampling.frequency_min / BAND_MARGIN_LOW,
+        frequency_stop=min(
+            config.sampling.frequency_max * BAND_MARGIN_HIGH,
+            sampling_frequency / SAMPLING_RATIO,
+        ),
+        duration=duration,
+        sampling_frequency=sampling_frequency,
+    )
+
+
+def sweep_ess(
+    config: SweepConfig,
+    sweep_home_path: Path,
+    sweep_file_path: Path,
+    backend: InstrumentBackend | None = None,
+    duration: float = 2.0,
+    ir_length: float | None = None,
+    n_harmonics: int = 5,
+    combination: list[list[float]] | None = None,
+) -> EssResult | None:
+    """Exponential sine sweep, a fast alternative to the stepped sweep.
+
+    The generator plays one logarithmic sweep, see `plan_exponential_sweep`,
+    captured in one record on the reference and DUT channels. The record is
+    deconvolved in the linear impulse response and in the ones of the
+    harmonics, see `ess_deconvolve`.
+
+    Directory:
+    `sweep_home_path`
+    |-`/sweep.spool`: raw capture, see `CaptureSpool`
+    |-`/sweep.harmonics.csv`: distortion of every harmonic and THD, in dB
+    |-`sweep_file_path`: `/sweep.csv`, frequency response on the log scale
+
+    Args:
+        config (SweepConfig): Configurations, the channels are (ref, dut).
+        sweep_home_path (Path): Home for the sweep measurements.
+        sweep_file_path (Path): File path to the sweep `.csv` file.
+        backend (InstrumentBackend | None, optional): Instruments to use.
+            Defaults to the hardware ones.
+        duration (float, optional): Seconds of the sweep. Defaults to 2.0.
+        ir_length (float | None, optional): Seconds of the impulse response.
+            Defaults to `IR_PERIODS` periods of the min frequency.
+        n_harmonics (int, optional): Highest harmonic order. Defaults to 5.
+        combination (list[list[float]] | None, optional): Channels combination
+            to (ref, dut), e.g. `[[1, -1, 0, 0], [0, 0, 1, -1]]` for the
+            balanced channels. Defaults to None.
+
+    Returns:
+        EssResult | None: The impulse responses, None if the instruments are
+            not available.
+    """
+    if backend is None:
+        backend = InstrumentBackend.hardware()
+
+    if config.nidaq.channels is None or len(config.nidaq.channels) < 2:  # noqa: PLR2004
+        console.log("[ESS ERROR]: The reference and DUT channels are needed.")
+        return None
+
+    channel_names = [channel.name for channel in config.nidaq.channels]
+
+    sweep_home_path.mkdir(parents=True, exist_ok=True)
+
+    rm = backend.resource_manager()
+    list_devices = rm.search_resources()
+    if len(list_devices) < 1:
+        console.log("[ESS ERROR]: UsbTmc devices not found.")
+        return None
+    generator = rm.open_resource(list_devices[0])
+
+    if not generator.instr.connected:
+        generator.open()
+
+    exponential_sweep = plan_exponential_sweep(config, duration)
+    if ir_length is None:
+        ir_length = IR_PERIODS / config.sampling.frequency_min
+
+    nidaq = backend.nidaq(
+        round(
+            (PRE_ROLL + duration + ir_length + PRE_ROLL)
+            * exponential_sweep.sampling_frequency,
+        ),
+        input_channel=channel_names,
+    )
+    nidaq.create_task("Exponential Sweep")
+
+    spool: CaptureSpoolWriter | None = None
+    try:
+        nidaq.add_ai_channel(channel_names)
+        nidaq.set_sampling_clock_timing(exponential_sweep.sampling_frequency)
+
+        # The deconvolution needs the sample clock actually set
+        sampling_clock_rate = nidaq.sampling_clock_rate
+        if (
+            sampling_clock_rate is not None
+            and sampling_clock_rate != exponential_sweep.sampling_frequency
+        ):
+            log.warning(
+                f"[ESS]: Fs: {exponential_sweep.sampling_frequency} coerced to {sampling_clock_rate}",
+            )
+            exponential_sweep.sampling_frequency = sampling_clock_rate
+
+        _print_exponential_sweep(exponential_sweep, nidaq.number_of_samples)
+
+        generator.execute(
+            [
+                SCPI.reset(),
+                SCPI.clear(),
+                SCPI.set_output(1, Switch.OFF),
+                SCPI.set_source_voltage_amplitude(
+                    1,
+                    round(config.rigol.amplitude_peak_to_peak, 5),
+                ),
+                SCPI.set_source_sweep(1, Switch.ON),
+                SCPI.set_source_sweep_spacing(1, "LOGarithmic"),
+                SCPI.set_source_frequency_start(1, round(exponential_sweep.frequency_start, 5)),
+                SCPI.set_source_frequency_stop(1, round(exponential_sweep.frequency_stop, 5)),
+                SCPI.set_source_sweep_time(1, duration),
+                SCPI.set_source_sweep_trigger_source(1, "MANual"),
+                SCPI.set_output(1, Switch.ON),
+            ],
+        )
+
+        nidaq.task_start()
+        backend.sleep(PRE_ROLL)
+        generator.write(SCPI.source_sweep_trigger(1))
+        voltages = nidaq.read_multi_voltages()
+        nidaq.task_stop()
+
+        if voltages is None:
+            console.log("[ESS ERROR]: Acquisition failed.")
+            return None
+
+        spool = CaptureSpoolWriter(
+            sweep_home_path / "sweep.spool",
+            n_channels=len(channel_names),
+            max_samples=voltages.shape[-1],
+            config={
+                "mode": "ess",
+                "amplitude_peak_to_peak": config.rigol.amplitude_peak_to_peak,
+                "frequency_start": exponential_sweep.frequency_start,
+                "frequency_stop": exponential_sweep.frequency_stop,
+                "duration": duration,
+                "channels": channel_names,
+            },
+        )
+        spool.append(
+            0,
+            exponential_sweep.frequency_start,
+            exponential_sweep.sampling_frequency,
+            voltages,
+        )
+    finally:
+        generator.execute(
+            [
+                SCPI.set_output(1, Switch.OFF),
+                SCPI.set_source_sweep(1, Switch.OFF),
+                SCPI.clear(),
+            ],
+        )
+        nidaq.task_close()
+        if spool is not None:
+            spool.close()
+
+    recording = voltages[:2]
+    if combination is not None:
+        recording = np.asarray(combination, dtype=np.float64) @ voltages
+
+    result = ess_deconvolve(recording, exponential_sweep, ir_length, n_harmonics)
+
+    frequency = np.asarray(
+        LogarithmicScale(
+            config.sampling.frequency_min,
+            config.sampling.frequency_max,
+            config.sampling.points_per_decade,
+        ).f_list,
+        dtype=np.float64,
+    )
+    gain_dB = result.gain_dB(frequency)
+    n_samples = result.impulse_response.shape[-1]
+
+    sampling_data = pd.DataFrame(
+        {
+            "frequency": frequency,
+            "rms": Vpp_to_Vrms(config.rigol.amplitude_peak_to_peak) * 10 ** (gain_dB / 20),
+            "dBV": gain_dB,
+            "fs": exponential_sweep.sampling_frequency,
+            "oversampling_ratio": exponential_sweep.sampling_frequency / frequency,
+            "n_periods": frequency * n_samples / exponential_sweep.sampling_frequency,
+            "n_samples": n_samples,
+        },
+    )
+
+    sweep_data = SweepData(
+        sampling_data,
+        amplitude=config.rigol.amplitude_peak_to_peak,
+        config=config.plot,
+    )
+    console.print(f"[FILE - SWEEP CSV] '{sweep_file_path}'")
+    sweep_data.save(sweep_file_path)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        distortion = 20 * np.log10(result.harmonic_distortion(frequency))
+        thd = 20 * np.log10(result.thd(frequency))
+
+    harmonics_file_path = sweep_home_path / "sweep.harmonics.csv"
+    harmonics_data = pd.DataFrame({"frequency": frequency})
+    for idx, harmonic in enumerate(distortion):
+        harmonics_data[f"hd{idx + 2}"] = harmonic
+    harmonics_data["thd"] = thd
+    harmonics_data.to_csv(harmonics_file_path, index=False)
+
+    console.print(
+        Panel(
+            f'[bold][[blue]FILE[/blue] - [cyan]CSV[/cyan]][/bold] - "[bold green]{harmonics_file_path.absolute()}[/bold green]"',
+        ),
+    )
+
+    return result
+
+
+def _print_exponential_sweep(sweep: ExponentialSweep, number_of_samples: int) -> None:
+    table = Table(
+        Column(r"Frequency [Hz]", justify="right"),
+        Column(r"Duration [s]", justify="right"),
+        Column(r"Fs [Hz]", justify="right"),
+        Column(r"Number of samples", justify="right"),
+        title="[blue]Exponential Sweep.",
+    )
+    table.add_row(
+        f"{sweep.frequency_start:.5f} - {sweep.frequency_stop:.5f}",
+        f"{sweep.duration}",
+        f"{sweep.sampling_frequency:.5f}",
+        f"{number_of_samples}",
+    )
+    console.print(table)
@@ -0,0 +1,251 @@
+from __future__ import annotations
+
+from datetime import datetime
+from pathlib import Path
+
+from rich.progress import track
+
+from audio.config.sweep import SweepConfig
+from audio.console import console
+from audio.constant import APP_HOME
+from audio.database.db import Database, DbSweepConfig
+from audio.device.backend import InstrumentBackend
+from audio.logging import log
+from audio.math.batch import SweepAnalysis, analysis_parameters_hash
+from audio.math.multitone import (
+    multitone_analysis,
+    plan_multitone,
+    print_multitone_plan,
+)
+from audio.sweep.spool import CaptureSpoolWriter
+from audio.utility.scpi import SCPI, Switch
+from audio.utility.timer import Timer
+
+# Estimator of the multitone results in the derived results table
+MULTITONE_ESTIMATOR: str = "MULTITONE"
+
+# Periods of the lowest tone of a set waited after a waveform change
+SETTLE_PERIODS: float = 30
+
+
+def multitone_parameters_hash(
+    channels: list[int],
+    combination: list[list[float]] | None = None,
+) -> str:
+    """Key of the multitone results, like the one of `analyse_sweep_cached`."""
+    return analysis_parameters_hash(channels=channels, combination=combination)
+
+
+def sweep_multitone(
+    test_id: int,
+    config: SweepConfig,
+    backend: InstrumentBackend | None = None,
+    combination: list[list[float]] | None = None,
+    periods: int = 1,
+) -> int | None:
+    """Measure the sweep frequencies with multitone acquisitions.
+
+    The log scale of `config.sampling` is grouped in tone sets, see
+    `plan_multitone`. Every set is uploaded to the generator as an arbitrary
+    waveform and captured once, the gain and phase of all its tones come from
+    one FFT of every channel. The tones share `amplitude_peak_to_peak`, the DUT
+    is assumed linear: its distortion products land on the other tones.
+
+    The frequencies are stored in `audio.frequency` and the results in the
+    derived results, as `MULTITONE_ESTIMATOR`. The raw captures, one per set,
+    are only in the spool.
+
+    Args:
+        test_id (int): Test of the sweep.
+        config (SweepConfig): Sweep configuration.
+        backend (InstrumentBackend | None, optional): Instruments. Defaults to
+            the hardware.
+        combination (list[list[float]] | None, optional): Channels combination,
+            e.g. `[[1, -1, 0, 0], [0, 0, 1, -1]]` for the balanced channels.
+            Defaults to None.
+        periods (int, optional): Waveform periods captured and averaged.
+            Defaults to 1.
+
+    Returns:
+        int | None: The sweep id, None if the instruments are not available.
+    """
+    if backend is None:
+        backend = InstrumentBackend.hardware()
+
+    if config.nidaq.channels is None:
+        console.log("[MULTITONE ERROR]: No channels configured.")
+        return None
+
+    channel_names = [channel.name for channel in config.nidaq.channels]
+
+    tone_sets = plan_multitone(config.sampling, config.nidaq.max_frequency_sampling)
+    print_multitone_plan(tone_sets)
+
+    rm = backend.resource_manager()
+    list_devices = rm.search_resources()
+    if len(list_devices) < 1:
+        console.log("[MULTITONE ERROR]: UsbTmc devices not found.")
+        return None
+    generator = rm.open_resource(list_devices[0])
+
+    if not generator.instr.connected:
+        generator.open()
+
+    generator.execute(
+        [
+            SCPI.reset(),
+            SCPI.clear(),
+            SCPI.set_output(1, Switch.OFF),
+        ],
+    )
+
+    nidaq = backend.nidaq(
+        config.sampling.number_of_samples,
+        input_channel=channel_names,
+    )
+    nidaq.create_task("Multitone")
+    nidaq.add_ai_channel(channel_names)
+
+    spool: CaptureSpoolWriter | None = None
+    try:
+        db = Database()
+
+        sweep_id = db.insert_sweep(
+            test_id,
+            "Multitone Sweep",
+            datetime.now(),
+            "Sweep Input/Output, multitone",
+        )
+        db.insert_sweep_config_data(
+            DbSweepConfig(
+                sweep_id,
+                config.rigol.amplitude_peak_to_peak,
+                config.sampling.frequency_min,
+                config.sampling.frequency_max,
+                config.sampling.points_per_decade,
+                config.sampling.number_of_samples,
+                config.sampling.Fs_multiplier,
+                config.sampling.delay_measurements,
+            ),
+        )
+        for idx_channel, channel in enumerate(config.nidaq.channels):
+            db.insert_channel(
+                sweep_id=sweep_id,
+                idx=idx_channel,
+                name=channel.name,
+                comment=channel.comment,
+            )
+
+        directory = Path(APP_HOME / "data/measurements")
+        directory.mkdir(parents=True, exist_ok=True)
+
+        spool = CaptureSpoolWriter(
+            directory / f"sweep-{sweep_id}.spool",
+            n_channels=len(channel_names),
+            max_samples=max(tone_set.number_of_samples for tone_set in tone_sets) * periods,
+            config={
+                "sweep_id": sweep_id,
+                "mode": "multitone",
+                "amplitude_peak_to_peak": config.rigol.amplitude_peak_to_peak,
+                "frequency_min": config.sampling.frequency_min,
+                "frequency_max": config.sampling.frequency_max,
+                "points_per_decade": config.sampling.points_per_decade,
+                "periods": periods,
+                "channels": channel_names,
+            },
+        )
+
+        timer = Timer()
+        results: list[SweepAnalysis] = []
+        sampling_frequencies: list[float] = []
+
+        for idx_set, tone_set in track(
+            enumerate(tone_sets),
+            total=len(tone_sets),
+            console=console,
+        ):
+            timer.start()
+
+            # The waveform frequency follows the sample clock actually set
+            nidaq.set_sampling_clock_timing(tone_set.sampling_frequency)
+            sampling_clock_rate = nidaq.sampling_clock_rate
+            if sampling_clock_rate is not None and sampling_clock_rate != tone_set.sampling_frequency:
+                log.warning(
+                    f"[MULTITONE]: Fs: {tone_set.sampling_frequency} coerced to {sampling_clock_rate}",
+                )
+                tone_set = tone_set.with_sampling_frequency(sampling_clock_rate)  # noqa: PLW2901
+            nidaq.number_of_samples = tone_set.number_of_samples * periods
+
+            generator.execute(
+                [
+                    SCPI.set_source_arbitrary_data(1, tone_set.waveform()),
+                    SCPI.set_source_frequency(1, tone_set.frequency_resolution),
+                    SCPI.set_source_voltage_amplitude(
+                        1,
+                        round(config.rigol.amplitude_peak_to_peak, 5),
+                    ),
+                    SCPI.set_output(1, Switch.ON),
+                ],
+            )
+
+            backend.sleep(
+                max(
+                    config.sampling.delay_measurements or 0,
+                    SETTLE_PERIODS / tone_set.frequency[0],
+                ),
+            )
+
+            nidaq.task_start()
+            voltages = nidaq.read_multi_voltages()
+            nidaq.task_stop()
+
+            if voltages is None:
+                console.log(f"[MULTITONE ERROR]: set {idx_set}, acquisition failed, skipped.")
+                continue
+
+            spool.append(
+                idx_set,
+                tone_set.frequency_resolution,
+                tone_set.sampling_frequency,
+                voltages,
+            )
+            results.append(multitone_analysis(voltages, tone_set, combination))
+            sampling_frequencies += [tone_set.sampling_frequency] * len(tone_set.bins)
+
+            console.log(
+                f"[ACQUISITION]: {len(tone_set.bins)} tones, {tone_set.frequency[0]:.5f} - {tone_set.frequency[-1]:.5f} Hz, Fs: {tone_set.sampling_frequency}, time: {timer.stop()}",
+            )
+    finally:
+        generator.execute(
+            [
+                SCPI.set_output(1, Switch.OFF),
+                SCPI.clear(),
+            ],
+        )
+        nidaq.task_close()
+        if spool is not None:
+            spool.close()
+
+    if len(results) == 0:
+        console.log("[MULTITONE ERROR]: No tone set measured.")
+        return sweep_id
+
+    result = SweepAnalysis.concatenate(results)
+
+    frequency_ids = [
+        db.insert_frequency(sweep_id, idx, frequency, sampling_frequency, commit=False)
+        for idx, (frequency, sampling_frequency) in enumerate(
+            zip(result.frequency, sampling_frequencies, strict=True),
+        )
+    ]
+    db.connection.commit()
+
+    db.insert_derived_results(
+        sweep_id,
+        MULTITONE_ESTIMATOR,
+        multitone_parameters_hash(list(range(len(channel_names))), combination),
+        frequency_ids,
+        result,
+    )
+
+    return sweep_id
@@ -9,7 +9,8 @@ from rich.prompt import Prompt
 from audio.config.sweep import SweepConfig
 from audio.console import console
 from audio.math.algorithm import LogarithmicScale
-from audio.math.rms import RMS, RMSResult, VoltageSampling
+from audio.math.rms import RMS, RMSResult
+from audio.model.sampling import VoltageSamplingV3
 from audio.usb.usbtmc import ResourceManager
 from audio.utility import trim_value
 from audio.utility.interrupt import InterruptHandler
@@ -102,8 +103,9 @@ def phase_sweep(
             nidaq.task_start()
             voltages = nidaq.read_multi_voltages()
             nidaq.task_stop()
-            voltages_sampling_0 = VoltageSampling.from_list(voltages[0], frequency, Fs)
-            voltages_sampling_1 = VoltageSampling.from_list(voltages[1], frequency, Fs)
+            sampling = VoltageSamplingV3(voltages, frequency, Fs)
+            voltages_sampling_0 = sampling.channel(0)
+            voltages_sampling_1 = sampling.channel(1)
 
             result_0: RMSResult = RMS.rms_v2(
                 voltages_sampling_0,
@@ -116,12 +118,12 @@ def phase_sweep(
                 trim=False,
             )
 
-            voltages_sampling_0 = VoltageSampling.from_list(
+            voltages_sampling_0 = VoltageSamplingV3(
                 result_0.voltages,
                 input_frequency=frequency,
                 sampling_frequency=Fs * config.sampling.interpolation_rate,
             )
-            voltages_sampling_1 = VoltageSampling.from_list(
+            voltages_sampling_1 = VoltageSamplingV3(
                 result_1.voltages,
                 input_frequency=frequency,
                 sampling_frequency=Fs * config.sampling.interpolation_rate,
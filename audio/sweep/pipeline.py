@@ -0,0 +1,245 @@
+from __future__ import annotations
+
+import queue
+import threading
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from datetime import timedelta
+from typing import Any, Self
+
+import numpy as np
+import rich.repr
+from rich.table import Column, Table
+
+from audio.console import console
+from audio.logging import log
+from audio.math.batch import (
+    SweepAnalysis,
+    SweepTensor,
+    analyse_sweep,
+    analysis_parameters_hash,
+)
+from audio.math.rms import RMS_MODE
+from audio.utility.timer import Timer
+
+
+@rich.repr.auto
+@dataclass
+class SweepPoint:
+    idx: int
+    frequency: float
+    sampling_frequency: float
+    voltages: np.ndarray | list[list[float]]
+    analysis: SweepAnalysis | None = None
+
+
+class PointAnalyser:
+    """Stage computing the RMS and phasor of every point like
+    `analyse_sweep_cached`, the `DatabaseWriter` caches them with the same
+    parameters so the analysis after the sweep is read from the cache.
+    """
+
+    channels: list[int]
+    rms_mode: RMS_MODE
+    combination: list[list[float]] | None
+
+    def __init__(
+        self: Self,
+        channels: list[int],
+        rms_mode: RMS_MODE = RMS_MODE.FFT,
+        combination: list[list[float]] | None = None,
+    ) -> None:
+        self.channels = channels
+        self.rms_mode = rms_mode
+        self.combination = combination
+
+    @property
+    def estimator(self: Self) -> str:
+        return self.rms_mode.name
+
+    @property
+    def parameters_hash(self: Self) -> str:
+        return analysis_parameters_hash(
+            channels=self.channels,
+            combination=self.combination,
+        )
+
+    def __call__(self: Self, point: SweepPoint) -> SweepPoint:
+        voltages = np.asarray(point.voltages, dtype=np.float64)[self.channels]
+        tensor = SweepTensor.from_voltages(
+            [point.frequency],
+            [point.sampling_frequency],
+            [voltages],
+        )
+        if self.combination is not None:
+            tensor = tensor.combine(self.combination)
+
+        point.analysis = analyse_sweep(tensor, processes=1, rms_mode=self.rms_mode)
+
+        log.debug(
+            f"[ANALYSIS]: freq: {point.frequency}, gain: {point.analysis.gain_dB()[0]:.3f} dB, phase: {point.analysis.phase()[0]:.3f} deg",
+        )
+
+        return point
+
+
+@rich.repr.auto
+@dataclass
+class StageStatistics:
+    name: str
+    busy: timedelta = field(default_factory=timedelta)
+    waiting: timedelta = field(default_factory=timedelta)
+    items: int = 0
+
+    @property
+    def occupancy(self: Self) -> float:
+        total = (self.busy + self.waiting).total_seconds()
+        if total <= 0:
+            return 0.0
+        return self.busy.total_seconds() / total
+
+
+_STOP = object()
+
+
+class SweepPipeline:
+    """Run the per-point stages of a sweep while the next point is acquired.
+
+    The acquisition stays in the caller thread and hands every point to `put`.
+    Each stage runs in its own thread and returns the item for the next stage
+    (`None` drops it). Stages are connected by bounded queues, so a slow stage
+    blocks the acquisition instead of buffering the whole sweep in memory.
+    """
+
+    acquisition: StageStatistics
+    stages: list[StageStatistics]
+
+    _functions: list[Callable[[Any], Any]]
+    _queues: list[queue.Queue]
+    _threads: list[threading.Thread]
+    _error: BaseException | None
+
+    def __init__(
+        self: Self,
+        stages: list[tuple[str, Callable[[Any], Any]]],
+        queue_size: int = 2,
+    ) -> None:
+        self.acquisition = StageStatistics("acquisition")
+        self.stages = [StageStatistics(name) for name, _ in stages]
+        self._functions = [function for _, function in stages]
+        self._queues = [queue.Queue(maxsize=queue_size) for _ in stages]
+        self._threads = []
+        self._error = None
+
+    def __enter__(self: Self) -> Self:
+        self.start()
+        return self
+
+    def __exit__(self: Self, exc_type, exc_value, traceback) -> None:  # noqa: ANN001
+        self.close(raise_error=exc_type is None)
+
+    def start(self: Self) -> None:
+        for idx, stage in enumerate(self.stages):
+            thread = threading.Thread(
+                target=self._run_stage,
+                args=(idx,),
+                name=f"sweep-{stage.name}",
+                daemon=True,
+            )
+            thread.start()
+            self._threads.append(thread)
+
+    def put(self: Self, item: Any, busy: timedelta | None = None) -> None:  # noqa: ANN401
+        """Hand over an acquired item, blocking while the first queue is full.
+
+        Args:
+            item (Any): Item for the first stage.
+            busy (timedelta | None, optional): Time the caller spent acquiring
+                the item, used for the acquisition occupancy.
+        """
+        if self._error is not None:
+            raise self._error
+
+        timer = Timer()
+        timer.start()
+        self._queues[0].put(item)
+
+        self.acquisition.waiting += timer.stop()
+        self.acquisition.items += 1
+        if busy is not None:
+            self.acquisition.busy += busy
+
+    def close(self: Self, raise_error: bool = True) -> None:
+        """Wait for every queued item to go through all the stages."""
+        if len(self._threads) > 0:
+            self._queues[0].put(_STOP)
+            for thread in self._threads:
+                thread.join()
+            self._threads = []
+
+        if raise_error and self._error is not None:
+            raise self._error
+
+    def _run_stage(self: Self, idx: int) -> None:
+        stage = self.stages[idx]
+        function = self._functions[idx]
+        input_queue = self._queues[idx]
+        output_queue = self._queues[idx + 1] if idx + 1 < len(self._queues) else None
+
+        timer = Timer()
+        timer.start()
+
+        while True:
+            item = input_queue.get()
+            stage.waiting += timer.lap()
+
+            if item is _STOP:
+                if output_queue is not None:
+                    output_queue.put(_STOP)
+                break
+
+            result = None
+
+            # After an error the remaining items are only drained
+            if self._error is None:
+                try:
+                    result = function(item)
+                except Exception as e:  # noqa: BLE001
+                    console.log(f"[PIPELINE ERROR]: {stage.name}: {e}")
+                    self._error = e
+
+            stage.busy += timer.lap()
+            stage.items += 1
+
+            if output_queue is not None and result is not None:
+                output_queue.put(result)
+
+        timer.stop()
+
+    @property
+    def statistics(self: Self) -> list[StageStatistics]:
+        return [self.acquisition, *self.stages]
+
+    def print_statistics(self: Self) -> None:
+        table = Table(
+            Column("Stage", justify="left"),
+            Column("Items", justify="right"),
+            Column("Busy", justify="right"),
+            Column("Waiting", justify="right"),
+            Column("Occupancy", justify="right"),
+            title="[blue]Sweep Pipeline.",
+        )
+
+        for stage in self.statistics:
+            table.add_row(
+                stage.name,
+                f"{stage.items}",
+                f"[cyan]{stage.busy}[/]",
+                f"[cyan]{stage.waiting}[/]",
+                f"{stage.occupancy:.1%}",
+            )
+            log.info(
+                f"[PIPELINE]: {stage.name}: items: {stage.items}, busy: {stage.busy}, waiting: {stage.waiting}, occupancy: {stage.occupancy:.1%}",
+            )
+
+        console.print(table)
@@ -0,0 +1,338 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import math
+from collections.abc import Callable
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, Self
+
+import numpy as np
+import rich.repr
+
+from audio.config.sweep import SweepConfig
+from audio.console import console
+from audio.constant import APP_HOME
+from audio.math.sine_fit import sine_fit
+
+if TYPE_CHECKING:
+    from audio.device.backend import InstrumentBackend
+    from audio.device.cdaq import Ni9223
+
+# Reads the next `(channels, samples)` block, None if the read failed
+BlockReader = Callable[[int], np.ndarray | None]
+
+SETTLE_CACHE_PATH: Path = APP_HOME / "data/settle.json"
+
+
+@rich.repr.auto
+@dataclass
+class SettleConfig:
+    """Steady state criteria, between two consecutive blocks.
+
+    Attributes:
+        amplitude_tolerance: Max relative change of every channel amplitude.
+        phase_tolerance: Max change of the phase of every channel to the first
+            one, in degrees.
+        block_periods: Periods of the input frequency in a block.
+        block_samples_min: Min samples of a block.
+        block_time_min: Min seconds of a block, bounds the reads per second.
+        timeout: Max seconds to wait at a frequency, the point is measured
+            anyway after it.
+        margin: Factor applied to the cached settle times.
+    """
+
+    amplitude_tolerance: float = 1e-3
+    phase_tolerance: float = 0.1
+    block_periods: float = 4
+    block_samples_min: int = 64
+    block_time_min: float = 0.005
+    timeout: float = 2.0
+    margin: float = 1.2
+
+
+@rich.repr.auto
+@dataclass
+class SettleResult:
+    settled: bool
+    time: float
+    blocks: int
+    cached: bool = False
+
+
+def is_steady(
+    previous: np.ndarray,
+    current: np.ndarray,
+    config: SettleConfig,
+) -> bool:
+    """Whether two consecutive block phasors agree within the tolerances."""
+    amplitude_previous = np.abs(previous)
+    amplitude_current = np.abs(current)
+    if np.any(amplitude_current == 0):
+        return False
+
+    amplitude_change = np.abs(amplitude_current - amplitude_previous) / amplitude_current
+    if np.any(amplitude_change > config.amplitude_tolerance):
+        return False
+
+    if len(current) < 2:  # noqa: PLR2004
+        return True
+
+    # The absolute phase moves between blocks, the channel to channel one not
+    phase_previous = np.angle(previous[1:] * np.conj(previous[0]))
+    phase_current = np.angle(current[1:] * np.conj(current[0]))
+    phase_change = np.angle(np.exp(1j * (phase_current - phase_previous)))
+    return bool(np.all(np.degrees(np.abs(phase_change)) <= config.phase_tolerance))
+
+
+def wait_settled(
+    read_block: BlockReader,
+    frequency: float,
+    sampling_frequency: float,
+    now: Callable[[], float],
+    config: SettleConfig | None = None,
+) -> SettleResult:
+    """Read blocks until the amplitude and phase stop changing.
+
+    The settle time is the start of the first of the two matching blocks,
+    from the call. It gives up after `config.timeout`.
+    """
+    if config is None:
+        config = SettleConfig()
+
+    block_samples = max(
+        config.block_samples_min,
+        math.ceil(config.block_time_min * sampling_frequency),
+        math.ceil(config.block_periods * sampling_frequency / frequency),
+    )
+
+    time_start = now()
+    previous: np.ndarray | None = None
+    time_previous = time_start
+    blocks = 0
+
+    while True:
+        time_block = now()
+        block = read_block(block_samples)
+        blocks += 1
+
+        if block is not None:
+            # Sine fit, exact on blocks of a fractional number of periods
+            current = sine_fit(
+                np.atleast_2d(np.asarray(block, dtype=np.float64)),
+                frequency,
+                sampling_frequency,
+            ).phasor
+            if previous is not None and is_steady(previous, current, config):
+                return SettleResult(True, time_previous - time_start, blocks)
+            previous = current
+            time_previous = time_block
+
+        if now() - time_start > config.timeout:
+            return SettleResult(False, now() - time_start, blocks)
+
+
+def nidaq_block_reader(
+    nidaq: Ni9223,
+    sampling_frequency: float,
+    streaming: bool = False,
+) -> BlockReader:
+    """Blocks from the stream, or from short finite acquisitions. The task
+    timing is restored after every finite acquisition.
+    """
+
+    def read_block(number_of_samples: int) -> np.ndarray | None:
+        if streaming:
+            if not nidaq.streaming or nidaq.sampling_frequency != sampling_frequency:
+                nidaq.start_streaming(sampling_frequency)
+            return nidaq.read_multi_voltages_after(number_of_samples=number_of_samples)
+
+        number_of_samples_acquisition = nidaq.number_of_samples
+        nidaq.number_of_samples = number_of_samples
+        try:
+            nidaq.set_sampling_clock_timing(sampling_frequency)
+            nidaq.task_start()
+            voltages = nidaq.read_multi_voltages()
+            nidaq.task_stop()
+        finally:
+            nidaq.number_of_samples = number_of_samples_acquisition
+            nidaq.set_sampling_clock_timing(sampling_frequency)
+
+        return voltages
+
+    return read_block
+
+
+def settle_cache_key(config: SweepConfig, dut: str | None = None) -> str:
+    """Key of the settle times of a DUT and measurement setup."""
+    setup = {
+        "dut": dut,
+        "amplitude_peak_to_peak": config.rigol.amplitude_peak_to_peak,
+        "channels": [channel.name for channel in config.nidaq.channels or []],
+    }
+    return hashlib.sha256(json.dumps(setup, sort_keys=True).encode()).hexdigest()
+
+
+class SettleCache:
+    """Settle times learned by previous sweeps, per setup and frequency."""
+
+    path: Path
+    _times: dict[str, dict[str, float]]
+
+    def __init__(self: Self, path: Path = SETTLE_CACHE_PATH) -> None:
+        self.path = path
+        self._times = {}
+
+        if path.exists():
+            try:
+                self._times = json.loads(path.read_text())
+            except (OSError, ValueError) as e:
+                console.log(f"[SETTLE]: {path} not readable, ignored: {e}")
+
+    @staticmethod
+    def _frequency_key(frequency: float) -> str:
+        return f"{frequency:.5f}"
+
+    def get(self: Self, key: str, frequency: float) -> float | None:
+        return self._times.get(key, {}).get(self._frequency_key(frequency))
+
+    def set(self: Self, key: str, frequency: float, time: float) -> None:
+        self._times.setdefault(key, {})[self._frequency_key(frequency)] = time
+
+    def clear(self: Self, key: str | None = None) -> None:
+        if key is None:
+            self._times.clear()
+        else:
+            self._times.pop(key, None)
+
+    def save(self: Self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.path.write_text(json.dumps(self._times, indent=2, sort_keys=True))
+
+
+class SettleDetector:
+    """Waits for the steady state after a generator change, once learned the
+    settle time of a frequency is slept and the steady state only checked.
+    """
+
+    key: str
+    config: SettleConfig
+    cache: SettleCache | None
+
+    _sleep: Callable[[float], None]
+    _now: Callable[[], float]
+
+    def __init__(
+        self: Self,
+        key: str,
+        sleep: Callable[[float], None],
+        now: Callable[[], float],
+        config: SettleConfig | None = None,
+        cache: SettleCache | None = None,
+    ) -> None:
+        self.key = key
+        self.config = config if config is not None else SettleConfig()
+        self.cache = cache
+        self._sleep = sleep
+        self._now = now
+
+    @classmethod
+    def for_sweep(
+        cls: type[Self],
+        config: SweepConfig,
+        backend: InstrumentBackend,
+        dut: str | None = None,
+        reset: bool = False,
+    ) -> Self:
+        """Detector on the backend clock, with the settle times cache.
+
+        Args:
+            config (SweepConfig): Sweep configuration, part of the cache key.
+            backend (InstrumentBackend): Instruments of the sweep.
+            dut (str | None, optional): DUT identifier, part of the cache key.
+                Defaults to None.
+            reset (bool, optional): Forget the settle times learned for this
+                DUT and setup. Defaults to False.
+        """
+        detector = cls(
+            settle_cache_key(config, dut),
+            backend.sleep,
+            backend.now,
+            cache=SettleCache(),
+        )
+        if reset:
+            detector.clear()
+
+        return detector
+
+    def wait(
+        self: Self,
+        read_block: BlockReader,
+        frequency: float,
+        sampling_frequency: float,
+    ) -> SettleResult:
+        if self.cache is not None:
+            settle_time = self.cache.get(self.key, frequency)
+            if settle_time is not None:
+                return self._wait_cached(
+                    read_block,
+                    frequency,
+                    sampling_frequency,
+                    settle_time,
+                )
+
+        result = wait_settled(
+            read_block,
+            frequency,
+            sampling_frequency,
+            self._now,
+            self.config,
+        )
+
+        if result.settled and self.cache is not None:
+            self.cache.set(self.key, frequency, result.time)
+
+        return result
+
+    def _wait_cached(
+        self: Self,
+        read_block: BlockReader,
+        frequency: float,
+        sampling_frequency: float,
+        settle_time: float,
+    ) -> SettleResult:
+        """Sleep the learned settle time and check the steady state, the
+        detection goes on when the first two blocks do not match.
+        """
+        time_sleep = settle_time * self.config.margin
+        self._sleep(time_sleep)
+
+        result = wait_settled(
+            read_block,
+            frequency,
+            sampling_frequency,
+            self._now,
+            self.config,
+        )
+        if result.settled and result.blocks <= 2:  # noqa: PLR2004
+            return SettleResult(True, settle_time, result.blocks, cached=True)
+
+        # The setup changed, the learned time is too short
+        console.log(
+            f"[SETTLE]: freq: {frequency}, not steady after the learned {settle_time:.3f} s, detected again",
+        )
+        result.time += time_sleep
+        if result.settled:
+            self.cache.set(self.key, frequency, result.time)
+
+        return result
+
+    def clear(self: Self) -> None:
+        """Forget the settle times learned for the key of this detector."""
+        if self.cache is not None:
+            self.cache.clear(self.key)
+
+    def save(self: Self) -> None:
+        if self.cache is not None:
+            self.cache.save()
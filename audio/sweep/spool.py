@@ -0,0 +1,277 @@
+from __future__ import annotations
+
+import json
+import os
+import struct
+import zlib
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, BinaryIO, Self
+
+import numpy as np
+import rich.repr
+
+from audio.console import console
+from audio.database.codec import INT16_MAX, VoltageFormat
+from audio.math.batch import SweepTensor
+from audio.model.sampling import VoltageSampling
+
+# Layout of a capture spool file:
+#   header: magic, version, format, n_channels, max_samples, scale, config size
+#   config: sweep configuration as JSON, padded to 8 bytes
+#   frames: fixed size, `frame_dtype`, appended one per sweep point
+# Frames are fixed size, a sweep interrupted in the middle of a write leaves a
+# readable prefix: the truncated last frame is ignored and the CRC of every
+# frame is checked on read.
+SPOOL_MAGIC: bytes = b"\x93ASP"
+SPOOL_VERSION: int = 1
+
+_HEADER = struct.Struct("<4sHBxIIdI")
+
+_DTYPES: dict[VoltageFormat, np.dtype] = {
+    VoltageFormat.FLOAT32: np.dtype("<f4"),
+    VoltageFormat.FLOAT64: np.dtype("<f8"),
+    VoltageFormat.INT16: np.dtype("<i2"),
+}
+
+
+def frame_dtype(
+    n_channels: int,
+    max_samples: int,
+    voltage_format: VoltageFormat,
+) -> np.dtype:
+    return np.dtype(
+        [
+            ("idx", "<u4"),
+            ("n_samples", "<u4"),
+            ("frequency", "<f8"),
+            ("sampling_frequency", "<f8"),
+            ("crc", "<u4"),
+            ("reserved", "<u4"),
+            ("voltages", _DTYPES[voltage_format], (n_channels, max_samples)),
+        ],
+    )
+
+
+def _frame_crc(frame: np.ndarray) -> int:
+    frame = frame.copy()
+    frame["crc"] = 0
+    return zlib.crc32(frame.tobytes())
+
+
+class CaptureSpoolWriter:
+    """Append the captures of a sweep to a binary spool file.
+
+    A single buffered sequential writer, every frame is handed to the OS when
+    appended so a crash of the process loses at most the frame being written.
+    """
+
+    path: Path
+    n_channels: int
+    max_samples: int
+    voltage_format: VoltageFormat
+    scale: float
+
+    _dtype: np.dtype
+    _file: BinaryIO | None
+
+    def __init__(
+        self: Self,
+        path: Path,
+        n_channels: int,
+        max_samples: int,
+        voltage_format: VoltageFormat = VoltageFormat.FLOAT32,
+        scale: float = 1.0,
+        config: dict[str, Any] | None = None,
+    ) -> None:
+        """Create the spool file and write its header.
+
+        Args:
+            path (Path): Spool file, overwritten if it exists.
+            n_channels (int): Channels of every capture.
+            max_samples (int): Max samples of a capture, the frame size.
+            voltage_format (VoltageFormat, optional): Sample type. Defaults to
+                VoltageFormat.FLOAT32.
+            scale (float, optional): Volts per `INT16` code. Defaults to 1.0.
+            config (dict[str, Any] | None, optional): Sweep configuration,
+                stored as JSON. Defaults to None.
+        """
+        self.path = path
+        self.n_channels = n_channels
+        self.max_samples = max_samples
+        self.voltage_format = voltage_format
+        self.scale = scale
+        self._dtype = frame_dtype(n_channels, max_samples, voltage_format)
+
+        config_bytes = json.dumps(config or {}, default=str).encode()
+        config_bytes += b" " * (-(_HEADER.size + len(config_bytes)) % 8)
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = path.open("wb", buffering=1 << 20)
+        self._file.write(
+            _HEADER.pack(
+                SPOOL_MAGIC,
+                SPOOL_VERSION,
+                voltage_format.value,
+                n_channels,
+                max_samples,
+                scale,
+                len(config_bytes),
+            ),
+        )
+        self._file.write(config_bytes)
+        self._file.flush()
+
+    def __enter__(self: Self) -> Self:
+        return self
+
+    def __exit__(self: Self, exc_type, exc_value, traceback) -> None:  # noqa: ANN001
+        self.close()
+
+    def append(
+        self: Self,
+        idx: int,
+        frequency: float,
+        sampling_frequency: float,
+        voltages: np.ndarray | list[list[float]],
+    ) -> None:
+        """Append the `(channels, samples)` capture of a sweep point."""
+        voltages = np.atleast_2d(np.asarray(voltages, dtype=np.float64))
+        n_channels, n_samples = voltages.shape
+        if n_channels > self.n_channels or n_samples > self.max_samples:
+            _msg = f"Capture {voltages.shape} larger than the spool frame ({self.n_channels}, {self.max_samples})."
+            raise ValueError(_msg)
+
+        if self.voltage_format == VoltageFormat.INT16:
+            voltages = np.clip(np.rint(voltages / self.scale), -INT16_MAX - 1, INT16_MAX)
+
+        frame = np.zeros(1, dtype=self._dtype)
+        frame["idx"] = idx
+        frame["n_samples"] = n_samples
+        frame["frequency"] = frequency
+        frame["sampling_frequency"] = sampling_frequency
+        frame["voltages"][0, :n_channels, :n_samples] = voltages
+        frame["crc"] = _frame_crc(frame)
+
+        self._file.write(frame.tobytes())
+        self._file.flush()
+
+    def close(self: Self) -> None:
+        if self._file is None:
+            return
+
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file.close()
+        self._file = None
+
+
+@rich.repr.auto
+@dataclass
+class CaptureSpool:
+    """Captures of a spool file, `frames` is a read only memory map."""
+
+    path: Path
+    voltage_format: VoltageFormat
+    scale: float
+    config: dict[str, Any]
+    frames: np.ndarray
+
+    @classmethod
+    def read(cls: type[Self], path: Path, check: bool = True) -> Self:
+        """Map the complete frames of a spool file.
+
+        Args:
+            path (Path): Spool file.
+            check (bool, optional): Drop the frames from the first one with a
+                wrong CRC. Defaults to True.
+        """
+        with path.open("rb") as f:
+            header = f.read(_HEADER.size)
+            (
+                magic,
+                version,
+                voltage_format,
+                n_channels,
+                max_samples,
+                scale,
+                config_size,
+            ) = _HEADER.unpack(header)
+            if magic != SPOOL_MAGIC or version > SPOOL_VERSION:
+                _msg = f"{path} is not a supported capture spool."
+                raise ValueError(_msg)
+            config = json.loads(f.read(config_size))
+
+        voltage_format = VoltageFormat(voltage_format)
+        dtype = frame_dtype(n_channels, max_samples, voltage_format)
+        offset = _HEADER.size + config_size
+        n_frames = (path.stat().st_size - offset) // dtype.itemsize
+
+        frames = (
+            np.memmap(path, dtype=dtype, mode="r", offset=offset, shape=(n_frames,))
+            if n_frames > 0
+            else np.zeros(0, dtype=dtype)
+        )
+
+        if check:
+            for idx, frame in enumerate(frames):
+                if _frame_crc(frame) != frame["crc"]:
+                    console.log(f"[SPOOL]: {path}: corrupted frame {idx}, ignored from here.")
+                    frames = frames[:idx]
+                    break
+
+        return cls(
+            path=path,
+            voltage_format=voltage_format,
+            scale=scale,
+            config=config,
+            frames=frames,
+        )
+
+    def __len__(self: Self) -> int:
+        return len(self.frames)
+
+    def voltages(self: Self, idx: int) -> np.ndarray:
+        """`(channels, samples)` volts of a frame."""
+        frame = self.frames[idx]
+        voltages = frame["voltages"][:, : frame["n_samples"]]
+        if self.voltage_format == VoltageFormat.INT16:
+            return voltages * self.scale
+        return voltages
+
+    def to_tensor(self: Self) -> SweepTensor:
+        voltages = self.frames["voltages"]
+        if self.voltage_format == VoltageFormat.INT16:
+            voltages = voltages * self.scale
+
+        return SweepTensor(
+            voltages=np.asarray(voltages, dtype=np.float64),
+            lengths=self.frames["n_samples"].astype(np.int64),
+            frequency=self.frames["frequency"].astype(np.float64),
+            sampling_frequency=self.frames["sampling_frequency"].astype(np.float64),
+        )
+
+    def export_csv(self: Self, directory: Path) -> list[Path]:
+        """Export the frames in the per point CSV layout of the old sweeps:
+        `directory/<frequency>/sample.csv`, `sample-<channel>.csv` for more
+        channels.
+        """
+        files: list[Path] = []
+        for idx, frame in enumerate(self.frames):
+            frequency = float(frame["frequency"])
+            frequency_path = directory / f"{round(frequency, 5)}".replace(".", "_", 1)
+            frequency_path.mkdir(parents=True, exist_ok=True)
+
+            voltages = self.voltages(idx)
+            for idx_channel, channel in enumerate(voltages):
+                file = frequency_path / (
+                    "sample.csv" if len(voltages) == 1 else f"sample-{idx_channel}.csv"
+                )
+                VoltageSampling.from_list(
+                    channel.tolist(),
+                    frequency,
+                    float(frame["sampling_frequency"]),
+                ).save(file)
+                files.append(file)
+
+        return files
@@ -0,0 +1,214 @@
+from __future__ import annotations
+
+import queue
+import threading
+import time
+from datetime import timedelta
+from typing import TYPE_CHECKING, Self
+
+from audio.console import console
+from audio.database.db import Database
+from audio.logging import log
+from audio.math.batch import SweepAnalysis
+from audio.utility.timer import Timer
+
+if TYPE_CHECKING:
+    from audio.sweep.pipeline import SweepPoint
+
+_STOP = object()
+
+
+class DatabaseWriter:
+    """Store the sweep points from a background thread.
+
+    Points are grouped and written in one transaction every `batch_points`
+    points or `batch_interval`, whichever comes first. The queue is bounded,
+    `put` blocks when the database falls behind instead of buffering the whole
+    sweep. Without `db` the writer checks out its own pooled session, a given
+    `db` must not be used by other threads until `close`. The analysis of the
+    points, see `PointAnalyser`, is cached under `estimator` and
+    `parameters_hash` in the same transaction.
+    """
+
+    sweep_id: int
+    channel_ids: list[int]
+    batch_points: int
+    batch_interval: timedelta
+    estimator: str | None
+    parameters_hash: str | None
+
+    _db: Database | None
+    _queue: queue.Queue
+    _thread: threading.Thread | None
+    _error: BaseException | None
+
+    def __init__(
+        self: Self,
+        sweep_id: int,
+        channel_ids: list[int],
+        db: Database | None = None,
+        batch_points: int = 10,
+        batch_interval: timedelta = timedelta(milliseconds=500),
+        queue_size: int = 32,
+        estimator: str | None = None,
+        parameters_hash: str | None = None,
+    ) -> None:
+        self.sweep_id = sweep_id
+        self.channel_ids = channel_ids
+        self.batch_points = batch_points
+        self.batch_interval = batch_interval
+        self.estimator = estimator
+        self.parameters_hash = parameters_hash
+
+        self._db = db
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._thread = None
+        self._error = None
+
+    def __enter__(self: Self) -> Self:
+        self.start()
+        return self
+
+    def __exit__(self: Self, exc_type, exc_value, traceback) -> None:  # noqa: ANN001
+        self.close(raise_error=exc_type is None)
+
+    def start(self: Self) -> None:
+        self._thread = threading.Thread(
+            target=self._run,
+            name="sweep-db-writer",
+            daemon=True,
+        )
+        self._thread.start()
+
+    def put(self: Self, point: SweepPoint) -> None:
+        """Queue a point, blocking while the queue is full."""
+        if self._error is not None:
+            raise self._error
+
+        self._queue.put(point)
+
+    def flush(self: Self) -> None:
+        """Wait until every queued point is committed."""
+        barrier = threading.Event()
+        self._queue.put(barrier)
+        barrier.wait()
+
+        if self._error is not None:
+            raise self._error
+
+    def close(self: Self, raise_error: bool = True) -> None:
+        """Commit every queued point and stop the thread."""
+        if self._thread is not None:
+            self._queue.put(_STOP)
+            self._thread.join()
+            self._thread = None
+
+        if raise_error and self._error is not None:
+            raise self._error
+
+    def _run(self: Self) -> None:
+        if self._db is not None:
+            self._consume(self._db)
+            return
+
+        try:
+            with Database.session() as db:
+                self._consume(db)
+        except Exception as e:  # noqa: BLE001
+            console.log(f"[DB WRITER ERROR]: {e}")
+            self._error = e
+            self._drain()
+
+    def _drain(self: Self) -> None:
+        # Release the producers waiting on a full queue or a barrier
+        while True:
+            item = self._queue.get()
+            if isinstance(item, threading.Event):
+                item.set()
+            elif item is _STOP:
+                break
+
+    def _consume(self: Self, db: Database) -> None:
+        pending: list[SweepPoint] = []
+        deadline = 0.0
+
+        while True:
+            timeout = None
+            if len(pending) > 0:
+                timeout = max(deadline - time.monotonic(), 0)
+
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+
+            is_point = item is not None and item is not _STOP
+            is_point = is_point and not isinstance(item, threading.Event)
+
+            if is_point:
+                if len(pending) == 0:
+                    deadline = time.monotonic() + self.batch_interval.total_seconds()
+                pending.append(item)
+                if len(pending) < self.batch_points:
+                    continue
+
+            if len(pending) > 0:
+                self._write(db, pending)
+                pending = []
+
+            if isinstance(item, threading.Event):
+                item.set()
+            elif item is _STOP:
+                break
+
+    def _write(self: Self, db: Database, points: list[SweepPoint]) -> None:
+        # After an error the remaining points are only drained
+        if self._error is not None:
+            return
+
+        timer = Timer()
+        timer.start()
+
+        try:
+            rows = []
+            frequency_ids = []
+            for point in points:
+                frequency_id = db.insert_frequency(
+                    self.sweep_id,
+                    point.idx,
+                    point.frequency,
+                    point.sampling_frequency,
+                    commit=False,
+                )
+                frequency_ids.append(frequency_id)
+                rows.extend(
+                    (frequency_id, channel_id, voltages)
+                    for channel_id, voltages in zip(
+                        self.channel_ids,
+                        point.voltages,
+                        strict=False,
+                    )
+                )
+
+            db.insert_many_sweep_voltages(rows, commit=False)
+
+            analyses = [point.analysis for point in points]
+            if self.estimator is not None and all(a is not None for a in analyses):
+                db.insert_derived_results(
+                    self.sweep_id,
+                    self.estimator,
+                    self.parameters_hash,
+                    frequency_ids,
+                    SweepAnalysis.concatenate(analyses),
+                    replace=False,
+                    commit=False,
+                )
+
+            db.connection.commit()
+        except Exception as e:  # noqa: BLE001
+            console.log(f"[DB WRITER ERROR]: {e}")
+            db.connection.rollback()
+            self._error = e
+            return
+
+        log.debug(f"[DB WRITER]: points: {len(points)}, {timer.stop()}")
@@ -0,0 +1,122 @@
+from __future__ import annotations
+
+import threading
+from typing import Self
+
+import numpy as np
+
+
+class RingBufferOverrunError(Exception):
+    """The requested samples were already overwritten."""
+
+
+class RingBuffer:
+    """Preallocated multichannel ring buffer.
+
+    Samples are addressed by their absolute index since the buffer was created
+    (or reset), so a reader can ask for a window of samples without caring about
+    where the write head currently is.
+    """
+
+    _data: np.ndarray
+    _capacity: int
+    _written: int
+    _condition: threading.Condition
+
+    def __init__(
+        self: Self,
+        n_channels: int,
+        capacity: int,
+        dtype: np.dtype | type = np.float64,
+    ) -> None:
+        self._data = np.zeros((n_channels, capacity), dtype=dtype)
+        self._capacity = capacity
+        self._written = 0
+        self._condition = threading.Condition()
+
+    @property
+    def n_channels(self: Self) -> int:
+        return self._data.shape[0]
+
+    @property
+    def capacity(self: Self) -> int:
+        return self._capacity
+
+    @property
+    def written(self: Self) -> int:
+        """Absolute number of samples per channel written so far."""
+        with self._condition:
+            return self._written
+
+    @property
+    def oldest(self: Self) -> int:
+        """Absolute index of the oldest sample still in the buffer."""
+        with self._condition:
+            return max(0, self._written - self._capacity)
+
+    def reset(self: Self) -> None:
+        with self._condition:
+            self._written = 0
+            self._condition.notify_all()
+
+    def write(self: Self, block: np.ndarray) -> None:
+        """Append a `(n_channels, n)` block of samples."""
+        n_samples = block.shape[1]
+
+        if n_samples > self._capacity:
+            block = block[:, -self._capacity :]
+            skipped = n_samples - self._capacity
+            n_samples = self._capacity
+        else:
+            skipped = 0
+
+        with self._condition:
+            start = (self._written + skipped) % self._capacity
+            end = start + n_samples
+
+            if end <= self._capacity:
+                self._data[:, start:end] = block
+            else:
+                split = self._capacity - start
+                self._data[:, start:] = block[:, :split]
+                self._data[:, : end - self._capacity] = block[:, split:]
+
+            self._written += skipped + n_samples
+            self._condition.notify_all()
+
+    def wait_for(self: Self, index: int, timeout: float | None = None) -> bool:
+        """Wait until the sample with absolute index `index - 1` is written."""
+        with self._condition:
+            return self._condition.wait_for(
+                lambda: self._written >= index,
+                timeout=timeout,
+            )
+
+    def read(self: Self, start: int, n_samples: int) -> np.ndarray:
+        """Copy `n_samples` per channel starting at the absolute index `start`.
+
+        Raises:
+            RingBufferOverrunError: when part of the window was already
+                overwritten or was not written yet.
+        """
+        with self._condition:
+            if start < self._written - self._capacity:
+                _msg = f"Samples from {start} were overwritten (written: {self._written})."
+                raise RingBufferOverrunError(_msg)
+            if start + n_samples > self._written:
+                _msg = f"Samples up to {start + n_samples} are not available yet."
+                raise RingBufferOverrunError(_msg)
+
+            first = start % self._capacity
+            last = first + n_samples
+
+            if last <= self._capacity:
+                return self._data[:, first:last].copy()
+
+            return np.concatenate(
+                (
+                    self._data[:, first:],
+                    self._data[:, : last - self._capacity],
+                ),
+                axis=1,
+            )
@@ -7,6 +7,8 @@ from typing import TYPE_CHECKING, Literal, Self
 from audio.console import console
 
 if TYPE_CHECKING:
+    from collections.abc import Sequence
+
     from audio.usb.usbtmc import UsbTmc
 
 
@@ -126,6 +128,61 @@ class SCPI:
 
         return f":SOURce{source}:FREQ {frequency}"
 
+    @staticmethod
+    def set_source_arbitrary_data(source: int, values: Sequence[float]) -> str:
+        """Load one period of an arbitrary waveform, `values` in [-1, 1], in
+        the volatile memory and select it. Its period is set by the frequency.
+        """
+        if SCPI.check_source(source):
+            console.print("Setting Source to 0", style="warning")
+            source = 0
+
+        data = ",".join(f"{value:.6f}" for value in values)
+        return f":SOURce{source}:TRACe:DATA VOLATILE,{data}"
+
+    @staticmethod
+    def set_source_frequency_start(source: int, frequency: float) -> str:
+        if SCPI.check_source(source):
+            console.print("Setting Source to 0", style="warning")
+            source = 0
+
+        return f":SOURce{source}:FREQuency:STARt {frequency}"
+
+    @staticmethod
+    def set_source_frequency_stop(source: int, frequency: float) -> str:
+        if SCPI.check_source(source):
+            console.print("Setting Source to 0", style="warning")
+            source = 0
+
+        return f":SOURce{source}:FREQuency:STOP {frequency}"
+
+    @staticmethod
+    def set_source_sweep(source: int, switch: Switch) -> str:
+        return f":SOURce{source}:SWEep:STATe {switch.value}"
+
+    @staticmethod
+    def set_source_sweep_spacing(
+        source: int,
+        spacing: Literal["LINear", "LOGarithmic", "STEp"],
+    ) -> str:
+        return f":SOURce{source}:SWEep:SPACing {spacing}"
+
+    @staticmethod
+    def set_source_sweep_time(source: int, seconds: float) -> str:
+        return f":SOURce{source}:SWEep:TIME {seconds}"
+
+    @staticmethod
+    def set_source_sweep_trigger_source(
+        source: int,
+        trigger: Literal["INTernal", "EXTernal", "MANual"],
+    ) -> str:
+        return f":SOURce{source}:SWEep:TRIGger:SOURce {trigger}"
+
+    @staticmethod
+    def source_sweep_trigger(source: int) -> str:
+        """Start one sweep, with the `MANual` trigger source."""
+        return f":SOURce{source}:SWEep:TRIGger:IMMediate"
+
     @staticmethod
     def set_output_impedance(output: int, impedance: float) -> str:
         if SCPI.check_output(output):
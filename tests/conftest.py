@@ -0,0 +1,23 @@
+from pathlib import Path
+
+import pytest
+
+import audio.database.db
+
+
+@pytest.fixture
+def sqlite_path(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    """Configure the SQLite storage backend on a temporary file."""
+    path = tmp_path / "audio.sqlite"
+    config_path = tmp_path / "config.ini"
+    config_path.write_text(
+        "[Database]\n"
+        "backend = sqlite\n"
+        f"sqlite_path = {path}\n"
+        "host = localhost\n"
+        "port = 3306\n"
+        "user = root\n"
+        "password = password\n",
+    )
+    monkeypatch.setattr(audio.database.db, "APP_DB_AUTH_PATH", config_path)
+    return path
@@ -0,0 +1,29 @@
+import numpy as np
+
+from audio.database.codec import (
+    Compression,
+    VoltageFormat,
+    decode_voltages,
+    encode_voltages,
+    is_legacy,
+)
+
+
+def test_codec():
+    voltages = np.sin(2 * np.pi * np.arange(1000) / 100)
+
+    data = encode_voltages(voltages, compression=Compression.ZLIB)
+    assert not is_legacy(data)
+    assert np.array_equal(decode_voltages(data), voltages)
+
+    data = encode_voltages(voltages, voltage_format=VoltageFormat.INT16)
+    assert len(data) == 8 + 8 + 2 * len(voltages)
+    assert np.allclose(decode_voltages(data), voltages, atol=1 / 32767)
+
+
+def test_codec_legacy():
+    voltages = np.sin(2 * np.pi * np.arange(1000) / 100)
+    data = "\n".join([str(v) for v in voltages]).encode()
+
+    assert is_legacy(data)
+    assert np.array_equal(decode_voltages(data), voltages)
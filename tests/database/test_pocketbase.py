@@ -0,0 +1,264 @@
+import json
+import threading
+from collections.abc import Iterator
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import pytest
+
+from audio.database.pocketbase import PocketBaseUploader, RecordRef, UploadJob
+
+
+class FakePocketBase(ThreadingHTTPServer):
+    """Records the posted records, `status` sets the response of a collection.
+
+    A batch is created only if every record of it is accepted, `batches` holds
+    the number of records of every created batch.
+    """
+
+    def __init__(self) -> None:
+        super().__init__(("127.0.0.1", 0), _Handler)
+        self.status: dict[str, int] = {}
+        self.records: list[tuple[str, dict]] = []
+        self.batches: list[int] = []
+        self.batch_api = True
+
+    def create(self, collection: str, record: dict) -> dict:
+        record_id = f"{collection}-{len(self.records)}"
+        self.records.append((collection, record))
+        return {"id": record_id}
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: FakePocketBase
+
+    def do_POST(self) -> None:
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+
+        if self.path == "/api/batch":
+            status, response = self._batch(body["requests"])
+        else:
+            collection = self.path.split("/")[3]
+            status = self.server.status.get(collection, 200)
+            response = {}
+            if status == 200:
+                response = self.server.create(collection, body)
+
+        self._respond(status, json.dumps(response).encode())
+
+    def _batch(self, requests: list[dict]) -> tuple[int, dict | list]:
+        if not self.server.batch_api:
+            return 403, {}
+
+        collections = [request["url"].split("/")[3] for request in requests]
+        for collection in collections:
+            status = self.server.status.get(collection, 200)
+            if status != 200:
+                return 400 if status < 500 else status, {}
+
+        self.server.batches.append(len(requests))
+        return 200, [
+            {"status": 200, "body": self.server.create(collection, request["body"])}
+            for collection, request in zip(collections, requests, strict=True)
+        ]
+
+    def _respond(self, status: int, response: bytes) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(response)))
+        self.end_headers()
+        self.wfile.write(response)
+
+    def log_message(self, *args) -> None:
+        pass
+
+
+@pytest.fixture()
+def server() -> Iterator[FakePocketBase]:
+    server = FakePocketBase()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _uploader(server: FakePocketBase, spool_path: Path) -> PocketBaseUploader:
+    return PocketBaseUploader(
+        url=server.url,
+        spool_path=spool_path,
+        max_attempts=2,
+        backoff=0.01,
+        timeout=1,
+        offline_interval=0.05,
+    )
+
+
+def _create_sweep(uploader: PocketBaseUploader) -> None:
+    sweep = uploader.create("sweeps", {"name": "Sweep"})
+    channel = uploader.create("channels", {"sweep_id": sweep, "idx": 0})
+    uploader.create("measurements", {"sweep_id": sweep, "channel_id": channel})
+
+
+def test_upload(server: FakePocketBase, tmp_path: Path):
+    with _uploader(server, tmp_path) as uploader:
+        _create_sweep(uploader)
+
+    assert server.records == [
+        ("sweeps", {"name": "Sweep"}),
+        ("channels", {"sweep_id": "sweeps-0", "idx": 0}),
+        ("measurements", {"sweep_id": "sweeps-0", "channel_id": "channels-1"}),
+    ]
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_spool_replay(server: FakePocketBase, tmp_path: Path):
+    server.status["sweeps"] = 503
+    with _uploader(server, tmp_path) as uploader:
+        _create_sweep(uploader)
+
+    assert server.records == []
+    assert len(list(tmp_path.glob("*.json"))) == 3
+
+    # PocketBase is back in the next run
+    server.status.clear()
+    with _uploader(server, tmp_path):
+        pass
+
+    assert [collection for collection, _ in server.records] == [
+        "sweeps",
+        "channels",
+        "measurements",
+    ]
+    assert server.records[2][1] == {"sweep_id": "sweeps-0", "channel_id": "channels-1"}
+    assert list(tmp_path.glob("*.json")) == []
+    assert not (tmp_path / "ids.jsonl").exists()
+
+
+def test_spool_rejected_parent(server: FakePocketBase, tmp_path: Path):
+    server.status["sweeps"] = 503
+    with _uploader(server, tmp_path) as uploader:
+        _create_sweep(uploader)
+
+    # The spooled sweep is rejected, its channel and measurement can never
+    # be uploaded
+    server.status["sweeps"] = 400
+    with _uploader(server, tmp_path):
+        pass
+
+    assert server.records == []
+    assert list(tmp_path.glob("*.json")) == []
+    assert not (tmp_path / "ids.jsonl").exists()
+    assert len(list((tmp_path / "rejected").glob("*.json"))) == 3
+
+
+def test_rejected_parent(server: FakePocketBase, tmp_path: Path):
+    server.status["sweeps"] = 400
+    with _uploader(server, tmp_path) as uploader:
+        _create_sweep(uploader)
+
+    assert server.records == []
+    assert list(tmp_path.glob("*.json")) == []
+    assert len(list((tmp_path / "rejected").glob("*.json"))) == 3
+
+
+def test_spool_lost_parent(server: FakePocketBase, tmp_path: Path):
+    server.status["sweeps"] = 503
+    with _uploader(server, tmp_path) as uploader:
+        _create_sweep(uploader)
+
+    # The spooled sweep is lost, e.g. deleted by hand
+    sorted(tmp_path.glob("*.json"))[0].unlink()
+
+    server.status.clear()
+    with _uploader(server, tmp_path):
+        pass
+
+    assert server.records == []
+    assert list(tmp_path.glob("*.json")) == []
+    assert len(list((tmp_path / "rejected").glob("*.json"))) == 2
+
+
+def _create_measurements(uploader: PocketBaseUploader, collections: list[str]) -> None:
+    sweep = uploader.create("sweeps", {"name": "Sweep"})
+    channel = uploader.create("channels", {"sweep_id": sweep, "idx": 0})
+    for idx, collection in enumerate(collections):
+        uploader.create(
+            collection,
+            {"sweep_id": sweep, "channel_id": channel, "idx": idx},
+        )
+
+
+def test_upload_batch(server: FakePocketBase, tmp_path: Path):
+    uploader = _uploader(server, tmp_path)
+    # Queued before the worker starts, it takes them all at once
+    _create_measurements(uploader, ["measurements"] * 5)
+    with uploader:
+        pass
+
+    # The sweep and channel are referenced by the records after them
+    assert server.batches == [5]
+    assert [collection for collection, _ in server.records] == [
+        "sweeps",
+        "channels",
+        *["measurements"] * 5,
+    ]
+    assert server.records[6][1] == {
+        "sweep_id": "sweeps-0",
+        "channel_id": "channels-1",
+        "idx": 4,
+    }
+
+
+def test_upload_batch_rejected(server: FakePocketBase, tmp_path: Path):
+    server.status["notes"] = 400
+
+    uploader = _uploader(server, tmp_path)
+    _create_measurements(uploader, ["measurements", "notes", "measurements"])
+    with uploader:
+        pass
+
+    # The batch transaction fails, the records are posted one by one
+    assert server.batches == []
+    assert [collection for collection, _ in server.records] == [
+        "sweeps",
+        "channels",
+        "measurements",
+        "measurements",
+    ]
+    assert len(list((tmp_path / "rejected").glob("*.json"))) == 1
+
+
+def test_upload_batch_disabled(server: FakePocketBase, tmp_path: Path):
+    server.batch_api = False
+
+    uploader = _uploader(server, tmp_path)
+    _create_measurements(uploader, ["measurements"] * 3)
+    with uploader:
+        pass
+
+    assert not uploader._batch_api
+    assert server.batches == []
+    assert len(server.records) == 5  # noqa: PLR2004
+
+
+def test_job_json():
+    job = UploadJob(
+        "measurements",
+        {
+            "sweep_id": RecordRef("sweep"),
+            "config": {"$ref": "sweep", "gain": 1},
+            "tags": {"a": 1},
+            "idx": 0,
+        },
+        {"file": Path("data.csv")},
+    )
+
+    loaded = UploadJob.from_json(job.to_json())
+
+    # Only `{"$ref": key}` is a reference, other dicts are JSON fields
+    assert loaded == job
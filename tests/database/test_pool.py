@@ -0,0 +1,117 @@
+import multiprocessing
+import time
+from pathlib import Path
+from typing import Self
+
+import mysql.connector
+import pytest
+from mysql.connector.pooling import CNX_POOL_MAXSIZE
+
+import audio.database.db
+from audio.database.db import Database, StorageBackend, get_connection, get_pool
+
+
+class StubConnection:
+    def __init__(self: Self, pool: "StubPool") -> None:
+        self.pool = pool
+        self.pings = 0
+
+    def ping(self: Self, **_: object) -> None:
+        self.pings += 1
+
+    def rollback(self: Self) -> None:
+        pass
+
+    def close(self: Self) -> None:
+        self.pool.idle.append(self)
+
+
+class StubPool:
+    """`MySQLConnectionPool` without a server."""
+
+    def __init__(self: Self, pool_name: str, pool_size: int, **_: object) -> None:
+        self.pool_name = pool_name
+        self.pool_size = pool_size
+        self.idle = [StubConnection(self) for _ in range(pool_size)]
+
+    def get_connection(self: Self) -> StubConnection:
+        if len(self.idle) == 0:
+            _msg = "Failed getting connection; pool exhausted"
+            raise mysql.connector.errors.PoolError(_msg)
+        return self.idle.pop()
+
+
+@pytest.fixture
+def mysql_config(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    config_path = tmp_path / "config.ini"
+    config_path.write_text(
+        "[Database]\n"
+        "backend = mysql\n"
+        "host = localhost\n"
+        "port = 3306\n"
+        "user = root\n"
+        "password = password\n"
+        "pool_size = 2\n"
+        "pool_timeout = 0.2\n",
+    )
+    monkeypatch.setattr(audio.database.db, "APP_DB_AUTH_PATH", config_path)
+    monkeypatch.setattr(audio.database.db, "MySQLConnectionPool", StubPool)
+    monkeypatch.setattr(audio.database.db, "_POOLS", {})
+    return config_path
+
+
+def _pool_name(names: multiprocessing.Queue) -> None:
+    names.put(get_pool()[0].pool_name)
+
+
+def test_pool_per_process(mysql_config: Path):  # noqa: ARG001
+    pool, db_config = get_pool()
+    assert get_pool()[0] is pool
+    assert (db_config.pool_size, db_config.pool_timeout) == (2, 0.2)
+
+    # A forked child creates its own pool instead of reusing the parent one
+    context = multiprocessing.get_context("fork")
+    names = context.Queue()
+    process = context.Process(target=_pool_name, args=(names,))
+    process.start()
+    process.join()
+
+    name = names.get(timeout=5)
+    assert name != pool.pool_name
+    assert name == f"audio-{process.pid}"
+
+
+def test_pool_size_max(mysql_config: Path):
+    mysql_config.write_text(mysql_config.read_text().replace("pool_size = 2", "pool_size = 1000"))
+
+    assert get_pool()[0].pool_size == CNX_POOL_MAXSIZE
+
+
+def test_session_returns_connection(mysql_config: Path):  # noqa: ARG001
+    pool = get_pool()[0]
+
+    for _ in range(5):
+        with Database.session() as db:
+            assert db.connection.pings == 1
+            assert len(pool.idle) == 1
+            db.connection.pings = 0
+
+    assert len(pool.idle) == 2  # noqa: PLR2004
+
+    # Returned on error too
+    with pytest.raises(ValueError, match="failed"), Database.session():
+        _msg = "failed"
+        raise ValueError(_msg)
+    assert len(pool.idle) == 2  # noqa: PLR2004
+
+
+def test_pool_timeout(mysql_config: Path):  # noqa: ARG001
+    with Database.session(StorageBackend.MYSQL), Database.session(StorageBackend.MYSQL):
+        start = time.monotonic()
+        with pytest.raises(mysql.connector.errors.PoolError):
+            get_connection(StorageBackend.MYSQL)
+
+        # Waited `pool_timeout` for a free connection
+        assert time.monotonic() - start >= 0.2  # noqa: PLR2004
+
+    assert get_connection(StorageBackend.MYSQL) is not None
@@ -0,0 +1,142 @@
+import sqlite3
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from audio.database.db import Database, StorageBackend
+from audio.database.migration import load_migrations
+from audio.math.batch import SweepAnalysis
+
+
+def test_sqlite_copy_sweep(tmp_path: Path):
+    with Database.session(StorageBackend.SQLITE, tmp_path / "a.sqlite") as db:
+        test_id = db.insert_test("Test 1", datetime.now())
+        sweep_id = db.insert_sweep(test_id, "Sweep 1", datetime.now())
+        channel_ids = [db.insert_channel(sweep_id, idx, f"ch{idx}") for idx in range(2)]
+
+        for idx in range(3):
+            frequency_id = db.insert_frequency(sweep_id, idx, 10 * (idx + 1), 1000)
+            db.insert_many_sweep_voltages(
+                [
+                    (frequency_id, channel_id, np.arange(10 + idx) * (idx_channel + 1))
+                    for idx_channel, channel_id in enumerate(channel_ids)
+                ],
+            )
+
+        tensor = db.get_sweep_tensor(sweep_id)
+        assert tensor.voltages.shape == (3, 2, 12)
+        assert list(tensor.lengths) == [10, 11, 12]
+
+        with Database.session(StorageBackend.SQLITE, tmp_path / "b.sqlite") as target:
+            target_sweep_id = db.copy_sweep(sweep_id, target)
+            copied = target.get_sweep_tensor(target_sweep_id)
+
+    assert np.array_equal(copied.voltages, tensor.voltages)
+    assert np.array_equal(copied.frequency, tensor.frequency)
+
+
+def test_sqlite_derived_results(tmp_path: Path):
+    with Database.session(StorageBackend.SQLITE, tmp_path / "a.sqlite") as db:
+        test_id = db.insert_test("Test 1", datetime.now())
+        sweep_id = db.insert_sweep(test_id, "Sweep 1", datetime.now())
+        frequency_ids = [db.insert_frequency(sweep_id, idx, 10 * (idx + 1), 1000) for idx in range(3)]
+
+        analysis = SweepAnalysis(
+            frequency=np.array([10.0, 20.0, 30.0]),
+            rms=np.array([[1.0, 2.0], [1.0, 0.5], [1.0, 1.0]]),
+            phasor=np.array([[1, 2j], [1, -0.5], [1j, 1]]),
+        )
+        assert db.get_derived_results(sweep_id, "FFT", "hash") is None
+
+        db.insert_derived_results(sweep_id, "FFT", "hash", frequency_ids, analysis)
+        cached = db.get_derived_results(sweep_id, "FFT", "hash")
+
+        assert np.allclose(cached.rms, analysis.rms)
+        assert np.allclose(cached.phase(), analysis.phase())
+        assert cached.rms_std is None
+
+        assert db.invalidate_derived_results(sweep_id) == 6
+        assert db.get_derived_results(sweep_id, "FFT", "hash") is None
+
+
+def test_sqlite_migrations(tmp_path: Path):
+    with Database.session(StorageBackend.SQLITE, tmp_path / "a.sqlite") as db:
+        assert db.get_schema_version() == max(m.version for m in load_migrations(sqlite=True))
+        assert db.migrate() == []
+
+        test_id = db.insert_test("Test 1", datetime.now())
+        sweep_id = db.insert_sweep(test_id, "Sweep 1", datetime.now())
+        channel_id = db.insert_channel(sweep_id, 0, "ch0")
+        frequency_id = db.insert_frequency(sweep_id, 0, 10, 1000)
+        db.insert_many_sweep_voltages([(frequency_id, channel_id, np.zeros(4))])
+
+        with pytest.raises(sqlite3.IntegrityError):
+            db.insert_many_sweep_voltages([(frequency_id, channel_id, np.zeros(4))])
+
+
+def test_sqlite_migrate_derived_result(tmp_path: Path):
+    with Database.session(StorageBackend.SQLITE, tmp_path / "a.sqlite") as db:
+        # A database created before the derivedResult table
+        cur = db.connection.cursor()
+        cur.execute("DROP TABLE audio.derivedResult")
+        cur.execute("DELETE FROM audio.schemaVersion WHERE version >= 3")
+        db.connection.commit()
+
+        test_id = db.insert_test("Test 1", datetime.now())
+        sweep_id = db.insert_sweep(test_id, "Sweep 1", datetime.now())
+        frequency_id = db.insert_frequency(sweep_id, 0, 10, 1000)
+        analysis = SweepAnalysis(
+            frequency=np.array([10.0]),
+            rms=np.ones((1, 1)),
+            phasor=np.ones((1, 1), dtype=np.complex128),
+        )
+
+        # Without the table the analysis is not cached
+        assert db.get_derived_results(sweep_id, "FFT", "hash") is None
+        db.insert_derived_results(sweep_id, "FFT", "hash", [frequency_id], analysis)
+
+        assert [m.name for m in db.migrate()] == ["derived_result"]
+
+        db.insert_derived_results(sweep_id, "FFT", "hash", [frequency_id], analysis)
+        assert db.get_derived_results(sweep_id, "FFT", "hash") is not None
+
+
+def test_sqlite_sweep_blocks(tmp_path: Path):
+    with Database.session(StorageBackend.SQLITE, tmp_path / "a.sqlite") as db:
+        test_id = db.insert_test("Test 1", datetime.now())
+        sweep_id = db.insert_sweep(test_id, "Sweep 1", datetime.now())
+        channel_ids = [db.insert_channel(sweep_id, idx, f"ch{idx}") for idx in range(2)]
+
+        for idx in range(5):
+            frequency_id = db.insert_frequency(sweep_id, idx, 10 * (idx + 1), 1000)
+            db.insert_many_sweep_voltages(
+                [(frequency_id, channel_id, np.arange(10 + idx)) for channel_id in channel_ids],
+            )
+
+        blocks = list(db.iter_sweep_blocks(sweep_id, block_size=2, fetch_size=3))
+        assert [block.n_frequencies for block in blocks] == [2, 2, 1]
+        assert np.array_equal(
+            np.concatenate([block.frequency for block in blocks]),
+            db.get_sweep_tensor(sweep_id).frequency,
+        )
+
+        # Stopped early, the connection is still usable
+        for _ in db.iter_sweep_blocks(sweep_id, block_size=1):
+            break
+        assert len(db.get_channels_from_sweep_id(sweep_id)) == 2
+
+
+def test_sqlite_reindex_frequencies(tmp_path: Path):
+    with Database.session(StorageBackend.SQLITE, tmp_path / "a.sqlite") as db:
+        test_id = db.insert_test("Test 1", datetime.now())
+        sweep_id = db.insert_sweep(test_id, "Sweep 1", datetime.now())
+        for idx, frequency in enumerate([10, 1000, 100, 31.6]):
+            db.insert_frequency(sweep_id, idx, frequency, 1000)
+
+        db.reindex_frequencies(sweep_id)
+        frequencies = db.get_frequencies_from_sweep_id(sweep_id)
+
+    assert [f.frequency for f in frequencies] == [10, 31.6, 100, 1000]
+    assert [f.idx for f in frequencies] == [0, 1, 2, 3]
@@ -0,0 +1,38 @@
+import math
+
+import numpy as np
+
+from audio.device.cdaq import Ni9223
+from audio.utility.ring_buffer import RingBuffer
+
+
+def test_stream_index_at():
+    nidaq = Ni9223(number_of_samples=100, input_channel=["ai0"])
+    nidaq._stream_start_time = 10.0
+    nidaq._stream_rate = 80_000_000 / 101
+
+    for timestamp in [10.0, 10.25, 10.5 + 1e-7, 12.0]:
+        index = nidaq.stream_index_at(timestamp)
+
+        # The first sample acquired at or after the timestamp
+        assert 10.0 + index / nidaq._stream_rate >= timestamp
+        assert 10.0 + (index - 1) / nidaq._stream_rate < timestamp
+
+    assert nidaq.stream_index_at(10.0) == 0
+    assert nidaq.stream_index_at(11.0) == math.ceil(nidaq._stream_rate)
+
+
+def test_read_multi_voltages_after_decimation():
+    nidaq = Ni9223(number_of_samples=100, input_channel=["ai0", "ai1"])
+    nidaq.sampling_frequency = 1000
+    nidaq._stream_start_time = 0.0
+    nidaq._stream_rate = 1000
+    nidaq._stream_buffer = RingBuffer(2, 2000)
+    nidaq._stream_buffer.write(np.tile(np.arange(1500, dtype=np.float64), (2, 1)))
+
+    voltages = nidaq.read_multi_voltages_after(timestamp=0.1, decimation=5)
+    assert voltages.shape == (2, 100)
+    assert np.array_equal(voltages[0], np.arange(100, 600, 5))
+
+    # Longer than the stream buffer
+    assert nidaq.read_multi_voltages_after(timestamp=0.1, decimation=50) is None
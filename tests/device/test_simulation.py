@@ -0,0 +1,50 @@
+import math
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from audio.config.nidaq import Channel, NiDaqConfig
+from audio.config.plot import PlotConfig
+from audio.config.rigol import RigolConfig
+from audio.config.sampling import SamplingConfig
+from audio.config.sweep import SweepConfig
+from audio.database.db import Database
+from audio.device.backend import InstrumentBackend
+from audio.device.simulation import DutModel, SimulatedBench, SimulationClock
+from audio.math.batch import analyse_sweep
+from audio.sweep import sweep_amplitude_phase
+
+
+@pytest.mark.parametrize("streaming", [False, True])
+def test_simulated_sweep(sqlite_path: Path, streaming: bool):  # noqa: ARG001
+    dut = DutModel(gain_dB=-6.0, phase=30.0)
+    bench = SimulatedBench(clock=SimulationClock(speed=math.inf), dut=dut, seed=0)
+    config = SweepConfig(
+        RigolConfig(amplitude_peak_to_peak=2.0),
+        NiDaqConfig(max_frequency_sampling=1e6, channels=[Channel("ai1"), Channel("ai3")]),
+        SamplingConfig(
+            Fs_multiplier=50,
+            points_per_decade=5,
+            number_of_samples=1000,
+            frequency_min=100,
+            frequency_max=10_000,
+            delay_measurements=1.0,
+        ),
+        PlotConfig(),
+    )
+
+    sweep_id = sweep_amplitude_phase(
+        config,
+        streaming=streaming,
+        backend=InstrumentBackend.simulated(bench),
+    )
+
+    with Database.session() as db:
+        tensor = db.get_sweep_tensor(sweep_id)
+    result = analyse_sweep(tensor)
+
+    assert tensor.n_frequencies == 11  # noqa: PLR2004
+    response = dut.responses(tensor.frequency)
+    assert np.allclose(result.gain_dB(), 20 * np.log10(np.abs(response)), atol=0.01)
+    assert np.allclose(result.phase(), np.degrees(np.angle(response)), atol=0.1)
@@ -0,0 +1,48 @@
+import numpy as np
+
+from audio.math.adaptive import AdaptiveConfig, adaptive_sweep, refine_frequencies
+
+
+def low_pass(frequency: float) -> complex:
+    return 1 / (1 + 1j * frequency / 1000)
+
+
+def test_refine_flat_response():
+    frequency = np.geomspace(10, 100_000, 13)
+
+    new_frequencies, _ = refine_frequencies(frequency, np.zeros(13), np.zeros(13))
+
+    assert len(new_frequencies) == 0
+
+
+def test_refine_cutoff_crossing():
+    frequency = np.array([100.0, 1000.0, 10_000.0])
+    gain_dB = np.array([0.0, -1.0, -20.0])
+
+    new_frequencies, _ = refine_frequencies(
+        frequency,
+        gain_dB,
+        config=AdaptiveConfig(tolerance_dB=100),
+    )
+
+    assert np.allclose(new_frequencies, [np.sqrt(1000.0 * 10_000.0)])
+
+
+def test_adaptive_sweep_low_pass():
+    coarse = list(np.geomspace(10, 100_000, 13))
+    config = AdaptiveConfig(max_points=60)
+
+    result = adaptive_sweep(low_pass, coarse, config)
+
+    assert len(coarse) < len(result.frequency) <= config.max_points
+    assert np.all(np.diff(result.frequency) > 0)
+
+    # The -3 dB crossing is located within the tolerance
+    idx = np.argmin(np.abs(result.gain_dB + 3))
+    assert abs(result.gain_dB[idx] + 3) < config.tolerance_cutoff_dB
+
+    # Interpolation between the points follows the response
+    frequency = np.geomspace(10, 100_000, 1000)
+    interpolated = np.interp(np.log10(frequency), np.log10(result.frequency), result.gain_dB)
+    exact = 20 * np.log10(np.abs(low_pass(frequency)))
+    assert np.max(np.abs(interpolated - exact)) < 0.2
@@ -0,0 +1,17 @@
+import pytest
+
+from audio.math.algorithm import LogarithmicScale, decade_sampling
+
+
+def test_decade_sampling():
+    log_scale = LogarithmicScale(10, 10_000, 10)
+    sampling = [decade_sampling(frequency, 10, 1_000_000) for frequency in log_scale.f_list]
+
+    # One clock per decade, the last point opens the 10 kHz decade
+    assert {Fs for Fs, _ in sampling} == {1_000, 10_000, 100_000, 1_000_000}
+    for frequency, (Fs, decimation) in zip(log_scale.f_list, sampling, strict=True):
+        assert 10 <= Fs / decimation / frequency < 20  # noqa: PLR2004
+
+    assert decade_sampling(20, 10, 1_000_000) == (pytest.approx(1_000), 5)
+    assert decade_sampling(99.9, 10, 1_000_000) == (pytest.approx(1_000), 1)
+    assert decade_sampling(200_000, 10, 1_000_000) == (1_000_000, 1)
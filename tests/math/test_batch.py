@@ -0,0 +1,159 @@
+import numpy as np
+import pytest
+
+from audio.math.batch import (
+    BALANCED_COMBINATION,
+    SweepTensor,
+    analyse_sweep,
+    whole_period_weights,
+)
+from audio.math.rms import RMS, RMS_MODE
+from audio.model.sampling import VoltageSamplingV3
+
+
+def sweep_tensor(
+    frequency: list[float],
+    sampling_frequency: float,
+    lengths: list[int],
+    gain: float = 0.5,
+    phase: float = -np.pi / 4,
+    offset: tuple[float, float] = (0.0, 0.0),
+) -> SweepTensor:
+    voltages = []
+    for f, length in zip(frequency, lengths, strict=True):
+        n = np.arange(length)
+        omega = 2 * np.pi * f / sampling_frequency
+        voltages.append(
+            [
+                np.sin(omega * n) + offset[0],
+                gain * np.sin(omega * n + phase) + offset[1],
+            ],
+        )
+
+    return SweepTensor.from_voltages(
+        frequency,
+        [sampling_frequency] * len(frequency),
+        voltages,
+    )
+
+
+def test_from_voltages():
+    tensor = SweepTensor.from_voltages(
+        [10.0, 20.0],
+        [100.0, 100.0],
+        [[[1, 2, 3], [4, 5, 6, 7]], [[1, 2], [3, 4]]],
+    )
+
+    assert tensor.voltages.shape == (2, 2, 3)
+    # Every capture is cut to its shortest channel and zero padded
+    assert np.array_equal(tensor.lengths, [3, 2])
+    assert np.array_equal(tensor.voltages[0], [[1, 2, 3], [4, 5, 6]])
+    assert np.array_equal(tensor.voltages[1], [[1, 2, 0], [3, 4, 0]])
+
+
+def test_whole_period_weights():
+    # 4 coherent periods and 2.5 periods
+    weights, window = whole_period_weights(
+        np.array([40, 25]),
+        np.array([10.0, 10.0]),
+        np.array([100.0, 100.0]),
+        40,
+    )
+
+    assert np.array_equal(weights[0], np.ones(40))
+    assert window[0] == 40  # noqa: PLR2004
+
+    # Trapezoidal rule over the 2 whole periods, 20 intervals
+    assert window[1] == 20  # noqa: PLR2004
+    assert np.isclose(weights[1].sum(), window[1])
+    assert weights[1][0] == weights[1][20] == 0.5  # noqa: PLR2004
+    assert np.all(weights[1][21:] == 0)
+
+
+def test_analyse_sweep_rms_v3():
+    sampling_frequency = 10_000.0
+    frequency = [100.0, 250.0, 1000.0]
+    tensor = sweep_tensor(frequency, sampling_frequency, [1000, 800, 900])
+
+    analysis = analyse_sweep(tensor, processes=1)
+
+    # Coherent captures, the same RMS as the per point estimator
+    for idx, f in enumerate(frequency):
+        for channel in range(2):
+            sampling = VoltageSamplingV3(
+                tensor.voltages[idx, channel, : tensor.lengths[idx]],
+                f,
+                sampling_frequency,
+            )
+            expected = RMS.rms_v3(sampling, trim=False, rms_mode=RMS_MODE.FFT)
+            assert analysis.rms[idx, channel] == pytest.approx(expected)
+
+    assert np.allclose(analysis.gain_dB(), 20 * np.log10(0.5))
+    assert np.allclose(analysis.phase(), -45)
+    assert analysis.rms_std is None
+
+
+def test_analyse_sweep_sine_fit():
+    sampling_frequency = 10_000.0
+    frequency = [73.0, 310.0, 1234.5]
+    # Not coherent, the DC offsets are fitted out
+    tensor = sweep_tensor(
+        frequency,
+        sampling_frequency,
+        [1013, 777, 901],
+        offset=(0.1, -0.2),
+    )
+
+    analysis = analyse_sweep(tensor, processes=1, rms_mode=RMS_MODE.SINE_FIT)
+
+    for idx, f in enumerate(frequency):
+        for channel in range(2):
+            sampling = VoltageSamplingV3(
+                tensor.voltages[idx, channel, : tensor.lengths[idx]],
+                f,
+                sampling_frequency,
+            )
+            expected = RMS.rms_v3(sampling, trim=False, rms_mode=RMS_MODE.SINE_FIT)
+            assert analysis.rms[idx, channel] == pytest.approx(expected)
+
+    assert np.allclose(analysis.gain_dB(), 20 * np.log10(0.5))
+    assert np.allclose(analysis.phase(), -45)
+    assert analysis.rms_std.shape == analysis.phase_std.shape == (3, 2)
+    assert np.all(analysis.rms_std < 1e-9)  # noqa: PLR2004
+
+
+@pytest.mark.parametrize("rms_mode", [RMS_MODE.FFT, RMS_MODE.SINE_FIT])
+def test_analyse_sweep_sharded(rms_mode: RMS_MODE):
+    rng = np.random.default_rng(0)
+    frequency = rng.uniform(20, 2000, size=13).tolist()
+    lengths = rng.integers(500, 1000, size=13).tolist()
+    tensor = sweep_tensor(frequency, 10_000.0, lengths)
+    tensor.voltages += rng.normal(scale=0.01, size=tensor.voltages.shape)
+
+    single = analyse_sweep(tensor, processes=1, rms_mode=rms_mode)
+    sharded = analyse_sweep(tensor, processes=2, rms_mode=rms_mode)
+
+    assert np.allclose(single.rms, sharded.rms)
+    assert np.allclose(single.phasor, sharded.phasor)
+    if rms_mode == RMS_MODE.SINE_FIT:
+        assert np.allclose(single.rms_std, sharded.rms_std)
+        assert np.allclose(single.phase_std, sharded.phase_std)
+
+
+def test_combine():
+    tensor = sweep_tensor([100.0], 10_000.0, [1000])
+    balanced = SweepTensor(
+        voltages=np.concatenate((tensor.voltages, -tensor.voltages), axis=1)[:, [0, 2, 1, 3]],
+        lengths=tensor.lengths,
+        frequency=tensor.frequency,
+        sampling_frequency=tensor.sampling_frequency,
+        frequency_id=np.array([7]),
+        channel_id=np.array([[1, 2, 3, 4]]),
+    )
+
+    combined = balanced.combine(BALANCED_COMBINATION)
+
+    assert np.allclose(combined.voltages, 2 * tensor.voltages)
+    assert np.array_equal(combined.frequency_id, [7])
+    assert combined.channel_id is None
+    assert np.allclose(analyse_sweep(combined).gain_dB(), 20 * np.log10(0.5))
@@ -0,0 +1,82 @@
+import math
+
+import pytest
+
+from audio.config.sampling import SamplingConfig
+from audio.math.coherent import (
+    DAQ_TIMEBASE,
+    coerce_sampling_frequency,
+    coherent_number_of_samples_max,
+    is_coherent,
+    plan_coherent_point,
+)
+
+
+def test_coerce_sampling_frequency():
+    # 80 MHz / 794328 Hz is 100.7, the clock is set with the divider 101
+    assert coerce_sampling_frequency(794328) == pytest.approx(DAQ_TIMEBASE / 101)
+    assert coerce_sampling_frequency(800000) == 800000
+    assert not is_coherent(15886, coerce_sampling_frequency(794328), 50000)
+
+
+@pytest.mark.parametrize("frequency", [10.0, 20.5, 1234.567, 15886.0, 99999.3])
+def test_plan_coherent_point(frequency: float):
+    sampling_frequency = min(50 * frequency, 1_000_000)
+    point = plan_coherent_point(frequency, sampling_frequency, 200, 400, 1_000_000)
+
+    assert point.coherent
+    assert 200 <= point.number_of_samples <= 400
+    assert sampling_frequency / 2 <= point.sampling_frequency <= 2 * sampling_frequency
+
+    divider = DAQ_TIMEBASE / point.sampling_frequency
+    assert divider == pytest.approx(round(divider))
+    assert is_coherent(frequency, point.sampling_frequency, point.number_of_samples)
+    assert point.n_periods == round(
+        point.number_of_samples * frequency / point.sampling_frequency,
+    )
+
+
+def test_plan_coherent_point_prefers_requested_clock():
+    # 1 kHz at 50 kHz is already coherent with the minimum number of samples
+    point = plan_coherent_point(1000, 50000, 1000, 2000, 1_000_000)
+
+    assert point.sampling_frequency == 50000
+    assert point.number_of_samples == 1000
+    assert point.n_periods == 20
+    assert point.error == 0
+
+
+def test_plan_coherent_point_large_capture():
+    # The candidates grid would be about 10^6 x 4 * 10^4 without the bounds
+    point = plan_coherent_point(20.5, 1025, 1_000_000, 2_000_000, 1_000_000)
+
+    assert point.coherent
+    assert 1_000_000 <= point.number_of_samples <= 2_000_000
+
+
+def test_plan_coherent_point_not_coherent():
+    point = plan_coherent_point(
+        20.5123,
+        1025,
+        2000,
+        2000,
+        1_000_000,
+        tolerance=1e-9,
+    )
+
+    assert not point.coherent
+    assert point.number_of_samples == 2000
+    assert point.error == pytest.approx(
+        abs(2000 * 20.5123 / point.sampling_frequency - point.n_periods),
+    )
+    assert math.isfinite(point.error)
+
+
+def test_coherent_number_of_samples_max():
+    assert coherent_number_of_samples_max(SamplingConfig(number_of_samples=200)) == 400
+    assert (
+        coherent_number_of_samples_max(
+            SamplingConfig(number_of_samples=200, number_of_samples_max=300),
+        )
+        == 300
+    )
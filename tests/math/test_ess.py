@@ -0,0 +1,48 @@
+import numpy as np
+from scipy import signal
+
+from audio.math.ess import ExponentialSweep, ess_deconvolve, fft_convolve_chunked
+
+
+def test_fft_convolve_chunked():
+    rng = np.random.default_rng(0)
+    x = rng.normal(size=(2, 3000))
+    h = rng.normal(size=300)
+    full = np.array([np.convolve(channel, h) for channel in x])
+
+    assert np.allclose(fft_convolve_chunked(x, h, block_size=100), full)
+    window = fft_convolve_chunked(x, h, window=(200, 700), block_size=100)
+    assert np.allclose(window, full[:, 200:700])
+    # Blocks shorter than the filter
+    h = rng.normal(size=900)
+    assert np.allclose(fft_convolve_chunked(x[0], h, block_size=64), np.convolve(x[0], h))
+
+
+def test_ess_deconvolve():
+    sampling_frequency = 48000
+    sweep = ExponentialSweep(5, 20000, 2.0, sampling_frequency)
+
+    # Band-pass 20 Hz - 5 kHz after a 2nd and 3rd order nonlinearity
+    b, a = signal.bilinear(
+        *signal.butter(2, [2 * np.pi * 20, 2 * np.pi * 5000], btype="bandpass", analog=True),
+        sampling_frequency,
+    )
+    amplitude, a2, a3 = 0.5, 0.02, 0.01
+    ref = amplitude * np.concatenate(
+        [np.zeros(1234), sweep.signal(), np.zeros(sampling_frequency // 2)],
+    )
+    dut = signal.lfilter(b, a, ref + a2 * ref**2 + a3 * ref**3)
+
+    result = ess_deconvolve(np.vstack([ref, dut]), sweep, ir_length=0.5, n_harmonics=3)
+
+    frequency = np.array([50.0, 100.0, 200.0, 1000.0])
+    _, response = signal.freqz(b, a, worN=frequency, fs=sampling_frequency)
+    # The cubic term adds 3 / 4 * a3 * amplitude**2 to the fundamental
+    gain = 20 * np.log10(np.abs(response) * (1 + 0.75 * a3 * amplitude**2))
+
+    assert np.allclose(result.gain_dB(frequency), gain, atol=0.01)
+    assert np.allclose(result.phase(frequency), np.degrees(np.angle(response)), atol=0.05)
+
+    harmonic_distortion = result.harmonic_distortion(frequency)
+    assert np.allclose(harmonic_distortion[0], a2 * amplitude / 2, rtol=0.02)
+    assert np.allclose(harmonic_distortion[1][:3], a3 * amplitude**2 / 4, rtol=0.06)
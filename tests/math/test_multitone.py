@@ -0,0 +1,65 @@
+import numpy as np
+
+from audio.config.sampling import SamplingConfig
+from audio.math.coherent import DAQ_TIMEBASE
+from audio.math.multitone import (
+    crest_factor,
+    multitone_analysis,
+    multitone_waveform,
+    plan_multitone,
+)
+
+
+def test_plan_multitone():
+    sampling = SamplingConfig(
+        Fs_multiplier=51,
+        points_per_decade=10,
+        number_of_samples=200,
+        frequency_min=20,
+        frequency_max=200_000,
+    )
+
+    tone_sets = plan_multitone(sampling, max_frequency_sampling=1_000_000)
+    frequency = np.concatenate([tone_set.frequency for tone_set in tone_sets])
+
+    assert len(tone_sets) < 5
+    assert np.all(np.diff(frequency) > 0)
+    assert abs(frequency[0] - 20) < 1
+    assert abs(frequency[-1] - 200_000) < 2_000
+
+    for tone_set in tone_sets:
+        # Sample clock on the timebase, one waveform period per capture
+        assert (DAQ_TIMEBASE / tone_set.sampling_frequency).is_integer()
+        assert np.all(tone_set.bins < tone_set.number_of_samples // 2)
+
+        waveform = tone_set.waveform()
+        zero_phase = multitone_waveform(tone_set.bins, np.zeros(len(tone_set.bins)), len(waveform))
+        assert crest_factor(waveform) < 0.6 * crest_factor(zero_phase)
+
+
+def test_multitone_analysis():
+    sampling = SamplingConfig(
+        Fs_multiplier=20,
+        points_per_decade=10,
+        number_of_samples=200,
+        frequency_min=100,
+        frequency_max=10_000,
+    )
+    (tone_set,) = plan_multitone(sampling, max_frequency_sampling=1_000_000)
+
+    # First order low pass at 1 kHz on the DUT channel, two periods captured
+    response = 1 / (1 + 1j * tone_set.frequency / 1000)
+    n = np.arange(2 * tone_set.number_of_samples)
+    omega = 2 * np.pi * tone_set.bins[:, np.newaxis] * n / tone_set.number_of_samples
+    ref = np.sum(np.cos(omega + tone_set.phases[:, np.newaxis]), axis=0)
+    dut = np.sum(
+        np.abs(response)[:, np.newaxis]
+        * np.cos(omega + (tone_set.phases + np.angle(response))[:, np.newaxis]),
+        axis=0,
+    )
+
+    result = multitone_analysis(np.vstack((ref, dut)), tone_set)
+
+    assert np.allclose(result.gain_dB(), 20 * np.log10(np.abs(response)))
+    assert np.allclose(result.phase(), np.degrees(np.angle(response)))
+    assert np.allclose(result.rms[:, 0], 1 / np.sqrt(2))
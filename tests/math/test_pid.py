@@ -0,0 +1,46 @@
+import numpy as np
+
+from audio.math.pid import PidController, TimedValue, calculate_area, calculate_gradient
+
+
+def _pid(**kwargs) -> PidController:
+    return PidController(
+        set_point=1.0,
+        controller_gain=1.5,
+        tau_integral=2.0,
+        tau_derivative=0.5,
+        controller_output_zero=0.1,
+        **kwargs,
+    )
+
+
+def test_pid_incremental_terms():
+    pid = _pid()
+    rng = np.random.default_rng(0)
+    process_variables = rng.normal(1.0, 0.2, size=50).tolist()
+
+    for process_variable in process_variables:
+        pid.add_process_variable(process_variable)
+        pid.add_error(TimedValue(pid.set_point - process_variable))
+
+    errors = [pid.set_point - process_variable for process_variable in process_variables]
+    assert np.isclose(pid.integral_term, 1.5 * calculate_area(errors) / 2.0)
+    assert np.isclose(pid.derivative_term, -1.5 * 0.5 * calculate_gradient(process_variables))
+    assert np.isclose(pid.proportional_term, 1.5 * errors[-1])
+
+
+def test_pid_anti_windup_and_limits():
+    pid = _pid(integral_limit=0.5, output_limits=(0.0, 1.0), history=4)
+
+    for _ in range(20):
+        pid.add_process_variable(0.0)
+        pid.add_error(TimedValue(1.0))
+        pid.term.add_proportional(pid.proportional_term)
+        pid.term.add_integral(pid.integral_term)
+        pid.term.add_derivative(pid.derivative_term)
+        pid.add_process_output(pid.output_process)
+
+    assert np.isclose(pid.integral_term, 0.5)
+    assert pid.output_process == 1.0
+    assert len(pid.error_list) == 4
+    assert len(pid.term.integral) == 4
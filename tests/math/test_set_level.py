@@ -0,0 +1,38 @@
+import numpy as np
+
+from audio.math.set_level import solve_set_level
+
+
+def test_set_level_linear_dut():
+    calls: list[float] = []
+
+    def measure(amplitude: float) -> float:
+        calls.append(amplitude)
+        # Near-linear DUT, slightly compressing
+        return 0.35 * amplitude - 0.0005 * amplitude**2
+
+    result = solve_set_level(measure, target_rms=1.228, amplitude_start=0.01, tolerance=0.0005)
+
+    assert result is not None
+    assert result.converged
+    assert result.iterations <= 3
+    assert result.iterations == len(calls)
+    assert abs(measure(result.amplitude) - 1.228) < 0.0005
+
+
+def test_set_level_out_of_range():
+    result = solve_set_level(
+        lambda amplitude: 0.01 * amplitude,
+        target_rms=1.0,
+        amplitude_start=0.1,
+        tolerance=0.0005,
+        amplitude_max=11,
+    )
+
+    assert result is not None
+    assert not result.converged
+    assert np.isclose(result.amplitude, 11)
+
+
+def test_set_level_measure_error():
+    assert solve_set_level(lambda _: None, 1.0, 0.1, 0.0005) is None
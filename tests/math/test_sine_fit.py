@@ -0,0 +1,57 @@
+import numpy as np
+
+from audio.math.sine_fit import sine_fit
+
+
+def test_sine_fit():
+    sampling_frequency = 1000
+    frequency = 7.3
+    n = np.arange(1000)
+    samples = 0.5 * np.cos(2 * np.pi * frequency / sampling_frequency * n - 0.4) + 0.1
+
+    fit = sine_fit(samples, frequency, sampling_frequency)
+
+    assert np.isclose(fit.amplitude, 0.5)
+    assert np.isclose(fit.phase, -0.4)
+    assert np.isclose(fit.offset, 0.1)
+    assert fit.amplitude_std < 1e-9
+
+
+def test_sine_fit_frequency():
+    sampling_frequency = 1000
+    n = np.arange(2000)
+    samples = np.cos(2 * np.pi * 7.31 / sampling_frequency * n)
+
+    fit = sine_fit(samples, 7.3, sampling_frequency, fit_frequency=True)
+
+    assert np.isclose(fit.frequency, 7.31)
+    assert np.isclose(fit.amplitude, 1)
+
+
+def test_sine_fit_rows():
+    sampling_frequency = np.array([1000.0, 2000.0])
+    frequency = np.array([7.3, 101.0])
+    lengths = np.array([900, 1000])
+    n = np.arange(1000)
+
+    samples = np.zeros((2, 3, 1000))
+    for idx in range(2):
+        omega = 2 * np.pi * frequency[idx] / sampling_frequency[idx]
+        for channel in range(3):
+            samples[idx, channel, : lengths[idx]] = (channel + 1) * np.cos(
+                omega * n[: lengths[idx]] + 0.1 * channel,
+            )
+
+    # One frequency per row shared by the channels
+    fit = sine_fit(
+        samples,
+        frequency[:, np.newaxis],
+        sampling_frequency[:, np.newaxis],
+        lengths=lengths[:, np.newaxis],
+    )
+
+    assert fit.amplitude.shape == fit.frequency.shape == fit.amplitude_std.shape == (2, 3)
+    assert np.allclose(fit.amplitude, [[1, 2, 3], [1, 2, 3]])
+    assert np.allclose(fit.phase, [[0, 0.1, 0.2], [0, 0.1, 0.2]])
+    assert np.allclose(fit.frequency, frequency[:, np.newaxis])
+    assert np.allclose(fit.offset, 0)
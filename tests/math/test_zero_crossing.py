@@ -0,0 +1,34 @@
+import numpy as np
+
+from audio.math import trim_sin_zero_offset
+from audio.math.zero_crossing import zero_crossings
+
+
+def test_zero_crossings():
+    sampling_frequency = 1000
+    frequency = 7
+    times = np.arange(1000) / sampling_frequency
+    samples = np.sin(2 * np.pi * frequency * times + 0.1)
+
+    crossings = zero_crossings(samples, sampling_frequency=sampling_frequency)
+
+    expected = (np.arange(1, 15) * np.pi - 0.1) / (2 * np.pi * frequency)
+    assert len(crossings) == len(expected)
+    assert np.allclose(crossings.time, expected, atol=1e-5)
+    assert not crossings.rising[0]
+    assert crossings.rising[1]
+
+
+def test_trim_sin_zero_offset():
+    samples = list(np.sin(2 * np.pi * np.arange(1000) / 100 + 0.1))
+
+    trimmed, index_start, index_end = trim_sin_zero_offset(samples)
+
+    assert (index_start, index_end) == (48, 948)
+    assert len(trimmed) == 900
+    assert trim_sin_zero_offset([1.0, -1.0, 1.0]) is None
+
+
+if __name__ == "__main__":
+    test_zero_crossings()
+    test_trim_sin_zero_offset()
@@ -0,0 +1,40 @@
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from audio.math.batch import SweepTensor
+from audio.model.archive import SweepArchive
+from audio.model.sweep import SweepData
+
+pytest.importorskip("pyarrow")
+
+
+def test_archive_round_trip(tmp_path: Path):
+    path = tmp_path / "sweep.parquet"
+    data = pd.DataFrame({"frequency": [10.0, 100.0, 1000.0], "dBV": [-0.1, 0.0, 0.2]})
+    voltages = np.random.default_rng(0).normal(size=(3, 2, 16))
+    lengths = np.array([16, 12, 8])
+    voltages[np.arange(16) >= lengths[:, np.newaxis, np.newaxis].repeat(2, axis=1)] = 0
+
+    SweepArchive(
+        data,
+        amplitude=1.5,
+        config={"sweep_id": 1},
+        captures=SweepTensor(
+            voltages=voltages,
+            lengths=lengths,
+            frequency=data["frequency"].to_numpy(),
+            sampling_frequency=np.full(3, 48000.0),
+        ),
+    ).save(path)
+
+    sweep_data = SweepData.from_file(path, columns=["dBV"])
+    assert list(sweep_data.data.columns) == ["dBV"]
+    assert sweep_data.amplitude == 1.5
+
+    archive = SweepArchive.read(path, captures=True)
+    assert archive.config == {"sweep_id": 1}
+    assert list(archive.captures.lengths) == [16, 12, 8]
+    assert np.allclose(archive.captures.voltages, voltages, atol=1e-6)
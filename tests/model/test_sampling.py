@@ -0,0 +1,48 @@
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from audio.math.interpolation import InterpolationKind
+from audio.math.rms import RMS, RMS_MODE
+from audio.model.sampling import VoltageSamplingV3
+
+
+def test_voltage_sampling_v3_views():
+    Fs = 48000.0
+    n = np.arange(960)
+    voltages = np.stack(
+        [np.sin(2 * np.pi * 1000 * n / Fs), 0.5 * np.sin(2 * np.pi * 1000 * n / Fs)],
+    )
+
+    sampling = VoltageSamplingV3(voltages, 1000.0, Fs)
+
+    assert sampling.voltages is voltages
+    assert sampling.n_channels == 2
+    assert len(sampling) == 960
+    assert sampling.times[1] == 1 / Fs
+
+    dut = sampling.channel(1)
+    assert np.shares_memory(dut.voltages, voltages)
+
+    rms = RMS.rms_v3(dut, trim=False, rms_mode=RMS_MODE.FFT)
+    assert abs(rms - 0.5 / np.sqrt(2)) < 1e-9
+
+    interpolated = sampling.augment_interpolation(4, InterpolationKind.CUBIC)
+    assert interpolated.voltages.shape == (2, 3840)
+    assert interpolated.sampling_frequency == 4 * Fs
+
+
+def test_voltage_sampling_v3_save(tmp_path: Path):
+    path = tmp_path / "sampling.csv"
+    voltages = np.array([[0.0, 1.0, -1.0], [0.5, 0.25, 0.125]])
+    sampling = VoltageSamplingV3(voltages, 1234.56789, 48123.456789)
+
+    assert sampling.save(path)
+
+    # The header keeps the full precision of the frequencies
+    header = path.read_text().splitlines()[:2]
+    assert header == ["# frequency: 1234.56789", "# Fs: 48123.456789"]
+
+    data = pd.read_csv(path, comment="#")
+    assert np.allclose(data[["voltage-0", "voltage-1"]].to_numpy().T, voltages)
@@ -0,0 +1,72 @@
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+from click.testing import CliRunner
+
+from audio.database.db import Database, StorageBackend
+from audio.script.db import db
+
+
+def create_sweep() -> int:
+    with Database.session() as database:
+        test_id = database.insert_test("Test", datetime.now())
+        database.insert_test_config(test_id, '{"name": "Test"}')
+        sweep_id = database.insert_sweep(test_id, "Sweep", datetime.now())
+        channel_id = database.insert_channel(sweep_id, 0, "ai0")
+        frequency_id = database.insert_frequency(sweep_id, 0, 100, 1000)
+        database.insert_many_sweep_voltages([(frequency_id, channel_id, np.arange(10))])
+
+    return sweep_id
+
+
+def n_sweeps(path: Path) -> int:
+    with Database.session(StorageBackend.SQLITE, path) as database:
+        cur = database.connection.cursor()
+        cur.execute("SELECT COUNT(*) FROM audio.sweep")
+        return cur.fetchone()[0]
+
+
+def test_copy(sqlite_path: Path, tmp_path: Path):
+    sweep_id = create_sweep()
+    target_path = tmp_path / "target.sqlite"
+
+    result = CliRunner().invoke(
+        db,
+        [
+            "copy",
+            "--sweep-id",
+            sweep_id,
+            "--target",
+            "sqlite",
+            "--target-sqlite-path",
+            target_path,
+        ],
+    )
+    assert result.exit_code == 0
+
+    with Database.session(StorageBackend.SQLITE, target_path) as target:
+        tensor = target.get_sweep_tensor(1)
+        cur = target.connection.cursor()
+        cur.execute("SELECT test_id, config FROM audio.testConfig")
+        configs = cur.fetchall()
+
+    assert np.array_equal(tensor.voltages[0, 0], np.arange(10))
+    assert [(test_id, bytes(config)) for test_id, config in configs] == [
+        (1, b'{"name": "Test"}'),
+    ]
+    assert n_sweeps(sqlite_path) == 1
+
+
+def test_copy_same_database(sqlite_path: Path):
+    sweep_id = create_sweep()
+
+    # The configured SQLite file, given by path too
+    for options in (
+        ["--target", "sqlite"],
+        ["--target", "sqlite", "--target-sqlite-path", sqlite_path],
+    ):
+        result = CliRunner().invoke(db, ["copy", "--sweep-id", sweep_id, *options])
+        assert result.exit_code == 0
+
+    assert n_sweeps(sqlite_path) == 1
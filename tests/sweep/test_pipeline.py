@@ -0,0 +1,111 @@
+import threading
+import time
+from datetime import timedelta
+
+import numpy as np
+import pytest
+
+from audio.math.batch import SweepTensor, analyse_sweep
+from audio.sweep.pipeline import PointAnalyser, SweepPipeline, SweepPoint
+
+
+def test_pipeline_stages():
+    stored = []
+
+    with SweepPipeline([("double", lambda x: 2 * x), ("store", stored.append)]) as pipeline:
+        for item in range(10):
+            pipeline.put(item)
+
+    assert stored == [2 * item for item in range(10)]
+
+
+def test_pipeline_backpressure():
+    release = threading.Event()
+    put = []
+
+    pipeline = SweepPipeline([("store", lambda _: release.wait())], queue_size=2)
+    pipeline.start()
+
+    def acquire() -> None:
+        for item in range(5):
+            pipeline.put(item)
+            put.append(item)
+
+    thread = threading.Thread(target=acquire, daemon=True)
+    thread.start()
+    thread.join(timeout=0.2)
+
+    # One item in the stage and two in the queue, the acquisition is blocked
+    assert thread.is_alive()
+    assert put == [0, 1, 2]
+
+    release.set()
+    thread.join()
+    pipeline.close()
+    assert put == [0, 1, 2, 3, 4]
+
+
+def test_pipeline_error():
+    stored = []
+
+    def store(item: int) -> None:
+        if item == 2:  # noqa: PLR2004
+            _msg = "disk full"
+            raise OSError(_msg)
+        stored.append(item)
+
+    pipeline = SweepPipeline([("store", store)])
+    pipeline.start()
+    for item in range(2):
+        pipeline.put(item)
+
+    pipeline.put(2)
+    with pytest.raises(OSError, match="disk full"):
+        for item in range(3, 10):
+            pipeline.put(item)
+            time.sleep(0.01)
+        pipeline.close()
+
+    # The items after the error are drained, not processed
+    pipeline.close(raise_error=False)
+    assert stored == [0, 1]
+    with pytest.raises(OSError, match="disk full"):
+        pipeline.close()
+
+
+def test_pipeline_statistics():
+    pipeline = SweepPipeline([("slow", lambda _: time.sleep(0.02)), ("fast", lambda _: None)])
+    with pipeline:
+        for item in range(5):
+            pipeline.put(item, busy=timedelta(milliseconds=10))
+
+    acquisition, slow, fast = pipeline.statistics
+    assert (acquisition.name, slow.name, fast.name) == ("acquisition", "slow", "fast")
+    assert acquisition.items == slow.items == 5  # noqa: PLR2004
+    # `None` drops the items
+    assert fast.items == 0
+    assert acquisition.busy == timedelta(milliseconds=50)
+    assert slow.busy >= timedelta(milliseconds=100)
+    assert slow.occupancy > 0.5  # noqa: PLR2004
+    assert 0 <= acquisition.occupancy <= 1
+
+
+def test_point_analyser():
+    sampling_frequency = 10_000.0
+    n = np.arange(1000)
+    voltages = np.array(
+        [
+            np.sin(2 * np.pi * 100 * n / sampling_frequency),
+            0.5 * np.sin(2 * np.pi * 100 * n / sampling_frequency - np.pi / 4),
+            np.zeros(len(n)),
+        ],
+    )
+
+    point = PointAnalyser([0, 1])(SweepPoint(0, 100.0, sampling_frequency, voltages))
+
+    expected = analyse_sweep(
+        SweepTensor.from_voltages([100.0], [sampling_frequency], [voltages[:2]]),
+    )
+    assert np.allclose(point.analysis.rms, expected.rms)
+    assert point.analysis.gain_dB()[0] == pytest.approx(20 * np.log10(0.5))
+    assert point.analysis.phase()[0] == pytest.approx(-45)
@@ -0,0 +1,80 @@
+import math
+from pathlib import Path
+
+import numpy as np
+
+from audio.device.simulation import SimulationClock
+from audio.sweep.settle import SettleCache, SettleConfig, SettleDetector, wait_settled
+
+
+def _block_reader(clock: SimulationClock, frequency: float, Fs: float, tau: float):
+    def read_block(number_of_samples: int) -> np.ndarray:
+        times = clock.now() + np.arange(number_of_samples) / Fs
+        clock.sleep(number_of_samples / Fs)
+        amplitude = 1 - np.exp(-times / tau)
+        return np.stack(
+            [
+                amplitude * np.sin(2 * np.pi * frequency * times),
+                0.5 * amplitude * np.sin(2 * np.pi * frequency * times - 0.3),
+            ],
+        )
+
+    return read_block
+
+
+def test_wait_settled():
+    clock = SimulationClock(math.inf)
+    read_block = _block_reader(clock, 1000.0, 48000.0, tau=0.01)
+
+    result = wait_settled(read_block, 1000.0, 48000.0, clock.now, SettleConfig())
+
+    assert result.settled
+    # Relative amplitude change below 1e-3 after about 7 time constants
+    assert 0.04 < result.time < 0.1
+
+
+def test_wait_settled_timeout():
+    clock = SimulationClock(math.inf)
+    read_block = _block_reader(clock, 1000.0, 48000.0, tau=100.0)
+
+    result = wait_settled(read_block, 1000.0, 48000.0, clock.now, SettleConfig(timeout=0.5))
+
+    assert not result.settled
+    assert result.time >= 0.5
+
+
+def test_settle_cache(tmp_path: Path):
+    path = tmp_path / "settle.json"
+    clock = SimulationClock(math.inf)
+
+    detector = SettleDetector("dut", clock.sleep, clock.now, cache=SettleCache(path))
+    learned = detector.wait(_block_reader(clock, 1000.0, 48000.0, tau=0.01), 1000.0, 48000.0)
+    detector.save()
+
+    # The same DUT, settled after the learned time: two blocks check it
+    clock = SimulationClock(math.inf)
+    detector = SettleDetector("dut", clock.sleep, clock.now, cache=SettleCache(path))
+    cached = detector.wait(_block_reader(clock, 1000.0, 48000.0, tau=0.01), 1000.0, 48000.0)
+
+    assert cached.cached
+    assert cached.time == learned.time
+    assert cached.blocks == 2
+    assert clock.now() < learned.time * detector.config.margin + 0.02
+
+
+def test_settle_cache_redetect(tmp_path: Path):
+    cache = SettleCache(tmp_path / "settle.json")
+    cache.set("dut", 1000.0, 0.01)
+
+    # The learned time is too short for the slower DUT
+    clock = SimulationClock(math.inf)
+    detector = SettleDetector("dut", clock.sleep, clock.now, cache=cache)
+    result = detector.wait(_block_reader(clock, 1000.0, 48000.0, tau=0.02), 1000.0, 48000.0)
+
+    assert result.settled
+    assert not result.cached
+    assert result.time > 0.08
+    assert cache.get("dut", 1000.0) == result.time
+
+    detector.clear()
+    assert cache.get("dut", 1000.0) is None
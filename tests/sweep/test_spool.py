@@ -0,0 +1,40 @@
+from pathlib import Path
+
+import numpy as np
+
+from audio.database.codec import VoltageFormat
+from audio.sweep.spool import CaptureSpool, CaptureSpoolWriter
+
+
+def test_spool_interrupted(tmp_path: Path):
+    path = tmp_path / "sweep.spool"
+    captures = [np.random.default_rng(idx).normal(size=(2, 100 + idx)) for idx in range(3)]
+
+    with CaptureSpoolWriter(path, 2, 128, config={"sweep_id": 1}) as spool:
+        for idx, voltages in enumerate(captures):
+            spool.append(idx, 10.0 * (idx + 1), 1000.0, voltages)
+
+    # A crash in the middle of the last frame
+    with path.open("r+b") as f:
+        f.truncate(path.stat().st_size - 10)
+
+    spool = CaptureSpool.read(path)
+    assert spool.config == {"sweep_id": 1}
+    assert len(spool) == 2
+    for idx in range(2):
+        assert np.allclose(spool.voltages(idx), captures[idx], atol=1e-6)
+
+    tensor = spool.to_tensor()
+    assert tensor.voltages.shape == (2, 2, 128)
+    assert list(tensor.lengths) == [100, 101]
+
+
+def test_spool_int16(tmp_path: Path):
+    path = tmp_path / "sweep.spool"
+    voltages = np.sin(np.linspace(0, 10, 64))[np.newaxis]
+
+    with CaptureSpoolWriter(path, 1, 64, VoltageFormat.INT16, scale=1 / 32767) as spool:
+        spool.append(0, 1000.0, 48000.0, voltages)
+
+    spool = CaptureSpool.read(path)
+    assert np.allclose(spool.voltages(0), voltages, atol=1e-4)
@@ -0,0 +1,54 @@
+import math
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from audio.config.nidaq import Channel, NiDaqConfig
+from audio.config.plot import PlotConfig
+from audio.config.rigol import RigolConfig
+from audio.config.sampling import SamplingConfig
+from audio.config.sweep import SweepConfig
+from audio.device.backend import InstrumentBackend
+from audio.device.simulation import SimulatedBench, SimulatedNi9223, SimulationClock
+from audio.sweep.ess import sweep_ess
+
+
+def test_sweep_ess_cleanup(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    bench = SimulatedBench(clock=SimulationClock(speed=math.inf), seed=0)
+    config = SweepConfig(
+        RigolConfig(amplitude_peak_to_peak=2.0),
+        NiDaqConfig(
+            max_frequency_sampling=1e6,
+            channels=[Channel("ai1"), Channel("ai3")],
+        ),
+        SamplingConfig(
+            points_per_decade=5,
+            frequency_min=100,
+            frequency_max=10_000,
+        ),
+        PlotConfig(),
+    )
+    closed = []
+
+    def read_multi_voltages(self: SimulatedNi9223) -> np.ndarray:  # noqa: ARG001
+        assert bench._state.output
+        _msg = "cDAQ disconnected"
+        raise RuntimeError(_msg)
+
+    monkeypatch.setattr(SimulatedNi9223, "read_multi_voltages", read_multi_voltages)
+    monkeypatch.setattr(SimulatedNi9223, "task_close", lambda _: closed.append(True))
+
+    with pytest.raises(RuntimeError, match="cDAQ disconnected"):
+        sweep_ess(
+            config,
+            tmp_path,
+            tmp_path / "sweep.csv",
+            backend=InstrumentBackend.simulated(bench),
+            duration=0.5,
+        )
+
+    # The generator output and sweep are off, the task closed
+    assert not bench._state.output
+    assert not bench._state.sweep
+    assert closed == [True]
@@ -0,0 +1,64 @@
+import math
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+import audio.sweep.multitone
+from audio.config.nidaq import Channel, NiDaqConfig
+from audio.config.plot import PlotConfig
+from audio.config.rigol import RigolConfig
+from audio.config.sampling import SamplingConfig
+from audio.config.sweep import SweepConfig
+from audio.database.db import Database
+from audio.device.backend import InstrumentBackend
+from audio.device.simulation import SimulatedBench, SimulatedNi9223, SimulationClock
+from audio.sweep.multitone import sweep_multitone
+
+
+def test_sweep_multitone_cleanup(
+    sqlite_path: Path,  # noqa: ARG001
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+):
+    monkeypatch.setattr(audio.sweep.multitone, "APP_HOME", tmp_path)
+    bench = SimulatedBench(clock=SimulationClock(speed=math.inf), seed=0)
+    config = SweepConfig(
+        RigolConfig(amplitude_peak_to_peak=2.0),
+        NiDaqConfig(
+            max_frequency_sampling=1e6,
+            channels=[Channel("ai1"), Channel("ai3")],
+        ),
+        SamplingConfig(
+            Fs_multiplier=50,
+            points_per_decade=5,
+            number_of_samples=1000,
+            frequency_min=100,
+            frequency_max=10_000,
+            delay_measurements=0.1,
+        ),
+        PlotConfig(),
+    )
+    closed = []
+
+    def read_multi_voltages(self: SimulatedNi9223) -> np.ndarray:  # noqa: ARG001
+        assert bench._state.output
+        _msg = "cDAQ disconnected"
+        raise RuntimeError(_msg)
+
+    monkeypatch.setattr(SimulatedNi9223, "read_multi_voltages", read_multi_voltages)
+    monkeypatch.setattr(SimulatedNi9223, "task_close", lambda _: closed.append(True))
+
+    with Database.session() as db:
+        test_id = db.insert_test("Test", datetime.now())
+
+    with pytest.raises(RuntimeError, match="cDAQ disconnected"):
+        sweep_multitone(test_id, config, backend=InstrumentBackend.simulated(bench))
+
+    # The generator output is off, the task and the spool closed
+    assert not bench._state.output
+    assert closed == [True]
+    spool_path = tmp_path / "data/measurements/sweep-1.spool"
+    with spool_path.open("rb+"):
+        pass
@@ -0,0 +1,183 @@
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from audio.database.db import Database
+from audio.sweep.pipeline import PointAnalyser, SweepPoint
+from audio.sweep.writer import DatabaseWriter
+
+
+def create_sweep() -> tuple[int, list[int]]:
+    with Database.session() as db:
+        test_id = db.insert_test("Test", datetime.now())
+        sweep_id = db.insert_sweep(test_id, "Sweep", datetime.now())
+        channel_ids = [db.insert_channel(sweep_id, idx, f"ai{idx}") for idx in range(2)]
+
+    return sweep_id, channel_ids
+
+
+def point(idx: int) -> SweepPoint:
+    return SweepPoint(idx, 100.0 * (idx + 1), 10_000.0, np.full((2, 50), float(idx)))
+
+
+def n_frequencies(sweep_id: int) -> int:
+    with Database.session() as db:
+        return len(db.get_frequencies_from_sweep_id(sweep_id))
+
+
+def record_batches(writer: DatabaseWriter) -> list[int]:
+    batches = []
+    write = writer._write
+
+    def _write(db: Database, points: list[SweepPoint]) -> None:
+        write(db, points)
+        batches.append(len(points))
+
+    writer._write = _write
+    return batches
+
+
+def test_writer_batch_points(sqlite_path: Path):  # noqa: ARG001
+    sweep_id, channel_ids = create_sweep()
+
+    writer = DatabaseWriter(
+        sweep_id,
+        channel_ids,
+        batch_points=3,
+        batch_interval=timedelta(hours=1),
+    )
+    batches = record_batches(writer)
+
+    with writer:
+        for idx in range(7):
+            writer.put(point(idx))
+
+        # `flush` commits the pending point before the batch is full
+        writer.flush()
+        assert batches == [3, 3, 1]
+        assert n_frequencies(sweep_id) == 7  # noqa: PLR2004
+
+    with Database.session() as db:
+        tensor = db.get_sweep_tensor(sweep_id)
+    assert np.array_equal(tensor.voltages[:, 0, 0], np.arange(7))
+
+
+def test_writer_batch_interval(sqlite_path: Path):  # noqa: ARG001
+    sweep_id, channel_ids = create_sweep()
+
+    writer = DatabaseWriter(
+        sweep_id,
+        channel_ids,
+        batch_points=100,
+        batch_interval=timedelta(milliseconds=50),
+    )
+    batches = record_batches(writer)
+
+    with writer:
+        writer.put(point(0))
+        writer.put(point(1))
+
+        deadline = time.monotonic() + 5
+        while len(batches) == 0 and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+        # Written after `batch_interval` without a flush
+        assert batches == [2]
+        assert n_frequencies(sweep_id) == 2  # noqa: PLR2004
+
+
+def test_writer_backpressure(sqlite_path: Path):  # noqa: ARG001
+    sweep_id, channel_ids = create_sweep()
+    release = threading.Event()
+    put = []
+
+    writer = DatabaseWriter(sweep_id, channel_ids, batch_points=1, queue_size=2)
+    write = writer._write
+
+    def _write(db: Database, points: list[SweepPoint]) -> None:
+        release.wait()
+        write(db, points)
+
+    writer._write = _write
+    writer.start()
+
+    def acquire() -> None:
+        for idx in range(5):
+            writer.put(point(idx))
+            put.append(idx)
+
+    thread = threading.Thread(target=acquire, daemon=True)
+    thread.start()
+    thread.join(timeout=0.2)
+
+    # One point in the transaction and two in the queue
+    assert thread.is_alive()
+    assert put == [0, 1, 2]
+
+    release.set()
+    thread.join()
+    writer.close()
+    assert n_frequencies(sweep_id) == 5  # noqa: PLR2004
+
+
+def test_writer_error(sqlite_path: Path, monkeypatch: pytest.MonkeyPatch):  # noqa: ARG001
+    sweep_id, channel_ids = create_sweep()
+
+    def insert_many_sweep_voltages(*_, **__) -> None:
+        _msg = "disk I/O error"
+        raise sqlite3.OperationalError(_msg)
+
+    monkeypatch.setattr(Database, "insert_many_sweep_voltages", insert_many_sweep_voltages)
+
+    writer = DatabaseWriter(sweep_id, channel_ids, batch_points=2)
+    writer.start()
+    writer.put(point(0))
+    writer.put(point(1))
+
+    with pytest.raises(sqlite3.OperationalError, match="disk I/O error"):
+        writer.flush()
+    with pytest.raises(sqlite3.OperationalError):
+        writer.put(point(2))
+    with pytest.raises(sqlite3.OperationalError):
+        writer.close()
+
+    # The failed batch is rolled back
+    assert n_frequencies(sweep_id) == 0
+    writer.close(raise_error=False)
+
+
+def test_writer_analysis(sqlite_path: Path):  # noqa: ARG001
+    sweep_id, channel_ids = create_sweep()
+    analyser = PointAnalyser([0, 1])
+    n = np.arange(1000)
+
+    writer = DatabaseWriter(
+        sweep_id,
+        channel_ids,
+        estimator=analyser.estimator,
+        parameters_hash=analyser.parameters_hash,
+    )
+    with writer:
+        for idx, frequency in enumerate([100.0, 200.0]):
+            voltages = np.vstack(
+                [
+                    np.sin(2 * np.pi * frequency * n / 10_000),
+                    0.5 * np.sin(2 * np.pi * frequency * n / 10_000),
+                ],
+            )
+            writer.put(analyser(SweepPoint(idx, frequency, 10_000.0, voltages)))
+
+    with Database.session() as db:
+        result = db.get_derived_results(
+            sweep_id,
+            analyser.estimator,
+            analyser.parameters_hash,
+        )
+
+    assert np.allclose(result.frequency, [100, 200])
+    assert np.allclose(result.gain_dB(), 20 * np.log10(0.5))
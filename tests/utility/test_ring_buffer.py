@@ -0,0 +1,51 @@
+import threading
+
+import numpy as np
+import pytest
+
+from audio.utility.ring_buffer import RingBuffer, RingBufferOverrunError
+
+
+def test_ring_buffer_wrap_around():
+    buffer = RingBuffer(2, 8)
+    samples = np.vstack([np.arange(20.0), -np.arange(20.0)])
+
+    for start in range(0, 20, 3):
+        buffer.write(samples[:, start : start + 3])
+
+    assert buffer.written == 20
+    assert buffer.oldest == 12
+    assert np.array_equal(buffer.read(12, 8), samples[:, 12:20])
+    assert np.array_equal(buffer.read(15, 3), samples[:, 15:18])
+
+
+def test_ring_buffer_overrun():
+    buffer = RingBuffer(1, 8)
+    buffer.write(np.arange(10.0)[np.newaxis, :])
+
+    with pytest.raises(RingBufferOverrunError):
+        buffer.read(1, 4)
+    with pytest.raises(RingBufferOverrunError):
+        buffer.read(8, 4)
+
+
+def test_ring_buffer_block_larger_than_capacity():
+    buffer = RingBuffer(1, 4)
+    buffer.write(np.arange(10.0)[np.newaxis, :])
+
+    assert buffer.written == 10
+    assert np.array_equal(buffer.read(6, 4), [[6.0, 7.0, 8.0, 9.0]])
+
+
+def test_ring_buffer_wait_for():
+    buffer = RingBuffer(1, 16)
+
+    assert not buffer.wait_for(4, timeout=0.01)
+
+    writer = threading.Timer(0.01, buffer.write, args=(np.ones((1, 4)),))
+    writer.start()
+    assert buffer.wait_for(4, timeout=5)
+    writer.join()
+
+    buffer.reset()
+    assert buffer.written == 0